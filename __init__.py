@@ -1,3 +1,3 @@
-from .memory_metrics import MemoryMetrics
-from .cpu_metrics import CPUMetrics
-from .disk_metrics import DiskMetrics
+from .memory_metrics import MemoryMetrics
+from .cpu_metrics import CPUMetrics
+from .disk_metrics import DiskMetrics
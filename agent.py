@@ -0,0 +1,253 @@
+"""
+Lightweight collection agent: collects snapshots on this host and ships them to an aggregator.
+
+    python agent.py --aggregator monitor.internal:9300 --host web-1 --interval 30 --token "$AGGREGATOR_TOKEN"
+
+Flask, the Analyzer and the dashboard are never loaded; the aggregator serves them.
+"""
+import argparse
+import asyncio
+import collections
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+
+from metrics.scheduler import FixedRateScheduler
+from metrics.wire_protocol import ProtocolError, encode_frame, read_frame
+
+
+class MetricsAgent:
+    """
+    Ships metrics snapshots to an aggregator over one persistent TCP connection.
+
+    Snapshots wait in a bounded outbox. At most max_in_flight of them are on the wire
+    without an acknowledgement; when the aggregator falls behind, acks slow down and
+    the outbox fills, and once outbox_size snapshots are pending the oldest is dropped
+    (fresh data is worth more than stale). After a reconnect the unacknowledged
+    snapshots are sent again; the aggregator discards duplicates by (session, seq).
+
+    collect, if given, is called every interval seconds on a worker thread; snapshots
+    can also be handed over with submit() from any thread. token is sent in the hello
+    frame for aggregators that require a shared token.
+    """
+
+    def __init__(self, collect=None, aggregator=("127.0.0.1", 9300), host=None, interval=30,
+                 max_in_flight=8, outbox_size=100, reconnect_delay=1.0, max_reconnect_delay=30.0,
+                 compression_level=6, token=None):
+        self.collect = collect
+        self.aggregator = aggregator
+        self.host = host or socket.gethostname()
+        self.session = uuid.uuid4().hex
+        self.interval = interval
+        self.max_in_flight = max(1, max_in_flight)
+        self.outbox_size = max(1, outbox_size)
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.compression_level = compression_level
+        self.token = token
+        self.scheduler = FixedRateScheduler(interval)
+        self.lock = threading.Lock()
+        self._outbox = collections.deque()              # (seq, snapshot) not yet sent
+        self._unacked = collections.OrderedDict()       # seq -> snapshot sent on this connection
+        self._seq = 0
+        self._loop = None
+        self._wakeup = None
+        self._stop_event = None
+        self._thread = None
+        self.stats = {"collected": 0, "sent": 0, "acked": 0, "resent": 0, "dropped": 0, "bytes_sent": 0,
+                      "connects": 0, "connected": False}
+
+    # ---------- Outbox ----------------------------------------------------------------
+
+    def submit(self, snapshot):
+        """Queue a snapshot for shipping (thread-safe, never blocks)."""
+        with self.lock:
+            self._seq += 1
+            self._outbox.append((self._seq, snapshot))
+            self.stats["collected"] += 1
+            while len(self._outbox) + len(self._unacked) > self.outbox_size and self._outbox:
+                self._outbox.popleft()
+                self.stats["dropped"] += 1
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _next_snapshot(self):
+        with self.lock:
+            if not self._outbox or len(self._unacked) >= self.max_in_flight:
+                return None
+            seq, snapshot = self._outbox.popleft()
+            self._unacked[seq] = snapshot
+            return seq, snapshot
+
+    def _acknowledge(self, seq):
+        with self.lock:
+            while self._unacked and next(iter(self._unacked)) <= seq:
+                self._unacked.popitem(last=False)
+                self.stats["acked"] += 1
+
+    def _requeue_unacked(self):
+        """Put snapshots sent on a lost connection back at the front of the outbox."""
+        with self.lock:
+            self.stats["resent"] += len(self._unacked)
+            self._outbox.extendleft(reversed(list(self._unacked.items())))
+            self._unacked.clear()
+
+    # ---------- Connection ----------------------------------------------------------------
+
+    async def _send_loop(self, writer):
+        while True:
+            item = self._next_snapshot()
+            if item is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            seq, snapshot = item
+            frame = encode_frame({"type": "snapshot", "seq": seq, "snapshot": snapshot}, self.compression_level)
+            writer.write(frame)
+            await writer.drain()
+            self.stats["sent"] += 1
+            self.stats["bytes_sent"] += len(frame)
+
+    async def _ack_loop(self, reader):
+        while True:
+            message = await read_frame(reader)
+            if message is None:
+                raise ConnectionError("Aggregator closed the connection")
+            if message.get("type") == "ack":
+                self._acknowledge(message["seq"])
+                self._wakeup.set()
+            elif message.get("type") == "error":
+                raise ConnectionError(f"Aggregator refused the connection: {message.get('message')}")
+
+    async def _connection(self):
+        reader, writer = await asyncio.open_connection(*self.aggregator)
+        self.stats["connects"] += 1
+        self.stats["connected"] = True
+        logging.info(f"Agent {self.host} connected to aggregator {self.aggregator[0]}:{self.aggregator[1]}")
+        try:
+            hello = {"type": "hello", "host": self.host, "session": self.session, "interval": self.interval,
+                     "pid": os.getpid()}
+            if self.token:
+                hello["token"] = self.token
+            writer.write(encode_frame(hello))
+            await writer.drain()
+            tasks = [asyncio.ensure_future(self._send_loop(writer)), asyncio.ensure_future(self._ack_loop(reader))]
+            try:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+                for task in done:
+                    task.result()
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            self.stats["connected"] = False
+            writer.close()
+
+    async def _ship_loop(self):
+        delay = self.reconnect_delay
+        while not self._stop_event.is_set():
+            connects = self.stats["connects"]
+            try:
+                await self._connection()
+            except (OSError, ConnectionError, ProtocolError) as e:
+                if self.stats["connects"] > connects:
+                    delay = self.reconnect_delay  # the connection was up: start backing off afresh
+                logging.warning(f"Agent {self.host}: aggregator connection lost ({e}); retrying in {delay:.1f}s")
+            self._requeue_unacked()
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _collect_loop(self):
+        loop = asyncio.get_running_loop()
+        while not self._stop_event.is_set():
+            self.scheduler.begin_tick()
+            try:
+                snapshot = await loop.run_in_executor(None, self.collect)
+                if snapshot is not None:
+                    self.submit(snapshot)
+            except Exception as e:
+                logging.error(f"Agent collection failed: {e}")
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), self.scheduler.advance())
+            except asyncio.TimeoutError:
+                pass
+
+    async def _main(self):
+        tasks = [asyncio.ensure_future(self._ship_loop())]
+        if self.collect is not None:
+            tasks.append(asyncio.ensure_future(self._collect_loop()))
+        await self._stop_event.wait()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def start(self):
+        """Run the agent's event loop on a background thread."""
+        if self._thread:
+            return
+        self._loop = asyncio.new_event_loop()
+        self._wakeup = asyncio.Event()
+        self._stop_event = asyncio.Event()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._loop.run_until_complete(self._main())
+            finally:
+                self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="metrics-agent", daemon=True)
+        self._thread.start()
+        logging.info(f"Started metrics agent {self.host} (session {self.session}).")
+
+    def stop(self):
+        if self._loop and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+            logging.info("Stopped metrics agent.")
+
+
+def parse_address(value, default_port=9300):
+    host, _, port = value.rpartition(":")
+    return (host, int(port)) if host else (value, default_port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Collect system metrics and ship them to an aggregator.")
+    parser.add_argument("--aggregator", default=os.getenv("AGGREGATOR_ADDRESS", "127.0.0.1:9300"),
+                        help="Aggregator host:port.")
+    parser.add_argument("--host", default=os.getenv("AGENT_HOST_NAME"), help="Host name reported (default: hostname).")
+    parser.add_argument("--interval", type=float, default=float(os.getenv("AUTO_SAVE_INTERVAL", "30")))
+    parser.add_argument("--backend", choices=("psutil", "procfs"), default=os.getenv("COLLECTOR_BACKEND", "psutil"))
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--outbox-size", type=int, default=100)
+    parser.add_argument("--token", default=os.getenv("AGGREGATOR_TOKEN"), help="Shared token the aggregator expects.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    from metrics.metric_manager import MetricManager
+    metric_manager = MetricManager(collector_backend=args.backend)
+    agent = MetricsAgent(metric_manager.collect_metrics, aggregator=parse_address(args.aggregator), host=args.host,
+                         interval=args.interval, max_in_flight=args.max_in_flight, outbox_size=args.outbox_size,
+                         token=args.token)
+    agent.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        agent.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
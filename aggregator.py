@@ -0,0 +1,314 @@
+import asyncio
+import collections
+import hmac
+import logging
+import os
+import re
+import threading
+import time
+
+from metrics.metrics_writer import MetricsWriter
+from metrics.openmetrics_exporter import OpenMetricsExporter
+from metrics.self_profiler import perf
+from metrics.wire_protocol import ProtocolError, encode_frame, read_frame
+
+
+class MetricsAggregator:
+    """
+    Ingests snapshots from many agents and keeps a bounded series per host.
+
+    One asyncio server (on its own thread) reads every agent connection. Decoded
+    snapshots go into a bounded ingest queue; when it is full, connection readers
+    stop reading, so TCP flow control and the agents' in-flight window push back
+    all the way to the agents. A single ingest task drains the queue in batches of up
+    to batch_size snapshots (or whatever arrived within batch_interval), applies
+    each batch under one lock acquisition and then acknowledges the highest sequence
+    number per connection.
+
+    Per host the last `history` snapshots are kept in memory; with history_dir set
+    they are also appended to <history_dir>/<host>/system_metrics.json through a
+    MetricsWriter, so the Analyzer can run on any host's history.
+
+    The server listens on loopback unless listen_host says otherwise. With token set,
+    an agent whose hello frame does not carry the same shared token is refused.
+    """
+
+    def __init__(self, listen_host="127.0.0.1", port=9300, max_queue=1000, batch_size=64, batch_interval=0.2,
+                 history=720, history_dir=None, writer_options=None, token=None):
+        self.listen_host = listen_host
+        self.port = port
+        self.token = token
+        self.max_queue = max_queue
+        self.batch_size = max(1, batch_size)
+        self.batch_interval = batch_interval
+        self.history = history
+        self.history_dir = history_dir
+        self.writer_options = writer_options or {}
+        self.lock = threading.Lock()
+        self._hosts = {}        # host -> {"series", "session", "last_seq", "connected", ...}
+        self._writers = {}      # host -> MetricsWriter
+        self._openmetrics = {}  # host -> (snapshot, rendered text)
+        self.openmetrics_exporter = OpenMetricsExporter()
+        self._queue = None
+        self._server = None
+        self._connections = {}  # connection handler task -> stream writer
+        self._loop = None
+        self._stop_event = None
+        self._thread = None
+        self._started = threading.Event()
+        self.stats = {"connections": 0, "snapshots": 0, "duplicates": 0, "batches": 0, "protocol_errors": 0,
+                      "queue_full_waits": 0, "rejected": 0}
+
+    # ---------- Ingestion -----------------------------------------------------------------
+
+    async def _handle_connection(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        connection = {"writer": writer, "host": None, "session": None}
+        self._connections[asyncio.current_task()] = writer
+        try:
+            hello = await read_frame(reader)
+            if not isinstance(hello, dict) or hello.get("type") != "hello" or not hello.get("host"):
+                raise ProtocolError("Expected a hello frame")
+            if self.token is not None and not hmac.compare_digest(str(hello.get("token") or ""), self.token):
+                self.stats["rejected"] += 1
+                logging.warning(f"Aggregator: rejecting agent {hello['host']} from {peer}: invalid token")
+                writer.write(encode_frame({"type": "error", "message": "Invalid token"}))
+                await writer.drain()
+                return
+            connection.update(host=str(hello["host"]), session=hello.get("session"))
+            self._register(connection, hello, peer)
+            self.stats["connections"] += 1
+            logging.info(f"Aggregator: agent {connection['host']} connected from {peer}")
+
+            while True:
+                message = await read_frame(reader)
+                if message is None:
+                    break
+                if not isinstance(message, dict):
+                    raise ProtocolError(f"Expected a JSON object, got {type(message).__name__}")
+                if message.get("type") != "snapshot":
+                    continue
+                self._validate_snapshot(message)
+                if self._queue.full():
+                    self.stats["queue_full_waits"] += 1
+                await self._queue.put((connection, message))  # blocks the reader when ingestion falls behind
+        except ProtocolError as e:
+            self.stats["protocol_errors"] += 1
+            logging.warning(f"Aggregator: dropping connection from {peer}: {e}")
+        except (ConnectionError, OSError) as e:
+            logging.warning(f"Aggregator: connection from {peer} lost: {e}")
+        finally:
+            if connection["host"] is not None:
+                with self.lock:
+                    state = self._hosts.get(connection["host"])
+                    if state is not None and state["session"] == connection["session"]:
+                        state["connected"] = False
+            self._connections.pop(asyncio.current_task(), None)
+            writer.close()
+
+    @staticmethod
+    def _validate_snapshot(message):
+        """Refuse snapshot frames _apply_batch cannot store, so they drop only their own connection."""
+        seq = message.get("seq")
+        if not isinstance(seq, int) or isinstance(seq, bool) or seq < 1:
+            raise ProtocolError(f"Invalid snapshot sequence number {seq!r}")
+        if not isinstance(message.get("snapshot"), dict):
+            raise ProtocolError(f"Snapshot {seq} is not a JSON object")
+
+    def _register(self, connection, hello, peer):
+        with self.lock:
+            state = self._hosts.get(connection["host"])
+            if state is None:
+                state = self._hosts[connection["host"]] = {
+                    "series": collections.deque(maxlen=self.history),
+                    "session": None, "last_seq": 0, "snapshots": 0, "duplicates": 0, "last_seen": None
+                }
+            if state["session"] != connection["session"]:
+                state["session"], state["last_seq"] = connection["session"], 0  # agent restarted
+            state.update(connected=True, address=f"{peer[0]}:{peer[1]}" if peer else None,
+                         interval=hello.get("interval"), connected_at=time.time())
+
+    def _apply_batch(self, batch):
+        """Store one batch of snapshots. :return: dict - connection id -> (connection, highest seq)."""
+        acks = {}
+        written = []
+        with perf.timed("aggregator.apply_batch"), self.lock:
+            for connection, message in batch:
+                seq = message["seq"]
+                acks[id(connection)] = (connection, max(seq, acks.get(id(connection), (None, 0))[1]))
+                state = self._hosts.get(connection["host"])
+                if state is None or state["session"] != connection["session"] or seq <= state["last_seq"]:
+                    # Resent after a reconnect, or from a superseded session
+                    self.stats["duplicates"] += 1
+                    if state is not None:
+                        state["duplicates"] += 1
+                    continue
+                snapshot = message["snapshot"]
+                state["series"].append(snapshot)
+                state["last_seq"] = seq
+                state["snapshots"] += 1
+                state["last_seen"] = time.time()
+                self.stats["snapshots"] += 1
+                if self.history_dir:
+                    written.append((connection["host"], snapshot))
+            self.stats["batches"] += 1
+        for host, snapshot in written:
+            self._writer(host).submit(snapshot)
+        return acks
+
+    async def _ingest_loop(self):
+        loop = asyncio.get_running_loop()
+        # Also checks the stop event: wait_for() can swallow a cancellation that races with a new item
+        while not self._stop_event.is_set():
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+
+            try:
+                acks = self._apply_batch(batch)
+            except Exception as e:
+                # Leaves the batch unacknowledged: the agents resend it after their next reconnect
+                logging.error(f"Aggregator: failed to apply a batch of {len(batch)} snapshots: {e}")
+                continue
+            for connection, seq in acks.values():
+                writer = connection["writer"]
+                if writer.is_closing():
+                    continue
+                try:
+                    writer.write(encode_frame({"type": "ack", "seq": seq}))
+                    await writer.drain()
+                except (ConnectionError, OSError):
+                    continue
+
+    # ---------- Per-host history files ------------------------------------------------------
+
+    @staticmethod
+    def _safe_name(host):
+        return re.sub(r"[^A-Za-z0-9._-]", "_", host) or "_"
+
+    def history_path(self, host):
+        """:return: str - The history file of host, or None without history_dir."""
+        if not self.history_dir:
+            return None
+        suffix = MetricsWriter.COMPRESSION_SUFFIXES.get(self.writer_options.get("compression"), "")
+        return os.path.join(self.history_dir, self._safe_name(host), "system_metrics.json" + suffix)
+
+    def _writer(self, host):
+        with self.lock:
+            writer = self._writers.get(host)
+            if writer is None:
+                directory = os.path.join(self.history_dir, self._safe_name(host))
+                os.makedirs(directory, exist_ok=True)
+                writer = self._writers[host] = MetricsWriter(os.path.join(directory, "system_metrics.json"),
+                                                             **self.writer_options)
+            return writer
+
+    # ---------- Read API (thread-safe, used by the Flask routes) ----------------------------
+
+    def hosts(self):
+        """:return: list[dict] - Every host seen, with connection state and ingestion counters."""
+        now = time.time()
+        with self.lock:
+            return [{
+                "host": host,
+                "connected": state.get("connected", False),
+                "address": state.get("address"),
+                "interval": state.get("interval"),
+                "snapshots": state["snapshots"],
+                "duplicates": state["duplicates"],
+                "stored": len(state["series"]),
+                "last_seen": state["last_seen"],
+                "seconds_since_last_snapshot": round(now - state["last_seen"], 1) if state["last_seen"] else None
+            } for host, state in sorted(self._hosts.items())]
+
+    def latest(self, host):
+        """:return: dict - The newest snapshot of host, or None."""
+        with self.lock:
+            state = self._hosts.get(host)
+            return state["series"][-1] if state and state["series"] else None
+
+    def series(self, host, limit=None):
+        """:return: list[dict] - Stored snapshots of host, oldest first (the last `limit` ones)."""
+        with self.lock:
+            state = self._hosts.get(host)
+            snapshots = list(state["series"]) if state else []
+        return snapshots[-limit:] if limit else snapshots
+
+    def openmetrics(self, host):
+        """:return: bytes - OpenMetrics text of the newest snapshot of host (rendered once per snapshot)."""
+        snapshot = self.latest(host)
+        if snapshot is None:
+            return None
+        cached = self._openmetrics.get(host)
+        if cached is not None and cached[0] is snapshot:
+            return cached[1]
+        text = self.openmetrics_exporter.render(snapshot).encode("utf-8")
+        self._openmetrics[host] = (snapshot, text)
+        return text
+
+    # ---------- Lifecycle -----------------------------------------------------------------------
+
+    async def _main(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._server = await asyncio.start_server(self._handle_connection, self.listen_host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]  # resolves port=0
+        ingest = asyncio.ensure_future(self._ingest_loop())
+        self._started.set()
+        try:
+            await self._stop_event.wait()
+        finally:
+            # Stop accepting and ingesting, then drop live agent connections (agents reconnect and
+            # resend unacknowledged snapshots); emptying the queue releases readers blocked on it
+            self._server.close()
+            ingest.cancel()
+            await asyncio.gather(ingest, return_exceptions=True)
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            handlers = list(self._connections)
+            for writer in self._connections.values():
+                writer.close()
+            if handlers:
+                await asyncio.wait(handlers, timeout=5)
+            await self._server.wait_closed()
+
+    def start(self, timeout=10):
+        """Run the aggregator's event loop on a background thread and wait until it listens."""
+        if self._thread:
+            return
+        self._loop = asyncio.new_event_loop()
+        self._stop_event = asyncio.Event()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._loop.run_until_complete(self._main())
+            except Exception as e:
+                logging.error(f"Aggregator stopped: {e}")
+            finally:
+                self._started.set()
+                self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="metrics-aggregator", daemon=True)
+        self._thread.start()
+        self._started.wait(timeout)
+        logging.info(f"Started metrics aggregator on {self.listen_host}:{self.port}.")
+
+    def stop(self):
+        if self._loop and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+            logging.info("Stopped metrics aggregator.")
+        for writer in list(self._writers.values()):
+            writer.close()
@@ -1,33 +1,401 @@
-# alerts/alert_manager.py
-
-import logging
-import smtplib
-from email.message import EmailMessage
-
-class AlertManager:
-    def __init__(self, email_notifications_enabled=False, alert_email_recipients=None):
-        self.email_notifications_enabled = email_notifications_enabled
-        self.alert_email_recipients = alert_email_recipients or []
-        self.logger = logging.getLogger(__name__)
-        self.logger.setLevel(logging.INFO)
-
-    def trigger_alert(self, message):
-        self.logger.warning(f"ALERT: {message}")
-        if self.email_notifications_enabled:
-            self.send_email_alert(message)
-
-    def send_email_alert(self, message):
-        try:
-            msg = EmailMessage()
-            msg.set_content(f"System Alert: {message}")
-            msg['Subject'] = 'System Performance Alert'
-            msg['From'] = 'noreply@system-monitor.local'
-            msg['To'] = ', '.join(self.alert_email_recipients)
-
-            # Replace with your SMTP configuration
-            with smtplib.SMTP('localhost') as server:
-                server.send_message(msg)
-
-            self.logger.info("Alert email sent successfully.")
-        except Exception as e:
-            self.logger.error(f"Failed to send alert email: {e}")
+# alerts/alert_manager.py
+
+import json
+import logging
+import logging.handlers
+import operator
+import queue
+import smtplib
+import threading
+import time
+import urllib.request
+from datetime import datetime
+from email.message import EmailMessage
+
+
+class AlertRule:
+    """
+    One threshold rule evaluated against every snapshot.
+
+    value(snapshot) returns a number, None (no data), or a dict {key: number} for
+    rules that fan out (per disk, per cgroup, ...); every key is tracked separately.
+
+    A key becomes firing once the condition has held for for_seconds, and resolves
+    only when the value crosses back over clear_threshold (hysteresis; defaults to
+    threshold). message is formatted with key, value and threshold.
+    """
+
+    COMPARISONS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+
+    def __init__(self, name, value, threshold, comparison=">", clear_threshold=None, for_seconds=0.0,
+                 severity="warning", message="{name} is {value} (threshold {threshold})"):
+        if comparison not in self.COMPARISONS:
+            raise ValueError(f"Unsupported comparison: {comparison}")
+        self.name = name
+        self.value = value
+        self.threshold = threshold
+        self.comparison = comparison
+        self.clear_threshold = threshold if clear_threshold is None else clear_threshold
+        self.for_seconds = for_seconds
+        self.severity = severity
+        self.message = message
+
+    def values(self, snapshot):
+        """:return: dict - {key: value} for every key with data in this snapshot."""
+        try:
+            value = self.value(snapshot)
+        except Exception as e:
+            logging.error(f"Error evaluating alert rule {self.name}: {e}")
+            return {}
+        if value is None:
+            return {}
+        if isinstance(value, dict):
+            return {key: item for key, item in value.items() if item is not None}
+        return {None: value}
+
+    def breached(self, value, firing):
+        """Raise at threshold; once firing, stay firing until the value crosses clear_threshold."""
+        return self.COMPARISONS[self.comparison](value, self.clear_threshold if firing else self.threshold)
+
+    def format(self, key, value):
+        return self.message.format(name=self.name, key=key, value=value, threshold=self.threshold)
+
+
+class EmailSink:
+    """Sends each batch of alerts as one email through an SMTP server."""
+
+    name = "email"
+
+    def __init__(self, recipients, host="localhost", port=25, sender="noreply@system-monitor.local",
+                 use_tls=False, username=None, password=None, timeout=10.0):
+        self.recipients = list(recipients)
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.use_tls = use_tls
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+
+    def send(self, alerts):
+        msg = EmailMessage()
+        msg.set_content("\n".join(f"System Alert [{alert['status']}]: {alert['message']}" for alert in alerts))
+        msg['Subject'] = ('System Performance Alert' if len(alerts) == 1
+                          else f'{len(alerts)} System Performance Alerts')
+        msg['From'] = self.sender
+        msg['To'] = ', '.join(self.recipients)
+
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as server:
+            if self.use_tls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+            server.send_message(msg)
+
+
+class WebhookSink:
+    """POSTs each batch as JSON {"alerts": [...]}; HTTP errors raise and are retried."""
+
+    name = "webhook"
+
+    def __init__(self, url, headers=None, timeout=5.0):
+        self.url = url
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+        self.timeout = timeout
+
+    def send(self, alerts):
+        body = json.dumps({"alerts": alerts}).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body, headers=self.headers, method="POST")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class FileSink:
+    """Appends alerts to a file, one JSON object per line."""
+
+    name = "file"
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, alerts):
+        with open(self.path, "a") as file:
+            file.write("".join(json.dumps(alert) + "\n" for alert in alerts))
+
+
+class SyslogSink:
+    """Forwards alerts to syslog (a socket path such as /dev/log, or a (host, port) pair)."""
+
+    name = "syslog"
+    LEVELS = {"critical": logging.CRITICAL, "error": logging.ERROR, "warning": logging.WARNING, "info": logging.INFO}
+
+    def __init__(self, address="/dev/log", facility=logging.handlers.SysLogHandler.LOG_USER):
+        self.address = address
+        self.facility = facility
+        self._handler = None
+
+    def send(self, alerts):
+        if self._handler is None:
+            self._handler = logging.handlers.SysLogHandler(address=self.address, facility=self.facility)
+        for alert in alerts:
+            level = logging.INFO if alert["status"] == "resolved" else self.LEVELS.get(alert["severity"], logging.WARNING)
+            record = logging.LogRecord("system-monitor", level, __file__, 0,
+                                       f"system-monitor: [{alert['status']}] {alert['message']}", None, None)
+            self._handler.emit(record)
+
+
+class AlertManager:
+    """
+    Alert engine: rule evaluation over the snapshot stream, per-key deduplication and
+    cooldown, and asynchronous delivery to pluggable sinks.
+
+    evaluate() runs on the collection path and only updates in-memory state; alerts to
+    deliver are queued and a single worker thread sends them in batches (batch_size
+    alerts or whatever is queued after batch_interval seconds). A failing sink is
+    retried max_retries times with exponential backoff, without holding up collection;
+    once close() has been called, whatever is still queued gets a single attempt.
+
+    A firing key is notified once, then again every cooldown seconds while it keeps
+    firing; resolving sends one "resolved" notification.
+    """
+
+    def __init__(self, email_notifications_enabled=False, alert_email_recipients=None, rules=None, sinks=None,
+                 smtp_host="localhost", smtp_port=25, cooldown=300.0, batch_size=20, batch_interval=5.0,
+                 max_retries=3, retry_backoff=1.0, max_queue=1000):
+        self.email_notifications_enabled = email_notifications_enabled
+        self.alert_email_recipients = alert_email_recipients or []
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.INFO)
+        self.rules = list(rules or [])
+        self.sinks = list(sinks or [])
+        self.email_sink = EmailSink(self.alert_email_recipients, host=smtp_host, port=smtp_port)
+        if email_notifications_enabled:
+            self.sinks.append(self.email_sink)
+        self.cooldown = cooldown
+        self.batch_size = max(1, batch_size)
+        self.batch_interval = batch_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.lock = threading.Lock()
+        self._states = {}        # (rule name, key) -> {"pending_since", "firing", "last_notified", "value"}
+        self._last_sent = {}     # trigger_alert key -> time of the last notification
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.stats = {"evaluations": 0, "notifications": 0, "suppressed": 0, "delivered": 0, "batches": 0,
+                      "retries": 0, "failed": 0, "dropped": 0}
+
+    # ---------- Rule evaluation ---------------------------------------------------
+
+    def evaluate(self, snapshot, now=None):
+        """
+        Evaluate every rule against one snapshot and queue the resulting notifications.
+
+        :param snapshot: dict - A metrics snapshot.
+        :param now: float - Evaluation time (default: time.time()).
+        :return: list[dict] - Alerts firing after this evaluation.
+        """
+        now = time.time() if now is None else now
+        notifications = []
+        with self.lock:
+            self.stats["evaluations"] += 1
+            seen = set()
+            for rule in self.rules:
+                for key, value in rule.values(snapshot).items():
+                    state_key = (rule.name, key)
+                    seen.add(state_key)
+                    state = self._states.setdefault(state_key, {"pending_since": None, "firing": False,
+                                                                "last_notified": None, "value": None})
+                    state["value"] = value
+                    if rule.breached(value, state["firing"]):
+                        if state["pending_since"] is None:
+                            state["pending_since"] = now
+                        if not state["firing"] and now - state["pending_since"] >= rule.for_seconds:
+                            state["firing"] = True
+                        if state["firing"] and (state["last_notified"] is None
+                                                or now - state["last_notified"] >= self.cooldown):
+                            state["last_notified"] = now
+                            notifications.append(self._alert(rule, key, value, "firing", now))
+                    else:
+                        if state["firing"]:
+                            notifications.append(self._alert(rule, key, value, "resolved", now))
+                        state.update(pending_since=None, firing=False, last_notified=None)
+
+            # Keys that vanished from the snapshot (disk unmounted, cgroup removed) resolve
+            rules = {rule.name: rule for rule in self.rules}
+            for state_key in [state_key for state_key in self._states if state_key not in seen]:
+                state = self._states.pop(state_key)
+                if state["firing"] and state_key[0] in rules:
+                    notifications.append(self._alert(rules[state_key[0]], state_key[1], state["value"],
+                                                     "resolved", now))
+
+            firing = [self._alert(rules[name], key, state["value"], "firing", now)
+                      for (name, key), state in self._states.items() if state["firing"]]
+
+        for alert in notifications:
+            self._enqueue(alert)
+        return firing
+
+    def active(self):
+        """:return: list[dict] - Currently firing alerts, stamped with the time their condition started."""
+        rules = {rule.name: rule for rule in self.rules}
+        with self.lock:
+            return [self._alert(rules[name], key, state["value"], "firing", state["pending_since"])
+                    for (name, key), state in self._states.items() if state["firing"] and name in rules]
+
+    @staticmethod
+    def _alert(rule, key, value, status, now):
+        return {
+            "rule": rule.name,
+            "key": key,
+            "status": status,
+            "severity": rule.severity,
+            "value": value,
+            "threshold": rule.threshold,
+            "message": rule.format(key, value),
+            "timestamp": datetime.utcfromtimestamp(now).isoformat() + "Z"
+        }
+
+    # ---------- Ad-hoc alerts ---------------------------------------------------------
+
+    def trigger_alert(self, message, key=None, severity="warning"):
+        """
+        Raise an alert outside the rule set. Repeats of the same key (default: the
+        message itself) within the cooldown are suppressed.
+
+        :return: bool - True when the alert was queued for delivery.
+        """
+        key = message if key is None else key
+        now = time.time()
+        with self.lock:
+            last_sent = self._last_sent.get(key)
+            if last_sent is not None and now - last_sent < self.cooldown:
+                self.stats["suppressed"] += 1
+                self.logger.debug(f"Suppressed duplicate alert: {message}")
+                return False
+            self._last_sent[key] = now
+        self._enqueue({
+            "rule": None,
+            "key": key,
+            "status": "firing",
+            "severity": severity,
+            "value": None,
+            "threshold": None,
+            "message": message,
+            "timestamp": datetime.utcfromtimestamp(now).isoformat() + "Z"
+        })
+        return True
+
+    def send_email_alert(self, message):
+        """Send one email synchronously, bypassing the delivery queue."""
+        try:
+            self.email_sink.send([{"status": "firing", "message": message}])
+            self.logger.info("Alert email sent successfully.")
+        except Exception as e:
+            self.logger.error(f"Failed to send alert email: {e}")
+
+    # ---------- Delivery ------------------------------------------------------------------
+
+    def _count(self, stat, amount=1):
+        with self.lock:
+            self.stats[stat] += amount
+
+    def get_stats(self):
+        """:return: dict - A consistent copy of the delivery counters."""
+        with self.lock:
+            return dict(self.stats)
+
+    def _enqueue(self, alert):
+        self._count("notifications")
+        if alert["status"] == "resolved":
+            self.logger.info(f"RESOLVED: {alert['message']}")
+        else:
+            self.logger.warning(f"ALERT: {alert['message']}")
+        if not self.sinks:
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(alert)
+        except queue.Full:
+            self._count("dropped")
+            self.logger.warning("Alert delivery queue full; dropping alert.")
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._worker, name="alert-delivery", daemon=True)
+                self._thread.start()
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far has been delivered (or given up on)."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=None):
+        if self._thread is None:
+            return
+        # Stop first so a sink that is down does not hold shutdown through its retry backoff
+        self._stop.set()
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass  # the worker delivers what is queued and exits once it finds the queue empty
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _deliver(self, batch):
+        if not batch:
+            return
+        self._count("batches")
+        for sink in self.sinks:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    sink.send(batch)
+                    self._count("delivered", len(batch))
+                    break
+                except Exception as e:
+                    if attempt == self.max_retries or self._stop.is_set():
+                        self._count("failed", len(batch))
+                        self.logger.error(f"Failed to deliver {len(batch)} alert(s) via {sink.name}: {e}")
+                        break
+                    self._count("retries")
+                    self.logger.warning(f"Alert delivery via {sink.name} failed ({e}); retrying.")
+                    if self._stop.wait(self.retry_backoff * (2 ** attempt)):
+                        self._count("failed", len(batch))
+                        self.logger.error(f"Gave up delivering {len(batch)} alert(s) via {sink.name}: shutting down.")
+                        break
+
+    def _worker(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if self._stop.is_set():
+                timeout = 0  # closing: drain without waiting for the batch interval
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None if self._stop.is_set() else Ellipsis  # closing, or batch interval elapsed
+
+            if item is None or isinstance(item, threading.Event) or item is Ellipsis:
+                self._deliver(batch)
+                batch, deadline = [], None
+                if item is None:
+                    return
+                if item is not Ellipsis:
+                    item.set()
+                continue
+
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.batch_interval
+            if len(batch) >= self.batch_size:
+                self._deliver(batch)
+                batch, deadline = [], None
@@ -0,0 +1,189 @@
+"""
+Offline batch analysis of archived metrics.
+
+    python -m metrics.analyze_cli ARCHIVE_DIR [ARCHIVE_DIR ...] --output report.json
+    python -m metrics.analyze_cli archive/ --format html --output report.html --workers 32
+
+Every metrics file found under the given directories is analyzed with the parallel
+Analyzer engine. Files are grouped by host: the first directory level below each
+input directory (archive/<host>/<day>/system_metrics.json), or the input directory
+itself for files directly inside it.
+
+Only the standard library is imported at startup; the analyzer (and psutil) load
+when analysis begins, and Flask, sklearn, pandas and wmi are never imported.
+"""
+import argparse
+import fnmatch
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+
+def find_metrics_files(inputs, patterns):
+    """
+    :return: dict - host -> sorted list of metrics file paths.
+    """
+    hosts = {}
+    for root in inputs:
+        if os.path.isfile(root):
+            hosts.setdefault(os.path.basename(os.path.dirname(os.path.abspath(root))), []).append(root)
+            continue
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if not any(fnmatch.fnmatch(filename, pattern) for pattern in patterns):
+                    continue
+                relative = os.path.relpath(dirpath, root)
+                host = os.path.basename(os.path.abspath(root)) if relative == "." else relative.split(os.sep)[0]
+                hosts.setdefault(host, []).append(os.path.join(dirpath, filename))
+    return {host: sorted(files) for host, files in sorted(hosts.items())}
+
+
+def analyze_hosts(hosts, workers, analyzer_options, chunks_per_worker=4, top=20):
+    from concurrent.futures import ProcessPoolExecutor
+    from metrics.analyzer import Analyzer, analyze_chunk
+    from metrics.history_reader import MappedHistoryReader
+
+    # Plan every chunk of every file up front so one process pool serves the whole archive
+    plans = []  # (host, analyzer, config, ranges); ranges [(None, None)] streams a compressed file
+    for host, files in hosts.items():
+        for file_path in files:
+            analyzer = Analyzer(metrics_file=file_path, **analyzer_options)
+            if file_path.endswith((".gz", ".zst")):
+                plans.append((host, analyzer, analyzer.worker_config(), [(None, None)]))
+                continue
+            try:
+                with MappedHistoryReader(file_path) as reader:
+                    ranges = reader.split(workers * chunks_per_worker)
+            except (OSError, ValueError) as e:
+                print(f"Skipping {file_path}: {e}", file=sys.stderr)
+                continue
+            plans.append((host, analyzer, analyzer.worker_config(), ranges))
+
+    tasks = [(config, start, end) for _, _, config, ranges in plans for start, end in ranges]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        partials = iter(pool.map(analyze_chunk,
+                                 [task[0] for task in tasks], [task[1] for task in tasks],
+                                 [task[2] for task in tasks], [False] * len(tasks)))
+        file_partials = []  # (host, partials of one file in file order)
+        for host, analyzer, config, ranges in plans:
+            chunks = [next(partials) for _ in ranges]
+            if len(chunks) > 1 and analyzer.rules is not None and analyzer.rules.rules:
+                # for_seconds / hysteresis state must run on from each chunk into the next
+                chunks = analyzer.chain_rule_state(pool, config, ranges, chunks, False, workers)
+            file_partials.append((host, chunks))
+
+    report = {}
+    for host, files in hosts.items():
+        host_partials = [partial for partial_host, chunks in file_partials if partial_host == host
+                         for partial in chunks]
+        summary = Analyzer.merge_summaries(host_partials)
+        processes = sorted(summary["processes"].values(),
+                           key=lambda proc: sum(proc["issue_counts"].values()), reverse=True)
+        episodes = sorted(summary["episodes"], key=lambda episode: episode["records"], reverse=True)
+        report[host] = {
+            "files": files,
+            "records": summary["records"],
+            "counts": summary["counts"],
+            "episode_count": len(summary["episodes"]),
+            "top_processes": processes[:top],
+            "longest_episodes": episodes[:top]
+        }
+    return report
+
+
+def render_html(report):
+    from html import escape
+
+    sections = []
+    for host, data in report["hosts"].items():
+        counts = "".join(f"<tr><td>{escape(kind)}</td><td>{count}</td></tr>"
+                         for kind, count in sorted(data["counts"].items()))
+        processes = "".join(
+            f"<tr><td>{escape(str(proc['pid']))}</td><td>{escape(str(proc['process_name']))}</td>"
+            f"<td>{sum(proc['issue_counts'].values())}</td><td>{proc['max_cpu_percent']}</td>"
+            f"<td>{proc['max_memory_percent']:.2f}</td></tr>"
+            for proc in data["top_processes"])
+        episodes = "".join(
+            f"<tr><td>{escape(episode['type'])}</td><td>{escape(str(episode['process_name'] or ''))}</td>"
+            f"<td>{escape(episode['start'])}</td><td>{escape(episode['end'])}</td><td>{episode['records']}</td></tr>"
+            for episode in data["longest_episodes"])
+        sections.append(f"""
+<h2>{escape(host)}</h2>
+<p>{len(data['files'])} file(s), {data['records']} record(s), {data['episode_count']} episode(s)</p>
+<h3>Issue counts</h3>
+<table><tr><th>Type</th><th>Count</th></tr>{counts}</table>
+<h3>Top processes</h3>
+<table><tr><th>PID</th><th>Name</th><th>Issues</th><th>Max CPU %</th><th>Max memory %</th></tr>{processes}</table>
+<h3>Longest episodes</h3>
+<table><tr><th>Type</th><th>Process</th><th>Start</th><th>End</th><th>Records</th></tr>{episodes}</table>""")
+
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Metrics analysis report</title>
+<style>body{{font-family:sans-serif}} table{{border-collapse:collapse}} td,th{{border:1px solid #ccc;padding:4px 8px}}</style>
+</head><body>
+<h1>Metrics analysis report</h1>
+<p>Generated {escape(report['generated_at'])} in {report['elapsed_seconds']}s over {report['totals']['records']} record(s).</p>
+{''.join(sections)}
+</body></html>
+"""
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze archived system metrics offline.")
+    parser.add_argument("inputs", nargs="+", help="Archive directories or metrics files.")
+    parser.add_argument("--pattern", action="append", dest="patterns",
+                        help="Filename glob to include (repeatable, default: *.json, *.json.gz, *.json.zst).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes.")
+    parser.add_argument("--format", choices=("json", "html"), default="json", help="Report format.")
+    parser.add_argument("--output", "-o", help="Report file (default: stdout).")
+    parser.add_argument("--top", type=int, default=20, help="Processes / episodes listed per host.")
+    parser.add_argument("--cpu-threshold", type=float, default=1)
+    parser.add_argument("--memory-threshold", type=float, default=5)
+    parser.add_argument("--rules", help="Threshold rule file (JSON/YAML) evaluated over every record.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    started = time.perf_counter()
+    args = parse_args(argv)
+    hosts = find_metrics_files(args.inputs, args.patterns or ["*.json", "*.json.gz", "*.json.zst"])
+    if not hosts:
+        print("No metrics files found.", file=sys.stderr)
+        return 1
+
+    rules = None
+    if args.rules:
+        from metrics.threshold_rules import ThresholdRuleSet
+        rules = ThresholdRuleSet.load(args.rules)  # compiled once; workers receive its spec
+    analyzer_options = {"cpu_threshold": args.cpu_threshold, "memory_threshold": args.memory_threshold,
+                        "rules": rules}
+    host_reports = analyze_hosts(hosts, max(1, args.workers), analyzer_options, top=args.top)
+
+    totals = {"records": 0, "counts": {}}
+    for data in host_reports.values():
+        totals["records"] += data["records"]
+        for kind, count in data["counts"].items():
+            totals["counts"][kind] = totals["counts"].get(kind, 0) + count
+
+    report = {
+        "generated_at": datetime.utcnow().isoformat() + "Z",
+        "inputs": args.inputs,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+        "totals": totals,
+        "hosts": host_reports
+    }
+    output = render_html(report) if args.format == "html" else json.dumps(report, indent=2)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+        print(f"Report written to {args.output} ({totals['records']} records, {len(host_reports)} host(s)).")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,408 +1,984 @@
-﻿import json
-import psutil
-import time
-from datetime import datetime
-import logging
-import os
-
-class Analyzer:
-       
-
-
-    def __init__(self, metrics_file="system_metrics.json", cpu_threshold=1, memory_threshold=5,
-                 disk_threshold=5, gc_threshold=1, include_stack_lines=10):
-        self.metrics_file = metrics_file
-        self.cpu_threshold = cpu_threshold
-        self.memory_threshold = memory_threshold
-        self.disk_threshold = disk_threshold
-        self.gc_threshold = gc_threshold
-        self.include_stack_lines = include_stack_lines
-
-    def load_metrics_stream(self):
-        """Yield each line of the metrics file as a parsed JSON object (for large files)."""
-        try:
-            with open(self.metrics_file, "r") as file:
-                for line in file:
-                    try:
-                        yield json.loads(line.strip())
-                    except json.JSONDecodeError as e:
-                        print(f"JSON parse error: {e}")
-                        continue
-        except Exception as e:
-            print(f"Error opening metrics file: {e}")
-            return
-    
-    def get_blocking_threads_info(self):
-        """Detect high CPU threads across all processes."""
-        thread_info_list = []
-
-        for proc in psutil.process_iter(['pid', 'name']):
-            try:
-                with proc.oneshot():
-                    threads = proc.threads()
-                    for thread in threads:
-                        total_cpu = thread.user_time + thread.system_time
-                        if total_cpu > self.cpu_threshold:
-                            thread_info_list.append({
-                                "thread_name": f"Thread-{thread.id}",
-                                "process_name": proc.name(),
-                                "pid": proc.pid,
-                                "message": f"Thread {thread.id} in process {proc.name()} (PID: {proc.pid}) exceeded CPU threshold.",
-                                "cpu_time": total_cpu,
-                                "stack_trace": ["Stack unavailable across processes"],
-                                "timestamp": datetime.utcnow().isoformat() + "Z",
-                                "type": "HighCPUThread"  # match this with JS issueType
-                            })
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                continue
-
-        return thread_info_list
-
-
-    def get_memory_leak_suspects(memory_threshold_mb=500):    
-        memory_leak_info = []
-
-        for proc in psutil.process_iter(['pid', 'name', 'memory_info']):
-            try:
-                with proc.oneshot():
-                    mem_info = proc.memory_info()
-                    mem_usage_mb = mem_info.rss / (1024 * 1024)  # Convert to MB
-
-                    # if mem_usage_mb > memory_threshold_mb:  # This line must use a number
-                    memory_leak_info.append({
-                        "process_name": proc.name(),
-                        "pid": proc.pid,
-                        "message": f"Process {proc.name()} (PID: {proc.pid}) is using {mem_usage_mb:.2f} MB, which exceeds threshold.",
-                        "memory_usage_mb": round(mem_usage_mb, 2),
-                        "timestamp": datetime.utcnow().isoformat() + "Z",
-                        "type": "HighMemoryUsage"
-                    })
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                continue
-
-        return memory_leak_info
-
-
-
-
-    def get_disk_profiler_issues(
-        disk_usage_threshold=85,        # %
-        disk_io_threshold_mb_s=100,     # MB / second
-        sample_seconds=1                # how long to sample I/O
-    ):
-        """
-        Returns a list of dicts describing disk-related performance issues.
-        Structure is identical to get_memory_leak_suspects.
-
-        Two detectors run:
-          1. HighDiskUsage – partitions whose 'usage.percent' > disk_usage_threshold
-          2. HighDiskIO    – physical disks whose Δ(read+write) / seconds > disk_io_threshold_mb_s
-        """
-
-        issues = []
-
-        # ---------- 1) Nearly-full partitions ----------------------------------
-        for part in psutil.disk_partitions(all=False):
-            try:
-                usage = psutil.disk_usage(part.mountpoint)
-              
-                issues.append({
-                    "device": part.device,
-                    "mountpoint": part.mountpoint,
-                    "total_gb": round(usage.total / (1024**3), 2),
-                    "used_gb":  round(usage.used  / (1024**3), 2),
-                    "free_gb":  round(usage.free  / (1024**3), 2),
-                    "usage_percent": round(usage.percent, 2),
-                    "message": (
-                        f"Partition {part.device} ({part.mountpoint}) is "
-                        f"{usage.percent:.1f}% full – exceeds {disk_usage_threshold}% threshold."
-                    ),
-                    "timestamp": datetime.utcnow().isoformat() + "Z",
-                    "type": "HighDiskUsage"
-                })
-            except PermissionError:
-                # Ignore CD/DVD or unmounted partitions we can't query
-                continue
-
-        # ---------- 2) Heavy I/O on disks --------------------------------------
-        io_start = psutil.disk_io_counters(perdisk=True)
-        time.sleep(sample_seconds)
-        io_end   = psutil.disk_io_counters(perdisk=True)
-
-        for disk_name, s0 in io_start.items():
-            s1 = io_end.get(disk_name)
-            if not s1:
-                continue  # disk disappeared
-
-            # Bytes read+written during the sample window
-            delta_bytes = (s1.read_bytes - s0.read_bytes) + (s1.write_bytes - s0.write_bytes)
-            mb_per_sec  = (delta_bytes / (1024 * 1024)) / sample_seconds
-
-            if mb_per_sec > disk_io_threshold_mb_s:
-                issues.append({
-                    "disk": disk_name,
-                    "io_mb_per_sec": round(mb_per_sec, 2),
-                    "sample_seconds": sample_seconds,
-                    "message": (
-                        f"Disk {disk_name} sustained {mb_per_sec:.2f} MB/s "
-                        f"I/O for {sample_seconds}s – exceeds {disk_io_threshold_mb_s} MB/s threshold."
-                    ),
-                    "timestamp": datetime.utcnow().isoformat() + "Z",
-                    "type": "HighDiskIO"
-                })
-
-        return issues
-
-
-        
-
-
-
-    def analyze_metrics(self):
-        """Analyze the metrics stream to detect threshold breaches and extract critical info."""
-        performance_issues = []
-
-        for idx, metric in enumerate(self.load_metrics_stream()):
-            # Extract timestamp, prefer top-level "timestamp"
-            timestamp = metric.get("timestamp") or metric.get("system_info", {}).get("current_time", "Unknown Time")
-
-            # CPU
-            cpu_usage = metric.get("cpu_metrics", {}).get("cpu_usage_percent", 0)
-            if cpu_usage > self.cpu_threshold:
-                performance_issues.append({
-                    "type": "CPU",
-                    "timestamp": timestamp,
-                    "message": f"High CPU usage: {cpu_usage:.2f}%"
-                })
-
-            # Memory
-            memory_usage = metric.get("memory_metrics", {}).get("memory_usage_percent", 0)
-            if memory_usage == 0:
-                # fallback to deep memory metrics percent
-                memory_usage = metric.get("memory_deep_metrics", {}).get("memory_usage", {}).get("percent", 0)
-            if memory_usage > self.memory_threshold:
-                performance_issues.append({
-                    "type": "Memory",
-                    "timestamp": timestamp,
-                    "message": f"High memory usage: {memory_usage:.2f}%"
-                })
-
-            # Disk
-            # disk_usage = metric.get("disk_metrics", {}).get("disk_usage_percent", 0)
-            # if disk_usage == 0:
-            #     # fallback to deep disk metrics percent
-            #     disk_usage = metric.get("disk_deep_metrics", {}).get("disk_usage", {}).get("percent", 0)
-            # if disk_usage > self.disk_threshold:
-            #     performance_issues.append({
-            #         "type": "Disk",
-            #         "timestamp": timestamp,
-            #         "message": f"High disk usage: {disk_usage:.2f}%"
-            #     })
-
-            # Garbage Collection
-            # gc_collected = metric.get("garbage_collector_metrics", {}).get("collected_objects", 0)
-            # if gc_collected > self.gc_threshold:
-            #     performance_issues.append({
-            #         "type": "GC",
-            #         "timestamp": timestamp,
-            #         "message": f"High GC activity: {gc_collected} collected objects"
-            #     })
-
-            # Thread contention
-            thread_metrics = metric.get("thread_metrics", {})
-            for thread in thread_metrics.get("thread_details", []):
-                is_blocking = thread.get("is_blocking")
-                # Accept True boolean or string "True" (case-insensitive), ignore "Unknown"
-                if isinstance(is_blocking, bool) and is_blocking:
-                    blocking = True
-                elif isinstance(is_blocking, str) and is_blocking.lower() == "true":
-                    blocking = True
-                else:
-                    blocking = False
-
-                if blocking:
-                    process_name = thread.get("process_name", "UnknownProcess")
-                    thread_name = thread.get("thread_name", "UnknownThread")
-                    stack_summary = thread.get("stack_summary", [])
-                    # Limit stack trace lines if configured
-                    summary = stack_summary[-self.include_stack_lines:] if self.include_stack_lines else stack_summary
-                    performance_issues.append({
-                        "type": "ThreadContention",
-                        "timestamp": timestamp,
-                        "process_name": process_name,
-                        "thread_name": thread_name,
-                        "message": "Blocking thread detected",
-                        "stack_summary": summary
-                    })
-
-            # Extract top CPU processes if any usage > threshold
-            top_cpu_processes = metric.get("cpu_deep_metrics", {}).get("top_cpu_processes", [])
-            logging.info(f"Count of the top CPU processes: {len(top_cpu_processes)}")
-
-            for proc in top_cpu_processes:
-                logging.info(f"Process Name: {proc.get('name')} with Id {proc.get('pid')}")
-                cpu_percent = proc.get("cpu_percent", 0)
-                # if cpu_percent > self.cpu_threshold:
-                performance_issues.append({
-                    "type": "CPUProcess",
-                    "timestamp": timestamp,
-                    "process_name": proc.get("name", "UnknownProcess"),
-                    "pid": proc.get("pid"),
-                    "message": f"High CPU process: {proc.get('name')} using {cpu_percent:.2f}% CPU"
-                })
-           
-            
-
-            # Extract top memory processes
-            top_memory_processes = metric.get("memory_deep_metrics", {}).get("top_memory_processes", [])
-            for proc in top_memory_processes:
-                mem_percent = proc.get("memory_percent", 0)
-                if mem_percent > self.memory_threshold:
-                    performance_issues.append({
-                        "type": "MemoryProcess",
-                        "timestamp": timestamp,
-                        "process_name": proc.get("name", "UnknownProcess"),
-                        "pid": proc.get("pid"),
-                        "message": f"High Memory process: {proc.get('name')} using {mem_percent:.2f}% Memory"
-                    })
-
-            # Disk partitions usage info (warn if any partition exceeds threshold)
-            # disk_partitions = metric.get("disk_deep_metrics", {}).get("disk_partitions", [])
-            # for partition in disk_partitions:
-            #     percent = partition.get("percent", 0)
-            #     if percent > self.disk_threshold:
-            #         performance_issues.append({
-            #             "type": "DiskPartition",
-            #             "timestamp": timestamp,
-            #             "partition": partition.get("device", "UnknownPartition"),
-            #             "message": f"High disk partition usage: {percent:.2f}% on {partition.get('device')}"
-            #         })
-
-            # GPU metrics (optional thresholds if needed, here just include info)
-            # gpu_metrics = metric.get("GPU_Metrics", [])
-            # for gpu in gpu_metrics:
-            #     load = gpu.get("load", 0)
-            #     if load > 0.9:  # example threshold for GPU load
-            #         performance_issues.append({
-            #             "type": "GPU",
-            #             "timestamp": timestamp,
-            #             "gpu_name": gpu.get("name", "UnknownGPU"),
-            #             "message": f"High GPU load: {load:.2f}"
-            #         })
-
-            # Network metrics (if you want to detect e.g. zero or very high network traffic)
-            network_metrics = metric.get("network_metrics", {})
-            bytes_sent = network_metrics.get("bytes_sent", 0)
-            bytes_received = network_metrics.get("bytes_received", 0)
-            if bytes_sent == 0 and bytes_received == 0:
-                performance_issues.append({
-                    "type": "Network",
-                    "timestamp": timestamp,
-                    "message": "No network traffic detected"
-                })
-
-            # Power metrics info (battery low warning)
-            power_metrics = metric.get("power_metrics", {})
-            battery_percent = power_metrics.get("battery_percent", 100)
-            power_plugged = power_metrics.get("power_plugged", True)
-            if battery_percent < 20 and not power_plugged:
-                performance_issues.append({
-                    "type": "Power",
-                    "timestamp": timestamp,
-                    "message": f"Low battery: {battery_percent}% and not plugged in"
-                })
-
-        return performance_issues
-    
-
-    def performanceOverview(file_path="Suggestions/PerformanceOverview.json"):
-        file_path = os.path.join("Suggestions", "PerformanceOverview.json")
-        print(f"📄 File path for overview: {file_path}")
-        try:
-            with open(file_path, "r") as f:
-                data = json.load(f)
-        except FileNotFoundError:
-            print(f"❌ File not found: {file_path}")
-            return []
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON parsing error: {e}")
-            return []
-
-        if not data:
-            print("✅ No performance issues detected.")
-            return []
-
-        print("🚨 Performance Issues Detected:\n")
-        issues = []
-
-        for entry in data:
-            pid = entry.get("PID")
-            cluster = entry.get("Cluster", "Unknown")
-            pattern = entry.get("Pattern", "Unknown")
-            summary = entry.get("Summary", "No summary provided.")
-            recommendation = entry.get("Recommendation", "No recommendation.")
-
-            print(f"[PID {pid}] - [{cluster}] {pattern}")
-            print(f"  ↪ {summary}\n")
-
-            if recommendation != "No action required":
-                issues.append({
-                    "pid": pid,
-                    "cluster": cluster,
-                    "pattern": pattern,
-                    "summary": summary,
-                    "recommendation": recommendation
-                })
-
-        return issues
-
-
-
-    def load_thread_summaries(self, pid: int = None, directory="Suggestions"):
-        summaries = []
-
-        logging.info("load_thread_summaries called...")
-        if not os.path.isdir(directory):
-            logging.warning(f"❌ Directory not found: {directory}")
-            return []
-
-        for filename in os.listdir(directory):
-            logging.info(f"Filename for process listing: {filename}")
-            if filename.lower().startswith("summary_") and filename.endswith(".json"):
-                if pid:
-                    if not filename.endswith(f"{pid}.json"):
-                        continue
-
-                file_path = os.path.join(directory, filename)
-                try:
-                    with open(file_path, "r") as f:
-                        data = json.load(f)
-                        summaries.append(data)
-                except Exception as e:
-                    logging.error(f"⚠️ Failed to read {filename}: {e}")
-
-        logging.info(f"📦 Loaded {len(summaries)} summary file(s).")
-        return summaries
-
-
-
-    def generate_report(self):
-        """Print or return a detailed report based on detected issues."""
-        issues = self.analyze_metrics()
-
-        if not issues:
-            print("✅ No performance issues detected.")
-            return []
-
-        print("🚨 Performance Issues Detected:\n")
-        for issue in issues:
-            print(f"[{issue['timestamp']}] - [{issue['type']}] {issue['message']}")
-            if issue["type"] == "ThreadContention":
-                print(f"    Process: {issue['process_name']}")
-                print(f"    Thread : {issue['thread_name']}")
-                print(f"    Stack  :")
-                for frame in issue["stack_summary"]:
-                    print(f"        {frame}")
-                print()
-
-        return issues
+﻿import json
+import gzip
+import io
+import psutil
+import time
+from datetime import datetime
+import logging
+import os
+import multiprocessing
+import threading
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from metrics.self_profiler import perf
+from metrics.history_reader import MappedHistoryReader
+from metrics.process_cache import process_cache
+from metrics.thread_tracker import thread_tracker
+from metrics.contention_detector import contention_detector
+from metrics.inspection_planner import inspection_planner
+from metrics.disk_io_engine import disk_io_engine
+from metrics.leak_detector import leak_detector
+from metrics.threshold_rules import ThresholdRuleSet
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+def analyze_chunk(config, start, end, include_issues, rule_state=None):
+    """
+    Worker-process entry point: summarize one record-aligned byte range of the history.
+    With start=None the whole file is streamed (used for compressed histories).
+
+    :param rule_state: dict - Threshold-rule state left by the chunks before this one (None: empty).
+    """
+    analyzer = Analyzer(**config)
+    rule_trace = {"records": 0, "runs": {}}
+    if start is None:
+        return analyzer.summarize_records(analyzer.load_metrics_stream(), include_issues, rule_state, rule_trace)
+    with MappedHistoryReader(analyzer.metrics_file) as reader:
+        return analyzer.summarize_records(reader.iter_records(start, end), include_issues, rule_state, rule_trace)
+
+
+_analysis_pool = None
+_analysis_pool_lock = threading.Lock()
+
+
+def analysis_pool():
+    """
+    Long-lived worker pool for analyze_metrics_parallel, created on first use and
+    sized to the CPU count. Workers are spawned rather than forked from the
+    multithreaded server process.
+    """
+    global _analysis_pool
+    with _analysis_pool_lock:
+        if _analysis_pool is None:
+            _analysis_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        return _analysis_pool
+
+
+def _discard_analysis_pool(pool):
+    global _analysis_pool
+    with _analysis_pool_lock:
+        if _analysis_pool is pool:
+            _analysis_pool = None
+    pool.shutdown(wait=False)
+
+
+class Analyzer:
+       
+
+
+    def __init__(self, metrics_file="system_metrics.json", cpu_threshold=1, memory_threshold=5,
+                 disk_threshold=5, gc_threshold=1, include_stack_lines=10,
+                 network_error_rate_threshold=1.0, network_utilization_threshold=90,
+                 psi_some_threshold=10.0, psi_full_threshold=5.0, major_fault_rate_threshold=100.0,
+                 cgroup_throttle_threshold=20.0, cgroup_memory_threshold=90.0, rules=None,
+                 rule_batch_size=1024):
+        self.metrics_file = metrics_file
+        self.cpu_threshold = cpu_threshold
+        self.memory_threshold = memory_threshold
+        self.disk_threshold = disk_threshold
+        self.gc_threshold = gc_threshold
+        self.include_stack_lines = include_stack_lines
+        self.network_error_rate_threshold = network_error_rate_threshold  # errors + drops per second
+        self.network_utilization_threshold = network_utilization_threshold  # % of link speed
+        self.psi_some_threshold = psi_some_threshold  # % of time some tasks stalled (PSI avg10)
+        self.psi_full_threshold = psi_full_threshold  # % of time all non-idle tasks stalled
+        self.major_fault_rate_threshold = major_fault_rate_threshold  # major faults per second
+        self.cgroup_throttle_threshold = cgroup_throttle_threshold  # % of CFS periods throttled
+        self.cgroup_memory_threshold = cgroup_memory_threshold  # % of memory.max in use
+        # Declarative threshold rules (a ThresholdRuleSet, or its spec() in worker processes),
+        # evaluated over history in batches of rule_batch_size records
+        self.rules = ThresholdRuleSet.from_spec(rules) if isinstance(rules, dict) else rules
+        self.rule_batch_size = rule_batch_size
+
+    def _open_metrics_file(self):
+        """Open the history file as text, transparently decompressing .gz / .zst files."""
+        if self.metrics_file.endswith(".gz"):
+            return gzip.open(self.metrics_file, "rt")
+        if self.metrics_file.endswith(".zst"):
+            if zstandard is None:
+                raise RuntimeError("Reading .zst metrics requires the 'zstandard' package")
+            raw = zstandard.ZstdDecompressor().stream_reader(open(self.metrics_file, "rb"), closefd=True,
+                                                            read_across_frames=True)
+            return io.TextIOWrapper(raw, encoding="utf-8")
+        return open(self.metrics_file, "r")
+
+    def load_metrics_stream(self):
+        """
+        Yield each line of the metrics file as a parsed JSON object (for large files).
+        Plain histories are memory-mapped; compressed ones are streamed line by line.
+        """
+        if not self.metrics_file.endswith((".gz", ".zst")):
+            try:
+                reader = MappedHistoryReader(self.metrics_file)
+            except Exception as e:
+                print(f"Error opening metrics file: {e}")
+                return
+            with reader:
+                yield from reader.iter_records(on_error=lambda e: print(f"JSON parse error: {e}"))
+            return
+
+        try:
+            with self._open_metrics_file() as file:
+                for line in file:
+                    try:
+                        yield json.loads(line.strip())
+                    except json.JSONDecodeError as e:
+                        print(f"JSON parse error: {e}")
+                        continue
+        except Exception as e:
+            print(f"Error opening metrics file: {e}")
+            return
+    
+    @staticmethod
+    def _snapshot_threads(snapshot):
+        """:return: list[(pid, process name, threads)] - A snapshot's thread_metrics in tracker form."""
+        processes = {}
+        for detail in (snapshot.get("thread_metrics") or {}).get("thread_details", []):
+            thread = dict(detail, tid=detail["ident"])
+            processes.setdefault(detail["pid"], (detail["process_name"], []))[1].append(thread)
+        return [(pid, name, threads) for pid, (name, threads) in processes.items()]
+
+    @perf.instrument("analyzer.get_blocking_threads_info")
+    def get_blocking_threads_info(self, snapshot=None):
+        """
+        Detect threads that are using CPU now: CPU% since the previous call (or over
+        the thread's lifetime on first sight) above cpu_threshold, instead of
+        cumulative CPU seconds that every long-lived thread eventually exceeds.
+        Baselines are this method's own, so polling it leaves the collector's rates alone.
+
+        :param snapshot: dict - Judge the threads in this snapshot (e.g. a remote host's) instead of this machine.
+        """
+        thread_info_list = []
+        timestamp = datetime.utcnow().isoformat() + "Z"
+
+        if snapshot is None:
+            samples = []
+            for proc in process_cache.sample():
+                try:
+                    samples.append((proc['pid'], proc['name'],
+                                    thread_tracker.sample(proc['pid'], process_cache.process(proc['pid']),
+                                                          consumer="blocking_threads")))
+                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                    continue
+        else:
+            samples = self._snapshot_threads(snapshot)
+            timestamp = snapshot.get("timestamp", timestamp)
+
+        for pid, process_name, threads in samples:
+            for thread in threads:
+                # Threads of snapshots older than the per-thread rates carry no cpu_percent
+                if (thread.get("cpu_percent") or 0.0) <= self.cpu_threshold:
+                    continue
+                thread_info_list.append({
+                    "thread_name": f"Thread-{thread['tid']}",
+                    "process_name": process_name,
+                    "pid": pid,
+                    "message": f"Thread {thread['tid']} in process {process_name} (PID: {pid}) "
+                               f"is using {thread['cpu_percent']:.1f}% CPU, above the {self.cpu_threshold}% threshold.",
+                    "cpu_time": thread["user_time"] + thread["system_time"],
+                    "cpu_percent": thread["cpu_percent"],
+                    "voluntary_ctxt_switches_per_sec": thread.get("voluntary_ctxt_switches_per_sec"),
+                    "nonvoluntary_ctxt_switches_per_sec": thread.get("nonvoluntary_ctxt_switches_per_sec"),
+                    "stack_trace": ["Stack unavailable across processes"],
+                    "timestamp": timestamp,
+                    "type": "HighCPUThread"  # match this with JS issueType
+                })
+
+        return thread_info_list
+
+
+    @perf.instrument("analyzer.get_contention_issues")
+    def get_contention_issues(self, snapshot=None):
+        """
+        Live lock-contention and CPU-starvation check over the processes the
+        inspection planner ranks highest (plus newly anomalous ones).
+
+        :param snapshot: dict - Classify the threads in this snapshot (e.g. a remote host's) instead.
+        """
+        issues = []
+        if snapshot is not None:
+            for pid, process_name, threads in self._snapshot_threads(snapshot):
+                issues.extend(contention_detector.classify(threads, pid, process_name, snapshot.get("timestamp")))
+            return issues
+        for proc, _ in inspection_planner.plan("threads", exclude_pids=(os.getpid(),)):
+            try:
+                issues.extend(contention_detector.detect(proc['pid'], proc['name'],
+                                                         process_cache.process(proc['pid'])))
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+        return issues
+
+    @perf.instrument("analyzer.get_memory_leak_suspects")
+    def get_memory_leak_suspects(self, memory_threshold_mb=500, snapshot=None):
+        """
+        Returns HighMemoryUsage entries for processes above memory_threshold_mb and
+        MemoryLeak entries for processes whose memory grows steadily (regression over
+        the leak detector's per-process history, with projected time to OOM). The history
+        is fed by the collection cycle only; polling this route just reports it.
+
+        :param snapshot: dict - Report from this snapshot (e.g. a remote host's) instead of this machine;
+                                only its top memory processes are checked against memory_threshold_mb.
+        """
+        memory_leak_info = []
+        timestamp = datetime.utcnow().isoformat() + "Z"
+
+        if snapshot is None:
+            processes = [(proc['pid'], proc['name'], proc['rss']) for proc in process_cache.sample()]
+            suspects = leak_detector.suspects()
+        else:
+            timestamp = snapshot.get("timestamp", timestamp)
+            memory = snapshot.get("memory_deep_metrics") or {}
+            total = (memory.get("memory_stats") or {}).get("total")
+            processes = [(proc['pid'], proc['name'],
+                          proc['memory_percent'] / 100 * total if total and proc.get('memory_percent') is not None
+                          else None)
+                         for proc in memory.get("top_memory_processes", [])]
+            suspects = (snapshot.get("memory_leak_metrics") or {}).get("suspects", [])
+
+        for pid, process_name, rss in processes:
+            if rss is None:
+                continue
+            mem_usage_mb = rss / (1024 * 1024)  # Convert to MB
+            if mem_usage_mb > memory_threshold_mb:
+                memory_leak_info.append({
+                    "process_name": process_name,
+                    "pid": pid,
+                    "message": f"Process {process_name} (PID: {pid}) is using {mem_usage_mb:.2f} MB, "
+                               f"which exceeds the {memory_threshold_mb} MB threshold.",
+                    "memory_usage_mb": round(mem_usage_mb, 2),
+                    "timestamp": timestamp,
+                    "type": "HighMemoryUsage"
+                })
+
+        for suspect in suspects:
+            time_to_oom = suspect["time_to_oom_seconds"]
+            projection = f", out of memory in ~{time_to_oom / 3600:.1f} h" if time_to_oom else ""
+            memory_leak_info.append({
+                **suspect,
+                "message": f"Process {suspect['process_name']} (PID: {suspect['pid']}) {suspect['metric'].upper()} "
+                           f"grew {suspect['growth_mb_per_hour']:.1f} MB/h over {suspect['samples']} samples "
+                           f"(r²={suspect['r2']}){projection}.",
+                "timestamp": timestamp,
+                "type": "MemoryLeak"
+            })
+
+        return memory_leak_info
+
+
+    @perf.instrument("analyzer.get_disk_profiler_issues")
+    def get_disk_profiler_issues(
+        self,
+        disk_usage_threshold=85,        # %
+        disk_io_threshold_mb_s=100,     # MB / second
+        disk_await_threshold_ms=50,     # ms per request
+        snapshot=None
+    ):
+        """
+        Returns a list of dicts describing disk-related performance issues.
+        Structure is identical to get_memory_leak_suspects.
+
+        Three detectors run:
+          1. HighDiskUsage   – partitions whose 'usage.percent' > disk_usage_threshold
+          2. HighDiskIO      – physical disks whose read+write throughput > disk_io_threshold_mb_s
+          3. HighDiskLatency – physical disks whose average await > disk_await_threshold_ms
+
+        Rates come from the disk I/O engine (counters since its previous sample, or
+        since boot on the first call), so no sampling sleep is needed. With snapshot
+        (e.g. a remote host's), partitions and rates come from its disk_deep_metrics.
+        """
+
+        issues = []
+        timestamp = datetime.utcnow().isoformat() + "Z"
+
+        if snapshot is None:
+            partitions = []
+            for part in psutil.disk_partitions(all=False):
+                try:
+                    usage = psutil.disk_usage(part.mountpoint)
+                except PermissionError:
+                    # Ignore CD/DVD or unmounted partitions we can't query
+                    continue
+                partitions.append({"device": part.device, "mountpoint": part.mountpoint, "total": usage.total,
+                                   "used": usage.used, "free": usage.free, "percent": usage.percent})
+            io_rates = disk_io_engine.sample()
+            top_processes = disk_io_engine.top_processes()
+        else:
+            timestamp = snapshot.get("timestamp", timestamp)
+            disk = snapshot.get("disk_deep_metrics") or {}
+            partitions = disk.get("disk_partitions", [])
+            io_rates = disk.get("disk_io_rates") or {"interval_seconds": None, "disks": {}}
+            top_processes = disk.get("top_io_processes", [])
+
+        # ---------- 1) Nearly-full partitions ----------------------------------
+        for part in partitions:
+            if part["percent"] <= disk_usage_threshold:
+                continue
+
+            issues.append({
+                "device": part["device"],
+                "mountpoint": part["mountpoint"],
+                "total_gb": round(part["total"] / (1024**3), 2),
+                "used_gb":  round(part["used"]  / (1024**3), 2),
+                "free_gb":  round(part["free"]  / (1024**3), 2),
+                "usage_percent": round(part["percent"], 2),
+                "message": (
+                    f"Partition {part['device']} ({part['mountpoint']}) is "
+                    f"{part['percent']:.1f}% full – exceeds {disk_usage_threshold}% threshold."
+                ),
+                "timestamp": timestamp,
+                "type": "HighDiskUsage"
+            })
+
+        # ---------- 2) Heavy I/O and 3) slow requests on disks ---------------------
+        sample_seconds = io_rates["interval_seconds"]
+
+        for disk_name, rates in io_rates["disks"].items():
+            mb_per_sec = (rates["read_bytes_per_sec"] + rates["write_bytes_per_sec"]) / (1024 * 1024)
+
+            if mb_per_sec > disk_io_threshold_mb_s:
+                issues.append({
+                    "disk": disk_name,
+                    "io_mb_per_sec": round(mb_per_sec, 2),
+                    "read_iops": rates["read_iops"],
+                    "write_iops": rates["write_iops"],
+                    "utilization_percent": rates["utilization_percent"],
+                    "sample_seconds": sample_seconds,
+                    "top_io_processes": top_processes,
+                    "message": (
+                        f"Disk {disk_name} sustained {mb_per_sec:.2f} MB/s "
+                        f"I/O for {sample_seconds}s – exceeds {disk_io_threshold_mb_s} MB/s threshold."
+                    ),
+                    "timestamp": timestamp,
+                    "type": "HighDiskIO"
+                })
+
+            await_ms = max(rates["read_await_ms"], rates["write_await_ms"])
+            if await_ms > disk_await_threshold_ms:
+                issues.append({
+                    "disk": disk_name,
+                    "read_await_ms": rates["read_await_ms"],
+                    "write_await_ms": rates["write_await_ms"],
+                    "utilization_percent": rates["utilization_percent"],
+                    "sample_seconds": sample_seconds,
+                    "message": (
+                        f"Disk {disk_name} averaged {await_ms:.1f} ms per request over {sample_seconds}s "
+                        f"– exceeds {disk_await_threshold_ms} ms threshold."
+                    ),
+                    "timestamp": timestamp,
+                    "type": "HighDiskLatency"
+                })
+
+        return issues
+
+
+    @perf.instrument("analyzer.analyze_metrics")
+    def analyze_metrics(self, records=None):
+        """
+        Analyze the metrics stream to detect threshold breaches and extract critical info.
+
+        :param records: iterable - Records to analyze instead of the metrics file (e.g. a remote host's series).
+        """
+        performance_issues = []
+
+        for metric, rule_issues in self.iter_rule_issues(self.load_metrics_stream() if records is None else records):
+            performance_issues.extend(self.analyze_record(metric))
+            performance_issues.extend(rule_issues)
+
+        return performance_issues
+
+    def iter_rule_issues(self, records, state=None, trace=None):
+        """
+        Pair every record with the issues raised by the threshold rules. Records are
+        buffered in batches so each rule is checked with array comparisons per batch;
+        for_seconds / hysteresis state carries over from one batch to the next.
+
+        :param state: dict - Rule state to start from; updated in place (see ThresholdRuleSet.evaluate_batch).
+        :param trace: dict - Rule trace to update in place (see ThresholdRuleSet.evaluate_batch).
+        :return: generator of (record, list[dict]) in record order.
+        """
+        if self.rules is None or not self.rules.rules:
+            for metric in records:
+                yield metric, []
+            return
+        batch = []
+        state = {} if state is None else state
+        for metric in records:
+            batch.append(metric)
+            if len(batch) >= self.rule_batch_size:
+                yield from zip(batch, self.rules.evaluate_batch(batch, state, trace))
+                batch = []
+        yield from zip(batch, self.rules.evaluate_batch(batch, state, trace))
+
+    @staticmethod
+    def _episode_key(issue):
+        return (issue["type"], issue.get("pid"), issue.get("process_name"), issue.get("thread_name"))
+
+    def summarize_records(self, records, include_issues=True, rule_state=None, rule_trace=None):
+        """
+        Analyze a sequence of records into a mergeable partial result.
+
+        Episodes are runs of consecutive records in which the same issue (type and
+        process/thread) is present; record indexes are local to this sequence.
+
+        :param rule_state: dict - Threshold-rule state to start from (None: empty).
+        :param rule_trace: dict - When given, the rule trace and the final rule state are
+                                  returned as "rule_trace" and "rule_state" for chaining chunks.
+        """
+        summary = {"records": 0, "issues": [], "counts": Counter(), "processes": {}, "episodes": []}
+        open_episodes = {}
+        rule_state = dict(rule_state or {})
+
+        for index, (metric, rule_issues) in enumerate(self.iter_rule_issues(records, rule_state, rule_trace)):
+            summary["records"] += 1
+            seen = set()
+            for issue in self.analyze_record(metric) + rule_issues:
+                summary["counts"][issue["type"]] += 1
+                if include_issues:
+                    summary["issues"].append(issue)
+
+                pid = issue.get("pid")
+                if pid is not None:
+                    proc = summary["processes"].setdefault(pid, {
+                        "pid": pid,
+                        "process_name": issue.get("process_name"),
+                        "issue_counts": Counter(),
+                        "max_cpu_percent": 0,
+                        "max_memory_percent": 0,
+                        "first_seen": issue["timestamp"],
+                        "last_seen": issue["timestamp"]
+                    })
+                    proc["issue_counts"][issue["type"]] += 1
+                    proc["max_cpu_percent"] = max(proc["max_cpu_percent"], issue.get("cpu_percent") or 0)
+                    proc["max_memory_percent"] = max(proc["max_memory_percent"], issue.get("memory_percent") or 0)
+                    proc["last_seen"] = issue["timestamp"]
+
+                key = self._episode_key(issue)
+                if key in seen:
+                    continue
+                seen.add(key)
+                episode = open_episodes.get(key)
+                if episode is None:
+                    open_episodes[key] = {
+                        "type": key[0], "pid": key[1], "process_name": key[2], "thread_name": key[3],
+                        "start": issue["timestamp"], "end": issue["timestamp"],
+                        "start_record": index, "end_record": index
+                    }
+                else:
+                    episode["end"] = issue["timestamp"]
+                    episode["end_record"] = index
+
+            for key in [key for key in open_episodes if key not in seen]:
+                summary["episodes"].append(open_episodes.pop(key))
+
+        summary["episodes"].extend(open_episodes.values())
+        if rule_trace is not None:
+            summary["rule_state"], summary["rule_trace"] = rule_state, rule_trace
+        return summary
+
+    def chain_rule_state(self, pool, config, ranges, partials, include_issues, workers):
+        """
+        Chunks are summarized from an empty rule state. Chain each chunk's rule state
+        onto the next, then summarize again, from the state it really starts from, every
+        chunk that starts with a key pending or firing, so the merged result matches a
+        serial run.
+
+        :return: list[dict] - partials with those chunks replaced.
+        """
+        starts, state = [], {}
+        for index, partial in enumerate(partials):
+            if state:
+                starts.append((index, state))
+            state = self.rules.carry(state, partial["rule_trace"], partial["rule_state"])
+
+        partials = list(partials)
+        pending = deque()
+        for index, start_state in starts:
+            if len(pending) >= workers:
+                done, future = pending.popleft()
+                partials[done] = future.result()
+            pending.append((index, pool.submit(analyze_chunk, config, *ranges[index], include_issues, start_state)))
+        for index, future in pending:
+            partials[index] = future.result()
+        return partials
+
+    @classmethod
+    def merge_summaries(cls, partials):
+        """
+        Merge partial summaries of consecutive chunks (in file order). Episodes that
+        run up to the end of one chunk and continue at the start of the next are joined.
+        """
+        merged = {"records": 0, "issues": [], "counts": Counter(), "processes": {}, "episodes": []}
+        tail = {}  # episode key -> merged episode still open at the end of the previous chunk
+
+        for partial in partials:
+            offset = merged["records"]
+            merged["issues"].extend(partial["issues"])
+            merged["counts"].update(partial["counts"])
+
+            for pid, proc in partial["processes"].items():
+                current = merged["processes"].get(pid)
+                if current is None:
+                    merged["processes"][pid] = dict(proc, issue_counts=Counter(proc["issue_counts"]))
+                    continue
+                current["issue_counts"].update(proc["issue_counts"])
+                current["max_cpu_percent"] = max(current["max_cpu_percent"], proc["max_cpu_percent"])
+                current["max_memory_percent"] = max(current["max_memory_percent"], proc["max_memory_percent"])
+                current["last_seen"] = proc["last_seen"]
+
+            next_tail = {}
+            last_index = offset + partial["records"] - 1
+            for episode in sorted(partial["episodes"], key=lambda e: e["start_record"]):
+                episode = dict(episode,
+                               start_record=episode["start_record"] + offset,
+                               end_record=episode["end_record"] + offset)
+                key = cls._episode_key(episode)
+                previous = tail.get(key)
+                if previous is not None and episode["start_record"] == offset:
+                    previous["end"] = episode["end"]
+                    previous["end_record"] = episode["end_record"]
+                    episode = previous
+                else:
+                    merged["episodes"].append(episode)
+                if episode["end_record"] == last_index:
+                    next_tail[key] = episode
+            tail = next_tail
+            merged["records"] += partial["records"]
+
+        for episode in merged["episodes"]:
+            episode["records"] = episode["end_record"] - episode["start_record"] + 1
+        merged["episodes"].sort(key=lambda e: (e["start_record"], e["type"]))
+        merged["counts"] = dict(merged["counts"])
+        for proc in merged["processes"].values():
+            proc["issue_counts"] = dict(proc["issue_counts"])
+        return merged
+
+    def worker_config(self):
+        return {
+            "metrics_file": self.metrics_file,
+            "cpu_threshold": self.cpu_threshold,
+            "memory_threshold": self.memory_threshold,
+            "disk_threshold": self.disk_threshold,
+            "gc_threshold": self.gc_threshold,
+            "include_stack_lines": self.include_stack_lines,
+            "network_error_rate_threshold": self.network_error_rate_threshold,
+            "network_utilization_threshold": self.network_utilization_threshold,
+            "psi_some_threshold": self.psi_some_threshold,
+            "psi_full_threshold": self.psi_full_threshold,
+            "major_fault_rate_threshold": self.major_fault_rate_threshold,
+            "cgroup_throttle_threshold": self.cgroup_throttle_threshold,
+            "cgroup_memory_threshold": self.cgroup_memory_threshold,
+            "rules": self.rules.spec() if self.rules else None,
+            "rule_batch_size": self.rule_batch_size
+        }
+
+    @perf.instrument("analyzer.analyze_metrics_parallel")
+    def analyze_metrics_parallel(self, workers=None, chunks_per_worker=4, include_issues=True):
+        """
+        Analyze the history in parallel: the file is split into record-aligned byte
+        ranges, each range is summarized in a worker process, and the partial results
+        (issues, counts, per-process aggregates, episodes) are merged in file order.
+        Compressed histories cannot be split by offset and are summarized serially.
+
+        :param workers: int - Chunks summarized at once, at most the CPU count (default: all CPUs).
+        :return: dict - {"records", "issues", "counts", "processes", "episodes"}
+        """
+        cpu_count = os.cpu_count() or 1
+        workers = max(1, min(workers or cpu_count, cpu_count))
+        if self.metrics_file.endswith((".gz", ".zst")) or workers == 1:
+            return self.merge_summaries([self.summarize_records(self.load_metrics_stream(), include_issues)])
+
+        try:
+            with MappedHistoryReader(self.metrics_file) as reader:
+                ranges = reader.split(workers * chunks_per_worker)
+        except Exception as e:
+            print(f"Error opening metrics file: {e}")
+            return self.merge_summaries([])
+
+        config = self.worker_config()
+        pool = analysis_pool()
+        partials = []
+        pending = deque()  # at most `workers` chunks in flight, collected in file order
+        try:
+            for start, end in ranges:
+                if len(pending) >= workers:
+                    partials.append(pending.popleft().result())
+                pending.append(pool.submit(analyze_chunk, config, start, end, include_issues))
+            partials.extend(future.result() for future in pending)
+            if self.rules is not None and self.rules.rules:
+                partials = self.chain_rule_state(pool, config, ranges, partials, include_issues, workers)
+        except BrokenProcessPool as e:
+            logging.error(f"Analysis worker pool failed ({e}); summarizing serially.")
+            _discard_analysis_pool(pool)
+            return self.merge_summaries([self.summarize_records(self.load_metrics_stream(), include_issues)])
+        return self.merge_summaries(partials)
+
+    def analyze_record(self, metric):
+        """Detect the performance issues present in a single metrics record."""
+        performance_issues = []
+
+        # Extract timestamp, prefer top-level "timestamp"
+        timestamp = metric.get("timestamp") or metric.get("system_info", {}).get("current_time", "Unknown Time")
+
+        # CPU
+        cpu_usage = metric.get("cpu_metrics", {}).get("cpu_usage_percent", 0)
+        if cpu_usage > self.cpu_threshold:
+            performance_issues.append({
+                "type": "CPU",
+                "timestamp": timestamp,
+                "message": f"High CPU usage: {cpu_usage:.2f}%"
+            })
+
+        # Memory
+        memory_usage = metric.get("memory_metrics", {}).get("memory_usage_percent", 0)
+        if memory_usage == 0:
+            # fallback to deep memory metrics percent
+            memory_usage = metric.get("memory_deep_metrics", {}).get("memory_usage", {}).get("percent", 0)
+        # Where PSI is collected, high usage alone (mostly reclaimable cache) is not an issue:
+        # it is reported only while tasks are also stalling on memory
+        memory_psi = ((metric.get("pressure_metrics") or {}).get("psi") or {}).get("memory")
+        memory_stalling = memory_psi is None or ((memory_psi.get("some") or {}).get("avg10") or 0) > 0
+        if memory_usage > self.memory_threshold and memory_stalling:
+            performance_issues.append({
+                "type": "Memory",
+                "timestamp": timestamp,
+                "message": f"High memory usage: {memory_usage:.2f}%"
+            })
+
+        # Disk
+        # disk_usage = metric.get("disk_metrics", {}).get("disk_usage_percent", 0)
+        # if disk_usage == 0:
+        #     # fallback to deep disk metrics percent
+        #     disk_usage = metric.get("disk_deep_metrics", {}).get("disk_usage", {}).get("percent", 0)
+        # if disk_usage > self.disk_threshold:
+        #     performance_issues.append({
+        #         "type": "Disk",
+        #         "timestamp": timestamp,
+        #         "message": f"High disk usage: {disk_usage:.2f}%"
+        #     })
+
+        # Garbage Collection
+        # gc_collected = metric.get("garbage_collector_metrics", {}).get("collected_objects", 0)
+        # if gc_collected > self.gc_threshold:
+        #     performance_issues.append({
+        #         "type": "GC",
+        #         "timestamp": timestamp,
+        #         "message": f"High GC activity: {gc_collected} collected objects"
+        #     })
+
+        # Thread contention
+        thread_metrics = metric.get("thread_metrics", {})
+        for thread in thread_metrics.get("thread_details", []):
+            is_blocking = thread.get("is_blocking")
+            # Accept True boolean or string "True" (case-insensitive), ignore "Unknown"
+            if isinstance(is_blocking, bool) and is_blocking:
+                blocking = True
+            elif isinstance(is_blocking, str) and is_blocking.lower() == "true":
+                blocking = True
+            else:
+                blocking = False
+
+            if blocking:
+                process_name = thread.get("process_name", "UnknownProcess")
+                thread_name = thread.get("thread_name", "UnknownThread")
+                stack_summary = thread.get("stack_summary", [])
+                # Limit stack trace lines if configured
+                summary = stack_summary[-self.include_stack_lines:] if self.include_stack_lines else stack_summary
+                reasons = thread.get("contention_reasons") or []
+                performance_issues.append({
+                    "type": "ThreadContention",
+                    "timestamp": timestamp,
+                    "process_name": process_name,
+                    "pid": thread.get("pid"),
+                    "thread_name": thread_name,
+                    "message": f"Blocking thread detected: {', '.join(reasons)}" if reasons else "Blocking thread detected",
+                    "blocked_ratio": thread.get("blocked_ratio"),
+                    "stack_summary": summary
+                })
+
+            # CPU starvation: runnable but waiting on the run queue
+            if thread.get("is_starved") is True:
+                performance_issues.append({
+                    "type": "CPUStarvation",
+                    "timestamp": timestamp,
+                    "process_name": thread.get("process_name", "UnknownProcess"),
+                    "pid": thread.get("pid"),
+                    "thread_name": thread.get("thread_name", "UnknownThread"),
+                    "message": f"Thread waited {thread.get('run_delay_ratio') or 0:.0%} of the time on the run queue",
+                    "run_delay_ratio": thread.get("run_delay_ratio")
+                })
+
+        # Extract top CPU processes if any usage > threshold
+        top_cpu_processes = metric.get("cpu_deep_metrics", {}).get("top_cpu_processes", [])
+        logging.info(f"Count of the top CPU processes: {len(top_cpu_processes)}")
+
+        for proc in top_cpu_processes:
+            logging.info(f"Process Name: {proc.get('name')} with Id {proc.get('pid')}")
+            cpu_percent = proc.get("cpu_percent", 0)
+            # if cpu_percent > self.cpu_threshold:
+            performance_issues.append({
+                "type": "CPUProcess",
+                "timestamp": timestamp,
+                "process_name": proc.get("name", "UnknownProcess"),
+                "pid": proc.get("pid"),
+                "cpu_percent": cpu_percent,
+                "message": f"High CPU process: {proc.get('name')} using {cpu_percent:.2f}% CPU"
+            })
+       
+        
+
+        # Extract top memory processes
+        top_memory_processes = metric.get("memory_deep_metrics", {}).get("top_memory_processes", [])
+        for proc in top_memory_processes:
+            mem_percent = proc.get("memory_percent", 0)
+            if mem_percent > self.memory_threshold:
+                performance_issues.append({
+                    "type": "MemoryProcess",
+                    "timestamp": timestamp,
+                    "process_name": proc.get("name", "UnknownProcess"),
+                    "pid": proc.get("pid"),
+                    "memory_percent": mem_percent,
+                    "message": f"High Memory process: {proc.get('name')} using {mem_percent:.2f}% Memory"
+                })
+
+        # Resource pressure: time stalled on CPU / memory / I/O (PSI) rather than utilisation percent
+        pressure = metric.get("pressure_metrics") or {}
+        for resource, psi in (pressure.get("psi") or {}).items():
+            if not psi:
+                continue
+            some = (psi.get("some") or {}).get("avg10", 0)
+            full = (psi.get("full") or {}).get("avg10", 0)
+            if full > self.psi_full_threshold or some > self.psi_some_threshold:
+                performance_issues.append({
+                    "type": {"cpu": "CPUPressure", "memory": "MemoryPressure", "io": "IOPressure"}.get(resource, "Pressure"),
+                    "timestamp": timestamp,
+                    "resource": resource,
+                    "some_avg10": some,
+                    "full_avg10": full,
+                    "message": f"{resource} pressure: tasks stalled {some:.1f}% of the last 10s "
+                               f"({full:.1f}% with every task stalled)"
+                })
+        vm_rates = pressure.get("vm_rates") or {}
+        major_faults = vm_rates.get("major_faults_per_sec", 0)
+        if major_faults > self.major_fault_rate_threshold:
+            # Name a process only if it actually took major faults (the list is sorted by (major, minor))
+            faulting = next((proc for proc in pressure.get("top_faulting_processes") or []
+                             if (proc.get("major_faults_per_sec") or 0) > 0), {})
+            performance_issues.append({
+                "type": "MemoryThrashing",
+                "timestamp": timestamp,
+                "major_faults_per_sec": major_faults,
+                "swap_in_pages_per_sec": vm_rates.get("swap_in_pages_per_sec"),
+                "process_name": faulting.get("name"),
+                "pid": faulting.get("pid"),
+                "message": f"{major_faults:.0f} major page faults/s"
+                           + (f", most from {faulting.get('name')} (PID {faulting.get('pid')})" if faulting else "")
+            })
+
+        # Containers: CPU quota throttling and memory.max headroom per cgroup
+        for path, cgroup in ((metric.get("cgroup_metrics") or {}).get("cgroups") or {}).items():
+            throttled = cgroup.get("throttled_periods_percent")
+            if throttled is not None and throttled > self.cgroup_throttle_threshold:
+                performance_issues.append({
+                    "type": "CgroupCPUThrottling",
+                    "timestamp": timestamp,
+                    "cgroup": path,
+                    "throttled_periods_percent": throttled,
+                    "cpu_limit_cores": cgroup.get("cpu_limit_cores"),
+                    "message": f"cgroup {path} was throttled in {throttled:.1f}% of CPU periods "
+                               f"(quota {cgroup.get('cpu_limit_cores')} cores)"
+                })
+            memory_percent = cgroup.get("memory_percent_of_max")
+            if memory_percent is not None and memory_percent > self.cgroup_memory_threshold:
+                performance_issues.append({
+                    "type": "CgroupMemoryLimit",
+                    "timestamp": timestamp,
+                    "cgroup": path,
+                    "memory_percent_of_max": memory_percent,
+                    "memory_headroom_bytes": cgroup.get("memory_headroom_bytes"),
+                    "message": f"cgroup {path} uses {memory_percent:.1f}% of memory.max "
+                               f"({(cgroup.get('memory_headroom_bytes') or 0) / (1024 * 1024):.0f} MB headroom)"
+                })
+
+        # Memory leak suspects found by the collector's growth-rate regression
+        for suspect in (metric.get("memory_leak_metrics") or {}).get("suspects", []):
+            performance_issues.append({
+                "type": "MemoryLeak",
+                "timestamp": timestamp,
+                "process_name": suspect.get("process_name", "UnknownProcess"),
+                "pid": suspect.get("pid"),
+                "growth_mb_per_hour": suspect.get("growth_mb_per_hour"),
+                "time_to_oom_seconds": suspect.get("time_to_oom_seconds"),
+                "message": f"Memory leak suspect: {suspect.get('process_name')} growing "
+                           f"{suspect.get('growth_mb_per_hour', 0):.1f} MB/h"
+            })
+
+        # Disk partitions usage info (warn if any partition exceeds threshold)
+        # disk_partitions = metric.get("disk_deep_metrics", {}).get("disk_partitions", [])
+        # for partition in disk_partitions:
+        #     percent = partition.get("percent", 0)
+        #     if percent > self.disk_threshold:
+        #         performance_issues.append({
+        #             "type": "DiskPartition",
+        #             "timestamp": timestamp,
+        #             "partition": partition.get("device", "UnknownPartition"),
+        #             "message": f"High disk partition usage: {percent:.2f}% on {partition.get('device')}"
+        #         })
+
+        # GPU metrics (optional thresholds if needed, here just include info)
+        # gpu_metrics = metric.get("GPU_Metrics", [])
+        # for gpu in gpu_metrics:
+        #     load = gpu.get("load", 0)
+        #     if load > 0.9:  # example threshold for GPU load
+        #         performance_issues.append({
+        #             "type": "GPU",
+        #             "timestamp": timestamp,
+        #             "gpu_name": gpu.get("name", "UnknownGPU"),
+        #             "message": f"High GPU load: {load:.2f}"
+        #         })
+
+        # Network: per-interface rates (cumulative counters are never zero, so they cannot show an outage)
+        network_metrics = metric.get("network_metrics", {})
+        interfaces = network_metrics.get("interfaces") or {}
+        active_interfaces = {name: nic for name, nic in interfaces.items()
+                             if not name.startswith("lo") and nic.get("is_up") is not False}
+        if active_interfaces and all(
+                nic.get("bytes_sent_per_sec", 0) == 0 and nic.get("bytes_recv_per_sec", 0) == 0
+                for nic in active_interfaces.values()):
+            performance_issues.append({
+                "type": "Network",
+                "timestamp": timestamp,
+                "message": "No network traffic detected"
+            })
+        for name, nic in active_interfaces.items():
+            error_rate = (nic.get("errors_per_sec") or 0) + (nic.get("drops_per_sec") or 0)
+            if error_rate > self.network_error_rate_threshold:
+                performance_issues.append({
+                    "type": "NetworkErrors",
+                    "timestamp": timestamp,
+                    "interface": name,
+                    "errors_per_sec": nic.get("errors_per_sec"),
+                    "drops_per_sec": nic.get("drops_per_sec"),
+                    "message": f"Interface {name} is losing {error_rate:.2f} packets/s to errors or drops"
+                })
+            utilization = nic.get("utilization_percent")
+            if utilization is not None and utilization > self.network_utilization_threshold:
+                performance_issues.append({
+                    "type": "NetworkSaturation",
+                    "timestamp": timestamp,
+                    "interface": name,
+                    "utilization_percent": utilization,
+                    "message": f"Interface {name} is at {utilization:.1f}% of its {nic.get('speed_mbps')} Mbit/s link"
+                })
+
+        # Power metrics info (battery low warning)
+        power_metrics = metric.get("power_metrics", {})
+        battery_percent = power_metrics.get("battery_percent", 100)
+        power_plugged = power_metrics.get("power_plugged", True)
+        # Hosts without a battery report "N/A"
+        if isinstance(battery_percent, (int, float)) and battery_percent < 20 and not power_plugged:
+            performance_issues.append({
+                "type": "Power",
+                "timestamp": timestamp,
+                "message": f"Low battery: {battery_percent}% and not plugged in"
+            })
+
+        return performance_issues
+    
+
+    def performanceOverview(file_path="Suggestions/PerformanceOverview.json"):
+        file_path = os.path.join("Suggestions", "PerformanceOverview.json")
+        print(f"📄 File path for overview: {file_path}")
+        try:
+            with open(file_path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            print(f"❌ File not found: {file_path}")
+            return []
+        except json.JSONDecodeError as e:
+            print(f"❌ JSON parsing error: {e}")
+            return []
+
+        if not data:
+            print("✅ No performance issues detected.")
+            return []
+
+        print("🚨 Performance Issues Detected:\n")
+        issues = []
+
+        for entry in data:
+            pid = entry.get("PID")
+            cluster = entry.get("Cluster", "Unknown")
+            pattern = entry.get("Pattern", "Unknown")
+            summary = entry.get("Summary", "No summary provided.")
+            recommendation = entry.get("Recommendation", "No recommendation.")
+
+            print(f"[PID {pid}] - [{cluster}] {pattern}")
+            print(f"  ↪ {summary}\n")
+
+            if recommendation != "No action required":
+                issues.append({
+                    "pid": pid,
+                    "cluster": cluster,
+                    "pattern": pattern,
+                    "summary": summary,
+                    "recommendation": recommendation
+                })
+
+        return issues
+
+
+
+    def load_thread_summaries(self, pid: int = None, directory="Suggestions"):
+        summaries = []
+
+        logging.info("load_thread_summaries called...")
+        if not os.path.isdir(directory):
+            logging.warning(f"❌ Directory not found: {directory}")
+            return []
+
+        for filename in os.listdir(directory):
+            logging.info(f"Filename for process listing: {filename}")
+            if filename.lower().startswith("summary_") and filename.endswith(".json"):
+                if pid:
+                    if not filename.endswith(f"{pid}.json"):
+                        continue
+
+                file_path = os.path.join(directory, filename)
+                try:
+                    with open(file_path, "r") as f:
+                        data = json.load(f)
+                        summaries.append(data)
+                except Exception as e:
+                    logging.error(f"⚠️ Failed to read {filename}: {e}")
+
+        logging.info(f"📦 Loaded {len(summaries)} summary file(s).")
+        return summaries
+
+
+
+    def generate_report(self, records=None):
+        """Print or return a detailed report based on detected issues."""
+        issues = self.analyze_metrics(records)
+
+        if not issues:
+            print("✅ No performance issues detected.")
+            return []
+
+        print("🚨 Performance Issues Detected:\n")
+        for issue in issues:
+            print(f"[{issue['timestamp']}] - [{issue['type']}] {issue['message']}")
+            if issue["type"] == "ThreadContention":
+                print(f"    Process: {issue['process_name']}")
+                print(f"    Thread : {issue['thread_name']}")
+                print(f"    Stack  :")
+                for frame in issue["stack_summary"]:
+                    print(f"        {frame}")
+                print()
+
+        return issues
@@ -0,0 +1,151 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from metrics.cpu_metrics import CPUMetrics
+from metrics.cpu_metrics_deep import CpuDeepMetrics
+from metrics.scheduler import FixedRateScheduler
+from metrics.self_profiler import perf
+
+
+class AsyncCollectionEngine:
+    """
+    asyncio-based collection loop for a MetricManager.
+
+    All collectors of a cycle run concurrently on one event loop: coroutine
+    collectors are awaited directly, blocking psutil collectors are dispatched to a
+    bounded thread pool. Cycles start on the fixed-rate ticks of a FixedRateScheduler,
+    so the sampling cadence does not drift with collection time.
+    """
+
+    # psutil.process_iter() hands out shared Process objects and stores the requested
+    # attributes on their `info` attribute, so collectors that walk the process table
+    # must not overlap each other.
+    PROCESS_TABLE_COLLECTORS = ("cpu_metrics", "cpu_deep_metrics", "memory_deep_metrics", "thread_metrics")
+
+    def __init__(self, metric_manager, interval=30, max_workers=4, collector_timeout=20):
+        self.metric_manager = metric_manager
+        self.interval = interval
+        self.max_workers = max_workers
+        self.collector_timeout = collector_timeout
+        self.collectors = dict(metric_manager.collectors)
+        # Non-blocking variants: CPU usage is measured across cycles instead of a
+        # 0.5s sleep, and py-spy dumps run as asyncio subprocesses.
+        if metric_manager.collector_backend == "psutil":
+            self.collectors["cpu_metrics"] = functools.partial(CPUMetrics.get_metrics, cpu_interval=None)
+        self.collectors["cpu_hot_processes"] = CpuDeepMetrics.get_hot_process_traces_async
+        self.executor = None
+        self._process_table_lock = None
+        self.scheduler = FixedRateScheduler(interval)
+        self._loop = None
+        self._stop_event = None
+        self._thread = None
+
+    def _release_process_table(self, future):
+        if not future.cancelled():
+            future.exception()  # retrieved, so a late failure is not reported as unhandled
+        self._process_table_lock.release()
+
+    async def _run_collector(self, name, collector):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        # Process-table collectors queue on an asyncio lock before they take an executor
+        # thread, so waiting for their turn does not idle a worker. The wait has its own
+        # collector_timeout: behind a walker that never finishes, the section is skipped.
+        serialized = name in self.PROCESS_TABLE_COLLECTORS
+        acquired = False
+        future = None
+        try:
+            if serialized:
+                try:
+                    await asyncio.wait_for(self._process_table_lock.acquire(), self.collector_timeout)
+                except asyncio.TimeoutError:
+                    message = f"Collector timed out after {self.collector_timeout}s waiting for the process table"
+                    logging.error(f"Collector {name} skipped: {message}")
+                    return {"error": message}
+                acquired = True
+            if asyncio.iscoroutinefunction(collector):
+                future = asyncio.ensure_future(collector())
+                result = future
+            else:
+                future = loop.run_in_executor(self.executor, collector)
+                result = asyncio.shield(future)  # a worker thread cannot be cancelled
+            return await asyncio.wait_for(result, self.collector_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"Collector {name} timed out after {self.collector_timeout}s")
+            return {"error": f"Collector timed out after {self.collector_timeout}s"}
+        except Exception as e:
+            logging.error(f"Collector {name} failed: {e}")
+            return {"error": str(e)}
+        finally:
+            if acquired:
+                if future is None or future.done():
+                    self._process_table_lock.release()
+                else:
+                    # Timed out while still walking the process table: keep the lock until it finishes
+                    future.add_done_callback(self._release_process_table)
+            perf.record(f"collector.{name}", time.perf_counter() - start)
+
+    async def collect_once(self):
+        """Run every collector concurrently and return the assembled snapshot."""
+        start = time.perf_counter()
+        metrics = {"timestamp": datetime.utcnow().isoformat() + "Z"}
+        names = list(self.collectors)
+        results = await asyncio.gather(*(self._run_collector(name, self.collectors[name]) for name in names))
+        metrics.update(zip(names, results))
+        perf.record("async_engine.collect_once", time.perf_counter() - start)
+        return metrics
+
+    async def _cycle(self):
+        loop = asyncio.get_running_loop()
+        metrics = await self.collect_once()
+        self.metric_manager.publish_snapshot(metrics)
+        await loop.run_in_executor(self.executor, self.metric_manager.write_metrics, metrics)
+        await loop.run_in_executor(self.executor, self.metric_manager.analyze_system_performance, metrics)
+
+    async def _main(self):
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="collector")
+        self._process_table_lock = asyncio.Lock()
+        try:
+            while not self._stop_event.is_set():
+                self.scheduler.begin_tick()
+                try:
+                    await self._cycle()
+                except Exception as e:
+                    logging.error(f"Async collection cycle failed: {e}")
+
+                try:
+                    await asyncio.wait_for(self._stop_event.wait(), self.scheduler.advance())
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.executor.shutdown(wait=False)
+
+    def start(self):
+        """Run the engine's event loop on a single background thread."""
+        if self._thread:
+            return
+        self._stop_event = asyncio.Event()
+        self._loop = asyncio.new_event_loop()
+
+        def run():
+            try:
+                self._loop.run_until_complete(self._main())
+            finally:
+                self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="async-collection-engine", daemon=True)
+        self._thread.start()
+        logging.info(f"Started async collection engine (interval={self.interval}s).")
+
+    def stop(self):
+        if self._loop and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+            logging.info("Stopped async collection engine.")
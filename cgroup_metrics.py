@@ -0,0 +1,199 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+from metrics.process_cache import process_cache
+
+
+class CgroupMetrics:
+    """
+    cgroup v2 resource accounting for containerised services.
+
+    Walks the populated part of the unified hierarchy under root, down to the leaf
+    cgroups (e.g. kubepods.slice/<qos>/<pod>/<container>.scope) or max_depth levels
+    when set, and reports for every populated cgroup:
+      - CPU usage and throttling from cpu.stat / cpu.max (usage, throttled time and
+        share of throttled periods since the previous sample, quota in cores)
+      - memory.current against memory.max (headroom) and memory.pressure (PSI)
+      - io.stat byte and operation rates summed over devices
+      - member PIDs from cgroup.procs, named through the shared process cache
+
+    All file access goes through root and proc_root, so the collector can be pointed
+    at a fake sysfs/procfs tree.
+    """
+
+    def __init__(self, root="/sys/fs/cgroup", proc_root="/proc", max_depth=None, max_pids=10):
+        self.root = root
+        self.proc_root = proc_root
+        self.max_depth = max_depth
+        self.max_pids = max_pids
+        self.lock = threading.Lock()
+        self._previous = {}     # cgroup path -> (counters, monotonic time)
+
+    @property
+    def available(self):
+        """cgroup v2 mounts expose cgroup.controllers at the hierarchy root."""
+        return os.path.isfile(os.path.join(self.root, "cgroup.controllers"))
+
+    def _read(self, directory, name):
+        try:
+            with open(os.path.join(directory, name), "r") as file:
+                return file.read()
+        except OSError:
+            return None
+
+    @staticmethod
+    def _parse_flat_keyed(text):
+        """'key value' lines (cpu.stat, cgroup.events) -> dict of ints."""
+        values = {}
+        for line in (text or "").splitlines():
+            key, _, value = line.partition(" ")
+            if value.strip().lstrip("-").isdigit():
+                values[key] = int(value)
+        return values
+
+    @staticmethod
+    def _parse_psi(text):
+        psi = {}
+        for line in (text or "").splitlines():
+            kind, *fields = line.split()
+            psi[kind] = {key: (int(value) if key == "total" else float(value))
+                         for key, value in (field.split("=", 1) for field in fields)}
+        return psi or None
+
+    @staticmethod
+    def _parse_io_stat(text):
+        """Sum rbytes/wbytes/rios/wios over every device line of io.stat."""
+        totals = {"rbytes": 0, "wbytes": 0, "rios": 0, "wios": 0}
+        for line in (text or "").splitlines():
+            for field in line.split()[1:]:
+                key, _, value = field.partition("=")
+                if key in totals and value.isdigit():
+                    totals[key] += int(value)
+        return totals
+
+    @staticmethod
+    def _parse_limit(text):
+        """memory.max / single values: 'max' means unlimited (None)."""
+        value = (text or "").strip()
+        return int(value) if value.isdigit() else None
+
+    @staticmethod
+    def _parse_cpu_max(text):
+        """cpu.max '$QUOTA $PERIOD' -> quota in cores, None when unlimited."""
+        fields = (text or "").split()
+        if len(fields) == 2 and fields[0].isdigit() and int(fields[1]) > 0:
+            return round(int(fields[0]) / int(fields[1]), 3)
+        return None
+
+    def cgroup_of(self, pid):
+        """:return: str - The cgroup v2 path of pid (from /proc/<pid>/cgroup), or None."""
+        try:
+            with open(os.path.join(self.proc_root, str(pid), "cgroup"), "r") as file:
+                for line in file:
+                    if line.startswith("0::"):
+                        return line[3:].strip()
+        except OSError:
+            pass
+        return None
+
+    def _iter_cgroups(self):
+        """:return: generator of (cgroup path, directory) - Populated cgroups, parents first."""
+        root_depth = self.root.rstrip(os.sep).count(os.sep)
+        for directory, subdirectories, _ in os.walk(self.root):
+            relative = os.path.relpath(directory, self.root)
+            path = "/" if relative == "." else "/" + relative.replace(os.sep, "/")
+            # Nothing runs anywhere below an unpopulated cgroup: skip its whole subtree
+            if path != "/" and self._parse_flat_keyed(self._read(directory, "cgroup.events")).get("populated") == 0:
+                subdirectories[:] = []
+                continue
+            depth = directory.rstrip(os.sep).count(os.sep) - root_depth
+            if self.max_depth is not None and depth >= self.max_depth:
+                subdirectories[:] = []
+            yield path, directory
+
+    def _sample_cgroup(self, path, directory, now, names):
+        cpu_stat = self._parse_flat_keyed(self._read(directory, "cpu.stat"))
+        io = self._parse_io_stat(self._read(directory, "io.stat"))
+        memory_current = self._parse_limit(self._read(directory, "memory.current"))
+        memory_max = self._parse_limit(self._read(directory, "memory.max"))
+        pids = [int(pid) for pid in (self._read(directory, "cgroup.procs") or "").split() if pid.isdigit()]
+
+        counters = {
+            "usage_usec": cpu_stat.get("usage_usec"),
+            "throttled_usec": cpu_stat.get("throttled_usec"),
+            "nr_periods": cpu_stat.get("nr_periods"),
+            "nr_throttled": cpu_stat.get("nr_throttled"),
+            **io
+        }
+        previous = self._previous.get(path)
+        self._previous[path] = (counters, now)
+
+        rates = {"cpu_percent": None, "cpu_throttled_percent": None, "throttled_periods_percent": None,
+                 "io_read_bytes_per_sec": None, "io_write_bytes_per_sec": None, "io_ops_per_sec": None}
+        if previous is not None and now > previous[1]:
+            before, elapsed = previous[0], now - previous[1]
+
+            def delta(key):
+                if counters[key] is None or before.get(key) is None:
+                    return None
+                return max(counters[key] - before[key], 0)
+
+            usage, throttled = delta("usage_usec"), delta("throttled_usec")
+            periods, throttled_periods = delta("nr_periods"), delta("nr_throttled")
+            if usage is not None:
+                rates["cpu_percent"] = round(usage / (elapsed * 1e6) * 100, 2)
+            if throttled is not None:
+                rates["cpu_throttled_percent"] = round(throttled / (elapsed * 1e6) * 100, 2)
+            if periods:
+                rates["throttled_periods_percent"] = round(throttled_periods / periods * 100, 2)
+            rates["io_read_bytes_per_sec"] = round(delta("rbytes") / elapsed, 1)
+            rates["io_write_bytes_per_sec"] = round(delta("wbytes") / elapsed, 1)
+            rates["io_ops_per_sec"] = round((delta("rios") + delta("wios")) / elapsed, 2)
+
+        memory_pressure = self._parse_psi(self._read(directory, "memory.pressure"))
+        return {
+            "cpu_limit_cores": self._parse_cpu_max(self._read(directory, "cpu.max")),
+            "cpu_usage_seconds": round(counters["usage_usec"] / 1e6, 3) if counters["usage_usec"] is not None else None,
+            **rates,
+            "memory_current": memory_current,
+            "memory_max": memory_max,
+            "memory_headroom_bytes": memory_max - memory_current
+            if memory_max is not None and memory_current is not None else None,
+            "memory_percent_of_max": round(memory_current / memory_max * 100, 2)
+            if memory_max and memory_current is not None else None,
+            "memory_pressure": memory_pressure,
+            "pid_count": len(pids),
+            "processes": [{"pid": pid, "name": names.get(pid)} for pid in pids[:self.max_pids]]
+        }
+
+    def get_metrics(self):
+        """
+        :return: dict - Per-cgroup accounting keyed by cgroup path, or {"available": False} without cgroup v2.
+        """
+        if not self.available:
+            return {"available": False}
+        try:
+            with self.lock:
+                now = time.monotonic()
+                names = {proc["pid"]: proc["name"] for proc in process_cache.sample()}
+                cgroups = {}
+                for path, directory in self._iter_cgroups():
+                    cgroups[path] = self._sample_cgroup(path, directory, now, names)
+                # Forget cgroups that were removed
+                for path in [path for path in self._previous if path not in cgroups]:
+                    del self._previous[path]
+            return {
+                "available": True,
+                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "self_cgroup": self.cgroup_of("self"),
+                "cgroups": cgroups
+            }
+        except Exception as e:
+            print(f"Error collecting cgroup metrics: {e}")
+            return {"error": "Failed to collect cgroup metrics."}
+
+
+# Process-wide collector (keeps the previous sample of every cgroup between cycles)
+cgroup_metrics = CgroupMetrics()
@@ -0,0 +1,110 @@
+from datetime import datetime
+
+from metrics.thread_tracker import ThreadActivityTracker, thread_tracker
+
+
+class ContentionDetector:
+    """
+    Lock-contention and scheduler-latency classification of thread samples.
+
+    Works on the per-thread rates of ThreadActivityTracker (Linux /proc):
+
+      - CPU starvation: the thread spent at least run_delay_threshold of each wall
+        second runnable on the run queue without getting a CPU.
+      - Lock contention: the thread is mostly blocked (blocked_ratio) while asleep
+        on a futex and keeps waking up (voluntary context switches per second), the
+        signature of threads handing a contended lock back and forth. Idle pool
+        workers parked on a futex switch rarely and are not flagged.
+      - Uninterruptible wait: the thread is in state D (usually I/O) and blocked.
+    """
+
+    def __init__(self, proc_root="/proc", tracker=None, run_delay_threshold=0.2, blocked_threshold=0.5,
+                 contention_switch_rate=50.0, consumer="contention"):
+        """
+        :param proc_root: str - procfs mount point (for a private tracker; tests may point it at a fake tree).
+        :param tracker: ThreadActivityTracker - Shared tracker; a private one on proc_root if None.
+        :param consumer: str - Baseline key detect() samples under, separate from the collector's.
+        :param run_delay_threshold: float - Run-queue wait per wall second that counts as starvation.
+        :param blocked_threshold: float - Share of wall time blocked that counts as blocking.
+        :param contention_switch_rate: float - Voluntary switches per second of a contended futex waiter.
+        """
+        self.tracker = tracker or ThreadActivityTracker(proc_root=proc_root)
+        self.consumer = consumer
+        self.run_delay_threshold = run_delay_threshold
+        self.blocked_threshold = blocked_threshold
+        self.contention_switch_rate = contention_switch_rate
+
+    def assess(self, thread):
+        """
+        :param thread: dict - One entry from ThreadActivityTracker.sample(); fields missing from
+            older snapshots count as not measured.
+        :return: dict - is_blocking, is_starved and the reasons behind them.
+        """
+        reasons = []
+        blocked = (thread.get("blocked_ratio") or 0.0) >= self.blocked_threshold
+        wait_channel = thread.get("wait_channel") or ""
+        if blocked and "futex" in wait_channel and \
+                (thread.get("voluntary_ctxt_switches_per_sec") or 0.0) >= self.contention_switch_rate:
+            reasons.append("lock_contention")
+        if blocked and thread.get("state") == "D":
+            reasons.append("uninterruptible_wait")
+        starved = (thread.get("run_delay_ratio") or 0.0) >= self.run_delay_threshold
+        if starved:
+            reasons.append("cpu_starvation")
+        return {
+            "is_blocking": "lock_contention" in reasons or "uninterruptible_wait" in reasons,
+            "is_starved": starved,
+            "contention_reasons": reasons
+        }
+
+    def detect(self, pid, process_name, process=None, timestamp=None):
+        """
+        Sample one process and return ThreadContention / CPUStarvation issues for its threads.
+
+        :return: list[dict] - Issues in the Analyzer's issue format.
+        """
+        return self.classify(self.tracker.sample(pid, process, consumer=self.consumer), pid, process_name, timestamp)
+
+    def classify(self, threads, pid, process_name, timestamp=None):
+        """
+        Issues for already-sampled threads (e.g. the thread_metrics section of a remote snapshot).
+
+        :param threads: list[dict] - Thread rates in ThreadActivityTracker.sample() form.
+        :return: list[dict] - Issues in the Analyzer's issue format.
+        """
+        timestamp = timestamp or datetime.utcnow().isoformat() + "Z"
+        issues = []
+        for thread in threads:
+            assessment = self.assess(thread)
+            thread_name = f"TID-{thread.get('tid')}"
+            wait_channel = thread.get("wait_channel") or "unknown"
+            if assessment["is_blocking"]:
+                issues.append({
+                    "type": "ThreadContention",
+                    "timestamp": timestamp,
+                    "process_name": process_name,
+                    "pid": pid,
+                    "thread_name": thread_name,
+                    "message": f"Blocking thread detected: {', '.join(assessment['contention_reasons'])} "
+                               f"(blocked {thread['blocked_ratio']:.0%}, waiting in {wait_channel})",
+                    "blocked_ratio": thread["blocked_ratio"],
+                    "voluntary_ctxt_switches_per_sec": thread.get("voluntary_ctxt_switches_per_sec"),
+                    "stack_summary": [f"wchan: {wait_channel}", f"state: {thread.get('state')}"]
+                })
+            if assessment["is_starved"]:
+                issues.append({
+                    "type": "CPUStarvation",
+                    "timestamp": timestamp,
+                    "process_name": process_name,
+                    "pid": pid,
+                    "thread_name": thread_name,
+                    "message": f"Thread waited {thread['run_delay_ratio']:.0%} of the time on the run queue",
+                    "run_delay_ratio": thread["run_delay_ratio"],
+                    "nonvoluntary_ctxt_switches_per_sec": thread.get("nonvoluntary_ctxt_switches_per_sec")
+                })
+        return issues
+
+
+# Shares the process-wide thread tracker; detect() keeps its own "contention" baselines, so
+# /contentionInfo polls do not reset the windows of the collector's run_delay / blocked ratios
+contention_detector = ContentionDetector(tracker=thread_tracker)
@@ -1,32 +1,37 @@
-import psutil
-
-class CPUMetrics:
-    @staticmethod
-    def get_metrics(memory_threshold=1.0):
-        """
-        Get system CPU metrics and filter critical processes based on high memory consumption.
-        
-        :param memory_threshold: float - The minimum memory percentage to qualify as 'high' (default is 5%).
-        :return: dict - Metrics including filtered critical processes and the CPU percentage of the top process.
-        """
-        critical_processes = []
-        top_process_cpu_percent = 0.0  # Variable to store the top process CPU percentage
-        
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
-            try:
-                if proc.info['memory_percent'] > memory_threshold:
-                    critical_processes.append(proc.info)
-                    
-                    # Track the process with the highest CPU usage
-                    if proc.info['cpu_percent'] > top_process_cpu_percent:
-                        top_process_cpu_percent = proc.info['cpu_percent']
-            except psutil.NoSuchProcess:
-                pass
-
-        return {
-            "cpu_usage_percent": psutil.cpu_percent(interval=0.5),
-            "cpu_count": psutil.cpu_count(logical=True),
-            "cpu_frequency": psutil.cpu_freq().current if psutil.cpu_freq() else None,
-            "critical_processes": critical_processes,
-            "top_process_cpu_percent": top_process_cpu_percent  # Add top process CPU percentage
-        }
+import psutil
+
+from metrics.process_cache import process_cache
+
+class CPUMetrics:
+    @staticmethod
+    def get_metrics(memory_threshold=1.0, cpu_interval=0.5):
+        """
+        Get system CPU metrics and filter critical processes based on high memory consumption.
+        
+        :param memory_threshold: float - The minimum memory percentage to qualify as 'high' (default is 5%).
+        :param cpu_interval: float - Blocking sample window for cpu_usage_percent; None compares against the previous call.
+        :return: dict - Metrics including filtered critical processes and the CPU percentage of the top process.
+        """
+        critical_processes = []
+        top_process_cpu_percent = 0.0  # Variable to store the top process CPU percentage
+        
+        for proc in process_cache.sample():
+            if proc['memory_percent'] is not None and proc['memory_percent'] > memory_threshold:
+                critical_processes.append({
+                    'pid': proc['pid'],
+                    'name': proc['name'],
+                    'cpu_percent': proc['cpu_percent'],
+                    'memory_percent': proc['memory_percent']
+                })
+
+                # Track the process with the highest CPU usage
+                if (proc['cpu_percent'] or 0.0) > top_process_cpu_percent:
+                    top_process_cpu_percent = proc['cpu_percent']
+
+        return {
+            "cpu_usage_percent": psutil.cpu_percent(interval=cpu_interval),
+            "cpu_count": psutil.cpu_count(logical=True),
+            "cpu_frequency": psutil.cpu_freq().current if psutil.cpu_freq() else None,
+            "critical_processes": critical_processes,
+            "top_process_cpu_percent": top_process_cpu_percent  # Add top process CPU percentage
+        }
@@ -1,102 +1,159 @@
-import psutil
-from datetime import datetime
-import subprocess
-
-class CpuDeepMetrics:
-    @staticmethod
-    def get_hot_process_traces(top_n=5):
-        processes = sorted(
-            psutil.process_iter(['pid', 'name', 'cpu_percent']),
-            key=lambda p: p.info['name'],
-            reverse=True
-        )
-        result = []
-
-        for proc in processes[:top_n]:
-            try:
-                # Get stack trace using py-spy
-                trace_output = subprocess.check_output(
-                    ["py-spy", "dump", "--pid", str(proc.pid), "--native", "--threads"],
-                    stderr=subprocess.DEVNULL
-                ).decode()
-
-                # Get handle/fd count
-                if platform.system() == "Windows":
-                    handle_count = proc.num_handles()
-                else:
-                    handle_count = proc.num_fds()
-
-                result.append({
-                    "timestamp": datetime.now().isoformat(),
-                    "pid": proc.pid,
-                    "name": proc.name(),
-                    "cpu_percent": proc.cpu_percent(),
-                    "handle_count": handle_count,
-                    "stack_trace": trace_output
-                })
-
-            except Exception as e:
-                result.append({
-                    "timestamp": datetime.now().isoformat(),
-                    "pid": proc.pid,
-                    "name": proc.name(),
-                    "cpu_percent": proc.cpu_percent(),
-                    "handle_count": -1,
-                    "stack_trace": f"Error: {str(e)}"
-                })
-
-        return result
-
-   
-    def get_metrics():
-        """
-        Get detailed CPU metrics including usage per core, frequency, load, 
-        context switches, interrupts, and process-level CPU usage.
-        
-        :return: dict - A dictionary containing various CPU metrics.
-        """
-        try:
-            # Collect CPU usage for each core
-            cpu_usage_per_core = psutil.cpu_percent(percpu=True)
-
-            # Collect CPU frequency info (in MHz)
-            cpu_freq = psutil.cpu_freq()
-            cpu_frequency = {
-                'current': cpu_freq.current,
-                'min': cpu_freq.min,
-                'max': cpu_freq.max
-            }
-
-            # Collect system-wide CPU load averages over 1, 5, and 15 minutes
-            cpu_load = psutil.getloadavg()
-
-            # Collect the number of context switches (both voluntary and involuntary)
-            cpu_context_switches = psutil.cpu_stats().ctx_switches
-
-            # Collect the number of hardware interrupts
-            cpu_interrupts = psutil.cpu_stats().interrupts
-
-            # Collect process-level CPU usage (top 5 processes by CPU usage)
-            processes = []
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent']):
-                processes.append({
-                    'pid': proc.info['pid'],
-                    'name': proc.info['name'],
-                    'cpu_percent': proc.info['cpu_percent']
-                })
-            processes = sorted(processes, key=lambda x: x['cpu_percent'], reverse=True)[:5]  # Top 5 CPU-consuming processes
-
-            # Return all collected metrics
-            return {
-                "timestamp": datetime.utcnow().isoformat() + "Z",
-                "cpu_usage_per_core": cpu_usage_per_core,
-                "cpu_frequency": cpu_frequency,
-                "cpu_load": cpu_load,
-                "cpu_context_switches": cpu_context_switches,
-                "cpu_interrupts": cpu_interrupts,
-                "top_cpu_processes": processes
-            }
-        except Exception as e:
-            # Log the error if metrics collection fails
-            print(f"Error collecting CPU deep metrics: {e}")
-            return {"error": "Failed to collect deep CPU metrics."}
+import psutil
+from datetime import datetime
+import asyncio
+import os
+import platform
+import subprocess
+import time
+
+from metrics.inspection_planner import inspection_planner
+from metrics.process_cache import process_cache
+
+class CpuDeepMetrics:
+    @staticmethod
+    def get_hot_process_traces(top_n=None):
+        """
+        py-spy stack dumps and handle counts for the processes picked by the
+        inspection planner (top-ranked by CPU/RSS/IO plus newly anomalous ones).
+
+        :param top_n: int - Hard cap on top-ranked processes (None: adaptive K).
+        :return: list[dict] - One entry per inspected process.
+        """
+        result = []
+        started = time.perf_counter()
+        planned = inspection_planner.plan("stacks", limit=top_n, exclude_pids=(os.getpid(),))
+
+        for info, reason in planned:
+            entry = {
+                "timestamp": datetime.now().isoformat(),
+                "pid": info['pid'],
+                "name": info['name'],
+                "cpu_percent": info['cpu_percent'],
+                "handle_count": -1,
+                "inspection_reason": reason
+            }
+            try:
+                proc = process_cache.process(info['pid']) or psutil.Process(info['pid'])
+
+                # Get stack trace using py-spy
+                trace_output = subprocess.check_output(
+                    ["py-spy", "dump", "--pid", str(proc.pid), "--native", "--threads"],
+                    stderr=subprocess.DEVNULL
+                ).decode()
+
+                # Get handle/fd count
+                if platform.system() == "Windows":
+                    entry["handle_count"] = proc.num_handles()
+                else:
+                    entry["handle_count"] = proc.num_fds()
+                entry["stack_trace"] = trace_output
+
+            except Exception as e:
+                entry["stack_trace"] = f"Error: {str(e)}"
+            result.append(entry)
+
+        inspection_planner.record_cost("stacks", time.perf_counter() - started, len(planned))
+        return result
+
+    @staticmethod
+    async def get_hot_process_traces_async(top_n=None, timeout=10, max_concurrency=4):
+        """
+        Same as get_hot_process_traces, but py-spy dumps run concurrently as
+        asyncio subprocesses instead of blocking the caller one at a time.
+
+        :param max_concurrency: int - py-spy dumps running at once, whatever K the planner picks.
+        """
+        slots = asyncio.Semaphore(max(1, max_concurrency))
+        slot_seconds = []
+        processes = [(process_cache.process(info['pid']), info, reason)
+                     for info, reason in inspection_planner.plan("stacks", limit=top_n, exclude_pids=(os.getpid(),))]
+        processes = [(proc, info, reason) for proc, info, reason in processes if proc is not None]
+
+        async def trace(proc, info, reason):
+            entry = {
+                "timestamp": datetime.now().isoformat(),
+                "pid": proc.pid,
+                "name": info['name'],
+                "cpu_percent": info['cpu_percent'],
+                "handle_count": -1,
+                "inspection_reason": reason
+            }
+            async with slots:
+                started = time.perf_counter()
+                try:
+                    dump = await asyncio.create_subprocess_exec(
+                        "py-spy", "dump", "--pid", str(proc.pid), "--native", "--threads",
+                        stdout=asyncio.subprocess.PIPE,
+                        stderr=asyncio.subprocess.DEVNULL
+                    )
+                    try:
+                        stdout, _ = await asyncio.wait_for(dump.communicate(), timeout)
+                    except asyncio.TimeoutError:
+                        dump.kill()
+                        await dump.wait()
+                        raise
+                    if dump.returncode != 0:
+                        raise subprocess.CalledProcessError(dump.returncode, "py-spy dump")
+
+                    entry["handle_count"] = proc.num_handles() if platform.system() == "Windows" else proc.num_fds()
+                    entry["stack_trace"] = stdout.decode()
+                except Exception as e:
+                    entry["stack_trace"] = f"Error: {str(e) or type(e).__name__}"
+                slot_seconds.append(time.perf_counter() - started)
+            return entry
+
+        result = list(await asyncio.gather(*(trace(proc, info, reason) for proc, info, reason in processes)))
+        # Each dump is charged the time it held a slot, as if run one after another, so
+        # concurrency does not shrink the per-process cost and inflate K
+        inspection_planner.record_cost("stacks", sum(slot_seconds), len(processes))
+        return result
+
+   
+    def get_metrics():
+        """
+        Get detailed CPU metrics including usage per core, frequency, load, 
+        context switches, interrupts, and process-level CPU usage.
+        
+        :return: dict - A dictionary containing various CPU metrics.
+        """
+        try:
+            # Collect CPU usage for each core
+            cpu_usage_per_core = psutil.cpu_percent(percpu=True)
+
+            # Collect CPU frequency info (in MHz)
+            cpu_freq = psutil.cpu_freq()
+            cpu_frequency = {
+                'current': cpu_freq.current,
+                'min': cpu_freq.min,
+                'max': cpu_freq.max
+            }
+
+            # Collect system-wide CPU load averages over 1, 5, and 15 minutes
+            cpu_load = psutil.getloadavg()
+
+            # Collect the number of context switches (both voluntary and involuntary)
+            cpu_context_switches = psutil.cpu_stats().ctx_switches
+
+            # Collect the number of hardware interrupts
+            cpu_interrupts = psutil.cpu_stats().interrupts
+
+            # Collect process-level CPU usage (top 5 processes by CPU usage)
+            processes = [
+                {'pid': proc['pid'], 'name': proc['name'], 'cpu_percent': proc['cpu_percent']}
+                for proc in process_cache.top('cpu_percent', 5)
+            ]  # Top 5 CPU-consuming processes
+
+            # Return all collected metrics
+            return {
+                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "cpu_usage_per_core": cpu_usage_per_core,
+                "cpu_frequency": cpu_frequency,
+                "cpu_load": cpu_load,
+                "cpu_context_switches": cpu_context_switches,
+                "cpu_interrupts": cpu_interrupts,
+                "top_cpu_processes": processes
+            }
+        except Exception as e:
+            # Log the error if metrics collection fails
+            print(f"Error collecting CPU deep metrics: {e}")
+            return {"error": "Failed to collect deep CPU metrics."}
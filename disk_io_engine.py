@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+
+import psutil
+
+from metrics.process_cache import process_cache
+
+
+class DiskIORateEngine:
+    """
+    Per-disk I/O rates derived from consecutive counter samples, without sleeping.
+
+    Each sample is compared with the previous one:
+      - IOPS and throughput:  Δops / Δt, Δbytes / Δt
+      - await (ms per op):    Δread_time / Δread_count (same for writes), the
+                              average time a request spent queued and in service
+      - utilization (%):      Δbusy_time / Δt (Linux; None where psutil has no busy_time)
+
+    The first sample is compared with zero counters at boot, so it reports averages
+    since boot. Samples are reused for max_age seconds so every reader of a cycle
+    sees the same rates. Per-process I/O comes from the shared process cache, which
+    keeps io_counters deltas per (pid, create_time).
+    """
+
+    def __init__(self, max_age=1.0, sys_root="/sys"):
+        """
+        :param max_age: float - Seconds a sample is reused, so every reader of a cycle sees the same rates.
+        :param sys_root: str - sysfs mount point; <sys_root>/block lists the whole disks.
+        """
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self._previous = None       # (per-disk counters, monotonic time)
+        self._rates = None
+        self._sampled_at = 0.0
+        try:
+            # Partitions are listed next to their disk on Linux; only whole disks count towards the total
+            self._whole_disks = set(os.listdir(os.path.join(sys_root, "block")))
+        except OSError:
+            self._whole_disks = None
+
+    @staticmethod
+    def _per_op_ms(delta_time, delta_ops):
+        return round(delta_time / delta_ops, 3) if delta_ops > 0 else 0.0
+
+    def _disk_rates(self, counters, previous, elapsed):
+        elapsed_ms = elapsed * 1000.0
+        delta = {field: max(getattr(counters, field) - (getattr(previous, field) if previous else 0), 0)
+                 for field in ("read_count", "write_count", "read_bytes", "write_bytes", "read_time", "write_time")}
+        busy_time = getattr(counters, "busy_time", None)
+        utilization = None
+        if busy_time is not None:
+            # Clamped like the other deltas: counters restart when a device is re-attached
+            delta_busy = max(busy_time - (getattr(previous, "busy_time", 0) if previous else 0), 0)
+            utilization = round(min(delta_busy / elapsed_ms * 100, 100.0), 2)
+        return {
+            "read_iops": round(delta["read_count"] / elapsed, 2),
+            "write_iops": round(delta["write_count"] / elapsed, 2),
+            "read_bytes_per_sec": round(delta["read_bytes"] / elapsed, 1),
+            "write_bytes_per_sec": round(delta["write_bytes"] / elapsed, 1),
+            "read_await_ms": self._per_op_ms(delta["read_time"], delta["read_count"]),
+            "write_await_ms": self._per_op_ms(delta["write_time"], delta["write_count"]),
+            "utilization_percent": utilization,
+            "_delta": delta
+        }
+
+    def sample(self, max_age=None):
+        """
+        :return: dict - interval_seconds, since_boot, per-disk rates and the aggregate over all disks.
+        """
+        max_age = self.max_age if max_age is None else max_age
+        with self.lock:
+            now = time.monotonic()
+            if self._rates is not None and now - self._sampled_at < max_age:
+                return self._rates
+
+            counters = psutil.disk_io_counters(perdisk=True) or {}
+            if self._previous is None:
+                previous_counters, elapsed, since_boot = {}, max(time.time() - psutil.boot_time(), 1e-6), True
+            else:
+                previous_counters, elapsed, since_boot = self._previous[0], max(now - self._previous[1], 1e-6), False
+
+            disks = {}
+            totals = dict.fromkeys(("read_count", "write_count", "read_bytes", "write_bytes",
+                                    "read_time", "write_time"), 0)
+            for name, disk_counters in counters.items():
+                rates = self._disk_rates(disk_counters, previous_counters.get(name), elapsed)
+                delta = rates.pop("_delta")
+                if self._whole_disks is None or name in self._whole_disks:
+                    for field, value in delta.items():
+                        totals[field] += value
+                disks[name] = rates
+
+            self._previous = (counters, now)
+            self._rates = {
+                "interval_seconds": round(elapsed, 3),
+                "since_boot": since_boot,
+                "disks": disks,
+                "total": {
+                    "read_iops": round(totals["read_count"] / elapsed, 2),
+                    "write_iops": round(totals["write_count"] / elapsed, 2),
+                    "read_bytes_per_sec": round(totals["read_bytes"] / elapsed, 1),
+                    "write_bytes_per_sec": round(totals["write_bytes"] / elapsed, 1),
+                    "read_await_ms": self._per_op_ms(totals["read_time"], totals["read_count"]),
+                    "write_await_ms": self._per_op_ms(totals["write_time"], totals["write_count"])
+                }
+            }
+            self._sampled_at = now
+            return self._rates
+
+    @staticmethod
+    def top_processes(n=5):
+        """:return: list[dict] - Processes with the highest I/O rate since the previous process sample."""
+        return [
+            {
+                "pid": proc["pid"],
+                "name": proc["name"],
+                "read_bytes_per_sec": round(proc["io_read_bytes_per_sec"], 1),
+                "write_bytes_per_sec": round(proc["io_write_bytes_per_sec"], 1)
+            }
+            for proc in process_cache.top("io_bytes_per_sec", n) if proc["io_bytes_per_sec"] > 0
+        ]
+
+
+# Process-wide engine shared by DiskDeepMetrics and the Analyzer
+disk_io_engine = DiskIORateEngine()
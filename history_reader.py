@@ -0,0 +1,154 @@
+import json
+import mmap
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def decode_record(view):
+    """
+    Decode one JSON record from a memoryview. orjson decodes the view in place;
+    the standard library needs a bytes copy.
+    """
+    if orjson is not None:
+        return orjson.loads(view)
+    return json.loads(bytes(view))
+
+
+def decode_range(file_path, start, end):
+    """Decode every record in [start, end) of file_path. Runs in worker processes."""
+    with MappedHistoryReader(file_path) as reader:
+        records = []
+        for view in reader.iter_views(start, end):
+            try:
+                records.append(decode_record(view))
+            except ValueError:
+                continue
+        return records
+
+
+class MappedHistoryReader:
+    """
+    Memory-mapped reader for newline-delimited JSON metrics history.
+
+    The file is mapped read-only and record boundaries are located with mmap.find,
+    so scanning never goes through Python-level line iteration. Records are handed
+    out as memoryview slices of the mapping (no copy), and split() produces disjoint
+    byte ranges aligned to record boundaries that can be decoded in parallel.
+
+    Views yielded by iter_views() are only valid until the iteration advances; call
+    bytes(view) to keep a record. Views from record_view() must be released by the
+    caller before close().
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._file = open(file_path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        # mmap cannot map an empty file
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        self._view = memoryview(self._mmap) if self._mmap is not None else memoryview(b"")
+        self._offsets = None
+
+    def close(self):
+        self._view.release()
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # A caller still holds a record view; the mapping is unmapped once it is released
+                pass
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _next_boundary(self, pos):
+        """Return the offset just past the newline at or after pos (or the end of the file)."""
+        if pos <= 0:
+            return 0
+        if pos >= self.size:
+            return self.size
+        newline = self._mmap.find(b"\n", pos - 1)
+        return self.size if newline == -1 else newline + 1
+
+    def build_index(self):
+        """
+        Build the offset index: start offset of every record, plus a final end offset.
+
+        :return: array('Q') - Record boundaries.
+        """
+        if self._offsets is None:
+            offsets = array("Q", [0])
+            find = self._mmap.find if self._mmap is not None else None
+            pos = 0
+            while pos < self.size:
+                newline = find(b"\n", pos)
+                pos = self.size if newline == -1 else newline + 1
+                offsets.append(pos)
+            self._offsets = offsets
+        return self._offsets
+
+    def __len__(self):
+        return len(self.build_index()) - 1
+
+    def record_view(self, index):
+        offsets = self.build_index()
+        return self._view[offsets[index]:offsets[index + 1]]
+
+    def iter_views(self, start=0, end=None):
+        """Yield a memoryview for every non-blank record starting in [start, end)."""
+        end = self.size if end is None else min(end, self.size)
+        pos = self._next_boundary(start)
+        while pos < end:
+            newline = self._mmap.find(b"\n", pos)
+            stop = self.size if newline == -1 else newline + 1
+            view = self._view[pos:stop]
+            try:
+                if view.nbytes > 1 or (view.nbytes == 1 and view[0] not in b"\r\n"):
+                    yield view
+            finally:
+                view.release()
+            pos = stop
+
+    def split(self, parts):
+        """
+        Split the file into at most `parts` disjoint byte ranges aligned to record boundaries.
+
+        :return: list[(start, end)]
+        """
+        parts = max(1, parts)
+        bounds = sorted({self._next_boundary(self.size * i // parts) for i in range(parts)} | {self.size})
+        return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+    def iter_records(self, start=0, end=None, on_error=None):
+        """Decode and yield every record in [start, end); undecodable records go to on_error."""
+        for view in self.iter_views(start, end):
+            try:
+                yield decode_record(view)
+            except ValueError as e:
+                if on_error:
+                    on_error(e)
+
+    def iter_records_parallel(self, workers=None):
+        """
+        Decode disjoint ranges in worker processes, yielding records in file order.
+        """
+        workers = workers or os.cpu_count() or 1
+        ranges = self.split(workers * 4)
+        if len(ranges) <= 1:
+            yield from self.iter_records()
+            return
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for records in pool.map(decode_range, [self.file_path] * len(ranges),
+                                    [start for start, _ in ranges], [end for _, end in ranges]):
+                yield from records
@@ -0,0 +1,149 @@
+import threading
+
+from metrics.process_cache import process_cache
+
+
+class InspectionPlanner:
+    """
+    Chooses which processes get expensive inspection (per-thread, per-fd, stacks).
+
+    A cheap pass over the shared process cache scores every process by its CPU,
+    memory and I/O rates; each inspection tier then inspects the top K of that
+    ranking plus any process that became anomalous since the previous sample.
+    K adapts per tier: the measured cost per inspected process is tracked with an
+    exponential moving average and K is sized so one tier fits its time budget.
+    """
+
+    DEFAULT_TIERS = {
+        # tier -> (budget in seconds per cycle, initial K)
+        "threads": (1.0, 10),
+        "stacks": (5.0, 5)
+    }
+
+    def __init__(self, tiers=None, min_k=1, max_k=50, cpu_anomaly_percent=80.0,
+                 rss_growth_ratio=0.25, io_anomaly_bytes_per_sec=50 * 1024 * 1024,
+                 max_anomalies=10, cost_smoothing=0.3, cache=None):
+        """
+        :param tiers: dict - tier -> (budget_seconds, initial_k).
+        :param cpu_anomaly_percent: float - CPU% at which a process counts as anomalous.
+        :param rss_growth_ratio: float - RSS growth between samples that counts as anomalous.
+        :param io_anomaly_bytes_per_sec: float - I/O rate that counts as anomalous; also the I/O score scale.
+        :param max_anomalies: int - Anomalous processes inspected on top of K.
+        :param cache: ProcessCache - Source of the process sample (default: the shared process cache).
+        """
+        self.cache = cache or process_cache
+        self.min_k = min_k
+        self.max_k = max_k
+        self.cpu_anomaly_percent = cpu_anomaly_percent
+        self.rss_growth_ratio = rss_growth_ratio
+        self.io_anomaly_bytes_per_sec = io_anomaly_bytes_per_sec
+        self.max_anomalies = max_anomalies
+        self.cost_smoothing = cost_smoothing
+        self.lock = threading.Lock()
+        self._tiers = {
+            name: {"budget": budget, "k": initial_k, "cost_per_process": None, "inspected": 0, "elapsed": 0.0}
+            for name, (budget, initial_k) in (tiers or self.DEFAULT_TIERS).items()
+        }
+        self._ranked_sample = None
+        self._ranking = []
+        self._anomalies = []
+        self._previous_rss = {}
+        self._previous_anomalous = set()
+
+    def score(self, record):
+        """Cheap interest score: CPU and memory share plus I/O rate relative to the anomaly rate."""
+        return ((record["cpu_percent"] or 0.0) / 100
+                + (record["memory_percent"] or 0.0) / 100
+                + (record["io_bytes_per_sec"] or 0.0) / self.io_anomaly_bytes_per_sec)
+
+    def _anomaly_reasons(self, record, previous_rss):
+        reasons = []
+        if (record["cpu_percent"] or 0.0) >= self.cpu_anomaly_percent:
+            reasons.append("cpu")
+        if previous_rss and record["rss"] and (record["rss"] - previous_rss) / previous_rss >= self.rss_growth_ratio:
+            reasons.append("rss_growth")
+        if (record["io_bytes_per_sec"] or 0.0) >= self.io_anomaly_bytes_per_sec:
+            reasons.append("io")
+        return reasons
+
+    def _rank(self):
+        """Rank the current process sample once; every tier of the cycle reuses the result."""
+        records = self.cache.sample()
+        if records is self._ranked_sample:
+            return
+        anomalies = []
+        anomalous = set()
+        previous_rss = {}
+        for record in records:
+            key = (record["pid"], record["create_time"])
+            reasons = self._anomaly_reasons(record, self._previous_rss.get(key))
+            if reasons:
+                anomalous.add(key)
+                if key not in self._previous_anomalous:
+                    anomalies.append((record, reasons))
+            previous_rss[key] = record["rss"]
+
+        self._ranking = sorted(records, key=self.score, reverse=True)
+        self._anomalies = sorted(anomalies, key=lambda item: self.score(item[0]), reverse=True)[:self.max_anomalies]
+        self._previous_rss = previous_rss
+        self._previous_anomalous = anomalous
+        self._ranked_sample = records
+
+    def plan(self, tier, limit=None, exclude_pids=()):
+        """
+        :param tier: str - Inspection tier ("threads", "stacks", ...).
+        :param limit: int - Hard cap on K for this call (None: adaptive K only).
+        :param exclude_pids: iterable - PIDs never to inspect (e.g. the monitor itself).
+        :return: list[(record, reason)] - Processes to inspect; reason is "top" or "anomaly:<kinds>".
+        """
+        with self.lock:
+            self._rank()
+            state = self._tiers.setdefault(tier, {"budget": 1.0, "k": self.min_k, "cost_per_process": None,
+                                                  "inspected": 0, "elapsed": 0.0})
+            k = state["k"] if limit is None else min(state["k"], limit)
+            excluded = set(exclude_pids)
+            selected = []
+            chosen = set()
+            for record in self._ranking:
+                if len(selected) >= k:
+                    break
+                if record["pid"] not in excluded:
+                    selected.append((record, "top"))
+                    chosen.add(record["pid"])
+            for record, reasons in self._anomalies:
+                if record["pid"] not in excluded and record["pid"] not in chosen:
+                    selected.append((record, "anomaly:" + ",".join(reasons)))
+            return selected
+
+    def record_cost(self, tier, elapsed_seconds, inspected):
+        """Feed back the time one inspection pass took and resize K to the tier's budget."""
+        if inspected <= 0:
+            return
+        with self.lock:
+            state = self._tiers[tier]
+            cost = elapsed_seconds / inspected
+            previous = state["cost_per_process"]
+            state["cost_per_process"] = cost if previous is None else (
+                self.cost_smoothing * cost + (1 - self.cost_smoothing) * previous)
+            state["inspected"] += inspected
+            state["elapsed"] += elapsed_seconds
+            if state["cost_per_process"] > 0:
+                state["k"] = max(self.min_k, min(self.max_k, int(state["budget"] / state["cost_per_process"])))
+
+    def stats(self):
+        with self.lock:
+            return {
+                name: {
+                    "k": state["k"],
+                    "budget_seconds": state["budget"],
+                    "cost_per_process_ms": round(state["cost_per_process"] * 1000, 3)
+                    if state["cost_per_process"] is not None else None,
+                    "inspected": state["inspected"],
+                    "elapsed_seconds": round(state["elapsed"], 3)
+                }
+                for name, state in self._tiers.items()
+            }
+
+
+# Process-wide planner shared by the deep-inspection collectors
+inspection_planner = InspectionPlanner()
@@ -0,0 +1,185 @@
+import threading
+import time
+
+import psutil
+
+from metrics.process_cache import process_cache
+
+
+class MemoryLeakDetector:
+    """
+    Memory leak detection by RSS/USS growth-rate regression per process.
+
+    Every observation appends the resident memory of each live process to a bounded
+    ring buffer keyed by (pid, create_time). The histories of all tracked processes
+    live in one 2-D array, so the least-squares slope and r² of every process are
+    fitted in a single vectorized pass (NaN marks unused slots).
+
+    USS (memory unique to the process) is the better leak signal but costs a
+    memory_full_info() call, so it is only sampled for the uss_top_n largest
+    processes; their fit uses USS once it has min_samples points, RSS otherwise.
+
+    A process is a suspect when its memory grew steadily (r² >= min_r2) by at least
+    min_growth_bytes_per_hour over at least min_samples observations. Time to OOM
+    projects the slope against the memory currently available.
+
+    numpy is imported and the arrays are allocated on the first observation, keeping
+    both off the startup path.
+    """
+
+    def __init__(self, window=60, max_processes=4096, min_samples=10, min_r2=0.8,
+                 min_growth_bytes_per_hour=50 * 1024 * 1024, min_interval=5.0, uss_top_n=10):
+        """
+        :param window: int - Observations kept per process.
+        :param max_processes: int - Tracked processes (rows); the smallest newcomers are dropped when full.
+        :param min_interval: float - Observations closer together than this are skipped.
+        """
+        self.window = window
+        self.max_processes = max_processes
+        self.min_samples = min_samples
+        self.min_r2 = min_r2
+        self.min_growth_bytes_per_hour = min_growth_bytes_per_hour
+        self.min_interval = min_interval
+        self.uss_top_n = uss_top_n
+        self.lock = threading.Lock()
+        self._times = self._rss = self._uss = self._cursor = None
+        self._rows = {}        # (pid, create_time) -> row
+        self._names = {}       # row -> process name
+        self._free_rows = list(range(max_processes - 1, -1, -1))
+        self._last_observed = None
+
+    def _allocate(self):
+        import numpy as np
+        self._times = np.full((self.max_processes, self.window), np.nan)
+        self._rss = np.full((self.max_processes, self.window), np.nan)
+        self._uss = np.full((self.max_processes, self.window), np.nan)
+        self._cursor = np.zeros(self.max_processes, dtype=np.int64)
+
+    def _release(self, row):
+        self._times[row] = float("nan")
+        self._rss[row] = float("nan")
+        self._uss[row] = float("nan")
+        self._cursor[row] = 0
+        self._names.pop(row, None)
+        self._free_rows.append(row)
+
+    def observe(self, records=None, now=None):
+        """
+        Append one memory sample per live process and evict processes that exited.
+
+        :param records: list[dict] - Process records (default: the shared process cache sample).
+        :return: bool - False when skipped because of min_interval.
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            if self._last_observed is not None and now - self._last_observed < self.min_interval:
+                return False
+            self._last_observed = now
+            if self._times is None:
+                self._allocate()
+            records = process_cache.sample() if records is None else records
+
+            live = {(record["pid"], record["create_time"]): record for record in records if record["rss"] is not None}
+            for key in [key for key in self._rows if key not in live]:
+                self._release(self._rows.pop(key))
+
+            uss_keys = set(sorted(live, key=lambda key: live[key]["rss"], reverse=True)[:self.uss_top_n])
+            for key, record in live.items():
+                row = self._rows.get(key)
+                if row is None:
+                    if not self._free_rows:
+                        continue
+                    row = self._rows[key] = self._free_rows.pop()
+                self._names[row] = record["name"]
+                slot = self._cursor[row] % self.window
+                self._times[row, slot] = now
+                self._rss[row, slot] = record["rss"]
+                self._uss[row, slot] = self._read_uss(record["pid"]) if key in uss_keys else float("nan")
+                self._cursor[row] += 1
+            return True
+
+    @staticmethod
+    def _read_uss(pid):
+        process = process_cache.process(pid)
+        try:
+            return (process or psutil.Process(pid)).memory_full_info().uss
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess, AttributeError):
+            return float("nan")
+
+    @staticmethod
+    def _fit(times, values):
+        """
+        Row-wise least squares over NaN-padded histories.
+
+        :return: (slope per second, r², sample count, latest value) arrays.
+        """
+        import numpy as np
+        mask = ~np.isnan(times) & ~np.isnan(values)
+        count = mask.sum(axis=1)
+        safe_count = np.maximum(count, 1)
+        t = np.where(mask, times, 0.0)
+        y = np.where(mask, values, 0.0)
+        t_mean = t.sum(axis=1) / safe_count
+        y_mean = y.sum(axis=1) / safe_count
+        dt = np.where(mask, times - t_mean[:, None], 0.0)
+        dy = np.where(mask, values - y_mean[:, None], 0.0)
+        s_tt = (dt * dt).sum(axis=1)
+        s_yy = (dy * dy).sum(axis=1)
+        s_ty = (dt * dy).sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = np.where(s_tt > 0, s_ty / s_tt, 0.0)
+            r2 = np.where((s_tt > 0) & (s_yy > 0), (s_ty * s_ty) / (s_tt * s_yy), 0.0)
+        latest = np.where(mask, times, -np.inf).argmax(axis=1)
+        latest_value = values[np.arange(values.shape[0]), latest]
+        return slope, r2, count, latest_value
+
+    def suspects(self, available_bytes=None):
+        """
+        :param available_bytes: int - Memory available for growth (default: virtual_memory().available).
+        :return: list[dict] - Leak suspects, fastest growing first.
+        """
+        with self.lock:
+            if not self._rows:
+                return []
+            import numpy as np
+            rows = np.array(sorted(self._rows.values()), dtype=np.int64)
+            keys = {row: key for key, row in self._rows.items()}
+            times = self._times[rows]
+            rss_fit = self._fit(times, self._rss[rows])
+            uss_fit = self._fit(times, self._uss[rows])
+            names = dict(self._names)
+
+        if available_bytes is None:
+            available_bytes = psutil.virtual_memory().available
+        use_uss = uss_fit[2] >= self.min_samples
+        slope, r2, count, latest = (np.where(use_uss, uss_value, rss_value)
+                                    for uss_value, rss_value in zip(uss_fit, rss_fit))
+        growth_per_hour = slope * 3600
+        flagged = np.nonzero((count >= self.min_samples) & (r2 >= self.min_r2)
+                             & (growth_per_hour >= self.min_growth_bytes_per_hour))[0]
+
+        suspects = []
+        for index in flagged[np.argsort(-growth_per_hour[flagged])]:
+            row = int(rows[index])
+            pid, create_time = keys[row]
+            suspects.append({
+                "pid": pid,
+                "create_time": create_time,
+                "process_name": names.get(row),
+                "metric": "uss" if use_uss[index] else "rss",
+                "memory_usage_mb": round(float(rss_fit[3][index]) / (1024 * 1024), 2),
+                "growth_mb_per_hour": round(float(growth_per_hour[index]) / (1024 * 1024), 2),
+                "r2": round(float(r2[index]), 3),
+                "samples": int(count[index]),
+                "time_to_oom_seconds": round(available_bytes / float(slope[index])) if slope[index] > 0 else None
+            })
+        return suspects
+
+    def collect(self):
+        """Collector entry point: observe this cycle and return the current suspects."""
+        self.observe()
+        return {"tracked_processes": len(self._rows), "suspects": self.suspects()}
+
+
+# Process-wide detector fed once per collection cycle
+leak_detector = MemoryLeakDetector()
@@ -1,455 +1,842 @@
-﻿import os
-import logging
-from flask import Flask,request, render_template, jsonify
-from threading import Lock
-from MLLayer.feeder import ProcessMonitor
-from metrics.metric_manager import MetricManager
-from analyzer import Analyzer
-import atexit
-import psutil
-import time
-import platform
-import subprocess
-import pandas as pd
-import distro
-import wmi
-from datetime import datetime
-
-
-w = wmi.WMI()
-
-# Set up logging
-logging.basicConfig(level=logging.INFO)
-
-# Create Flask app
-app = Flask(__name__)
-
-# Initialize MetricManager with environment-based configuration
-memory_threshold = float(os.getenv("MEMORY_THRESHOLD", "5.0"))
-metrics_file_name = os.getenv("METRICS_FILE_PATH", "system_metrics.json")
-auto_save_interval = int(os.getenv("AUTO_SAVE_INTERVAL", "60"))  # Default every 60s
-
-# Ensure the log directory exists before initializing MetricManager
-# Convert the file path to absolute path first, then extract the directory
-log_dir = os.path.dirname(os.path.abspath(metrics_file_name))
-
-# Check if directory exists, create if not
-if not os.path.exists(log_dir):
-    try:
-        os.makedirs(log_dir)  # Create the necessary parent directories
-        logging.info(f"Created log directory: {log_dir}")
-    except Exception as e:
-        logging.error(f"Error creating log directory {log_dir}: {e}")
-        raise
-
-# Combine the log directory and the file name to get the full path
-metrics_file_path = os.path.join(log_dir, metrics_file_name)
-
-metric_manager = MetricManager(
-    memory_threshold=memory_threshold,
-    metrics_file_path=metrics_file_path,
-    auto_save_interval=auto_save_interval
-)
-
-# Start background auto-saving
-metric_manager.start_auto_save()
-
-# Initialize Analyzer
-analyzer = Analyzer()
-
-monitor = ProcessMonitor()
-monitor.start_background()  # ✅ Start background feeder loop
-
-# Lock to ensure thread-safety for metrics access
-metrics_lock = Lock()
-
-@app.route("/")
-def index():
-    """Render the real-time metrics dashboard."""
-    return render_template("index.html")
-
-@app.route("/metrics", methods=["GET"])
-def get_metrics():
-    """Return the latest system metrics to the frontend."""
-    try:
-        #with metrics_lock:
-        metrics = metric_manager.get_all_metrics()
-        return jsonify(metrics)
-    except Exception as e:
-        logging.error(f"Error fetching metrics: {e}")
-        return jsonify({"error": f"Failed to fetch metrics: {str(e)}"}), 500
-
-
-@app.route("/overview", methods=["GET"])
-def get_overView():
-    """Analyze the stored metrics and return detected performance issues."""
-    try:
-        issues = analyzer.performanceOverview()
-        return jsonify({"performance_issues": issues or []})
-    except Exception as e:
-        logging.error(f"Error analyzing metrics: {e}")
-        return jsonify({"error": f"Failed to analyze metrics: {str(e)}"}), 500
-
-
-@app.route("/aisummary", methods=["GET"])
-def get_summary():
-    """Analyze the stored metrics and return thread-level summaries (optionally by PID)."""
-    try:
-        pid = request.args.get("pid", type=int)  # Get optional ?pid=1234
-        logging.info(f"pid received for getting details: {pid}")
-        issues = analyzer.load_thread_summaries(pid=pid)
-        if not issues:
-            return jsonify({"performance_issues": []}), 404
-        return jsonify({"performance_issues": issues})
-    except Exception as e:
-        logging.error(f"Error analyzing summaries: {e}")
-        return jsonify({"error": f"Failed to analyze summaries: {str(e)}"}), 500
-
-
-@app.route("/analyze", methods=["GET"])
-def analyze_metrics():
-    """Analyze the stored metrics and return detected performance issues."""
-    try:
-        issues = analyzer.generate_report()
-        return jsonify({"performance_issues": issues or []})
-    except Exception as e:
-        logging.error(f"Error analyzing metrics: {e}")
-        return jsonify({"error": f"Failed to analyze metrics: {str(e)}"}), 500
-
-@app.route("/ThreadInfo", methods=["GET"])
-def SummaryInfo():
-    """Analyze the stored metrics and return detected performance issues."""
-    try:
-        issues = analyzer.get_blocking_threads_info()
-        return jsonify({"performance_issues": issues or []})
-    except Exception as e:
-        logging.error(f"Error analyzing metrics: {e}")
-        return jsonify({"error": f"Failed to analyze metrics: {str(e)}"}), 500
-
-
-@app.route("/memoryInfo", methods=["GET"])
-def MemoryProfileInfo():
-    """Analyze the stored metrics and return detected performance issues."""
-    try:
-        issues = analyzer.get_memory_leak_suspects()
-        return jsonify({"performance_issues": issues or []})
-    except Exception as e:
-        logging.error(f"Error analyzing metrics: {e}")
-        return jsonify({"error": f"Failed to analyze metrics: {str(e)}"}), 500
-
-
-@app.route("/threadProfilerInfo", methods=["GET"])
-def thread_profiler_info():
-    """Analyze the stored metrics and return per-thread CPU trend per PID."""
-    try:        
-        file_path = os.path.join("Suggestions", "process_thread_metrics.csv")
-        if not os.path.exists(file_path):
-            return jsonify({"error": "Metrics file not found."}), 404
-
-        # Define columns
-        columns = [
-            "Timestamp", "ProcessName", "PID", "HandleCount", "ThreadCount", "ThreadID",
-            "CpuTimeMs", "MemoryMB", "ReadBytes", "WriteBytes", "InLockContention",
-            "PossibleRaceProne", "ThreadStartTime", "ThreadState", "WaitReason",
-            "UserTimeMs", "KernelTimeMs", "Priority", "ContextSwitches"
-        ]
-
-        # Read & clean data
-        df = pd.read_csv(file_path, names=columns, header=0, parse_dates=["Timestamp"], low_memory=False)
-        df["CpuTimeMs"] = pd.to_numeric(df["CpuTimeMs"], errors='coerce')
-        df["PID"] = pd.to_numeric(df["PID"], errors='coerce')
-        df["ThreadID"] = pd.to_numeric(df["ThreadID"], errors='coerce')
-
-        # Build trend series
-        thread_trend = (
-            df.groupby(["PID", "ThreadID", "Timestamp"])["CpuTimeMs"]
-            .sum()
-            .reset_index()
-            .sort_values(["PID", "ThreadID", "Timestamp"])
-        )
-
-        result = []
-
-        for pid, group in thread_trend.groupby("PID"):
-            process_entry = {
-                "pid": int(pid),
-                "threads": []
-            }
-
-            for tid, tgroup in group.groupby("ThreadID"):
-                process_entry["threads"].append({
-                    "thread_id": int(tid),
-                    "timestamps": tgroup["Timestamp"].dt.strftime('%Y-%m-%d %H:%M:%S').tolist(),
-                    "cpu_time": tgroup["CpuTimeMs"].tolist()
-                })
-
-            result.append(process_entry)
-
-        return jsonify({"performance_issues": result})
-
-    except Exception as e:
-        logging.error(f"Error analyzing metrics: {e}")
-        return jsonify({"error": f"Failed to analyze metrics: {str(e)}"}), 500
-
-
-@app.route("/diskInfo", methods=["GET"])
-def disk_profile_info():
-    try:
-        issues = analyzer.get_disk_profiler_issues()          # default thresholds
-        # Or customise: get_disk_profiler_issues(disk_usage_threshold=90, disk_io_threshold_mb_s=150)
-        return jsonify({"performance_issues": issues or []})
-    except Exception as e:
-        logging.error(f"Error analyzing disk metrics: {e}")
-        return jsonify({"error": f"Failed to analyze disk metrics: {str(e)}"}), 500
-
-
-@app.route("/api/run-diagnosis", methods=["GET"])
-def run_diagnosis():
-    result = metric_manager.run_ai_diagnosis()
-    if result is None:
-        return jsonify({"error": "Diagnosis failed"}), 500
-    return jsonify(result)
-
-# Gracefully stop auto-save when Flask is stopped
-def shutdown():
-    logging.info("Shutting down Flask app...")
-    metric_manager.stop_auto_save()
-    logging.info("Auto-save stopped gracefully.")
-
-# Register the shutdown function to be called on app termination
-atexit.register(shutdown)
-
-
-@app.route('/optimize-locks', methods=['POST'])
-def optimize_locks():
-    try:
-        issues = request.get_json()
-        if not issues:
-            return jsonify(status="error", message="No data received"), 400
-
-        if not isinstance(issues, list):
-            issues = [issues]
-
-        all_suggestions = []
-
-        for issue in issues:
-            issue_type = issue.get("type", "Unknown")
-            timestamp = issue.get("timestamp", "Unknown")
-            process_name = issue.get("process_name", "Unknown")
-            pid = issue.get("pid", "Unknown")
-            cpu_message = issue.get("message", "No message provided.")
-
-            if issue_type == "CPUProcess":
-                optimization_message = (
-                    f"Optimization suggestion: Investigate high CPU usage by process '{process_name}' "
-                    f"(PID: {pid}). Consider checking for inefficient loops, stuck threads, or runaway processes."
-                )
-                all_suggestions.append({
-                    "status": "success",
-                    "message": optimization_message,
-                    "details": {
-                        "process_name": process_name,
-                        "pid": pid,
-                        "timestamp": timestamp,
-                        "original_message": cpu_message
-                    }
-                })
-
-            elif issue_type == "HighCPUThread":
-                thread_name = issue.get("thread_name", "Unknown")
-                optimization_message = (
-                    f"Optimization suggestion: Detected locked thread '{thread_name}'. "
-                    f"Safely abort or debug the issue causing thread in process '{process_name}'."
-                )
-                all_suggestions.append({
-                    "status": "success",
-                    "message": optimization_message,
-                    "details": {
-                        "thread_name": thread_name,
-                        "process_name": process_name,
-                        "timestamp": timestamp,
-                        "original_message": cpu_message
-                    }
-                })
-
-            else:
-                all_suggestions.append({
-                    "status": "error",
-                    "message": f"Unhandled issue type: {issue_type}",
-                    "details": {
-                        "issue_type": issue_type,
-                        "timestamp": timestamp
-                    }
-                })
-
-        return jsonify(all_suggestions), 200
-
-    except Exception as e:
-        return jsonify(status="error", message=str(e)), 500
-
-
-@app.route("/terminate-process", methods=["POST"])
-def terminate_process():
-    data = request.get_json()
-    pid = data.get("pid")
-    if not pid:
-        return jsonify({"status": "error", "message": "pid is required"}), 400
-
-    try:
-        proc = psutil.Process(int(pid))
-        proc.terminate()
-        try:
-            proc.wait(timeout=5)
-            if proc.is_running():
-                return jsonify({"status": "error", "message": f"Process PID {pid} did not terminate."}), 500
-        except psutil.TimeoutExpired:
-            proc.kill()
-            if proc.is_running():
-                return jsonify({"status": "error", "message": f"Process PID {pid} could not be killed."}), 500
-
-        return jsonify({"status": "success", "message": f"Process PID {pid} terminated."})
-
-    except psutil.NoSuchProcess:
-        return jsonify({"status": "error", "message": f"No process with PID {pid} found."}), 404
-    except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
-
-
-
-@app.route("/shutdown-system", methods=["POST"])
-def shutdown_system():
-    data = request.get_json()
-    reason = data.get("reason", "Shutdown requested by user")
-
-    try:
-        system = platform.system()
-
-        if system == "Windows":
-            # Force shutdown with message
-            subprocess.run(["shutdown", "/s", "/t", "0"], check=True)
-        elif system == "Linux" or system == "Darwin":  # macOS is Darwin
-            # Use shutdown command (requires sudo)
-            subprocess.run(["shutdown", "-h", "now"], check=True)
-        else:
-            return jsonify({"status": "error", "message": f"Unsupported platform: {system}"}), 400
-
-        return jsonify({"status": "success", "message": f"System shutdown initiated. Reason: {reason}"})
-    except subprocess.CalledProcessError as e:
-        return jsonify({"status": "error", "message": f"Failed to shutdown system: {e}"}), 500
-    except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
-
-
-@app.route('/get-osInfo', methods=['GET'])
-def get_os_info():
-    os_info = {
-        "OS": platform.system(),
-        "Release": platform.release(),
-        "Version": platform.version(),
-        "Machine": platform.machine(),
-        "Processor": platform.processor(),
-        "Architecture": platform.architecture()[0]
-    }
-
-    # Add Linux-specific distro info if available
-    if os_info["OS"] == "Linux":
-        os_info.update({
-            "DistroName": distro.name(),
-            "DistroVersion": distro.version(),
-            "DistroID": distro.id()
-        })
-
-    return jsonify(os_info)
-
-
-
-# Get Thread details for the faulty process detected
-
-
-# @app.route("/threadtimeline")
-# def thread_timeline():
-#     tid = request.args.get("tid", type=int)
-#     print(f"[INFO] Thread timeline request received for TID: {tid}")
-
-#     if not tid:
-#         print("[ERROR] Missing thread ID in request")
-#         return jsonify({"error": "Missing thread ID (tid)"}), 400
-
-#     try:
-#         found_thread = None
-#         proc_name = None
-
-#         print("[INFO] Enumerating all processes and threads...")
-#         for proc in w.Win32_Process():
-#             pid = proc.ProcessId
-#             try:
-#                 for thread in w.Win32_Thread(ProcessHandle=str(pid)):
-#                     if int(thread.Handle) == tid:
-#                         found_thread = thread
-#                         proc_name = proc.Name
-#                         print(f"[SUCCESS] Found thread {tid} in process {proc_name} (PID: {pid})")
-#                         break
-#             except Exception as thread_err:
-#                 print(f"[WARN] Could not read threads of PID {pid}: {thread_err}")
-#             if found_thread:
-#                 break
-
-#         if not found_thread:
-#             print(f"[ERROR] Thread ID {tid} not found in any running process")
-#             return jsonify({"error": f"Thread ID {tid} not found"}), 404
-
-#         snapshot = {
-#             "timestamp": datetime.now().isoformat(),
-#             "ThreadId": tid,
-#             "ProcessId": found_thread.ProcessHandle,
-#             "ProcessName": proc_name,
-#             "ThreadState": found_thread.ThreadState,
-#             "WaitReason": found_thread.ThreadWaitReason,
-#             "Priority": found_thread.Priority,
-#             "UserModeTimeMs": int(found_thread.UserModeTime) // 10_000,
-#             "KernelModeTimeMs": int(found_thread.KernelModeTime) // 10_000,
-#             "StartAddress": found_thread.StartAddress,
-#         }
-
-#         print(f"[INFO] Thread snapshot generated:\n{json.dumps(snapshot, indent=2)}")
-#         return jsonify(snapshot)
-
-    # except Exception as ex:
-    #     print(f"[EXCEPTION] An error occurred while fetching thread timeline: {ex}")
-    #     return jsonify({"error": str(ex)}), 500
-
-
-
-
-@app.route("/cpu-profiler", methods=["GET"])
-def cpu_profiler():
-    # Initialize CPU usage for all processes
-    for proc in psutil.process_iter(['pid', 'name']):
-        try:
-            proc.cpu_percent(interval=None)
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            continue
-
-    time.sleep(1.0)  # Wait so we get real values
-
-    return jsonify(get_cpu_data())
-
-
-def run_monitor():
-    monitor = ProcessMonitor()
-    monitor.start_background();
-    while True:
-        monitor.collect_metrics()
-        monitor.suggest_patterns()
-        monitor.analyze_json_and_generate_summary()
-        time.sleep(30)
-
-if __name__ == "__main__":
-    try:
-        # Start the Flask app
-        app.run(debug=True, host="0.0.0.0", port=8000)
-        run_monitor()
-    except KeyboardInterrupt:
-        # On graceful shutdown (Ctrl+C)
-        shutdown()
-        logging.info("Flask app stopped. Auto-save stopped gracefully.")
+﻿import time
+_startup_started = time.perf_counter()
+
+import os
+import logging
+from functools import lru_cache
+from flask import Flask,request, render_template, jsonify, g
+from threading import Lock
+from metrics.metric_manager import MetricManager
+from metrics.async_collector import AsyncCollectionEngine
+from metrics.sampling_profiler import SamplingProfiler
+from metrics.self_profiler import perf
+from metrics.process_cache import process_cache
+from metrics.inspection_planner import inspection_planner
+from metrics.thread_tracker import thread_tracker
+from metrics.network_io_engine import network_io_engine
+from metrics.cgroup_metrics import cgroup_metrics
+from metrics.alert_manager import EmailSink, WebhookSink, FileSink, SyslogSink
+from metrics.threshold_rules import ThresholdRuleSet
+from metrics.aggregator import MetricsAggregator
+from metrics.openmetrics_exporter import CONTENT_TYPE as OPENMETRICS_CONTENT_TYPE
+from analyzer import Analyzer
+import atexit
+import psutil
+import platform
+import subprocess
+from datetime import datetime
+
+# Heavy and platform-specific modules (wmi, pandas, distro, the sklearn-based ML feeder)
+# are imported on first use of the features that need them, not at startup.
+startup_budget_seconds = float(os.getenv("STARTUP_BUDGET_SECONDS", "2.0"))
+
+
+@lru_cache(maxsize=1)
+def get_wmi():
+    """WMI client, created on first use (Windows only)."""
+    import wmi
+    return wmi.WMI()
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+
+# Spawned analysis workers (Analyzer.analyze_metrics_parallel) re-import this script as
+# __mp_main__; they must not start a second collector, aggregator or ML feeder.
+spawned_worker = __name__ == "__mp_main__"
+
+# Create Flask app
+app = Flask(__name__)
+
+# Initialize MetricManager with environment-based configuration
+memory_threshold = float(os.getenv("MEMORY_THRESHOLD", "5.0"))
+metrics_file_name = os.getenv("METRICS_FILE_PATH", "system_metrics.json")
+auto_save_interval = int(os.getenv("AUTO_SAVE_INTERVAL", "60"))  # Default every 60s
+collection_engine = os.getenv("COLLECTION_ENGINE", "thread")  # "thread" or "async"
+collector_backend = os.getenv("COLLECTOR_BACKEND", "psutil")  # "psutil" or "procfs" (Linux /proc fast path)
+# Per-process socket counts from net_connections, refreshed at most every N seconds (0 disables)
+network_io_engine.connection_interval = float(os.getenv("NETWORK_CONNECTIONS_INTERVAL", "0")) or None
+# cgroup v2 hierarchy to account per container/service (e.g. /sys/fs/cgroup/unified on hybrid hosts)
+cgroup_metrics.root = os.getenv("CGROUP_ROOT", cgroup_metrics.root)
+
+# History writer: group commit of N records or T seconds, optional compression, fsync policy
+writer_options = {
+    "batch_size": int(os.getenv("METRICS_BATCH_SIZE", "10")),
+    "flush_interval": float(os.getenv("METRICS_FLUSH_INTERVAL", "30")),
+    "compression": os.getenv("METRICS_COMPRESSION") or None,  # "gzip" or "zstd"
+    "fsync_policy": os.getenv("METRICS_FSYNC_POLICY", "never")  # "never", "batch" or "interval"
+}
+
+# Declarative threshold rules (JSON or YAML); set THRESHOLD_RULES_FILE="" to use the built-in checks
+rules_file = os.getenv("THRESHOLD_RULES_FILE",
+                       os.path.join(os.path.dirname(os.path.abspath(__file__)), "threshold_rules.json"))
+threshold_rules = ThresholdRuleSet.load(rules_file) if rules_file and os.path.exists(rules_file) else None
+
+# Alert delivery sinks; each is enabled by its variable. Delivery runs off the collection thread.
+alert_sinks = []
+if os.getenv("ALERT_EMAIL_RECIPIENTS"):
+    alert_sinks.append(EmailSink(
+        os.getenv("ALERT_EMAIL_RECIPIENTS").split(","),
+        host=os.getenv("ALERT_SMTP_HOST", "localhost"),
+        port=int(os.getenv("ALERT_SMTP_PORT", "25")),
+        use_tls=os.getenv("ALERT_SMTP_TLS", "0") == "1",
+        username=os.getenv("ALERT_SMTP_USER") or None,
+        password=os.getenv("ALERT_SMTP_PASSWORD") or None
+    ))
+if os.getenv("ALERT_WEBHOOK_URL"):
+    alert_sinks.append(WebhookSink(os.getenv("ALERT_WEBHOOK_URL")))
+if os.getenv("ALERT_FILE_PATH"):
+    alert_sinks.append(FileSink(os.getenv("ALERT_FILE_PATH")))
+if os.getenv("ALERT_SYSLOG_ADDRESS"):
+    alert_sinks.append(SyslogSink(os.getenv("ALERT_SYSLOG_ADDRESS")))
+alert_options = {
+    "sinks": alert_sinks,
+    "cooldown": float(os.getenv("ALERT_COOLDOWN", "300")),  # seconds between repeats of a firing alert
+    "batch_interval": float(os.getenv("ALERT_BATCH_INTERVAL", "5")),
+    "max_retries": int(os.getenv("ALERT_MAX_RETRIES", "3"))
+}
+
+# Ensure the log directory exists before initializing MetricManager
+# Convert the file path to absolute path first, then extract the directory
+log_dir = os.path.dirname(os.path.abspath(metrics_file_name))
+
+# Check if directory exists, create if not
+if not os.path.exists(log_dir):
+    try:
+        os.makedirs(log_dir)  # Create the necessary parent directories
+        logging.info(f"Created log directory: {log_dir}")
+    except Exception as e:
+        logging.error(f"Error creating log directory {log_dir}: {e}")
+        raise
+
+# Combine the log directory and the file name to get the full path
+metrics_file_path = os.path.join(log_dir, metrics_file_name)
+
+metric_manager = MetricManager(
+    memory_threshold=memory_threshold,
+    metrics_file_path=metrics_file_path,
+    auto_save_interval=auto_save_interval,
+    writer_options=writer_options,
+    collector_backend=collector_backend,
+    alert_options=alert_options,
+    rules=threshold_rules
+)
+
+# Start background collection: the asyncio engine or the classic auto-save thread
+async_engine = None
+if collection_engine == "async":
+    async_engine = AsyncCollectionEngine(metric_manager, interval=auto_save_interval)
+    if not spawned_worker:
+        async_engine.start()
+elif not spawned_worker:
+    metric_manager.start_auto_save()
+
+# Initialize Analyzer on the history file the writer produces (may carry a .gz/.zst suffix)
+analyzer = Analyzer(metrics_file=metric_manager.metrics_writer.file_path,
+                    rules=threshold_rules,
+                    **(threshold_rules.analyzer_options if threshold_rules else {}))
+
+# Aggregator mode: ingest snapshots from remote agents (agent.py) and serve them with ?host=<name>
+aggregator = None
+if os.getenv("AGGREGATOR_PORT"):
+    aggregator = MetricsAggregator(
+        listen_host=os.getenv("AGGREGATOR_LISTEN_HOST", "127.0.0.1"),  # 0.0.0.0 to accept remote agents
+        port=int(os.getenv("AGGREGATOR_PORT")),
+        history=int(os.getenv("AGGREGATOR_HISTORY", "720")),  # snapshots kept in memory per host
+        history_dir=os.getenv("AGGREGATOR_HISTORY_DIR") or None,
+        writer_options=writer_options,
+        token=os.getenv("AGGREGATOR_TOKEN") or None  # shared token agents must send (agent.py --token)
+    )
+    if not spawned_worker:
+        aggregator.start()
+
+
+def selected_host():
+    """:return: str - The remote host chosen with ?host=, or None for this machine."""
+    host = request.args.get("host")
+    return None if host in (None, "", "local") else host
+
+
+def host_snapshot(host):
+    """:return: dict - The newest snapshot received from a remote host, or None."""
+    return aggregator.latest(host) if aggregator else None
+
+
+def no_metrics_response(host):
+    return jsonify({"error": f"No metrics received from host {host}"}), 404
+
+
+def local_only_response(host, view):
+    """Views built from this machine's own inspection files cannot be answered for an agent host."""
+    return jsonify({"error": f"{view} is only available for the local host, not {host}"}), 404
+
+
+def host_analyzer(host):
+    """:return: Analyzer - An analyzer over the stored history of a remote host, or None without one."""
+    history_path = aggregator.history_path(host) if aggregator else None
+    if history_path is None or not os.path.exists(history_path):
+        return None
+    return Analyzer(metrics_file=history_path, rules=analyzer.rules,
+                    **(threshold_rules.analyzer_options if threshold_rules else {}))
+
+
+monitor = None
+monitor_lock = Lock()
+
+
+def ensure_process_monitor():
+    """
+    Start the ML feeder (sklearn/pandas) on first use of a route that reads its
+    Suggestions/ output, so it never loads at startup.
+    """
+    global monitor
+    with monitor_lock:
+        if monitor is not None:
+            return
+        try:
+            from MLLayer.feeder import ProcessMonitor
+            monitor = ProcessMonitor()
+            monitor.start_background()  # ✅ Start background feeder loop
+        except Exception as e:
+            monitor = False  # not retried on every request
+            logging.error(f"Failed to start ML process monitor: {e}")
+
+# Continuous py-spy sampling profiler (sessions are started on demand)
+sampling_profiler = SamplingProfiler()
+
+# Lock to ensure thread-safety for metrics access
+metrics_lock = Lock()
+
+@app.before_request
+def start_request_timer():
+    g.perf_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_latency(response):
+    start = g.pop("perf_start", None)
+    if start is not None:
+        perf.record(f"route.{request.endpoint or 'unknown'}", time.perf_counter() - start)
+    return response
+
+
+@app.route("/debug/perf", methods=["GET"])
+def debug_perf():
+    """Return latency histograms and call counts for the monitor's own hot paths."""
+    if request.args.get("reset") == "1":
+        perf.reset()
+    report = perf.snapshot()
+    scheduler = async_engine.scheduler if async_engine else metric_manager.auto_save_scheduler
+    report["collection_scheduler"] = scheduler.stats()
+    report["snapshot_cache"] = dict(metric_manager.snapshot_cache.stats)
+    report["process_cache"] = process_cache.snapshot_stats()
+    report["inspection_planner"] = inspection_planner.stats()
+    report["thread_tracker"] = thread_tracker.stats()
+    report["metrics_writer"] = dict(metric_manager.metrics_writer.stats)
+    report["alert_manager"] = metric_manager.alert_manager.get_stats()
+    if aggregator:
+        report["aggregator"] = dict(aggregator.stats)
+    report["startup"] = {
+        "seconds": round(startup_seconds, 3),
+        "budget_seconds": startup_budget_seconds,
+        "within_budget": startup_seconds <= startup_budget_seconds
+    }
+    return jsonify(report)
+
+
+@app.route("/alerts", methods=["GET"])
+def active_alerts():
+    """Return the alerts currently firing."""
+    return jsonify(metric_manager.alert_manager.active())
+
+
+@app.route("/hosts", methods=["GET"])
+def list_hosts():
+    """Return this machine plus every agent host known to the aggregator."""
+    hosts = [{"host": "local", "connected": True}]
+    if aggregator:
+        hosts.extend(aggregator.hosts())
+    return jsonify(hosts)
+
+
+@app.route("/")
+def index():
+    """Render the real-time metrics dashboard."""
+    return render_template("index.html")
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Return the latest system metrics to the frontend."""
+    try:
+        host = selected_host()
+        if host is not None:
+            metrics = host_snapshot(host)
+            if metrics is None:
+                return no_metrics_response(host)
+            return jsonify(metrics)
+        #with metrics_lock:
+        metrics = metric_manager.get_all_metrics()
+        return jsonify(metrics)
+    except Exception as e:
+        logging.error(f"Error fetching metrics: {e}")
+        return jsonify({"error": f"Failed to fetch metrics: {str(e)}"}), 500
+
+
+@app.route("/metrics/openmetrics", methods=["GET"])
+def get_openmetrics():
+    """Serve the OpenMetrics text pre-rendered by the last collection cycle (never collects)."""
+    host = selected_host()
+    if host is not None:
+        body = aggregator.openmetrics(host) if aggregator else None
+    else:
+        body = metric_manager.openmetrics_text
+    if body is None:
+        return app.response_class("# No snapshot collected yet\n# EOF\n", status=503, mimetype="text/plain")
+    return app.response_class(body, content_type=OPENMETRICS_CONTENT_TYPE)
+
+
+@app.route("/overview", methods=["GET"])
+def get_overView():
+    """Analyze the stored metrics and return detected performance issues."""
+    host = selected_host()
+    if host is not None:
+        return local_only_response(host, "The performance overview")
+    ensure_process_monitor()
+    try:
+        issues = analyzer.performanceOverview()
+        return jsonify({"performance_issues": issues or []})
+    except Exception as e:
+        logging.error(f"Error analyzing metrics: {e}")
+        return jsonify({"error": f"Failed to analyze metrics: {str(e)}"}), 500
+
+
+@app.route("/aisummary", methods=["GET"])
+def get_summary():
+    """Analyze the stored metrics and return thread-level summaries (optionally by PID)."""
+    host = selected_host()
+    if host is not None:
+        return local_only_response(host, "The thread summary view")
+    ensure_process_monitor()
+    try:
+        pid = request.args.get("pid", type=int)  # Get optional ?pid=1234
+        logging.info(f"pid received for getting details: {pid}")
+        issues = analyzer.load_thread_summaries(pid=pid)
+        if not issues:
+            return jsonify({"performance_issues": []}), 404
+        return jsonify({"performance_issues": issues})
+    except Exception as e:
+        logging.error(f"Error analyzing summaries: {e}")
+        return jsonify({"error": f"Failed to analyze summaries: {str(e)}"}), 500
+
+
+@app.route("/analyze", methods=["GET"])
+def analyze_metrics():
+    """Analyze the stored metrics and return detected performance issues."""
+    try:
+        host = selected_host()
+        if host is None:
+            issues = analyzer.generate_report()
+        else:
+            # The host's history file when the aggregator keeps one, else its in-memory series
+            history_analyzer = host_analyzer(host)
+            if history_analyzer is not None:
+                issues = history_analyzer.generate_report()
+            else:
+                series = aggregator.series(host) if aggregator else []
+                if not series:
+                    return no_metrics_response(host)
+                issues = analyzer.generate_report(records=series)
+        return jsonify({"performance_issues": issues or []})
+    except Exception as e:
+        logging.error(f"Error analyzing metrics: {e}")
+        return jsonify({"error": f"Failed to analyze metrics: {str(e)}"}), 500
+
+@app.route("/analyze/summary", methods=["GET"])
+def analyze_metrics_summary():
+    """Analyze the stored history in parallel and return counts, per-process aggregates and episodes."""
+    try:
+        workers = request.args.get("workers", type=int)  # clamped to the CPU count by the Analyzer
+        host = selected_host()
+        if host is not None:
+            history_analyzer = host_analyzer(host)
+            if history_analyzer is not None:
+                summary = history_analyzer.analyze_metrics_parallel(workers=workers, include_issues=False)
+            else:
+                series = aggregator.series(host) if aggregator else []
+                if not series:
+                    return no_metrics_response(host)
+                summary = analyzer.merge_summaries([analyzer.summarize_records(series, include_issues=False)])
+        else:
+            summary = analyzer.analyze_metrics_parallel(workers=workers, include_issues=False)
+        summary.pop("issues", None)
+        return jsonify(summary)
+    except Exception as e:
+        logging.error(f"Error analyzing metrics: {e}")
+        return jsonify({"error": f"Failed to analyze metrics: {str(e)}"}), 500
+
+@app.route("/ThreadInfo", methods=["GET"])
+def SummaryInfo():
+    """Analyze the stored metrics and return detected performance issues."""
+    try:
+        host = selected_host()
+        if host is None:
+            issues = analyzer.get_blocking_threads_info()
+        else:
+            snapshot = host_snapshot(host)
+            if snapshot is None:
+                return no_metrics_response(host)
+            issues = analyzer.get_blocking_threads_info(snapshot=snapshot)
+        return jsonify({"performance_issues": issues or []})
+    except Exception as e:
+        logging.error(f"Error analyzing metrics: {e}")
+        return jsonify({"error": f"Failed to analyze metrics: {str(e)}"}), 500
+
+
+@app.route("/contentionInfo", methods=["GET"])
+def ContentionInfo():
+    """Live lock-contention and CPU-starvation issues from per-thread scheduler statistics."""
+    try:
+        host = selected_host()
+        if host is None:
+            issues = analyzer.get_contention_issues()
+        else:
+            snapshot = host_snapshot(host)
+            if snapshot is None:
+                return no_metrics_response(host)
+            issues = analyzer.get_contention_issues(snapshot=snapshot)
+        return jsonify({"performance_issues": issues or []})
+    except Exception as e:
+        logging.error(f"Error analyzing metrics: {e}")
+        return jsonify({"error": f"Failed to analyze metrics: {str(e)}"}), 500
+
+
+@app.route("/memoryInfo", methods=["GET"])
+def MemoryProfileInfo():
+    """Analyze the stored metrics and return detected performance issues."""
+    try:
+        host = selected_host()
+        if host is None:
+            issues = analyzer.get_memory_leak_suspects()
+        else:
+            snapshot = host_snapshot(host)
+            if snapshot is None:
+                return no_metrics_response(host)
+            issues = analyzer.get_memory_leak_suspects(snapshot=snapshot)
+        return jsonify({"performance_issues": issues or []})
+    except Exception as e:
+        logging.error(f"Error analyzing metrics: {e}")
+        return jsonify({"error": f"Failed to analyze metrics: {str(e)}"}), 500
+
+
+@app.route("/threadProfilerInfo", methods=["GET"])
+def thread_profiler_info():
+    """Analyze the stored metrics and return per-thread CPU trend per PID."""
+    host = selected_host()
+    if host is not None:
+        return local_only_response(host, "The thread CPU profile")
+    ensure_process_monitor()
+    try:        
+        file_path = os.path.join("Suggestions", "process_thread_metrics.csv")
+        if not os.path.exists(file_path):
+            return jsonify({"error": "Metrics file not found."}), 404
+
+        # Define columns
+        columns = [
+            "Timestamp", "ProcessName", "PID", "HandleCount", "ThreadCount", "ThreadID",
+            "CpuTimeMs", "MemoryMB", "ReadBytes", "WriteBytes", "InLockContention",
+            "PossibleRaceProne", "ThreadStartTime", "ThreadState", "WaitReason",
+            "UserTimeMs", "KernelTimeMs", "Priority", "ContextSwitches"
+        ]
+
+        import pandas as pd
+
+        # Read & clean data
+        df = pd.read_csv(file_path, names=columns, header=0, parse_dates=["Timestamp"], low_memory=False)
+        df["CpuTimeMs"] = pd.to_numeric(df["CpuTimeMs"], errors='coerce')
+        df["PID"] = pd.to_numeric(df["PID"], errors='coerce')
+        df["ThreadID"] = pd.to_numeric(df["ThreadID"], errors='coerce')
+
+        # Build trend series
+        thread_trend = (
+            df.groupby(["PID", "ThreadID", "Timestamp"])["CpuTimeMs"]
+            .sum()
+            .reset_index()
+            .sort_values(["PID", "ThreadID", "Timestamp"])
+        )
+
+        result = []
+
+        for pid, group in thread_trend.groupby("PID"):
+            process_entry = {
+                "pid": int(pid),
+                "threads": []
+            }
+
+            for tid, tgroup in group.groupby("ThreadID"):
+                process_entry["threads"].append({
+                    "thread_id": int(tid),
+                    "timestamps": tgroup["Timestamp"].dt.strftime('%Y-%m-%d %H:%M:%S').tolist(),
+                    "cpu_time": tgroup["CpuTimeMs"].tolist()
+                })
+
+            result.append(process_entry)
+
+        return jsonify({"performance_issues": result})
+
+    except Exception as e:
+        logging.error(f"Error analyzing metrics: {e}")
+        return jsonify({"error": f"Failed to analyze metrics: {str(e)}"}), 500
+
+
+@app.route("/diskInfo", methods=["GET"])
+def disk_profile_info():
+    try:
+        # Thresholds from the rule file's "disk_profiler" section (defaults otherwise)
+        options = dict(threshold_rules.disk_profiler_options) if threshold_rules else {}
+        host = selected_host()
+        if host is not None:
+            options["snapshot"] = host_snapshot(host)
+            if options["snapshot"] is None:
+                return no_metrics_response(host)
+        issues = analyzer.get_disk_profiler_issues(**options)
+        return jsonify({"performance_issues": issues or []})
+    except Exception as e:
+        logging.error(f"Error analyzing disk metrics: {e}")
+        return jsonify({"error": f"Failed to analyze disk metrics: {str(e)}"}), 500
+
+
+@app.route("/api/run-diagnosis", methods=["GET"])
+def run_diagnosis():
+    result = metric_manager.run_ai_diagnosis()
+    if result is None:
+        return jsonify({"error": "Diagnosis failed"}), 500
+    return jsonify(result)
+
+# Gracefully stop auto-save when Flask is stopped
+def shutdown():
+    logging.info("Shutting down Flask app...")
+    if async_engine:
+        async_engine.stop()
+    metric_manager.stop_auto_save()
+    if aggregator:
+        aggregator.stop()
+    logging.info("Auto-save stopped gracefully.")
+
+# Register the shutdown function to be called on app termination
+if not spawned_worker:
+    atexit.register(shutdown)
+
+
+@app.route('/optimize-locks', methods=['POST'])
+def optimize_locks():
+    try:
+        issues = request.get_json()
+        if not issues:
+            return jsonify(status="error", message="No data received"), 400
+
+        if not isinstance(issues, list):
+            issues = [issues]
+
+        all_suggestions = []
+
+        for issue in issues:
+            issue_type = issue.get("type", "Unknown")
+            timestamp = issue.get("timestamp", "Unknown")
+            process_name = issue.get("process_name", "Unknown")
+            pid = issue.get("pid", "Unknown")
+            cpu_message = issue.get("message", "No message provided.")
+
+            if issue_type == "CPUProcess":
+                optimization_message = (
+                    f"Optimization suggestion: Investigate high CPU usage by process '{process_name}' "
+                    f"(PID: {pid}). Consider checking for inefficient loops, stuck threads, or runaway processes."
+                )
+                all_suggestions.append({
+                    "status": "success",
+                    "message": optimization_message,
+                    "details": {
+                        "process_name": process_name,
+                        "pid": pid,
+                        "timestamp": timestamp,
+                        "original_message": cpu_message
+                    }
+                })
+
+            elif issue_type == "HighCPUThread":
+                thread_name = issue.get("thread_name", "Unknown")
+                optimization_message = (
+                    f"Optimization suggestion: Detected locked thread '{thread_name}'. "
+                    f"Safely abort or debug the issue causing thread in process '{process_name}'."
+                )
+                all_suggestions.append({
+                    "status": "success",
+                    "message": optimization_message,
+                    "details": {
+                        "thread_name": thread_name,
+                        "process_name": process_name,
+                        "timestamp": timestamp,
+                        "original_message": cpu_message
+                    }
+                })
+
+            elif issue_type in ("ThreadContention", "CPUStarvation"):
+                thread_name = issue.get("thread_name", "Unknown")
+                if issue_type == "ThreadContention":
+                    optimization_message = (
+                        f"Optimization suggestion: Thread '{thread_name}' in process '{process_name}' is blocked "
+                        f"most of the time. Minimize critical sections or refactor shared state behind the lock."
+                    )
+                else:
+                    optimization_message = (
+                        f"Optimization suggestion: Thread '{thread_name}' in process '{process_name}' is starved "
+                        f"of CPU. Reduce runnable threads, lower competing priorities or add CPU capacity."
+                    )
+                all_suggestions.append({
+                    "status": "success",
+                    "message": optimization_message,
+                    "details": {
+                        "thread_name": thread_name,
+                        "process_name": process_name,
+                        "pid": pid,
+                        "timestamp": timestamp,
+                        "original_message": cpu_message
+                    }
+                })
+
+            else:
+                all_suggestions.append({
+                    "status": "error",
+                    "message": f"Unhandled issue type: {issue_type}",
+                    "details": {
+                        "issue_type": issue_type,
+                        "timestamp": timestamp
+                    }
+                })
+
+        return jsonify(all_suggestions), 200
+
+    except Exception as e:
+        return jsonify(status="error", message=str(e)), 500
+
+
+@app.route("/terminate-process", methods=["POST"])
+def terminate_process():
+    host = selected_host()
+    if host is not None:
+        return jsonify({"status": "error", "message": f"Processes can only be terminated on the local host, not {host}"}), 400
+    data = request.get_json()
+    pid = data.get("pid")
+    if not pid:
+        return jsonify({"status": "error", "message": "pid is required"}), 400
+
+    try:
+        proc = psutil.Process(int(pid))
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+            if proc.is_running():
+                return jsonify({"status": "error", "message": f"Process PID {pid} did not terminate."}), 500
+        except psutil.TimeoutExpired:
+            proc.kill()
+            if proc.is_running():
+                return jsonify({"status": "error", "message": f"Process PID {pid} could not be killed."}), 500
+
+        return jsonify({"status": "success", "message": f"Process PID {pid} terminated."})
+
+    except psutil.NoSuchProcess:
+        return jsonify({"status": "error", "message": f"No process with PID {pid} found."}), 404
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+
+@app.route("/shutdown-system", methods=["POST"])
+def shutdown_system():
+    host = selected_host()
+    if host is not None:
+        return jsonify({"status": "error", "message": f"Only the local host can be shut down, not {host}"}), 400
+    data = request.get_json()
+    reason = data.get("reason", "Shutdown requested by user")
+
+    try:
+        system = platform.system()
+
+        if system == "Windows":
+            # Force shutdown with message
+            subprocess.run(["shutdown", "/s", "/t", "0"], check=True)
+        elif system == "Linux" or system == "Darwin":  # macOS is Darwin
+            # Use shutdown command (requires sudo)
+            subprocess.run(["shutdown", "-h", "now"], check=True)
+        else:
+            return jsonify({"status": "error", "message": f"Unsupported platform: {system}"}), 400
+
+        return jsonify({"status": "success", "message": f"System shutdown initiated. Reason: {reason}"})
+    except subprocess.CalledProcessError as e:
+        return jsonify({"status": "error", "message": f"Failed to shutdown system: {e}"}), 500
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route('/get-osInfo', methods=['GET'])
+def get_os_info():
+    os_info = {
+        "OS": platform.system(),
+        "Release": platform.release(),
+        "Version": platform.version(),
+        "Machine": platform.machine(),
+        "Processor": platform.processor(),
+        "Architecture": platform.architecture()[0]
+    }
+
+    # Add Linux-specific distro info if available
+    if os_info["OS"] == "Linux":
+        import distro
+        os_info.update({
+            "DistroName": distro.name(),
+            "DistroVersion": distro.version(),
+            "DistroID": distro.id()
+        })
+
+    return jsonify(os_info)
+
+
+
+# Get Thread details for the faulty process detected
+
+
+# @app.route("/threadtimeline")
+# def thread_timeline():
+#     tid = request.args.get("tid", type=int)
+#     print(f"[INFO] Thread timeline request received for TID: {tid}")
+
+#     if not tid:
+#         print("[ERROR] Missing thread ID in request")
+#         return jsonify({"error": "Missing thread ID (tid)"}), 400
+
+#     try:
+#         found_thread = None
+#         proc_name = None
+
+#         print("[INFO] Enumerating all processes and threads...")
+#         for proc in get_wmi().Win32_Process():
+#             pid = proc.ProcessId
+#             try:
+#                 for thread in get_wmi().Win32_Thread(ProcessHandle=str(pid)):
+#                     if int(thread.Handle) == tid:
+#                         found_thread = thread
+#                         proc_name = proc.Name
+#                         print(f"[SUCCESS] Found thread {tid} in process {proc_name} (PID: {pid})")
+#                         break
+#             except Exception as thread_err:
+#                 print(f"[WARN] Could not read threads of PID {pid}: {thread_err}")
+#             if found_thread:
+#                 break
+
+#         if not found_thread:
+#             print(f"[ERROR] Thread ID {tid} not found in any running process")
+#             return jsonify({"error": f"Thread ID {tid} not found"}), 404
+
+#         snapshot = {
+#             "timestamp": datetime.now().isoformat(),
+#             "ThreadId": tid,
+#             "ProcessId": found_thread.ProcessHandle,
+#             "ProcessName": proc_name,
+#             "ThreadState": found_thread.ThreadState,
+#             "WaitReason": found_thread.ThreadWaitReason,
+#             "Priority": found_thread.Priority,
+#             "UserModeTimeMs": int(found_thread.UserModeTime) // 10_000,
+#             "KernelModeTimeMs": int(found_thread.KernelModeTime) // 10_000,
+#             "StartAddress": found_thread.StartAddress,
+#         }
+
+#         print(f"[INFO] Thread snapshot generated:\n{json.dumps(snapshot, indent=2)}")
+#         return jsonify(snapshot)
+
+    # except Exception as ex:
+    #     print(f"[EXCEPTION] An error occurred while fetching thread timeline: {ex}")
+    #     return jsonify({"error": str(ex)}), 500
+
+
+
+
+@app.route("/cpu-profiler", methods=["GET"])
+def cpu_profiler():
+    # CPU usage comes from the cross-cycle process cache: no warm-up call and sleep needed
+    top_n = request.args.get("top", default=20, type=int)
+    return jsonify([
+        {
+            "pid": proc["pid"],
+            "name": proc["name"],
+            "username": proc["username"],
+            "cpu_percent": proc["cpu_percent"],
+            "memory_percent": proc["memory_percent"],
+            "num_threads": proc["num_threads"]
+        }
+        for proc in process_cache.top("cpu_percent", top_n)
+    ])
+
+
+@app.route("/profiler/start", methods=["POST"])
+def start_sampling_profiler():
+    """Start a bounded sampling session: {"pids": [...], "rate_hz": 100, "duration": 30}."""
+    data = request.get_json() or {}
+    pids = data.get("pids") or ([data["pid"]] if data.get("pid") else [])
+    if not pids:
+        return jsonify({"status": "error", "message": "pids is required"}), 400
+
+    try:
+        session = sampling_profiler.start(
+            pids,
+            rate_hz=data.get("rate_hz", 100),
+            duration=data.get("duration", 30)
+        )
+        return jsonify({"status": "success", "session": session})
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 404
+    except RuntimeError as e:
+        return jsonify({"status": "error", "message": str(e)}), 409
+    except Exception as e:
+        logging.error(f"Error starting sampling profiler: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route("/profiler/status", methods=["GET"])
+def sampling_profiler_status():
+    return jsonify(sampling_profiler.status())
+
+
+@app.route("/profiler/flamegraph", methods=["GET"])
+def sampling_profiler_flamegraph():
+    """Return aggregated stacks as flame graph JSON, or collapsed-stack text with ?format=collapsed."""
+    pid = request.args.get("pid", type=int)
+    if request.args.get("format") == "collapsed":
+        return app.response_class(sampling_profiler.collapsed(pid=pid), mimetype="text/plain")
+    return jsonify(sampling_profiler.flame_graph(pid=pid))
+
+
+def run_monitor():
+    from MLLayer.feeder import ProcessMonitor
+    monitor = ProcessMonitor()
+    monitor.start_background();
+    while True:
+        monitor.collect_metrics()
+        monitor.suggest_patterns()
+        monitor.analyze_json_and_generate_summary()
+        time.sleep(30)
+
+# Startup-time budget: everything above runs on import / process start
+startup_seconds = time.perf_counter() - _startup_started
+perf.record("startup.main", startup_seconds)
+if startup_seconds > startup_budget_seconds:
+    logging.warning(f"Startup took {startup_seconds:.3f}s, over the {startup_budget_seconds}s budget.")
+else:
+    logging.info(f"Startup took {startup_seconds:.3f}s (budget {startup_budget_seconds}s).")
+
+if __name__ == "__main__":
+    try:
+        # Start the Flask app
+        app.run(debug=True, host="0.0.0.0", port=8000)
+        run_monitor()
+    except KeyboardInterrupt:
+        # On graceful shutdown (Ctrl+C)
+        shutdown()
+        logging.info("Flask app stopped. Auto-save stopped gracefully.")
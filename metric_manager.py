@@ -1,163 +1,226 @@
-import json
-import threading
-from threading import Lock
-import os
-import logging
-import time
-from datetime import datetime
-
-from metrics.cpu_metrics import CPUMetrics
-from metrics.memory_metrics import MemoryMetrics
-from metrics.disk_metrics import DiskMetrics
-from metrics.garbage_collector_metrics import GarbageCollectorMetrics
-from metrics.system_info import SystemInfo
-from metrics.thread_metrics import ThreadMetrics
-from metrics.GPU_Info import GPUMetrics
-from metrics.network_metrics import NetworkMetrics
-from metrics.power_metrics import PowerMetrics
-from metrics.cpu_metrics_deep import CpuDeepMetrics
-from metrics.memory_metrics_deep import MemoryDeepMetrics
-from metrics.disk_metrics_deep import DiskDeepMetrics
-from metrics.alert_manager import AlertManager
-
-from sklearn.ensemble import IsolationForest
-import numpy as np
-
-from concurrent.futures import ThreadPoolExecutor, as_completed
-
-
-class MetricManager:
-    def __init__(self, memory_threshold=20.0, disk_threshold=50.0, cpu_freq_threshold=1500.0,
-                 metrics_file_path="system_metrics.json", auto_save_interval=30,
-                 baseline_data=None, metrics_refresh_interval=120):
-        self.metrics = {}
-        self.memory_threshold = memory_threshold
-        self.disk_threshold = disk_threshold
-        self.cpu_freq_threshold = cpu_freq_threshold
-        self.metrics_file_path = metrics_file_path
-        self.auto_save_interval = auto_save_interval  # in seconds
-        self.lock = Lock()
-        self.auto_save_thread = None
-        self.auto_save_active = False
-        self.alert_manager = AlertManager()
-        self._setup_logger()
-        # Caching related variables
-        self._last_metrics = None
-        self._last_metrics_time = 0  # epoch time
-        self._metrics_refresh_interval = metrics_refresh_interval  # seconds
-
-    def _setup_logger(self):
-        log_dir = os.path.dirname(self.metrics_file_path)
-        if log_dir and not os.path.exists(log_dir):
-            os.makedirs(log_dir)
-        log_handler = logging.FileHandler('metric_manager.log')
-        log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        log_handler.setFormatter(log_formatter)
-        logging.getLogger().addHandler(log_handler)
-        logging.getLogger().setLevel(logging.INFO)
-
-    
-    def collect_metrics(self):
-        try:
-            self.metrics = {
-                "timestamp": datetime.utcnow().isoformat() + "Z",
-                "cpu_metrics": CPUMetrics.get_metrics(),
-                "cpu_deep_metrics": CpuDeepMetrics.get_metrics(),
-                "cpu_hot_processes": CpuDeepMetrics.get_hot_process_traces(),
-                "memory_deep_metrics": MemoryDeepMetrics.get_metrics(),
-                "disk_deep_metrics": DiskDeepMetrics.get_metrics(),
-                "garbage_collector_metrics": GarbageCollectorMetrics.get_metrics(),
-                "system_info": SystemInfo.get_metrics(),
-                "thread_metrics": ThreadMetrics.get_metrics(),
-                "GPU_Metrics": GPUMetrics.get_metrics(),
-                "network_metrics": NetworkMetrics.get_metrics(),
-                "power_metrics": PowerMetrics.get_metrics()
-            }
-            logging.info("Metrics collected successfully.")
-        except Exception as e:
-            logging.error(f"Error collecting metrics: {e}")
-
-
-    
-    def get_all_metrics(self):
-       with self.lock:
-        current_time = time.time()
-
-        if (self._last_metrics is None) or (current_time - self._last_metrics_time > self._metrics_refresh_interval):
-            self.collect_metrics()
-            self._last_metrics = self.metrics
-            self._last_metrics_time = current_time
-        else:
-            logging.info("Returning cached metrics (within 60 seconds window).")
-
-       return self._last_metrics
-     
-
-    def save_metrics_to_json(self):
-        # with self.lock:
-            self.collect_metrics()
-            try:
-                with open(self.metrics_file_path, "a") as file:
-                    json.dump(self.metrics, file)
-                    file.write("\n")
-                logging.info(f"Metrics saved to {self.metrics_file_path}")
-            except Exception as e:
-                logging.error(f"Error saving metrics to JSON: {e}")
-
-    def start_auto_save(self):
-        def auto_save_worker():
-            while self.auto_save_active:
-                self.save_metrics_to_json()
-                self.analyze_system_performance()
-                # self.run_ai_diagnosis()
-                time.sleep(self.auto_save_interval+ 60)
-
-        if not self.auto_save_thread:
-            self.auto_save_active = True
-            self.auto_save_thread = threading.Thread(target=auto_save_worker, daemon=True)
-            self.auto_save_thread.start()
-            logging.info("Started background auto-save thread.")
-
-    def stop_auto_save(self):
-        self.auto_save_active = False
-        if self.auto_save_thread:
-            self.auto_save_thread.join()
-            logging.info("Stopped background auto-save thread.")
-
-    def get_metrics_for_analysis(self):
-        try:
-            metrics = self.get_all_metrics()
-            return metrics
-        except Exception as e:
-            logging.error(f"Error retrieving metrics for analysis: {e}")
-            return None
-
-    def analyze_system_performance(self):
-        metrics = self.get_metrics_for_analysis()
-        issues = []
-
-        if not metrics:
-            issues.append("Error: Metrics could not be retrieved.")
-            return issues
-
-        memory_usage = metrics.get("memory_deep_metrics", {}).get("memory_percent", 0)
-        if memory_usage > self.memory_threshold:
-            issue = f"High memory usage detected: {memory_usage}%"
-            issues.append(issue)
-            self.alert_manager.trigger_alert(issue)
-
-        cpu_freq = metrics.get("cpu_deep_metrics", {}).get("cpu_freq_current_mhz", 0)
-        if cpu_freq < self.cpu_freq_threshold:
-            issue = f"CPU frequency below threshold: {cpu_freq} MHz"
-            issues.append(issue)
-            self.alert_manager.trigger_alert(issue)
-
-        disk_usage = metrics.get("disk_deep_metrics", {}).get("disk_percent", 0)
-        if disk_usage > self.disk_threshold:
-            issue = f"Disk usage high: {disk_usage}%"
-            issues.append(issue)
-            self.alert_manager.trigger_alert(issue)
-
-        return issues
-
+import json
+import threading
+from threading import Lock
+import os
+import logging
+import sys
+import time
+from datetime import datetime
+
+from metrics.cpu_metrics import CPUMetrics
+from metrics.memory_metrics import MemoryMetrics
+from metrics.disk_metrics import DiskMetrics
+from metrics.garbage_collector_metrics import GarbageCollectorMetrics
+from metrics.system_info import SystemInfo
+from metrics.thread_metrics import ThreadMetrics
+from metrics.GPU_Info import GPUMetrics
+from metrics.network_metrics import NetworkMetrics
+from metrics.power_metrics import PowerMetrics
+from metrics.cpu_metrics_deep import CpuDeepMetrics
+from metrics.memory_metrics_deep import MemoryDeepMetrics
+from metrics.disk_metrics_deep import DiskDeepMetrics
+from metrics.alert_manager import AlertManager
+from metrics.threshold_rules import ThresholdRuleSet
+from metrics.self_profiler import perf
+from metrics.openmetrics_exporter import OpenMetricsExporter
+from metrics.scheduler import FixedRateScheduler
+from metrics.snapshot_cache import SnapshotCache
+from metrics.metrics_writer import MetricsWriter
+from metrics.procfs_collector import ProcfsCollector
+from metrics.leak_detector import leak_detector
+from metrics.pressure_metrics import pressure_metrics
+from metrics.cgroup_metrics import cgroup_metrics
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class MetricManager:
+    def __init__(self, memory_threshold=20.0, disk_threshold=50.0, cpu_freq_threshold=1500.0,
+                 metrics_file_path="system_metrics.json", auto_save_interval=30,
+                 baseline_data=None, metrics_refresh_interval=120, writer_options=None,
+                 collector_backend="psutil", alert_options=None, rules=None):
+        self.metrics = {}
+        self.memory_threshold = memory_threshold
+        self.disk_threshold = disk_threshold
+        self.cpu_freq_threshold = cpu_freq_threshold
+        self.metrics_file_path = metrics_file_path
+        # Group-committing history writer (batch size, compression, fsync policy)
+        self.metrics_writer = MetricsWriter(metrics_file_path, **(writer_options or {}))
+        self.auto_save_interval = auto_save_interval  # in seconds
+        self.auto_save_thread = None
+        self.auto_save_active = False
+        self.auto_save_scheduler = FixedRateScheduler(auto_save_interval)
+        self._auto_save_stop = threading.Event()
+        # Threshold rules (a ThresholdRuleSet, e.g. loaded from threshold_rules.json) or the built-in checks
+        self.rules = rules or ThresholdRuleSet(self.default_rule_specs())
+        # Evaluates those rules with per-key dedup/cooldown; notifications go out on a background delivery queue
+        self.alert_manager = AlertManager(rules=self.rules.alert_rules(), **(alert_options or {}))
+        self._setup_logger()
+        # Caching related variables: single-flight, stale-while-revalidate snapshot cache
+        self._metrics_refresh_interval = metrics_refresh_interval  # seconds
+        self.snapshot_cache = SnapshotCache(self.collect_metrics, max_age=metrics_refresh_interval)
+        self._publish_lock = Lock()
+        # OpenMetrics text is rendered once per collection cycle and served as-is
+        self.openmetrics_exporter = OpenMetricsExporter()
+        self.openmetrics_text = None
+        # Snapshot sections and the collector that produces each of them
+        self.collectors = {
+            "cpu_metrics": CPUMetrics.get_metrics,
+            "cpu_deep_metrics": CpuDeepMetrics.get_metrics,
+            "cpu_hot_processes": CpuDeepMetrics.get_hot_process_traces,
+            "memory_deep_metrics": MemoryDeepMetrics.get_metrics,
+            "disk_deep_metrics": DiskDeepMetrics.get_metrics,
+            "garbage_collector_metrics": GarbageCollectorMetrics.get_metrics,
+            "system_info": SystemInfo.get_metrics,
+            "thread_metrics": ThreadMetrics.get_metrics,
+            "GPU_Metrics": GPUMetrics.get_metrics,
+            "network_metrics": NetworkMetrics.get_metrics,
+            "power_metrics": PowerMetrics.get_metrics,
+            "memory_leak_metrics": leak_detector.collect,
+            "pressure_metrics": pressure_metrics.get_metrics,
+            "cgroup_metrics": cgroup_metrics.get_metrics
+        }
+        # "procfs" replaces the process-table and system-counter collectors with one /proc pass (Linux only)
+        self.collector_backend = collector_backend
+        self.procfs_collector = None
+        if collector_backend == "procfs":
+            if sys.platform.startswith("linux"):
+                self.procfs_collector = ProcfsCollector()
+                self.collectors.update(self.procfs_collector.collectors())
+            else:
+                logging.warning("procfs collector backend is only available on Linux; using psutil.")
+                self.collector_backend = "psutil"
+        elif collector_backend != "psutil":
+            raise ValueError(f"Unsupported collector backend: {collector_backend}")
+
+    def _setup_logger(self):
+        log_dir = os.path.dirname(self.metrics_file_path)
+        if log_dir and not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+        log_handler = logging.FileHandler('metric_manager.log')
+        log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        log_handler.setFormatter(log_formatter)
+        logging.getLogger().addHandler(log_handler)
+        logging.getLogger().setLevel(logging.INFO)
+
+    
+    @perf.instrument("metric_manager.collect_metrics")
+    def collect_metrics(self):
+        try:
+            metrics = {"timestamp": datetime.utcnow().isoformat() + "Z"}
+            for name, collector in self.collectors.items():
+                with perf.timed(f"collector.{name}"):
+                    metrics[name] = collector()
+            self.publish_snapshot(metrics)
+            logging.info("Metrics collected successfully.")
+            return metrics
+        except Exception as e:
+            logging.error(f"Error collecting metrics: {e}")
+            return None
+
+    def publish_snapshot(self, metrics):
+        """
+        Make a freshly collected snapshot the current one for every reader.
+        A snapshot older than the one already published is ignored, so overlapping
+        collections can never roll readers back in time.
+        """
+        with perf.timed("openmetrics.render"):
+            openmetrics_text = self.openmetrics_exporter.render(metrics).encode("utf-8")
+        with self._publish_lock:
+            if self.metrics and self.metrics.get("timestamp", "") > metrics.get("timestamp", ""):
+                return
+            self.metrics = metrics
+            self.openmetrics_text = openmetrics_text
+            self.snapshot_cache.publish(metrics)
+
+
+    
+    def get_all_metrics(self):
+        """
+        Return the latest complete snapshot immediately. A stale snapshot is still
+        returned while one background refresh replaces it.
+        """
+        return self.snapshot_cache.get()
+     
+
+    @perf.instrument("metric_manager.save_metrics_to_json")
+    def save_metrics_to_json(self):
+        metrics = self.snapshot_cache.refresh()
+        if metrics is not None:
+            self.write_metrics(metrics)
+
+    def write_metrics(self, metrics):
+        """Queue a snapshot for the background writer; it is committed with the next batch."""
+        self.metrics_writer.submit(metrics)
+
+    @perf.instrument("metric_manager.auto_save_cycle")
+    def run_auto_save_cycle(self):
+        """Collect one snapshot, then persist and analyze that same snapshot."""
+        metrics = self.snapshot_cache.refresh()
+        if metrics is None:
+            return
+        self.write_metrics(metrics)
+        self.analyze_system_performance(metrics)
+        # self.run_ai_diagnosis()
+
+    def start_auto_save(self):
+        def auto_save_worker():
+            # Fixed-rate ticks: the period stays auto_save_interval whatever a cycle costs
+            self.auto_save_scheduler.run(self.run_auto_save_cycle, self._auto_save_stop)
+
+        if not self.auto_save_thread:
+            self.auto_save_active = True
+            self._auto_save_stop.clear()
+            self.auto_save_thread = threading.Thread(target=auto_save_worker, daemon=True)
+            self.auto_save_thread.start()
+            logging.info("Started background auto-save thread.")
+
+    def stop_auto_save(self):
+        self.auto_save_active = False
+        self._auto_save_stop.set()
+        if self.auto_save_thread:
+            self.auto_save_thread.join()
+            self.auto_save_thread = None
+            logging.info("Stopped background auto-save thread.")
+        self.metrics_writer.close()
+        self.alert_manager.close()
+
+    def default_rule_specs(self):
+        """:return: list[dict] - Memory, CPU frequency and disk rules built from the constructor thresholds."""
+        return [
+            {"name": "memory_usage", "type": "HighMemoryUsage", "path": "memory_deep_metrics.memory_usage.percent",
+             "op": ">", "threshold": self.memory_threshold,
+             "message": "High memory usage detected: {value:.1f}%"},
+            {"name": "cpu_frequency", "type": "LowCPUFrequency", "path": "cpu_deep_metrics.cpu_frequency.current",
+             "op": "<", "threshold": self.cpu_freq_threshold,
+             "message": "CPU frequency below threshold: {value:.0f} MHz"},
+            {"name": "disk_usage", "type": "HighDiskUsage", "path": "disk_deep_metrics.disk_partitions[*].percent",
+             "key": "mountpoint", "op": ">", "threshold": self.disk_threshold,
+             "message": "Disk usage high: {value:.1f}% on {key}"}
+        ]
+
+    def get_metrics_for_analysis(self):
+        try:
+            metrics = self.get_all_metrics()
+            return metrics
+        except Exception as e:
+            logging.error(f"Error retrieving metrics for analysis: {e}")
+            return None
+
+    @perf.instrument("metric_manager.analyze_system_performance")
+    def analyze_system_performance(self, metrics=None):
+        if metrics is None:
+            metrics = self.get_metrics_for_analysis()
+        issues = []
+
+        if not metrics:
+            issues.append("Error: Metrics could not be retrieved.")
+            return issues
+
+        # Firing alerts are reported every cycle; notifications are deduplicated by the alert manager
+        for alert in self.alert_manager.evaluate(metrics):
+            issues.append(alert["message"])
+
+        return issues
+
    
\ No newline at end of file
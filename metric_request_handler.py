@@ -1,25 +1,116 @@
-import http.server
-import socketserver
-import json
-
-class MetricsRequestHandler(http.server.SimpleHTTPRequestHandler):
-    def __init__(self, metric_manager, *args, **kwargs):
-        self.metric_manager = metric_manager
-        super().__init__(*args, **kwargs)
-
-    def do_GET(self):
-        if self.path == '/metrics':
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            self.metric_manager.collect_metrics()
-            response = json.dumps(self.metric_manager.metrics)
-            self.wfile.write(response.encode())
-        else:
-            super().do_GET()
-
-def start_http_server(metric_manager, port=8000):
-    handler = lambda *args, **kwargs: MetricsRequestHandler(metric_manager, *args, **kwargs)
-    with socketserver.TCPServer(("", port), handler) as httpd:
-        print(f"Serving metrics at http://localhost:{port}")
-        httpd.serve_forever()
+import gzip
+import http.server
+import json
+import threading
+
+from metrics.openmetrics_exporter import CONTENT_TYPE as OPENMETRICS_CONTENT_TYPE
+
+
+class SnapshotEncoder:
+    """
+    Keeps the encoded (and gzip-compressed) bodies of the latest snapshot.
+
+    Bodies are rebuilt only when MetricManager publishes a new snapshot, so every
+    request for the same snapshot is a plain buffer write.
+    """
+
+    def __init__(self, metric_manager, compresslevel=6):
+        self.metric_manager = metric_manager
+        self.compresslevel = compresslevel
+        self.lock = threading.Lock()
+        self._cache = {}  # name -> (source object, raw bytes, gzip bytes)
+
+    def _encoded(self, name, source, encode):
+        with self.lock:
+            cached = self._cache.get(name)
+            if cached is None or cached[0] is not source:
+                raw = encode(source)
+                cached = (source, raw, gzip.compress(raw, compresslevel=self.compresslevel))
+                self._cache[name] = cached
+            return cached[1], cached[2]
+
+    def json_body(self):
+        snapshot = self.metric_manager.metrics
+        if not snapshot:
+            return None
+        return self._encoded("json", snapshot, lambda s: json.dumps(s).encode("utf-8"))
+
+    def openmetrics_body(self):
+        text = self.metric_manager.openmetrics_text
+        if text is None:
+            return None
+        return self._encoded("openmetrics", text, lambda t: t)
+
+
+class MetricsRequestHandler(http.server.SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive; every response carries Content-Length
+    timeout = 30                   # drop idle keep-alive connections
+
+    def __init__(self, encoder, *args, **kwargs):
+        self.encoder = encoder
+        super().__init__(*args, **kwargs)
+
+    def _send_body(self, bodies, content_type):
+        if bodies is None:
+            self.send_error(503, "No snapshot collected yet")
+            return
+        raw, compressed = bodies
+        use_gzip = "gzip" in self.headers.get("Accept-Encoding", "")
+        body = compressed if use_gzip else raw
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Vary', 'Accept-Encoding')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _route(self):
+        path = self.path.split('?', 1)[0]
+        if path == '/metrics':
+            self._send_body(self.encoder.json_body(), 'application/json')
+        elif path == '/metrics/openmetrics':
+            self._send_body(self.encoder.openmetrics_body(), OPENMETRICS_CONTENT_TYPE)
+        else:
+            return False
+        return True
+
+    def do_GET(self):
+        if not self._route():
+            super().do_GET()
+
+    def do_HEAD(self):
+        if not self._route():
+            super().do_HEAD()
+
+
+def create_http_server(metric_manager, port=8000, host=""):
+    """
+    Build the threaded metrics server. Requests only read the snapshot cached by
+    MetricManager's collection loop; they never trigger a collection themselves.
+    """
+    encoder = SnapshotEncoder(metric_manager)
+    handler = lambda *args, **kwargs: MetricsRequestHandler(encoder, *args, **kwargs)
+    httpd = http.server.ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    return httpd
+
+
+def start_http_server(metric_manager, port=8000, start_collection=True):
+    """
+    Serve metrics until interrupted. Requests only read published snapshots, so the
+    manager's collection loop is started here unless the caller runs it already.
+
+    :param start_collection: bool - Start metric_manager's auto-save loop (and stop it on exit).
+    """
+    if start_collection:
+        metric_manager.start_auto_save()
+    try:
+        with create_http_server(metric_manager, port) as httpd:
+            print(f"Serving metrics at http://localhost:{httpd.server_address[1]}")
+            httpd.serve_forever()
+    finally:
+        if start_collection:
+            metric_manager.stop_auto_save()
@@ -0,0 +1,159 @@
+import gzip
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from metrics.self_profiler import perf
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class MetricsWriter:
+    """
+    Background, group-committing writer for the metrics history file.
+
+    Records are queued by the collection loop and written by one worker thread in
+    batches of batch_size records, or whatever is queued after flush_interval seconds.
+    Each batch is appended as a single write; with compression enabled it becomes one
+    independent gzip member / zstd frame, so the file stays a valid stream that can
+    be read with gzip.open() or a zstd stream reader.
+
+    fsync_policy:
+      - "never":    leave durability to the OS page cache (cheapest)
+      - "batch":    fsync after every group commit
+      - "interval": fsync at most once every fsync_interval seconds
+    """
+
+    COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+    FSYNC_POLICIES = ("never", "batch", "interval")
+
+    def __init__(self, file_path, batch_size=10, flush_interval=30.0, compression=None,
+                 compression_level=None, fsync_policy="never", fsync_interval=60.0, max_queue=1000):
+        if compression not in (None, "gzip", "zstd"):
+            raise ValueError(f"Unsupported compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd compression requires the 'zstandard' package")
+        if fsync_policy not in self.FSYNC_POLICIES:
+            raise ValueError(f"Unsupported fsync policy: {fsync_policy}")
+
+        suffix = self.COMPRESSION_SUFFIXES.get(compression, "")
+        self.file_path = file_path if file_path.endswith(suffix) else file_path + suffix
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.compression = compression
+        self.compression_level = compression_level
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._last_fsync = time.monotonic()
+        self.stats = {"records": 0, "batches": 0, "bytes_written": 0, "fsyncs": 0, "dropped": 0,
+                      "unserializable": 0}
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name="metrics-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, record):
+        """Queue one record without blocking the caller. Records are dropped if the queue is full."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.stats["dropped"] += 1
+            logging.warning("Metrics writer queue full; dropping record.")
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far has been committed."""
+        self._ensure_started()
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=None):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _serialize(self, records):
+        """:return: list[str] - One JSON line per record; a record that cannot be serialized is logged and skipped."""
+        lines = []
+        for record in records:
+            try:
+                lines.append(json.dumps(record) + "\n")
+            except (TypeError, ValueError) as e:
+                self.stats["unserializable"] += 1
+                logging.error(f"Skipping metrics record that cannot be serialized: {e}")
+        return lines
+
+    def _encode(self, lines):
+        payload = "".join(lines).encode("utf-8")
+        if self.compression == "gzip":
+            return gzip.compress(payload, compresslevel=self.compression_level or 6)
+        if self.compression == "zstd":
+            return zstandard.ZstdCompressor(level=self.compression_level or 3).compress(payload)
+        return payload
+
+    def _commit(self, records):
+        if not records:
+            return
+        try:
+            with perf.timed("metrics_writer.commit"):
+                lines = self._serialize(records)
+                if not lines:
+                    return
+                data = self._encode(lines)
+                with open(self.file_path, "ab") as file:
+                    file.write(data)
+                    file.flush()
+                    now = time.monotonic()
+                    if self.fsync_policy == "batch" or (
+                            self.fsync_policy == "interval" and now - self._last_fsync >= self.fsync_interval):
+                        os.fsync(file.fileno())
+                        self._last_fsync = now
+                        self.stats["fsyncs"] += 1
+            self.stats["records"] += len(lines)
+            self.stats["batches"] += 1
+            self.stats["bytes_written"] += len(data)
+            logging.info(f"Committed {len(lines)} metrics record(s) to {self.file_path}")
+        except Exception as e:
+            logging.error(f"Error writing metrics batch: {e}")
+
+    def _worker(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = Ellipsis  # flush interval elapsed
+
+            if item is None or isinstance(item, threading.Event) or item is Ellipsis:
+                self._commit(batch)
+                batch, deadline = [], None
+                if item is None:
+                    return
+                if item is not Ellipsis:
+                    item.set()
+                continue
+
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+            if len(batch) >= self.batch_size:
+                self._commit(batch)
+                batch, deadline = [], None
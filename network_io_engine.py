@@ -0,0 +1,142 @@
+import logging
+import threading
+import time
+from collections import Counter
+
+import psutil
+
+from metrics.process_cache import process_cache
+
+
+class NetworkRateEngine:
+    """
+    Per-interface network rates from consecutive psutil.net_io_counters(pernic=True)
+    samples: bytes/s, packets/s, errors/s and drops/s, plus link utilization for
+    interfaces that report a speed. The first sample averages since boot.
+
+    Per-process socket counts from psutil.net_connections() are optional and rate
+    limited: walking every socket and mapping it to its owner is expensive, so the
+    result is cached and refreshed at most once every connection_interval seconds
+    (None or 0 disables it).
+    """
+
+    COUNTERS = ("bytes_sent", "bytes_recv", "packets_sent", "packets_recv", "errin", "errout", "dropin", "dropout")
+
+    def __init__(self, max_age=1.0, connection_interval=None, top_n=10, cache=None):
+        """
+        :param max_age: float - Seconds a sample is reused, so all collectors of one cycle share it.
+        :param connection_interval: float - Seconds between net_connections() walks (None or 0: disabled).
+        :param top_n: int - Processes listed by process_connections().
+        :param cache: ProcessCache - Source of process names for the socket counts (default: the shared process cache).
+        """
+        self.cache = cache or process_cache
+        self.max_age = max_age
+        self.connection_interval = connection_interval
+        self.top_n = top_n
+        self.lock = threading.Lock()
+        self._previous = None       # (per-NIC counters, monotonic time)
+        self._rates = None
+        self._sampled_at = 0.0
+        self._connections = None
+        self._connections_at = 0.0
+
+    def sample(self, max_age=None):
+        """
+        :return: dict - interval_seconds, since_boot, per-interface rates and the total over non-loopback interfaces.
+        """
+        max_age = self.max_age if max_age is None else max_age
+        with self.lock:
+            now = time.monotonic()
+            if self._rates is not None and now - self._sampled_at < max_age:
+                return self._rates
+
+            counters = psutil.net_io_counters(pernic=True) or {}
+            try:
+                stats = psutil.net_if_stats()
+            except OSError:
+                stats = {}
+            if self._previous is None:
+                previous_counters, elapsed, since_boot = {}, max(time.time() - psutil.boot_time(), 1e-6), True
+            else:
+                previous_counters, elapsed, since_boot = self._previous[0], max(now - self._previous[1], 1e-6), False
+
+            interfaces = {}
+            totals = Counter()
+            for name, nic in counters.items():
+                previous = previous_counters.get(name)
+                delta = {field: max(getattr(nic, field) - (getattr(previous, field) if previous else 0), 0)
+                         for field in self.COUNTERS}
+                nic_stats = stats.get(name)
+                speed_mbps = nic_stats.speed if nic_stats and nic_stats.speed else None
+                bits_per_sec = max(delta["bytes_sent"], delta["bytes_recv"]) * 8 / elapsed
+                interfaces[name] = {
+                    "is_up": nic_stats.isup if nic_stats else None,
+                    "speed_mbps": speed_mbps,
+                    "bytes_sent_per_sec": round(delta["bytes_sent"] / elapsed, 1),
+                    "bytes_recv_per_sec": round(delta["bytes_recv"] / elapsed, 1),
+                    "packets_sent_per_sec": round(delta["packets_sent"] / elapsed, 2),
+                    "packets_recv_per_sec": round(delta["packets_recv"] / elapsed, 2),
+                    "errors_per_sec": round((delta["errin"] + delta["errout"]) / elapsed, 3),
+                    "drops_per_sec": round((delta["dropin"] + delta["dropout"]) / elapsed, 3),
+                    # Busier direction against the link speed (full duplex)
+                    "utilization_percent": round(bits_per_sec / (speed_mbps * 1e6) * 100, 2) if speed_mbps else None
+                }
+                if not name.startswith("lo"):
+                    totals.update(delta)
+
+            self._previous = (counters, now)
+            self._rates = {
+                "interval_seconds": round(elapsed, 3),
+                "since_boot": since_boot,
+                "interfaces": interfaces,
+                "total": {
+                    "bytes_sent_per_sec": round(totals["bytes_sent"] / elapsed, 1),
+                    "bytes_recv_per_sec": round(totals["bytes_recv"] / elapsed, 1),
+                    "errors_per_sec": round((totals["errin"] + totals["errout"]) / elapsed, 3),
+                    "drops_per_sec": round((totals["dropin"] + totals["dropout"]) / elapsed, 3)
+                }
+            }
+            self._sampled_at = now
+            return self._rates
+
+    def process_connections(self):
+        """
+        Socket counts per process (total and by TCP state) for the top_n processes,
+        refreshed at most once every connection_interval seconds.
+
+        :return: dict - collected_at and processes, or None when disabled or unavailable.
+        """
+        if not self.connection_interval:
+            return None
+        with self.lock:
+            now = time.monotonic()
+            if self._connections is not None and now - self._connections_at < self.connection_interval:
+                return self._connections
+            try:
+                connections = psutil.net_connections(kind="inet")
+            except psutil.AccessDenied:
+                logging.warning("net_connections needs elevated privileges here; disabling per-process socket stats.")
+                self.connection_interval = None
+                return None
+
+            per_process = {}
+            for conn in connections:
+                if conn.pid is None:
+                    continue
+                per_process.setdefault(conn.pid, Counter())[conn.status] += 1
+
+            names = {proc["pid"]: proc["name"] for proc in self.cache.sample()}
+            ranked = sorted(per_process.items(), key=lambda item: sum(item[1].values()), reverse=True)
+            self._connections = {
+                "collected_at": time.time(),
+                "processes": [
+                    {"pid": pid, "name": names.get(pid), "connections": sum(states.values()), "by_state": dict(states)}
+                    for pid, states in ranked[:self.top_n]
+                ]
+            }
+            self._connections_at = now
+            return self._connections
+
+
+# Process-wide engine used by NetworkMetrics
+network_io_engine = NetworkRateEngine()
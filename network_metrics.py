@@ -1,12 +1,25 @@
-import psutil
-
-class NetworkMetrics:
-    @staticmethod
-    def get_metrics():
-        net_io = psutil.net_io_counters()
-        return {
-            "bytes_sent": net_io.bytes_sent,
-            "bytes_received": net_io.bytes_recv,
-            "packets_sent": net_io.packets_sent,
-            "packets_received": net_io.packets_recv,
-        }
+import psutil
+
+from metrics.network_io_engine import network_io_engine
+
+class NetworkMetrics:
+    @staticmethod
+    def get_metrics():
+        """
+        System-wide cumulative counters, per-interface rates since the previous
+        sample and, when enabled, cached per-process socket counts.
+
+        :return: dict - Network metrics.
+        """
+        net_io = psutil.net_io_counters()
+        rates = network_io_engine.sample()
+        return {
+            "bytes_sent": net_io.bytes_sent,
+            "bytes_received": net_io.bytes_recv,
+            "packets_sent": net_io.packets_sent,
+            "packets_received": net_io.packets_recv,
+            "interval_seconds": rates["interval_seconds"],
+            "interfaces": rates["interfaces"],
+            "total_rates": rates["total"],
+            "process_connections": network_io_engine.process_connections()
+        }
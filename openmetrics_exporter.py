@@ -0,0 +1,189 @@
+import math
+from datetime import datetime, timezone
+
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+
+class OpenMetricsExporter:
+    """
+    Render a collected snapshot as OpenMetrics text exposition.
+
+    Rendering happens once per collection cycle; scrapes only return the cached bytes.
+    Per-process series are limited to the top_n processes of each ranking so that
+    label cardinality stays bounded no matter how many processes are running.
+    """
+
+    PREFIX = "sysprof"
+
+    def __init__(self, top_n=10):
+        self.top_n = top_n
+
+    @staticmethod
+    def _escape(value):
+        return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+    @staticmethod
+    def _number(value):
+        if isinstance(value, bool):
+            return 1 if value else 0
+        if isinstance(value, (int, float)):
+            return value
+        return None
+
+    @classmethod
+    def _seconds(cls, milliseconds):
+        """Convert a millisecond reading, keeping a missing one missing rather than reporting 0."""
+        value = cls._number(milliseconds)
+        return None if value is None else value / 1000.0
+
+    @staticmethod
+    def _format(value):
+        """Python spells non-finite floats "inf"/"nan"; OpenMetrics wants "+Inf", "-Inf" and "NaN"."""
+        if isinstance(value, float) and not math.isfinite(value):
+            return "NaN" if math.isnan(value) else ("+Inf" if value > 0 else "-Inf")
+        return value
+
+    def _family(self, lines, name, metric_type, help_text, samples):
+        """
+        Append one metric family.
+
+        :param samples: list[(dict labels, value)] - Samples with non-numeric values are skipped.
+        """
+        samples = [(labels, self._number(value)) for labels, value in samples]
+        samples = [(labels, value) for labels, value in samples if value is not None]
+        if not samples:
+            return
+        full_name = f"{self.PREFIX}_{name}"
+        sample_name = f"{full_name}_total" if metric_type == "counter" else full_name
+        lines.append(f"# TYPE {full_name} {metric_type}")
+        lines.append(f"# HELP {full_name} {help_text}")
+        for labels, value in samples:
+            if labels:
+                label_text = ",".join(f'{key}="{self._escape(val)}"' for key, val in labels.items())
+                lines.append(f"{sample_name}{{{label_text}}} {self._format(value)}")
+            else:
+                lines.append(f"{sample_name} {self._format(value)}")
+
+    def render(self, snapshot):
+        """
+        :param snapshot: dict - A snapshot produced by MetricManager.collect_metrics.
+        :return: str - OpenMetrics text, terminated by "# EOF".
+        """
+        lines = []
+        cpu = snapshot.get("cpu_metrics") or {}
+        cpu_deep = snapshot.get("cpu_deep_metrics") or {}
+        memory = (snapshot.get("memory_deep_metrics") or {}).get("memory_usage") or {}
+        swap = (snapshot.get("memory_deep_metrics") or {}).get("swap_usage") or {}
+        disk = snapshot.get("disk_deep_metrics") or {}
+        disk_io = disk.get("disk_io") or {}
+        network = snapshot.get("network_metrics") or {}
+
+        # ---------- CPU ---------------------------------------------------------
+        self._family(lines, "cpu_usage_percent", "gauge", "System-wide CPU utilisation.",
+                     [({}, cpu.get("cpu_usage_percent"))])
+        self._family(lines, "cpu_core_usage_percent", "gauge", "Per-core CPU utilisation.",
+                     [({"core": core}, value) for core, value in enumerate(cpu_deep.get("cpu_usage_per_core") or [])])
+        self._family(lines, "cpu_frequency_mhz", "gauge", "Current CPU frequency.",
+                     [({}, (cpu_deep.get("cpu_frequency") or {}).get("current"))])
+        self._family(lines, "cpu_load_average", "gauge", "Load average.",
+                     [({"period": period}, value)
+                      for period, value in zip(("1m", "5m", "15m"), cpu_deep.get("cpu_load") or [])])
+        self._family(lines, "cpu_context_switches", "counter", "Context switches since boot.",
+                     [({}, cpu_deep.get("cpu_context_switches"))])
+        self._family(lines, "cpu_interrupts", "counter", "Hardware interrupts since boot.",
+                     [({}, cpu_deep.get("cpu_interrupts"))])
+
+        # ---------- Memory / swap -------------------------------------------------
+        self._family(lines, "memory_bytes", "gauge", "Physical memory by state.",
+                     [({"state": state}, memory.get(state))
+                      for state in ("total", "available", "used", "free", "active", "inactive")])
+        self._family(lines, "memory_usage_percent", "gauge", "Physical memory utilisation.",
+                     [({}, memory.get("percent"))])
+        self._family(lines, "swap_bytes", "gauge", "Swap space by state.",
+                     [({"state": state}, swap.get(state)) for state in ("total", "used", "free")])
+        self._family(lines, "swap_usage_percent", "gauge", "Swap utilisation.",
+                     [({}, swap.get("percent"))])
+        self._family(lines, "swap_io_bytes", "counter", "Bytes swapped in/out since boot.",
+                     [({"direction": "in"}, swap.get("sin")), ({"direction": "out"}, swap.get("sout"))])
+
+        pressure = snapshot.get("pressure_metrics") or {}
+        self._family(lines, "pressure_stall_percent", "gauge", "PSI: share of the last 10s tasks were stalled.",
+                     [({"resource": resource, "kind": kind}, values.get("avg10"))
+                      for resource, psi in (pressure.get("psi") or {}).items() if psi
+                      for kind, values in psi.items()])
+        vm_rates = pressure.get("vm_rates") or {}
+        self._family(lines, "page_faults_per_second", "gauge", "Page faults per second.",
+                     [({"kind": "minor"}, vm_rates.get("minor_faults_per_sec")),
+                      ({"kind": "major"}, vm_rates.get("major_faults_per_sec"))])
+
+        # ---------- Disk ------------------------------------------------------------
+        self._family(lines, "disk_io_operations", "counter", "Completed disk operations since boot.",
+                     [({"op": "read"}, disk_io.get("read_count")), ({"op": "write"}, disk_io.get("write_count"))])
+        self._family(lines, "disk_io_bytes", "counter", "Bytes transferred to/from disk since boot.",
+                     [({"op": "read"}, disk_io.get("read_bytes")), ({"op": "write"}, disk_io.get("write_bytes"))])
+        self._family(lines, "disk_io_time_seconds", "counter", "Time spent on disk I/O since boot.",
+                     [({"op": "read"}, self._seconds(disk_io.get("read_time_ms"))),
+                      ({"op": "write"}, self._seconds(disk_io.get("write_time_ms")))])
+        disk_rates = (disk.get("disk_io_rates") or {}).get("disks") or {}
+        self._family(lines, "disk_iops", "gauge", "Disk operations per second since the previous sample.",
+                     [({"disk": name, "op": op}, rates.get(f"{op}_iops"))
+                      for name, rates in disk_rates.items() for op in ("read", "write")])
+        self._family(lines, "disk_throughput_bytes_per_second", "gauge", "Disk throughput since the previous sample.",
+                     [({"disk": name, "op": op}, rates.get(f"{op}_bytes_per_sec"))
+                      for name, rates in disk_rates.items() for op in ("read", "write")])
+        self._family(lines, "disk_await_seconds", "gauge", "Average time per disk request since the previous sample.",
+                     [({"disk": name, "op": op}, self._seconds(rates.get(f"{op}_await_ms")))
+                      for name, rates in disk_rates.items() for op in ("read", "write")])
+        self._family(lines, "disk_utilization_percent", "gauge", "Share of time the disk was busy.",
+                     [({"disk": name}, rates.get("utilization_percent")) for name, rates in disk_rates.items()])
+        self._family(lines, "filesystem_usage_percent", "gauge", "Partition utilisation.",
+                     [({"device": part.get("device"), "mountpoint": part.get("mountpoint")}, part.get("percent"))
+                      for part in (disk.get("disk_partitions") or [])])
+
+        # ---------- Network ---------------------------------------------------------
+        self._family(lines, "network_bytes", "counter", "Network bytes since boot.",
+                     [({"direction": "sent"}, network.get("bytes_sent")),
+                      ({"direction": "received"}, network.get("bytes_received"))])
+        self._family(lines, "network_packets", "counter", "Network packets since boot.",
+                     [({"direction": "sent"}, network.get("packets_sent")),
+                      ({"direction": "received"}, network.get("packets_received"))])
+
+        interfaces = network.get("interfaces") or {}
+        self._family(lines, "network_interface_bytes_per_second", "gauge", "Per-interface throughput.",
+                     [({"interface": name, "direction": direction}, nic.get(f"bytes_{key}_per_sec"))
+                      for name, nic in interfaces.items() for direction, key in (("sent", "sent"), ("received", "recv"))])
+        self._family(lines, "network_interface_errors_per_second", "gauge", "Per-interface errors and drops.",
+                     [({"interface": name, "kind": kind}, nic.get(f"{kind}_per_sec"))
+                      for name, nic in interfaces.items() for kind in ("errors", "drops")])
+
+        # ---------- cgroups (containers / services) -----------------------------------
+        cgroups = (snapshot.get("cgroup_metrics") or {}).get("cgroups") or {}
+        self._family(lines, "cgroup_cpu_percent", "gauge", "CPU used by the cgroup (100 = one core).",
+                     [({"cgroup": path}, cgroup.get("cpu_percent")) for path, cgroup in cgroups.items()])
+        self._family(lines, "cgroup_cpu_throttled_periods_percent", "gauge",
+                     "Share of CFS periods in which the cgroup was throttled.",
+                     [({"cgroup": path}, cgroup.get("throttled_periods_percent")) for path, cgroup in cgroups.items()])
+        self._family(lines, "cgroup_memory_bytes", "gauge", "cgroup memory usage and limit.",
+                     [({"cgroup": path, "state": state}, cgroup.get(f"memory_{state}"))
+                      for path, cgroup in cgroups.items() for state in ("current", "max")])
+
+        # ---------- Top processes (bounded cardinality) ---------------------------
+        top_cpu = (cpu_deep.get("top_cpu_processes") or [])[:self.top_n]
+        self._family(lines, "process_cpu_percent", "gauge", "CPU usage of the top processes.",
+                     [({"pid": proc.get("pid"), "name": proc.get("name")}, proc.get("cpu_percent"))
+                      for proc in top_cpu])
+        top_memory = ((snapshot.get("memory_deep_metrics") or {}).get("top_memory_processes") or [])[:self.top_n]
+        self._family(lines, "process_memory_percent", "gauge", "Memory usage of the top processes.",
+                     [({"pid": proc.get("pid"), "name": proc.get("name")}, proc.get("memory_percent"))
+                      for proc in top_memory])
+
+        # ---------- Collection metadata -----------------------------------------------
+        timestamp = snapshot.get("timestamp")
+        if timestamp:
+            collected_at = datetime.fromisoformat(timestamp.rstrip("Z")).replace(tzinfo=timezone.utc).timestamp()
+            self._family(lines, "collection_timestamp_seconds", "gauge",
+                         "Time the snapshot was collected.", [({}, collected_at)])
+
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,125 @@
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+from metrics.process_cache import process_cache
+
+
+class PressureMetrics:
+    """
+    Resource-pressure collector: Linux PSI stall times, page-fault and swap rates.
+
+    /proc/pressure/{cpu,memory,io} report the share of wall time in which some (or
+    all) runnable tasks were stalled waiting for the resource. Besides the kernel's
+    avg10/avg60/avg300, the stall percentage since the previous sample is derived
+    from the cumulative `total` (microseconds).
+
+    /proc/vmstat gives system-wide minor/major fault, swap and direct-reclaim rates;
+    per-process minor/major fault rates come from the shared process cache, which
+    reads them with the CPU times of each process, keyed by (pid, create_time).
+    """
+
+    RESOURCES = ("cpu", "memory", "io")
+    VMSTAT_KEYS = ("pgfault", "pgmajfault", "pswpin", "pswpout", "pgscan_direct", "allocstall_normal",
+                   "allocstall_movable", "oom_kill")
+
+    def __init__(self, proc_root="/proc", top_n=5, cache=None):
+        """
+        :param proc_root: str - procfs mount point (tests may point it at a fake tree).
+        :param cache: ProcessCache - Source of per-process fault rates (default: the shared process cache).
+        """
+        self.proc_root = proc_root
+        self.top_n = top_n
+        self.cache = cache or process_cache
+        self.lock = threading.Lock()
+        self.available = sys.platform.startswith("linux") and os.path.isdir(proc_root)
+        self._previous = None           # (psi totals, vmstat, monotonic time)
+
+    def _read_psi(self, resource):
+        """:return: dict - {"some": {...}, "full": {...}} or None where PSI is not supported."""
+        try:
+            with open(os.path.join(self.proc_root, "pressure", resource), "rb") as file:
+                data = file.read().decode()
+        except OSError:
+            return None
+        psi = {}
+        for line in data.splitlines():
+            kind, *fields = line.split()
+            values = dict(field.split("=", 1) for field in fields)
+            psi[kind] = {key: (int(value) if key == "total" else float(value)) for key, value in values.items()}
+        return psi
+
+    def _read_vmstat(self):
+        values = {}
+        with open(os.path.join(self.proc_root, "vmstat"), "rb") as file:
+            for line in file:
+                key, _, value = line.decode().partition(" ")
+                if key in self.VMSTAT_KEYS:
+                    values[key] = int(value)
+        return values
+
+    def _process_faults(self):
+        faults = [{
+            "pid": record["pid"],
+            "name": record["name"],
+            "minor_faults_per_sec": round(record["minor_faults_per_sec"], 2),
+            "major_faults_per_sec": round(record["major_faults_per_sec"], 2)
+        } for record in self.cache.sample() if record.get("major_faults_per_sec") is not None]
+        faults.sort(key=lambda proc: (proc["major_faults_per_sec"], proc["minor_faults_per_sec"]), reverse=True)
+        return faults[:self.top_n]
+
+    def get_metrics(self):
+        """
+        :return: dict - PSI per resource with stall percentages, fault/swap rates and top faulting processes.
+        """
+        if not self.available:
+            return {"available": False}
+        try:
+            with self.lock:
+                now = time.monotonic()
+                psi = {resource: self._read_psi(resource) for resource in self.RESOURCES}
+                vmstat = self._read_vmstat()
+                previous = self._previous
+                self._previous = (psi, vmstat, now)
+
+                rates = {}
+                if previous is not None and now > previous[2]:
+                    elapsed = now - previous[2]
+                    for resource, values in psi.items():
+                        before = previous[0].get(resource)
+                        if values is None or before is None:
+                            continue
+                        for kind, stats in values.items():
+                            if kind in before:
+                                # total is cumulative stall time in microseconds
+                                stats["stall_percent"] = round(
+                                    (stats["total"] - before[kind]["total"]) / (elapsed * 1e6) * 100, 2)
+                    delta = {key: vmstat.get(key, 0) - previous[1].get(key, 0) for key in self.VMSTAT_KEYS}
+                    rates = {
+                        "minor_faults_per_sec": round((delta["pgfault"] - delta["pgmajfault"]) / elapsed, 2),
+                        "major_faults_per_sec": round(delta["pgmajfault"] / elapsed, 2),
+                        "swap_in_pages_per_sec": round(delta["pswpin"] / elapsed, 2),
+                        "swap_out_pages_per_sec": round(delta["pswpout"] / elapsed, 2),
+                        "direct_scan_pages_per_sec": round(delta["pgscan_direct"] / elapsed, 2),
+                        "allocation_stalls_per_sec": round(
+                            (delta["allocstall_normal"] + delta["allocstall_movable"]) / elapsed, 2),
+                        "oom_kills": delta["oom_kill"]
+                    }
+                top_faulting = self._process_faults()
+
+            return {
+                "available": True,
+                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "psi": psi,
+                "vm_rates": rates,
+                "top_faulting_processes": top_faulting
+            }
+        except Exception as e:
+            print(f"Error collecting pressure metrics: {e}")
+            return {"error": "Failed to collect pressure metrics."}
+
+
+# Process-wide collector (keeps the previous sample between cycles)
+pressure_metrics = PressureMetrics()
@@ -0,0 +1,186 @@
+import os
+import sys
+import threading
+import time
+
+import psutil
+
+
+class ProcessCache:
+    """
+    Process table cache shared by the collectors across cycles.
+
+    Entries are keyed by (pid, create_time), so a recycled PID is treated as a new
+    process. Each entry keeps its psutil.Process object and the static attributes
+    (name, cmdline, exe, username), which are fetched once when the process is first
+    seen. sample() reads the dynamic attributes of every live process in one pass
+    and evicts processes that have exited.
+
+    CPU percent, I/O bytes per second and page faults per second are computed from
+    the counters consumed since the previous sample, so no sleep is needed; a process
+    seen for the first time reports its average since it started instead of psutil's
+    meaningless first 0.0. On Linux one /proc/<pid>/stat read per process gives both
+    the CPU times and the minor/major fault counters.
+    """
+
+    STATIC_ATTRS = ("name", "cmdline", "exe", "username")
+    DYNAMIC_ATTRS = ("cpu_times", "memory_info", "num_threads", "io_counters")
+
+    def __init__(self, max_age=1.0, proc_root="/proc"):
+        """
+        :param max_age: float - Seconds a sample is reused, so all collectors of one cycle share it.
+        :param proc_root: str - procfs mount point the per-process stat files are read from (Linux).
+        """
+        self.max_age = max_age
+        self.proc_root = proc_root
+        self._proc_stat = sys.platform.startswith("linux") and os.path.isdir(proc_root)
+        self._clock_ticks = os.sysconf("SC_CLK_TCK") if self._proc_stat else None
+        self._dynamic_attrs = tuple(attr for attr in self.DYNAMIC_ATTRS
+                                    if not (self._proc_stat and attr == "cpu_times"))
+        self.lock = threading.Lock()
+        self._entries = {}  # (pid, create_time) -> entry
+        self._by_pid = {}
+        self._records = None
+        self._sampled_at = 0.0
+        self.stats = {"samples": 0, "hits": 0, "misses": 0, "evictions": 0}
+
+    def _admit(self, pid):
+        process = psutil.Process(pid)
+        static = process.as_dict(self.STATIC_ATTRS, ad_value=None)
+        return {
+            "key": (pid, process.create_time()),
+            "process": process,
+            "static": static,
+            "cpu_time": None,
+            "io_bytes": None,
+            "faults": None,
+            "sampled_at": None
+        }
+
+    def _read_stat(self, pid):
+        """:return: (CPU seconds, minor faults, major faults) from /proc/<pid>/stat, or None."""
+        try:
+            with open(f"{self.proc_root}/{pid}/stat", "rb") as file:
+                data = file.read()
+            # Fields after "(comm) ": state, ... minflt (8th), majflt (10th), utime (12th), stime (13th)
+            fields = data[data.rindex(b")") + 2:].split()
+            return (int(fields[11]) + int(fields[12])) / self._clock_ticks, int(fields[7]), int(fields[9])
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def sample(self, max_age=None):
+        """
+        Return one record per live process. Records are shared between callers and
+        must be treated as read-only.
+
+        :param max_age: float - Override of the reuse window for this call.
+        :return: list[dict] - pid, name, cmdline, exe, username, create_time, cpu_percent,
+                 memory_info, rss, memory_percent, num_threads, io_bytes_per_sec,
+                 io_read_bytes_per_sec, io_write_bytes_per_sec, minor_faults_per_sec,
+                 major_faults_per_sec (None off Linux).
+        """
+        max_age = self.max_age if max_age is None else max_age
+        with self.lock:
+            now = time.monotonic()
+            if self._records is not None and now - self._sampled_at < max_age:
+                return self._records
+
+            wall_now = time.time()
+            total_memory = psutil.virtual_memory().total
+            live = {}
+            records = []
+            for pid in psutil.pids():
+                entry = self._entries.get(self._by_pid.get(pid))
+                try:
+                    if entry is not None and not entry["process"].is_running():
+                        entry = None  # PID was recycled
+                    if entry is None:
+                        entry = self._admit(pid)
+                        self.stats["misses"] += 1
+                    else:
+                        self.stats["hits"] += 1
+                    process = entry["process"]
+                    dynamic = process.as_dict(self._dynamic_attrs, ad_value=None)
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+
+                # Rates since the previous sample, or since the process started on first sight
+                if entry["sampled_at"] is None:
+                    elapsed = wall_now - entry["key"][1]
+                    previous_cpu, previous_io, previous_faults = 0.0, (0, 0), (0, 0)
+                else:
+                    elapsed = now - entry["sampled_at"]
+                    previous_cpu, previous_io, previous_faults = entry["cpu_time"], entry["io_bytes"], entry["faults"]
+
+                cpu_time = minor_rate = major_rate = None
+                if self._proc_stat:
+                    stat = self._read_stat(pid)
+                    if stat is not None:
+                        cpu_time, minor, major = stat
+                        if previous_faults is not None and elapsed > 0:
+                            minor_rate = max(minor - previous_faults[0], 0) / elapsed
+                            major_rate = max(major - previous_faults[1], 0) / elapsed
+                        entry["faults"] = (minor, major)
+                elif dynamic["cpu_times"] is not None:
+                    cpu_time = dynamic["cpu_times"].user + dynamic["cpu_times"].system
+
+                cpu_percent = None
+                if cpu_time is not None:
+                    if previous_cpu is not None:
+                        cpu_percent = round((cpu_time - previous_cpu) / elapsed * 100, 1) if elapsed > 0 else 0.0
+                    entry["cpu_time"] = cpu_time
+
+                io_read_rate = io_write_rate = None
+                io_counters = dynamic["io_counters"]
+                if io_counters is not None:
+                    io_bytes = (io_counters.read_bytes, io_counters.write_bytes)
+                    if previous_io is not None and elapsed > 0:
+                        io_read_rate = max(io_bytes[0] - previous_io[0], 0) / elapsed
+                        io_write_rate = max(io_bytes[1] - previous_io[1], 0) / elapsed
+                    entry["io_bytes"] = io_bytes
+                entry["sampled_at"] = now
+
+                memory_info = dynamic["memory_info"]
+                live[entry["key"]] = entry
+                records.append({
+                    "pid": pid,
+                    **entry["static"],
+                    "create_time": entry["key"][1],
+                    "cpu_percent": cpu_percent,
+                    "memory_info": memory_info,
+                    "rss": memory_info.rss if memory_info is not None else None,
+                    "memory_percent": memory_info.rss / total_memory * 100 if memory_info is not None else None,
+                    "num_threads": dynamic["num_threads"],
+                    "io_bytes_per_sec": io_read_rate + io_write_rate if io_read_rate is not None else None,
+                    "io_read_bytes_per_sec": io_read_rate,
+                    "io_write_bytes_per_sec": io_write_rate,
+                    "minor_faults_per_sec": minor_rate,
+                    "major_faults_per_sec": major_rate
+                })
+
+            self.stats["evictions"] += sum(1 for key in self._entries if key not in live)
+            self.stats["samples"] += 1
+            self._entries = live
+            self._by_pid = {key[0]: key for key in live}
+            self._records = records
+            self._sampled_at = now
+            return records
+
+    def process(self, pid):
+        """:return: psutil.Process - The cached Process object for pid, or None if not cached."""
+        with self.lock:
+            entry = self._entries.get(self._by_pid.get(pid))
+            return entry["process"] if entry is not None else None
+
+    def top(self, key, n=5, max_age=None):
+        """:return: list[dict] - The n records with the largest value of `key`."""
+        records = [record for record in self.sample(max_age) if record[key] is not None]
+        return sorted(records, key=lambda record: record[key], reverse=True)[:n]
+
+    def snapshot_stats(self):
+        with self.lock:
+            return {**self.stats, "cached_processes": len(self._entries)}
+
+
+# Process-wide cache shared by all collectors
+process_cache = ProcessCache()
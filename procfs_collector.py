@@ -0,0 +1,405 @@
+"""
+Linux fast-path collector that reads /proc directly.
+
+Fills the cpu_metrics, cpu_deep_metrics, memory_deep_metrics, network_metrics and
+disk_deep_metrics sections of the snapshot with the same schema as the psutil
+collectors, using one batched pass over /proc per cycle. System files stay open and
+are re-read into a reused buffer; per-process data comes from a single
+/proc/<pid>/stat read each.
+
+Select it with MetricManager(collector_backend="procfs") (COLLECTOR_BACKEND=procfs).
+Benchmark against the psutil backend with:
+
+    python -m metrics.procfs_collector --bench 20
+"""
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+import psutil
+
+from metrics.disk_metrics_deep import DiskDeepMetrics
+from metrics.network_io_engine import network_io_engine
+
+
+class ProcfsCollector:
+    # /proc/stat cpu fields: user nice system idle iowait irq softirq steal (guest* are part of user)
+    _CPU_FIELDS = 8
+
+    def __init__(self, proc_root="/proc", top_n=5, critical_memory_threshold=1.0, min_process_interval=1.0,
+                 sys_root="/sys"):
+        self.proc_root = proc_root
+        self.sys_root = sys_root  # /sys/block tells whole disks from partitions
+        self.top_n = top_n
+        self.critical_memory_threshold = critical_memory_threshold
+        self.min_process_interval = min_process_interval
+        self.lock = threading.Lock()
+        # Sections run on different threads (async engine, snapshot cache refreshes): the open
+        # descriptors and the buffer they are read into are used under this lock only
+        self._read_lock = threading.Lock()
+        self._buffer = bytearray(64 * 1024)
+        self._files = {}
+        self._clock_ticks = os.sysconf("SC_CLK_TCK")
+        self._page_size = os.sysconf("SC_PAGE_SIZE")
+        self._storage_devices = None
+        self._prev_cpu = {}          # caller -> (total times, per-core times)
+        self._prev_processes = {}    # (pid, starttime) -> (cpu ticks, monotonic time)
+        self._process_table = None
+        self._process_table_time = 0.0
+
+    # ---------- Low-level reads ---------------------------------------------------
+
+    def _read(self, name):
+        """Re-read a system file into the shared buffer, keeping its descriptor open."""
+        with self._read_lock:
+            file = self._files.get(name)
+            if file is None:
+                file = self._files[name] = open(os.path.join(self.proc_root, name), "rb", buffering=0)
+            while True:
+                file.seek(0)
+                size = file.readinto(self._buffer)
+                if size < len(self._buffer):
+                    return bytes(self._buffer[:size])
+                self._buffer = bytearray(len(self._buffer) * 2)
+
+    @staticmethod
+    def _read_once(path):
+        with open(path, "rb", buffering=0) as file:
+            return file.read()
+
+    def close(self):
+        with self._read_lock:
+            for file in self._files.values():
+                file.close()
+            self._files = {}
+
+    # ---------- System-wide parsers -------------------------------------------------
+
+    def read_stat(self):
+        """
+        :return: dict - total and per-core cpu tick tuples, context switches, interrupts.
+        """
+        stat = {"cpu": None, "cores": [], "ctxt": 0, "intr": 0}
+        for line in self._read("stat").split(b"\n"):
+            if line.startswith(b"cpu"):
+                label, _, values = line.partition(b" ")
+                ticks = tuple(int(value) for value in values.split()[:self._CPU_FIELDS])
+                if label == b"cpu":
+                    stat["cpu"] = ticks
+                else:
+                    stat["cores"].append(ticks)
+            elif line.startswith(b"ctxt "):
+                stat["ctxt"] = int(line[5:])
+            elif line.startswith(b"intr "):
+                stat["intr"] = int(line[5:].split(b" ", 1)[0])
+        return stat
+
+    def read_meminfo(self):
+        """:return: dict - /proc/meminfo values in bytes."""
+        info = {}
+        for line in self._read("meminfo").split(b"\n"):
+            key, _, value = line.partition(b":")
+            if value:
+                fields = value.split()
+                info[key.decode()] = int(fields[0]) * (1024 if len(fields) > 1 else 1)
+        return info
+
+    def read_vmstat(self, keys=(b"pswpin", b"pswpout", b"pgfault", b"pgmajfault")):
+        values = {}
+        for line in self._read("vmstat").split(b"\n"):
+            key, _, value = line.partition(b" ")
+            if key in keys:
+                values[key.decode()] = int(value)
+        return values
+
+    def read_loadavg(self):
+        return tuple(float(value) for value in self._read("loadavg").split()[:3])
+
+    def read_net_dev(self):
+        """:return: dict - interface -> (bytes_recv, packets_recv, bytes_sent, packets_sent)."""
+        interfaces = {}
+        for line in self._read("net/dev").split(b"\n")[2:]:
+            name, _, values = line.partition(b":")
+            if not values:
+                continue
+            fields = values.split()
+            interfaces[name.strip().decode()] = (int(fields[0]), int(fields[1]), int(fields[8]), int(fields[9]))
+        return interfaces
+
+    def read_diskstats(self):
+        """
+        :return: dict - whole-disk name -> (reads, read_bytes, read_ms, writes, write_bytes, write_ms, busy_ms).
+        Partitions are skipped so totals match psutil.disk_io_counters().
+        """
+        if self._storage_devices is None:
+            try:
+                self._storage_devices = set(os.listdir(os.path.join(self.sys_root, "block")))
+            except OSError:
+                self._storage_devices = set()
+        disks = {}
+        for line in self._read("diskstats").split(b"\n"):
+            fields = line.split()
+            if len(fields) < 14:
+                continue
+            name = fields[2].decode()
+            if self._storage_devices and name not in self._storage_devices:
+                continue
+            disks[name] = (int(fields[3]), int(fields[5]) * 512, int(fields[6]),
+                           int(fields[7]), int(fields[9]) * 512, int(fields[10]), int(fields[12]))
+        return disks
+
+    # ---------- Per-process pass -------------------------------------------------------
+
+    def _parse_pid_stat(self, data):
+        # comm may contain spaces and parentheses: split around the last ')'
+        open_paren = data.index(b"(")
+        close_paren = data.rindex(b")")
+        fields = data[close_paren + 2:].split()
+        # fields[0] is state (field 3); utime=14, stime=15, starttime=22, rss=24 (1-based)
+        return (data[open_paren + 1:close_paren].decode(errors="replace"),
+                int(fields[11]) + int(fields[12]), int(fields[19]), int(fields[21]))
+
+    def sample_processes(self):
+        """
+        Read /proc/<pid>/stat for every process once and compute CPU% from the
+        previous sample. Results are shared by all sections of the same cycle.
+
+        :return: list[dict] - pid, name, cpu_percent, rss, memory_percent.
+        """
+        with self.lock:
+            now = time.monotonic()
+            if self._process_table is not None and now - self._process_table_time < self.min_process_interval:
+                return self._process_table
+
+            total_memory = self.read_meminfo().get("MemTotal", 1)
+            boot_uptime = float(self._read("uptime").split()[0])
+            processes = []
+            current = {}
+            for entry in os.listdir(self.proc_root):
+                if not entry.isdigit():
+                    continue
+                try:
+                    name, cpu_ticks, start_ticks, rss_pages = self._parse_pid_stat(
+                        self._read_once(f"{self.proc_root}/{entry}/stat"))
+                except (OSError, ValueError, IndexError):
+                    continue  # process exited or is unreadable
+                pid = int(entry)
+                key = (pid, start_ticks)
+                previous = self._prev_processes.get(key)
+                if previous is not None:
+                    elapsed = now - previous[1]
+                    cpu_seconds = (cpu_ticks - previous[0]) / self._clock_ticks
+                else:
+                    # First sight: average since the process started
+                    elapsed = boot_uptime - start_ticks / self._clock_ticks
+                    cpu_seconds = cpu_ticks / self._clock_ticks
+                current[key] = (cpu_ticks, now)
+                rss = rss_pages * self._page_size
+                processes.append({
+                    "pid": pid,
+                    "name": name,
+                    "cpu_percent": round(cpu_seconds / elapsed * 100, 1) if elapsed > 0 else 0.0,
+                    "rss": rss,
+                    "memory_percent": rss / total_memory * 100
+                })
+
+            self._prev_processes = current
+            self._process_table = processes
+            self._process_table_time = now
+            return processes
+
+    # ---------- Helpers ---------------------------------------------------------------
+
+    @staticmethod
+    def _busy_percent(previous, current):
+        if previous is None:
+            previous = (0,) * len(current)
+        deltas = [now - before for now, before in zip(current, previous)]
+        total = sum(deltas)
+        if total <= 0:
+            return 0.0
+        idle = deltas[3] + deltas[4]
+        return round((total - idle) / total * 100, 1)
+
+    def _cpu_percents(self, caller):
+        """Total and per-core usage since the previous call by the same caller (non-blocking)."""
+        stat = self.read_stat()
+        with self.lock:
+            previous_total, previous_cores = self._prev_cpu.get(caller, (None, []))
+            self._prev_cpu[caller] = (stat["cpu"], stat["cores"])
+        per_core = [self._busy_percent(previous_cores[i] if i < len(previous_cores) else None, core)
+                    for i, core in enumerate(stat["cores"])]
+        return self._busy_percent(previous_total, stat["cpu"]), per_core, stat
+
+    # ---------- Snapshot sections (same schema as the psutil collectors) ----------------------
+
+    def cpu_metrics(self):
+        usage, per_core, _ = self._cpu_percents("cpu_metrics")
+        critical_processes = [
+            {"pid": proc["pid"], "name": proc["name"], "cpu_percent": proc["cpu_percent"],
+             "memory_percent": proc["memory_percent"]}
+            for proc in self.sample_processes() if proc["memory_percent"] > self.critical_memory_threshold
+        ]
+        cpu_freq = psutil.cpu_freq()
+        return {
+            "cpu_usage_percent": usage,
+            "cpu_count": len(per_core),
+            "cpu_frequency": cpu_freq.current if cpu_freq else None,
+            "critical_processes": critical_processes,
+            "top_process_cpu_percent": max((proc["cpu_percent"] for proc in critical_processes), default=0.0)
+        }
+
+    def cpu_deep_metrics(self):
+        try:
+            _, per_core, stat = self._cpu_percents("cpu_deep_metrics")
+            cpu_freq = psutil.cpu_freq()
+            processes = sorted(self.sample_processes(), key=lambda proc: proc["cpu_percent"], reverse=True)
+            return {
+                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "cpu_usage_per_core": per_core,
+                "cpu_frequency": {
+                    "current": cpu_freq.current if cpu_freq else None,
+                    "min": cpu_freq.min if cpu_freq else None,
+                    "max": cpu_freq.max if cpu_freq else None
+                },
+                "cpu_load": self.read_loadavg(),
+                "cpu_context_switches": stat["ctxt"],
+                "cpu_interrupts": stat["intr"],
+                "top_cpu_processes": [
+                    {"pid": proc["pid"], "name": proc["name"], "cpu_percent": proc["cpu_percent"]}
+                    for proc in processes[:self.top_n]
+                ]
+            }
+        except Exception as e:
+            print(f"Error collecting CPU deep metrics: {e}")
+            return {"error": "Failed to collect deep CPU metrics."}
+
+    def memory_deep_metrics(self):
+        try:
+            info = self.read_meminfo()
+            vmstat = self.read_vmstat()
+            total = info.get("MemTotal", 0)
+            free = info.get("MemFree", 0)
+            buffers = info.get("Buffers", 0)
+            cached = info.get("Cached", 0) + info.get("SReclaimable", 0)
+            available = info.get("MemAvailable", free + buffers + cached)
+            used = max(total - available, 0)  # matches psutil >= 6
+            percent = round((total - available) / total * 100, 1) if total else 0.0
+            memory_stats = {
+                "total": total, "available": available, "percent": percent, "used": used, "free": free,
+                "active": info.get("Active", 0), "inactive": info.get("Inactive", 0), "buffers": buffers,
+                "cached": cached, "shared": info.get("Shmem", 0), "slab": info.get("Slab", 0)
+            }
+            swap_total = info.get("SwapTotal", 0)
+            swap_free = info.get("SwapFree", 0)
+            swap_used = swap_total - swap_free
+            processes = sorted(self.sample_processes(), key=lambda proc: proc["rss"], reverse=True)
+            return {
+                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "memory_usage": {key: memory_stats[key]
+                                 for key in ("total", "available", "used", "free", "percent", "active", "inactive")},
+                "swap_usage": {
+                    "total": swap_total,
+                    "used": swap_used,
+                    "free": swap_free,
+                    "percent": round(swap_used / swap_total * 100, 1) if swap_total else 0.0,
+                    "sin": vmstat.get("pswpin", 0) * self._page_size,
+                    "sout": vmstat.get("pswpout", 0) * self._page_size
+                },
+                "memory_stats": memory_stats,
+                "top_memory_processes": [
+                    {"pid": proc["pid"], "name": proc["name"], "memory_percent": proc["memory_percent"]}
+                    for proc in processes[:self.top_n]
+                ]
+            }
+        except Exception as e:
+            print(f"Error collecting memory deep metrics: {e}")
+            return {"error": "Failed to collect deep memory metrics."}
+
+    def network_metrics(self):
+        totals = [sum(values) for values in zip(*self.read_net_dev().values())] or [0, 0, 0, 0]
+        rates = network_io_engine.sample()
+        return {
+            "bytes_sent": totals[2],
+            "bytes_received": totals[0],
+            "packets_sent": totals[3],
+            "packets_received": totals[1],
+            "interval_seconds": rates["interval_seconds"],
+            "interfaces": rates["interfaces"],
+            "total_rates": rates["total"],
+            "process_connections": network_io_engine.process_connections()
+        }
+
+    def disk_io_counters(self):
+        """:return: dict - Whole-disk I/O totals from /proc/diskstats, as DiskDeepMetrics reports them."""
+        totals = [sum(values) for values in zip(*self.read_diskstats().values())] or [0] * 7
+        return {
+            "read_count": totals[0],
+            "write_count": totals[3],
+            "read_bytes": totals[1],
+            "write_bytes": totals[4],
+            "read_time_ms": totals[2],
+            "write_time_ms": totals[5]
+        }
+
+    def disk_deep_metrics(self):
+        # Usage and partitions need statvfs and the mount table, so they still come from psutil
+        return DiskDeepMetrics.get_metrics(disk_io_info=self.disk_io_counters())
+
+    def collectors(self):
+        """:return: dict - Snapshot section -> collector, to overlay on MetricManager.collectors."""
+        return {
+            "cpu_metrics": self.cpu_metrics,
+            "cpu_deep_metrics": self.cpu_deep_metrics,
+            "memory_deep_metrics": self.memory_deep_metrics,
+            "network_metrics": self.network_metrics,
+            "disk_deep_metrics": self.disk_deep_metrics
+        }
+
+
+def benchmark(rounds=20):
+    """
+    Time each section with the psutil collectors and with the /proc backend.
+
+    :return: dict - section -> {"psutil_ms", "procfs_ms", "speedup"} (mean per call).
+    """
+    import functools
+    from metrics.cpu_metrics import CPUMetrics
+    from metrics.cpu_metrics_deep import CpuDeepMetrics
+    from metrics.memory_metrics_deep import MemoryDeepMetrics
+    from metrics.network_metrics import NetworkMetrics
+
+    procfs = ProcfsCollector(min_process_interval=0)
+    backends = {
+        "cpu_metrics": (functools.partial(CPUMetrics.get_metrics, cpu_interval=None), procfs.cpu_metrics),
+        "cpu_deep_metrics": (CpuDeepMetrics.get_metrics, procfs.cpu_deep_metrics),
+        "memory_deep_metrics": (MemoryDeepMetrics.get_metrics, procfs.memory_deep_metrics),
+        "network_metrics": (NetworkMetrics.get_metrics, procfs.network_metrics),
+        "disk_deep_metrics": (DiskDeepMetrics.get_metrics, procfs.disk_deep_metrics)
+    }
+    results = {}
+    for section, (psutil_collector, procfs_collector) in backends.items():
+        timings = []
+        for collector in (psutil_collector, procfs_collector):
+            collector()  # warm up
+            start = time.perf_counter()
+            for _ in range(rounds):
+                collector()
+            timings.append((time.perf_counter() - start) / rounds * 1000)
+        results[section] = {
+            "psutil_ms": round(timings[0], 3),
+            "procfs_ms": round(timings[1], 3),
+            "speedup": round(timings[0] / timings[1], 2) if timings[1] else None
+        }
+    procfs.close()
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--bench":
+        rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+        for section, result in benchmark(rounds).items():
+            print(f"{section:22s} psutil {result['psutil_ms']:9.3f} ms   procfs {result['procfs_ms']:9.3f} ms"
+                  f"   x{result['speedup']}")
@@ -0,0 +1,237 @@
+import logging
+import os
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import psutil
+
+
+class SamplingProfiler:
+    """
+    Continuous sampling profiler built on `py-spy record`.
+
+    Each session attaches to a set of PIDs at a fixed sampling rate for a bounded
+    duration. Samples are recorded in short windows so the folded stacks can be
+    merged into the in-memory aggregate while the session is still running.
+    stop() interrupts the running window, so the session ends within poll_interval
+    seconds plus the time py-spy needs to write out what it has sampled.
+    """
+
+    POLL_INTERVAL = 0.2
+    INTERRUPT_GRACE = 5
+
+    def __init__(self, py_spy_path="py-spy", max_duration=300, max_rate_hz=1000, window_seconds=5):
+        self.py_spy_path = py_spy_path
+        self.max_duration = max_duration
+        self.max_rate_hz = max_rate_hz
+        self.window_seconds = window_seconds
+        self.lock = threading.Lock()
+        self._stacks = {}          # pid -> Counter of folded stack -> sample count
+        self._process_names = {}   # pid -> process name
+        self._errors = {}          # pid -> last error message
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._session = None
+
+    def start(self, pids, rate_hz=100, duration=30):
+        """
+        Start a profiling session in the background.
+
+        :param pids: list[int] - Processes to attach to.
+        :param rate_hz: int - Samples per second (clamped to max_rate_hz).
+        :param duration: float - Session length in seconds (clamped to max_duration).
+        :return: dict - The session description.
+        """
+        pids = [int(pid) for pid in pids if psutil.pid_exists(int(pid))]
+        if not pids:
+            raise ValueError("No running processes to profile.")
+
+        rate_hz = max(1, min(int(rate_hz), self.max_rate_hz))
+        duration = max(1.0, min(float(duration), self.max_duration))
+
+        with self.lock:
+            if self.is_running():
+                raise RuntimeError("A profiling session is already running.")
+            self._stacks = {pid: Counter() for pid in pids}
+            self._process_names = {pid: self._process_name(pid) for pid in pids}
+            self._errors = {}
+            self._stop_event.clear()
+            self._session = {
+                "pids": pids,
+                "rate_hz": rate_hz,
+                "duration": duration,
+                "started_at": datetime.utcnow().isoformat() + "Z",
+                "finished_at": None
+            }
+            self._thread = threading.Thread(target=self._run, args=(pids, rate_hz, duration), daemon=True)
+            self._thread.start()
+
+        logging.info(f"Started sampling profiler on PIDs {pids} at {rate_hz} Hz for {duration}s.")
+        return dict(self._session)
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def status(self):
+        with self.lock:
+            return {
+                "running": self.is_running(),
+                "session": dict(self._session) if self._session else None,
+                "samples": {pid: sum(stacks.values()) for pid, stacks in self._stacks.items()},
+                "errors": dict(self._errors)
+            }
+
+    def _run(self, pids, rate_hz, duration):
+        deadline = time.monotonic() + duration
+        while not self._stop_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining < 0.5:
+                break
+            window = max(1, round(min(self.window_seconds, remaining)))
+            workers = [
+                threading.Thread(target=self._record_window, args=(pid, rate_hz, window), daemon=True)
+                for pid in pids
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            pids = [pid for pid in pids if psutil.pid_exists(pid)]
+            if not pids:
+                break
+
+        with self.lock:
+            self._session["finished_at"] = datetime.utcnow().isoformat() + "Z"
+        logging.info("Sampling profiler session finished.")
+
+    def _record_window(self, pid, rate_hz, window):
+        fd, output_path = tempfile.mkstemp(prefix=f"pyspy_{pid}_", suffix=".txt")
+        os.close(fd)
+        try:
+            process = subprocess.Popen(
+                [self.py_spy_path, "record", "--pid", str(pid), "--rate", str(rate_hz),
+                 "--duration", str(window), "--format", "raw", "--output", output_path,
+                 "--nonblocking", "--threads"],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE
+            )
+            interrupted, stderr = self._wait_window(process, window + 30)
+            if process.returncode != 0 and not interrupted:
+                raise subprocess.CalledProcessError(process.returncode, process.args, stderr=stderr)
+            with open(output_path, "r") as file:
+                folded = self.parse_folded(file)
+            with self.lock:
+                self._stacks[pid].update(folded)
+        except Exception as e:
+            with self.lock:
+                self._errors[pid] = str(e)
+        finally:
+            try:
+                os.remove(output_path)
+            except OSError:
+                pass
+
+    def _wait_window(self, process, timeout):
+        """
+        Wait for one py-spy window, interrupting it as soon as stop() is called.
+
+        py-spy writes the samples it has taken when it receives SIGINT, so an
+        interrupted window still contributes to the aggregate.
+
+        :param process: subprocess.Popen - The running `py-spy record`.
+        :param timeout: float - Seconds after which the window is killed.
+        :return: tuple[bool, bytes] - Whether the window was interrupted, and py-spy's stderr.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                _, stderr = process.communicate(timeout=self.POLL_INTERVAL)
+                return False, stderr
+            except subprocess.TimeoutExpired:
+                pass
+            if self._stop_event.is_set():
+                process.send_signal(signal.SIGINT)
+                try:
+                    _, stderr = process.communicate(timeout=self.INTERRUPT_GRACE)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    _, stderr = process.communicate()
+                return True, stderr
+            if time.monotonic() > deadline:
+                process.kill()
+                process.communicate()
+                raise subprocess.TimeoutExpired(process.args, timeout)
+
+    @staticmethod
+    def _process_name(pid):
+        try:
+            return psutil.Process(pid).name()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return "unknown"
+
+    @staticmethod
+    def parse_folded(lines):
+        """
+        Parse collapsed-stack lines ("frame;frame;frame count") into a Counter.
+        """
+        stacks = Counter()
+        for line in lines:
+            stack, _, count = line.strip().rpartition(" ")
+            if not stack or not count.isdigit():
+                continue
+            stacks[stack] += int(count)
+        return stacks
+
+    def _folded(self, pid=None):
+        """Return folded stacks, prefixed with a process frame when covering several PIDs."""
+        with self.lock:
+            if pid is not None:
+                return Counter(self._stacks.get(pid, {}))
+            merged = Counter()
+            for stack_pid, stacks in self._stacks.items():
+                prefix = f"{self._process_names.get(stack_pid, 'unknown')} ({stack_pid})"
+                for stack, count in stacks.items():
+                    merged[f"{prefix};{stack}"] += count
+            return merged
+
+    def collapsed(self, pid=None):
+        """
+        :return: str - Aggregated stacks in collapsed-stack text format (flamegraph.pl input).
+        """
+        folded = self._folded(pid)
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(folded.items()))
+
+    def flame_graph(self, pid=None):
+        """
+        :return: dict - Nested {"name", "value", "children"} tree for d3-flame-graph.
+        """
+        root = {"name": "root", "value": 0, "children": {}}
+        for stack, count in self._folded(pid).items():
+            root["value"] += count
+            node = root
+            for frame in stack.split(";"):
+                child = node["children"].get(frame)
+                if child is None:
+                    child = node["children"][frame] = {"name": frame, "value": 0, "children": {}}
+                child["value"] += count
+                node = child
+
+        def to_list(node):
+            return {
+                "name": node["name"],
+                "value": node["value"],
+                "children": [to_list(child) for child in
+                             sorted(node["children"].values(), key=lambda c: c["value"], reverse=True)]
+            }
+
+        return to_list(root)
@@ -0,0 +1,86 @@
+import logging
+import math
+import threading
+import time
+
+
+class FixedRateScheduler:
+    """
+    Fixed-rate tick bookkeeping for periodic background work.
+
+    Ticks are scheduled at start + n * interval regardless of how long each run
+    takes. A run that overruns one or more ticks skips them (and counts them as
+    missed) instead of shifting every later tick, so the period never drifts.
+    Start lateness of every tick is tracked as jitter statistics.
+    """
+
+    def __init__(self, interval, clock=time.monotonic):
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self.interval = interval
+        self.clock = clock
+        self.lock = threading.Lock()
+        self._next_tick = None
+        self.ticks = 0
+        self.missed_ticks = 0
+        self._jitter_mean = 0.0
+        self._jitter_m2 = 0.0
+        self._jitter_max = 0.0
+        self._jitter_last = 0.0
+
+    def begin_tick(self):
+        """Mark the start of a run and record how late it started."""
+        now = self.clock()
+        with self.lock:
+            if self._next_tick is None:
+                self._next_tick = now
+            jitter = max(0.0, now - self._next_tick)
+            self.ticks += 1
+            # Welford's online mean / variance
+            delta = jitter - self._jitter_mean
+            self._jitter_mean += delta / self.ticks
+            self._jitter_m2 += delta * (jitter - self._jitter_mean)
+            self._jitter_max = max(self._jitter_max, jitter)
+            self._jitter_last = jitter
+
+    def advance(self):
+        """
+        Move to the next tick that is still in the future.
+
+        :return: float - Seconds to wait before the next run.
+        """
+        now = self.clock()
+        with self.lock:
+            if self._next_tick is None:
+                self._next_tick = now
+            self._next_tick += self.interval
+            if now > self._next_tick:
+                skipped = math.floor((now - self._next_tick) / self.interval) + 1
+                self.missed_ticks += skipped
+                self._next_tick += skipped * self.interval
+            return self._next_tick - now
+
+    def run(self, task, stop_event):
+        """Call task() on every tick until stop_event is set."""
+        while not stop_event.is_set():
+            self.begin_tick()
+            try:
+                task()
+            except Exception as e:
+                logging.error(f"Scheduled task failed: {e}")
+            stop_event.wait(self.advance())
+
+    def stats(self):
+        with self.lock:
+            variance = self._jitter_m2 / (self.ticks - 1) if self.ticks > 1 else 0.0
+            return {
+                "interval_seconds": self.interval,
+                "ticks": self.ticks,
+                "missed_ticks": self.missed_ticks,
+                "jitter_ms": {
+                    "last": round(self._jitter_last * 1000, 3),
+                    "mean": round(self._jitter_mean * 1000, 3),
+                    "stdev": round(math.sqrt(variance) * 1000, 3),
+                    "max": round(self._jitter_max * 1000, 3)
+                }
+            }
@@ -0,0 +1,135 @@
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+import psutil
+
+
+class PerfRecorder:
+    """
+    Lightweight latency recorder for the monitor's own hot paths.
+
+    Every timed section costs two perf_counter() calls, one bisect over a fixed
+    bucket table and a short critical section, so it can stay enabled in production.
+    """
+
+    # Upper bounds of the latency histogram buckets, in milliseconds
+    BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500,
+                  1000, 2500, 5000, 10000, 30000, float("inf"))
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._stats = {}
+        self._started_at = time.time()
+
+    def record(self, name, elapsed_seconds):
+        elapsed_ms = elapsed_seconds * 1000.0
+        bucket = bisect_left(self.BUCKETS_MS, elapsed_ms)
+        with self.lock:
+            stat = self._stats.get(name)
+            if stat is None:
+                stat = self._stats[name] = {
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "min_ms": elapsed_ms,
+                    "max_ms": elapsed_ms,
+                    "buckets": [0] * len(self.BUCKETS_MS)
+                }
+            stat["count"] += 1
+            stat["total_ms"] += elapsed_ms
+            if elapsed_ms < stat["min_ms"]:
+                stat["min_ms"] = elapsed_ms
+            if elapsed_ms > stat["max_ms"]:
+                stat["max_ms"] = elapsed_ms
+            stat["buckets"][bucket] += 1
+
+    @contextmanager
+    def timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def instrument(self, name=None):
+        """Decorator that records the latency of every call to the wrapped function."""
+        def decorator(func):
+            label = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(label, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def reset(self):
+        with self.lock:
+            self._stats = {}
+            self._started_at = time.time()
+
+    def _percentile(self, buckets, count, fraction, max_ms):
+        """
+        Estimate a percentile as the upper bound of the bucket that contains it,
+        capped at the observed maximum (the overflow bucket has no finite bound).
+        """
+        target = count * fraction
+        seen = 0
+        for upper, bucket_count in zip(self.BUCKETS_MS, buckets):
+            seen += bucket_count
+            if seen >= target:
+                return round(min(upper, max_ms), 3)
+        return round(max_ms, 3)
+
+    def snapshot(self):
+        """
+        :return: dict - Per-section call counts, latency summary and histogram,
+                 plus the CPU time consumed by the monitor process itself.
+        """
+        with self.lock:
+            stats = {name: dict(stat, buckets=list(stat["buckets"])) for name, stat in self._stats.items()}
+            started_at = self._started_at
+
+        sections = {}
+        for name, stat in sorted(stats.items(), key=lambda item: item[1]["total_ms"], reverse=True):
+            count = stat["count"]
+            sections[name] = {
+                "count": count,
+                "total_ms": round(stat["total_ms"], 3),
+                "mean_ms": round(stat["total_ms"] / count, 3),
+                "min_ms": round(stat["min_ms"], 3),
+                "max_ms": round(stat["max_ms"], 3),
+                "p50_ms": self._percentile(stat["buckets"], count, 0.50, stat["max_ms"]),
+                "p95_ms": self._percentile(stat["buckets"], count, 0.95, stat["max_ms"]),
+                "p99_ms": self._percentile(stat["buckets"], count, 0.99, stat["max_ms"]),
+                "histogram": {
+                    ("+Inf" if upper == float("inf") else str(upper)): bucket_count
+                    for upper, bucket_count in zip(self.BUCKETS_MS, stat["buckets"]) if bucket_count
+                }
+            }
+
+        process = psutil.Process(os.getpid())
+        cpu_times = process.cpu_times()
+        wall_seconds = max(time.time() - process.create_time(), 1e-6)
+        return {
+            "since": started_at,
+            "process": {
+                "pid": process.pid,
+                "threads": process.num_threads(),
+                "rss_bytes": process.memory_info().rss,
+                "cpu_user_seconds": cpu_times.user,
+                "cpu_system_seconds": cpu_times.system,
+                "cpu_percent_lifetime": round((cpu_times.user + cpu_times.system) / wall_seconds * 100, 2)
+            },
+            "sections": sections
+        }
+
+
+# Shared recorder used by collectors, the analyzer and the Flask routes
+perf = PerfRecorder()
@@ -0,0 +1,91 @@
+import logging
+import threading
+import time
+
+
+class SnapshotCache:
+    """
+    Latest-snapshot cache with single-flight refresh and stale-while-revalidate.
+
+    Readers always get the latest complete snapshot without waiting, except for the
+    very first read when nothing has been collected yet. When the snapshot is older
+    than max_age, the read that notices it starts one background refresh and still
+    returns the stale snapshot. At most one refresh runs at a time; callers that ask
+    for a refresh while one is in flight join it instead of collecting again.
+
+    Published snapshots are shared between threads and must never be mutated.
+    The loader is expected to publish the snapshot it builds (see publish()).
+    """
+
+    def __init__(self, loader, max_age):
+        self.loader = loader
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self._snapshot = None
+        self._published_at = 0.0
+        self._inflight = None
+        self.stats = {"hits": 0, "stale_hits": 0, "refreshes": 0, "joined_refreshes": 0}
+
+    def publish(self, snapshot):
+        with self.lock:
+            self._snapshot = snapshot
+            self._published_at = time.monotonic()
+
+    def latest(self):
+        """Return the current snapshot without ever triggering a refresh."""
+        return self._snapshot
+
+    def _claim_refresh(self):
+        """Return (flight, is_leader). Must be called with self.lock held."""
+        if self._inflight is not None:
+            self.stats["joined_refreshes"] += 1
+            return self._inflight, False
+        self._inflight = {"done": threading.Event(), "result": None}
+        return self._inflight, True
+
+    def _run_refresh(self, flight):
+        try:
+            flight["result"] = self.loader()
+        except Exception as e:
+            logging.error(f"Snapshot refresh failed: {e}")
+        finally:
+            with self.lock:
+                self._inflight = None
+                self.stats["refreshes"] += 1
+            flight["done"].set()
+
+    def refresh(self):
+        """
+        Collect a new snapshot now, or wait for the refresh already in flight.
+
+        :return: The snapshot produced by that refresh, or None if it failed.
+        """
+        with self.lock:
+            flight, leader = self._claim_refresh()
+        if leader:
+            self._run_refresh(flight)
+        else:
+            flight["done"].wait()
+        return flight["result"]
+
+    def get(self):
+        with self.lock:
+            snapshot = self._snapshot
+            if snapshot is not None and time.monotonic() - self._published_at <= self.max_age:
+                self.stats["hits"] += 1
+                return snapshot
+            flight, leader = self._claim_refresh()
+            if snapshot is not None:
+                self.stats["stale_hits"] += 1
+
+        if snapshot is None:
+            # Nothing to serve yet: wait for the first collection
+            if leader:
+                self._run_refresh(flight)
+            else:
+                flight["done"].wait()
+            return self._snapshot
+
+        if leader:
+            threading.Thread(target=self._run_refresh, args=(flight,), name="snapshot-refresh", daemon=True).start()
+        return snapshot
@@ -0,0 +1,40 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def register_metrics_package():
+    """Make the repository importable as the `metrics` package its modules import each other from."""
+    if "metrics" in sys.modules:
+        return
+    spec = importlib.util.spec_from_file_location("metrics", os.path.join(ROOT, "__init__.py"),
+                                                  submodule_search_locations=[ROOT])
+    package = importlib.util.module_from_spec(spec)
+    sys.modules["metrics"] = package
+    spec.loader.exec_module(package)
+
+
+register_metrics_package()
+
+
+@pytest.fixture
+def analysis_workers(tmp_path_factory, monkeypatch):
+    """
+    Let spawned analysis workers import the package: they resolve `metrics` through the
+    sys.path they inherit, so a `metrics` link to the repository goes on it. The pool
+    is shut down afterwards, so the next test sizes its own.
+    """
+    from metrics import analyzer
+
+    link_dir = tmp_path_factory.mktemp("importable")
+    os.symlink(ROOT, link_dir / "metrics")
+    monkeypatch.syspath_prepend(str(link_dir))
+    yield analyzer
+    pool = analyzer._analysis_pool
+    if pool is not None:
+        analyzer._discard_analysis_pool(pool)
+        pool.shutdown(wait=True)
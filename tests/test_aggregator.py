@@ -0,0 +1,158 @@
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+
+from metrics.agent import MetricsAgent
+from metrics.aggregator import MetricsAggregator
+from metrics.wire_protocol import encode_frame
+
+TOKEN = "s3cret"
+
+
+def wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def stored(aggregator, host):
+    return [snapshot["n"] for snapshot in aggregator.series(host)]
+
+
+@pytest.fixture
+def aggregator():
+    aggregator = MetricsAggregator(port=0, batch_interval=0.02, token=TOKEN)
+    aggregator.start()
+    yield aggregator
+    aggregator.stop()
+
+
+@pytest.fixture
+def make_agent(aggregator):
+    agents = []
+
+    def make(host, token=TOKEN, target=None):
+        agent = MetricsAgent(aggregator=("127.0.0.1", (target or aggregator).port), host=host, token=token,
+                             reconnect_delay=0.05, max_reconnect_delay=0.2)
+        agent.start()
+        agents.append(agent)
+        return agent
+
+    yield make
+    for agent in agents:
+        agent.stop()
+
+
+def test_listens_on_loopback_by_default():
+    assert MetricsAggregator().listen_host == "127.0.0.1"
+
+
+def test_agents_ship_to_aggregator(aggregator, make_agent):
+    hosts = ["web-1", "web-2", "db-1"]
+    agents = [make_agent(host) for host in hosts]
+    for n in range(5):
+        for agent in agents:
+            agent.submit({"n": n})
+
+    assert wait_for(lambda: all(len(aggregator.series(host)) == 5 for host in hosts))
+    assert wait_for(lambda: all(agent.stats["acked"] == 5 for agent in agents))
+    for host in hosts:
+        assert stored(aggregator, host) == [0, 1, 2, 3, 4]
+        assert aggregator.latest(host) == {"n": 4}
+    assert sorted(entry["host"] for entry in aggregator.hosts() if entry["connected"]) == sorted(hosts)
+    assert aggregator.stats["duplicates"] == 0
+
+
+def test_reconnect_resends_unacknowledged_and_dedups(aggregator, make_agent):
+    agent = make_agent("web-1")
+    agent._acknowledge = lambda seq: None  # acks get lost: everything stays unacknowledged
+    for n in range(3):
+        agent.submit({"n": n})
+    assert wait_for(lambda: len(aggregator.series("web-1")) == 3)
+
+    # Drop the connection from the aggregator side; the agent reconnects and resends all three
+    del agent._acknowledge
+    aggregator._loop.call_soon_threadsafe(lambda: [writer.close() for writer in aggregator._connections.values()])
+    assert wait_for(lambda: agent.stats["connects"] >= 2 and aggregator.stats["duplicates"] >= 3)
+    agent.submit({"n": 3})
+
+    assert wait_for(lambda: len(aggregator.series("web-1")) == 4)
+    assert wait_for(lambda: agent.stats["acked"] == 4)
+    assert stored(aggregator, "web-1") == [0, 1, 2, 3]
+    assert agent.stats["resent"] >= 3
+
+    # A restarted agent (new session) starts its sequence numbers afresh and is not deduplicated
+    restarted = make_agent("web-1")
+    restarted.submit({"n": 4})
+    assert wait_for(lambda: len(aggregator.series("web-1")) == 5)
+    assert stored(aggregator, "web-1") == [0, 1, 2, 3, 4]
+
+
+def test_token_mismatch_is_rejected(aggregator, make_agent):
+    intruder = make_agent("intruder", token="wrong")
+    intruder.submit({"n": 0})
+
+    assert wait_for(lambda: aggregator.stats["rejected"] >= 2)  # refused on every reconnect
+    assert aggregator.hosts() == []
+    assert intruder.stats["acked"] == 0
+
+
+@pytest.mark.parametrize("frame", [
+    {"type": "snapshot", "seq": "7", "snapshot": {"n": 0}},
+    {"type": "snapshot", "seq": True, "snapshot": {"n": 0}},
+    {"type": "snapshot", "seq": 1, "snapshot": [0]},
+    ["not", "an", "object"],
+])
+def test_bad_frame_drops_only_its_connection(aggregator, make_agent, frame):
+    agent = make_agent("web-1")
+    agent.submit({"n": 0})
+    assert wait_for(lambda: agent.stats["acked"] == 1)
+
+    with socket.create_connection(("127.0.0.1", aggregator.port), timeout=5) as bad:
+        bad.sendall(encode_frame({"type": "hello", "host": "bad-1", "session": "s", "token": TOKEN}))
+        bad.sendall(encode_frame(frame))
+        assert wait_for(lambda: aggregator.stats["protocol_errors"] == 1)
+        assert bad.recv(1) == b""  # closed by the aggregator
+
+    agent.submit({"n": 1})
+    assert wait_for(lambda: agent.stats["acked"] == 2)
+    assert stored(aggregator, "web-1") == [0, 1]
+    assert aggregator.series("bad-1") == []
+
+
+def test_full_queue_stalls_the_reader(make_agent):
+    aggregator = MetricsAggregator(port=0, max_queue=2, batch_interval=0.02, token=TOKEN)
+    released = threading.Event()
+    ingest_loop = aggregator._ingest_loop
+
+    async def gated_ingest_loop():
+        while not released.is_set():
+            await asyncio.sleep(0.01)
+        await ingest_loop()
+
+    aggregator._ingest_loop = gated_ingest_loop
+    aggregator.start()
+    try:
+        agent = make_agent("web-1", target=aggregator)
+        for n in range(5):
+            agent.submit({"n": n})
+
+        # Two snapshots fill the queue; the reader then waits on the third instead of reading on
+        assert wait_for(lambda: aggregator.stats["queue_full_waits"] == 1)
+        time.sleep(0.2)
+        assert aggregator.stats["queue_full_waits"] == 1
+        assert aggregator._queue.qsize() == 2
+        assert aggregator.series("web-1") == []
+
+        released.set()
+        assert wait_for(lambda: agent.stats["acked"] == 5)
+        assert stored(aggregator, "web-1") == [0, 1, 2, 3, 4]
+    finally:
+        released.set()
+        aggregator.stop()
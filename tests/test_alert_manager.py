@@ -0,0 +1,176 @@
+import email
+import email.policy
+import socketserver
+import threading
+import time
+
+import pytest
+
+from metrics.alert_manager import AlertManager, AlertRule, EmailSink
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib.send_message: EHLO, MAIL, RCPT, DATA, QUIT."""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.reply("220 stub ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().split(" ", 1)[0].upper()
+            if command == "DATA":
+                self.reply("354 end with <CRLF>.<CRLF>")
+                data = b""
+                while True:
+                    line = self.rfile.readline()
+                    if line in (b".\r\n", b""):
+                        break
+                    data += line[1:] if line.startswith(b"..") else line
+                self.server.messages.append(email.message_from_bytes(data, policy=email.policy.default))
+                self.reply("250 queued")
+            elif command == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("250 ok")
+
+
+@pytest.fixture
+def smtp_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SMTPHandler)
+    server.daemon_threads = True
+    server.messages = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def manager(smtp_server):
+    sink = EmailSink(["ops@example.com"], host="127.0.0.1", port=smtp_server.server_address[1])
+    rule = AlertRule("disk_busy", lambda snapshot: snapshot["disks"], 90, message="{key} busy at {value}%")
+    manager = AlertManager(rules=[rule], sinks=[sink], cooldown=300, batch_size=10, batch_interval=0.2)
+    yield manager
+    manager.close(timeout=5)
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def bodies(server):
+    return [message.get_content() for message in server.messages]
+
+
+def test_alerts_are_batched_into_one_email(manager, smtp_server):
+    firing = manager.evaluate({"disks": {"sda": 95, "sdb": 97, "sdc": 10}}, now=1000)
+    assert manager.flush(timeout=5)
+
+    assert sorted(alert["key"] for alert in firing) == ["sda", "sdb"]
+    assert len(smtp_server.messages) == 1
+    assert smtp_server.messages[0]["Subject"] == "2 System Performance Alerts"
+    assert "System Alert [firing]: sda busy at 95%" in bodies(smtp_server)[0]
+    assert "System Alert [firing]: sdb busy at 97%" in bodies(smtp_server)[0]
+    assert manager.get_stats()["batches"] == 1
+
+
+def test_cooldown_deduplicates_repeats(manager, smtp_server):
+    manager.evaluate({"disks": {"sda": 95}}, now=1000)
+    manager.evaluate({"disks": {"sda": 96}}, now=1060)      # inside the cooldown
+    assert manager.flush(timeout=5)
+    assert len(smtp_server.messages) == 1
+
+    manager.evaluate({"disks": {"sda": 97}}, now=1000 + 300)  # cooldown elapsed
+    assert manager.flush(timeout=5)
+    assert len(smtp_server.messages) == 2
+
+    assert manager.trigger_alert("fan failure") is True
+    assert manager.trigger_alert("fan failure") is False
+    assert manager.flush(timeout=5)
+    assert len(smtp_server.messages) == 3
+    assert manager.get_stats()["suppressed"] == 1
+
+
+def test_resolved_notification(manager, smtp_server):
+    manager.evaluate({"disks": {"sda": 95}}, now=1000)
+    assert manager.evaluate({"disks": {"sda": 40}}, now=1010) == []
+    assert manager.flush(timeout=5)
+
+    assert "System Alert [resolved]: sda busy at 40%" in "".join(bodies(smtp_server))
+    assert manager.active() == []
+
+
+def test_close_skips_retry_backoff():
+    class DownSink:
+        name = "down"
+
+        def send(self, alerts):
+            raise ConnectionRefusedError("connection refused")
+
+    manager = AlertManager(sinks=[DownSink()], batch_interval=60, max_retries=3, retry_backoff=1.0)
+    manager.trigger_alert("disk full")
+    started = time.monotonic()
+    manager.close(timeout=10)
+
+    assert time.monotonic() - started < 0.5
+    assert manager.get_stats()["failed"] == 1
+    assert manager.get_stats()["retries"] == 0
+
+
+def test_close_does_not_block_on_a_full_queue():
+    released = threading.Event()
+
+    class StuckSink:
+        name = "stuck"
+
+        def __init__(self):
+            self.sent = []
+
+        def send(self, alerts):
+            released.wait(10)
+            self.sent.extend(alerts)
+
+    sink = StuckSink()
+    manager = AlertManager(sinks=[sink], batch_size=1, batch_interval=0.01, max_queue=1)
+    manager.trigger_alert("first")
+    assert wait_until(lambda: manager._queue.empty())  # the worker holds it in send()
+    manager.trigger_alert("second")                       # fills the queue
+    worker = manager._thread
+
+    started = time.monotonic()
+    manager.close(timeout=0.5)
+    assert time.monotonic() - started < 2
+
+    released.set()
+    worker.join(5)
+    assert not worker.is_alive()
+    assert [alert["message"] for alert in sink.sent] == ["first", "second"]
+
+
+def test_for_seconds_and_clear_threshold():
+    rule = AlertRule("memory", lambda snapshot: snapshot["memory"], 90, clear_threshold=85, for_seconds=30)
+    manager = AlertManager(rules=[rule])
+
+    def firing(value, now):
+        return [alert["value"] for alert in manager.evaluate({"memory": value}, now=now)]
+
+    assert firing(95, now=0) == []    # pending
+    assert firing(95, now=20) == []
+    assert firing(95, now=30) == [95]  # held for for_seconds
+    assert firing(88, now=40) == [88]  # below the threshold but above the clear threshold
+    assert firing(84, now=50) == []    # crossed the clear threshold: resolved
+    assert firing(95, now=60) == []    # pending again from scratch
+    assert firing(80, now=70) == []
+    assert firing(95, now=80) == []
+    assert manager.get_stats()["notifications"] == 2  # one firing, one resolved
@@ -0,0 +1,79 @@
+import gzip
+import json
+
+import pytest
+
+from metrics import analyze_cli
+
+
+def history_lines(positions, cpu_percent):
+    return "".join(json.dumps({"timestamp": f"2026-01-01T00:{position * 10 // 60:02d}:{position * 10 % 60:02d}Z",
+                               "cpu_metrics": {"cpu_usage_percent": cpu_percent(position)},
+                               "memory": {"percent": 95}}) + "\n" for position in positions)
+
+
+@pytest.fixture
+def archive(tmp_path):
+    """web-1 keeps one gzip-compressed and one plain day; db-1 keeps a plain file directly in its directory."""
+    root = tmp_path / "archive"
+    (root / "web-1" / "2026-01-01").mkdir(parents=True)
+    (root / "web-1" / "2026-01-02").mkdir()
+    (root / "db-1").mkdir()
+    (root / "web-1" / "2026-01-01" / "system_metrics.json.gz").write_bytes(
+        gzip.compress(history_lines(range(30), lambda position: 90.0).encode("utf-8")))
+    (root / "web-1" / "2026-01-02" / "system_metrics.json").write_text(
+        history_lines(range(30, 60), lambda position: 90.0 if position < 40 else 10.0))
+    (root / "db-1" / "system_metrics.json").write_text(history_lines(range(40), lambda position: 10.0))
+    (root / "db-1" / "notes.txt").write_text("not metrics")
+    return root
+
+
+def run(archive, tmp_path, *options):
+    output = tmp_path / "report.out"
+    assert analyze_cli.main([str(archive), "--output", str(output), "--workers", "2",
+                             "--cpu-threshold", "50", *options]) == 0
+    return output.read_text()
+
+
+def test_files_are_grouped_by_host(archive):
+    hosts = analyze_cli.find_metrics_files([str(archive)], ["*.json", "*.json.gz"])
+
+    assert list(hosts) == ["db-1", "web-1"]
+    assert [path.rsplit("/", 1)[-1] for path in hosts["web-1"]] == ["system_metrics.json.gz", "system_metrics.json"]
+
+
+def test_json_report_covers_compressed_and_plain_files(archive, tmp_path, analysis_workers):
+    report = json.loads(run(archive, tmp_path))
+
+    web = report["hosts"]["web-1"]
+    assert web["records"] == 60
+    assert web["counts"] == {"CPU": 40}
+    assert [(episode["type"], episode["records"]) for episode in web["longest_episodes"]] == [("CPU", 40)]
+    assert report["hosts"]["db-1"]["records"] == 40
+    assert report["hosts"]["db-1"]["counts"] == {}
+    assert report["totals"] == {"records": 100, "counts": {"CPU": 40}}
+
+
+def test_rules_hold_across_chunks(archive, tmp_path, analysis_workers):
+    rules = tmp_path / "rules.json"
+    rules.write_text(json.dumps({"rules": [
+        {"name": "memory_usage", "type": "HighMemoryUsage", "path": "memory.percent",
+         "op": ">", "threshold": 90, "for_seconds": 60}]}))
+
+    report = json.loads(run(archive, tmp_path, "--rules", str(rules)))
+
+    # db-1 breaches in all 40 records; the rule fires six records (60 s) in and holds to the end
+    assert report["hosts"]["db-1"]["counts"] == {"HighMemoryUsage": 34}
+
+
+def test_html_report(archive, tmp_path, analysis_workers):
+    html = run(archive, tmp_path, "--format", "html")
+
+    assert html.startswith("<!DOCTYPE html>")
+    assert "<h2>web-1</h2>" in html and "<h2>db-1</h2>" in html
+    assert "<td>CPU</td><td>40</td>" in html
+
+
+def test_no_metrics_files(tmp_path, capsys):
+    assert analyze_cli.main([str(tmp_path)]) == 1
+    assert "No metrics files found." in capsys.readouterr().err
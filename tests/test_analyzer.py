@@ -0,0 +1,79 @@
+import gzip
+import json
+import logging
+import os
+
+import pytest
+
+from metrics.analyzer import Analyzer
+
+
+def record(position):
+    """One history record; CPU is high in records 10-45 and process 7 is hot in records 20-30."""
+    metric = {"timestamp": f"2026-01-01T00:{position // 60:02d}:{position % 60:02d}Z",
+              "cpu_metrics": {"cpu_usage_percent": 95.0 if 10 <= position <= 45 else 0.5},
+              "memory_metrics": {"memory_usage_percent": 1.0},
+              "memory_deep_metrics": {"top_memory_processes": [
+                  {"pid": 8, "name": "cache", "memory_percent": 5.5 + position / 10}]}}
+    if 20 <= position <= 30:
+        metric["cpu_deep_metrics"] = {"top_cpu_processes": [
+            {"pid": 7, "name": "spinner", "cpu_percent": 50.0 + position}]}
+    return metric
+
+
+@pytest.fixture
+def history(tmp_path):
+    path = tmp_path / "system_metrics.json"
+    path.write_text("".join(json.dumps(record(position)) + "\n" for position in range(60)))
+    return path
+
+
+@pytest.fixture
+def analyzer(history):
+    return Analyzer(metrics_file=str(history), cpu_threshold=80, memory_threshold=5)
+
+
+def test_parallel_summary_matches_serial(analyzer, monkeypatch, caplog, analysis_workers):
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+
+    serial = analyzer.analyze_metrics_parallel(workers=1)
+    with caplog.at_level(logging.ERROR):
+        parallel = analyzer.analyze_metrics_parallel(workers=4, chunks_per_worker=3)
+
+    assert not caplog.records  # no fallback to the serial path
+    assert parallel == serial
+    assert serial["records"] == 60
+    assert serial["counts"] == {"CPU": 36, "CPUProcess": 11, "MemoryProcess": 60}
+
+
+def test_episodes_are_joined_across_chunk_boundaries(analyzer, monkeypatch, analysis_workers):
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+
+    summary = analyzer.analyze_metrics_parallel(workers=4, chunks_per_worker=4)
+
+    spans = {episode["type"]: (episode["start_record"], episode["end_record"], episode["records"])
+             for episode in summary["episodes"]}
+    assert spans == {"CPU": (10, 45, 36), "CPUProcess": (20, 30, 11), "MemoryProcess": (0, 59, 60)}
+    spinner = summary["processes"][7]
+    assert spinner["max_cpu_percent"] == 80.0
+    assert (spinner["first_seen"], spinner["last_seen"]) == ("2026-01-01T00:00:20Z", "2026-01-01T00:00:30Z")
+    assert summary["processes"][8]["max_memory_percent"] == 11.4
+
+
+def test_compressed_history_is_summarized_serially(analyzer, history, tmp_path):
+    compressed = tmp_path / "system_metrics.json.gz"
+    compressed.write_bytes(gzip.compress(history.read_bytes()))
+
+    expected = analyzer.analyze_metrics_parallel(workers=1)
+    summary = Analyzer(metrics_file=str(compressed), cpu_threshold=80,
+                       memory_threshold=5).analyze_metrics_parallel(workers=4)
+
+    assert summary == expected
+
+
+def test_missing_history_yields_an_empty_summary(tmp_path, monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+
+    summary = Analyzer(metrics_file=str(tmp_path / "missing.json")).analyze_metrics_parallel(workers=4)
+
+    assert summary == {"records": 0, "issues": [], "counts": {}, "processes": {}, "episodes": []}
@@ -0,0 +1,35 @@
+import asyncio
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics.async_collector import AsyncCollectionEngine
+
+
+def make_engine(collector_timeout):
+    manager = types.SimpleNamespace(collectors={}, collector_backend="procfs")
+    return AsyncCollectionEngine(manager, collector_timeout=collector_timeout)
+
+
+def test_process_table_wait_is_bounded():
+    engine = make_engine(collector_timeout=0.2)
+
+    async def run():
+        engine.executor = ThreadPoolExecutor(max_workers=1)
+        engine._process_table_lock = asyncio.Lock()
+        await engine._process_table_lock.acquire()  # a process-table walker that never finishes
+        started = time.monotonic()
+        skipped = await engine._run_collector("thread_metrics", lambda: {"threads": 1})
+        waited = time.monotonic() - started
+
+        engine._process_table_lock.release()
+        collected = await engine._run_collector("thread_metrics", lambda: {"threads": 1})
+        engine.executor.shutdown()
+        return skipped, waited, collected, engine._process_table_lock.locked()
+
+    skipped, waited, collected, locked = asyncio.run(run())
+
+    assert "waiting for the process table" in skipped["error"]
+    assert waited < 1.0
+    assert collected == {"threads": 1}
+    assert locked is False
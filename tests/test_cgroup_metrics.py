@@ -0,0 +1,108 @@
+import shutil
+
+import pytest
+
+from metrics.cgroup_metrics import CgroupMetrics
+
+
+def write_cgroup(directory, usage_usec, nr_periods, nr_throttled, populated=1, rbytes=0):
+    directory.mkdir(parents=True, exist_ok=True)
+    files = {
+        "cgroup.events": f"populated {populated}\nfrozen 0\n",
+        "cpu.stat": f"usage_usec {usage_usec}\nuser_usec {usage_usec}\nsystem_usec 0\n"
+                    f"nr_periods {nr_periods}\nnr_throttled {nr_throttled}\nthrottled_usec {nr_throttled * 1000}\n",
+        "cpu.max": "50000 100000\n",
+        "memory.current": "268435456\n",
+        "memory.max": "536870912\n",
+        "memory.pressure": "some avg10=1.50 avg60=0.50 avg300=0.10 total=1200\n"
+                           "full avg10=0.00 avg60=0.00 avg300=0.00 total=0\n",
+        "io.stat": f"8:0 rbytes={rbytes} wbytes=0 rios=1 wios=0 dbytes=0 dios=0\n",
+        "cgroup.procs": "1\n"
+    }
+    for name, content in files.items():
+        (directory / name).write_text(content)
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "cgroup"
+    root.mkdir()
+    (root / "cgroup.controllers").write_text("cpu io memory pids\n")
+    (tmp_path / "proc" / "self").mkdir(parents=True)
+    (tmp_path / "proc" / "self" / "cgroup").write_text("0::/system.slice/web.service\n")
+    write_cgroup(root / "system.slice" / "web.service", usage_usec=1_000_000, nr_periods=100, nr_throttled=10)
+    write_cgroup(root / "system.slice" / "idle.service", usage_usec=0, nr_periods=0, nr_throttled=0, populated=0)
+    return root, CgroupMetrics(root=str(root), proc_root=str(tmp_path / "proc"))
+
+
+def test_unavailable_without_cgroup_v2(tmp_path):
+    assert CgroupMetrics(root=str(tmp_path)).get_metrics() == {"available": False}
+
+
+def test_limits_and_first_sample(tree):
+    _, collector = tree
+    metrics = collector.get_metrics()
+
+    assert metrics["available"] is True
+    assert metrics["self_cgroup"] == "/system.slice/web.service"
+    web = metrics["cgroups"]["/system.slice/web.service"]
+    assert web["cpu_limit_cores"] == 0.5
+    assert web["memory_headroom_bytes"] == 268435456
+    assert web["memory_percent_of_max"] == 50.0
+    assert web["memory_pressure"]["some"]["avg10"] == 1.5
+    assert web["cpu_usage_seconds"] == 1.0
+    assert web["throttled_periods_percent"] is None  # rates need two samples
+
+
+def test_unpopulated_cgroups_are_skipped(tree):
+    _, collector = tree
+    cgroups = collector.get_metrics()["cgroups"]
+
+    assert "/system.slice/idle.service" not in cgroups
+    assert "/system.slice/web.service" in cgroups
+
+
+def test_throttling_deltas(tree):
+    root, collector = tree
+    collector.get_metrics()
+    write_cgroup(root / "system.slice" / "web.service", usage_usec=1_500_000, nr_periods=200, nr_throttled=40,
+                 rbytes=4096)
+    web = collector.get_metrics()["cgroups"]["/system.slice/web.service"]
+
+    assert web["throttled_periods_percent"] == 30.0  # 30 of the 100 new periods
+    assert web["cpu_percent"] > 0
+    assert web["cpu_throttled_percent"] > 0
+    assert web["io_read_bytes_per_sec"] > 0
+
+
+def test_removed_cgroups_are_evicted(tree):
+    root, collector = tree
+    collector.get_metrics()
+    assert "/system.slice/web.service" in collector._previous
+
+    shutil.rmtree(root / "system.slice" / "web.service")
+    assert "/system.slice/web.service" not in collector.get_metrics()["cgroups"]
+    assert "/system.slice/web.service" not in collector._previous
+
+    # Re-created under the same path: counters start afresh instead of diffing against the old cgroup
+    write_cgroup(root / "system.slice" / "web.service", usage_usec=10, nr_periods=1, nr_throttled=0)
+    assert collector.get_metrics()["cgroups"]["/system.slice/web.service"]["throttled_periods_percent"] is None
+
+
+def test_container_cgroups_four_levels_down(tree):
+    root, collector = tree
+    pod = root / "kubepods.slice" / "kubepods-burstable.slice" / "kubepods-burstable-pod1234.slice"
+    for directory in (pod.parent.parent, pod.parent, pod):
+        write_cgroup(directory, usage_usec=3_000_000, nr_periods=0, nr_throttled=0)
+    write_cgroup(pod / "cri-containerd-abc.scope", usage_usec=2_000_000, nr_periods=10, nr_throttled=1)
+    write_cgroup(root / "kubepods.slice" / "kubepods-besteffort.slice", usage_usec=0, nr_periods=0,
+                 nr_throttled=0, populated=0)
+    write_cgroup(root / "kubepods.slice" / "kubepods-besteffort.slice" / "stale.scope", usage_usec=0,
+                 nr_periods=0, nr_throttled=0)
+
+    cgroups = collector.get_metrics()["cgroups"]
+
+    container = "/kubepods.slice/kubepods-burstable.slice/kubepods-burstable-pod1234.slice/cri-containerd-abc.scope"
+    assert cgroups[container]["cpu_usage_seconds"] == 2.0
+    # An unpopulated cgroup's subtree is not walked
+    assert not [path for path in cgroups if path.startswith("/kubepods.slice/kubepods-besteffort.slice")]
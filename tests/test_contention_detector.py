@@ -0,0 +1,83 @@
+import types
+
+from metrics import thread_tracker as tracker_module
+from metrics.analyzer import Analyzer
+from metrics.contention_detector import ContentionDetector
+
+# thread_details as shipped before per-thread rates existed: no cpu_percent, ratios or wait channel
+OLD_SNAPSHOT = {
+    "timestamp": "2026-01-01T00:00:00Z",
+    "thread_metrics": {"thread_details": [
+        {"pid": 42, "process_name": "legacy", "ident": 43, "user_time": 12.0, "system_time": 3.0,
+         "total_cpu_time": 15.0}
+    ]}
+}
+
+
+def test_snapshot_without_rates_is_classified_without_errors():
+    analyzer = Analyzer()
+    assert analyzer.get_contention_issues(snapshot=OLD_SNAPSHOT) == []
+    assert analyzer.get_blocking_threads_info(snapshot=OLD_SNAPSHOT) == []
+
+
+def test_partial_thread_fields_still_classify():
+    issues = ContentionDetector().classify([{"tid": 7, "blocked_ratio": 0.9, "state": "D"}], 42, "legacy")
+
+    issue, = issues
+    assert issue["type"] == "ThreadContention"
+    assert issue["stack_summary"] == ["wchan: unknown", "state: D"]
+    assert issue["voluntary_ctxt_switches_per_sec"] is None
+
+
+def write_task(proc, tid, cpu_ticks, voluntary, run_ns, wait_ns, state, wchan, uptime):
+    task = proc / "42" / "task" / str(tid)
+    task.mkdir(parents=True, exist_ok=True)
+    fields = [state] + ["0"] * 21
+    fields[11] = str(cpu_ticks)
+    (task / "stat").write_text(f"{tid} (worker) {' '.join(fields)}\n")
+    (task / "status").write_text(f"voluntary_ctxt_switches:\t{voluntary}\nnonvoluntary_ctxt_switches:\t0\n")
+    (task / "schedstat").write_text(f"{run_ns} {wait_ns} 1\n")
+    (task / "wchan").write_text(wchan)
+    (proc / "uptime").write_text(f"{uptime} 0.0\n")
+
+
+def test_assess_thresholds():
+    detector = ContentionDetector(blocked_threshold=0.5, contention_switch_rate=50, run_delay_threshold=0.2)
+
+    contended = {"blocked_ratio": 0.8, "wait_channel": "futex_wait_queue", "voluntary_ctxt_switches_per_sec": 400}
+    idle_worker = dict(contended, voluntary_ctxt_switches_per_sec=0.5)
+    disk_wait = {"blocked_ratio": 0.9, "state": "D", "wait_channel": "io_schedule"}
+    starved = {"blocked_ratio": 0.1, "run_delay_ratio": 0.35, "state": "R"}
+
+    assert detector.assess(contended)["contention_reasons"] == ["lock_contention"]
+    assert detector.assess(idle_worker) == {"is_blocking": False, "is_starved": False, "contention_reasons": []}
+    assert detector.assess(disk_wait)["contention_reasons"] == ["uninterruptible_wait"]
+    assert detector.assess(starved) == {"is_blocking": False, "is_starved": True,
+                                        "contention_reasons": ["cpu_starvation"]}
+
+
+def test_detect_classifies_from_schedstat_deltas(tmp_path, monkeypatch):
+    clock = iter([100.0, 110.0])
+    monkeypatch.setattr(tracker_module, "time", types.SimpleNamespace(monotonic=lambda: next(clock)))
+    proc = tmp_path / "proc"
+    second = 10 ** 9
+    # tid 1: contended lock waiter, tid 2: parked pool worker, tid 3: runnable but starved
+    write_task(proc, 1, 0, 0, 0, 0, "S", "futex_wait_queue", uptime=1000)
+    write_task(proc, 2, 0, 0, 0, 0, "S", "futex_wait_queue", uptime=1000)
+    write_task(proc, 3, 0, 0, 0, 0, "R", "0", uptime=1000)
+    detector = ContentionDetector(proc_root=str(proc))
+    assert detector.detect(42, "server") == []  # first sight: no schedstat baseline
+
+    write_task(proc, 1, 0, 3000, 1 * second, 1 * second, "S", "futex_wait_queue", uptime=1010)
+    write_task(proc, 2, 0, 3, 0, 0, "S", "futex_wait_queue", uptime=1010)
+    write_task(proc, 3, 0, 0, 6 * second, 4 * second, "R", "0", uptime=1010)
+    issues = sorted(detector.detect(42, "server", timestamp="2026-01-01T00:00:00Z"),
+                    key=lambda issue: issue["thread_name"])
+
+    assert [(issue["type"], issue["thread_name"]) for issue in issues] == [
+        ("ThreadContention", "TID-1"), ("CPUStarvation", "TID-3")]
+    contention, starvation = issues
+    assert contention["blocked_ratio"] == 0.8
+    assert contention["voluntary_ctxt_switches_per_sec"] == 300.0
+    assert contention["stack_summary"] == ["wchan: futex_wait_queue", "state: S"]
+    assert starvation["run_delay_ratio"] == 0.4
@@ -0,0 +1,73 @@
+import collections
+import itertools
+import types
+
+import pytest
+
+from metrics import disk_io_engine as engine_module
+from metrics.disk_io_engine import DiskIORateEngine
+
+DiskCounters = collections.namedtuple("DiskCounters", "read_count write_count read_bytes write_bytes "
+                                                      "read_time write_time busy_time")
+BOOT_TIME = 1_000_000.0
+
+
+@pytest.fixture
+def disks(tmp_path, monkeypatch):
+    """Fake psutil counters for sda (with partition sda1); 10 s between samples, booted 1000 s ago."""
+    (tmp_path / "block" / "sda").mkdir(parents=True)
+    counters = {}
+    ticks = itertools.count(500.0, 10.0)
+    monkeypatch.setattr(engine_module, "time",
+                        types.SimpleNamespace(monotonic=lambda: next(ticks), time=lambda: BOOT_TIME + 1000))
+    monkeypatch.setattr(engine_module.psutil, "boot_time", lambda: BOOT_TIME)
+    monkeypatch.setattr(engine_module.psutil, "disk_io_counters", lambda perdisk=False: dict(counters))
+    return counters, DiskIORateEngine(max_age=0, sys_root=str(tmp_path))
+
+
+def test_first_sample_reports_averages_since_boot(disks):
+    counters, engine = disks
+    counters["sda"] = DiskCounters(2000, 1000, 8_000_000, 4_000_000, 3000, 5000, 100_000)
+
+    rates = engine.sample()
+
+    assert rates["since_boot"] is True
+    assert rates["interval_seconds"] == 1000.0
+    assert rates["disks"]["sda"]["read_iops"] == 2.0
+    assert rates["disks"]["sda"]["utilization_percent"] == 10.0
+
+
+def test_iops_throughput_await_and_utilization(disks):
+    counters, engine = disks
+    counters["sda"] = DiskCounters(2000, 1000, 8_000_000, 4_000_000, 3000, 5000, 100_000)
+    counters["sda1"] = DiskCounters(2000, 1000, 8_000_000, 4_000_000, 3000, 5000, 100_000)
+    engine.sample()
+
+    counters["sda"] = DiskCounters(2500, 1200, 10_048_000, 4_409_600, 4000, 5800, 104_000)
+    counters["sda1"] = DiskCounters(2500, 1200, 10_048_000, 4_409_600, 4000, 5800, 104_000)
+    rates = engine.sample()
+
+    sda = rates["disks"]["sda"]
+    assert rates["since_boot"] is False
+    assert rates["interval_seconds"] == 10.0
+    assert sda["read_iops"] == 50.0
+    assert sda["write_iops"] == 20.0
+    assert sda["read_bytes_per_sec"] == 204_800.0
+    assert sda["write_bytes_per_sec"] == 40_960.0
+    assert sda["read_await_ms"] == 2.0    # 1000 ms over 500 reads
+    assert sda["write_await_ms"] == 4.0   # 800 ms over 200 writes
+    assert sda["utilization_percent"] == 40.0
+    # The partition is reported but not counted twice in the total
+    assert rates["total"]["read_iops"] == 50.0
+
+
+def test_counter_reset_does_not_go_negative(disks):
+    counters, engine = disks
+    counters["sda"] = DiskCounters(2000, 1000, 8_000_000, 4_000_000, 3000, 5000, 100_000)
+    engine.sample()
+
+    counters["sda"] = DiskCounters(10, 5, 4096, 4096, 2, 3, 50)  # device re-attached
+    sda = engine.sample()["disks"]["sda"]
+
+    assert sda["read_iops"] == 0.0
+    assert sda["utilization_percent"] == 0.0
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from metrics.history_reader import MappedHistoryReader, decode_range
+
+RECORDS = [{"seq": i, "pad": "x" * (i * 37 % 300)} for i in range(60)]
+
+
+@pytest.fixture
+def history(tmp_path):
+    """Records of uneven length with a blank line, a CRLF line and no newline after the last record."""
+    lines = [json.dumps(record) for record in RECORDS]
+    lines[10] += "\r"
+    lines.insert(20, "")
+    path = tmp_path / "history.jsonl"
+    path.write_bytes("\n".join(lines).encode("utf-8"))
+    return str(path)
+
+
+def test_index_and_record_views(history):
+    with MappedHistoryReader(history) as reader:
+        assert len(reader) == len(RECORDS) + 1  # the blank line is a record slot in the index
+        view = reader.record_view(0)
+        assert json.loads(bytes(view)) == RECORDS[0]
+        view.release()
+
+
+@pytest.mark.parametrize("parts", [1, 2, 3, 7, 16, 200])
+def test_split_ranges_are_aligned_and_cover_every_record_once(history, parts):
+    with MappedHistoryReader(history) as reader:
+        ranges = reader.split(parts)
+        records = [record for start, end in ranges for record in reader.iter_records(start, end)]
+        boundaries = set(reader.build_index())
+
+    assert len(ranges) <= parts
+    assert ranges[0][0] == 0 and ranges[-1][1] == reader.size
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    assert all(start in boundaries for start, _ in ranges)
+    assert records == RECORDS
+
+
+def test_unaligned_range_starts_at_the_next_record(history):
+    with MappedHistoryReader(history) as reader:
+        second = reader.build_index()[1]
+        assert [record["seq"] for record in reader.iter_records(1, second)] == []
+        assert [record["seq"] for record in reader.iter_records(1, second + 1)] == [1]
+        assert [record["seq"] for record in decode_range(history, second - 1, second + 1)] == [1]
+
+
+def test_undecodable_records_go_to_on_error(tmp_path):
+    path = tmp_path / "history.jsonl"
+    path.write_text('{"seq": 1}\n{"seq": \n{"seq": 3}\n')
+    errors = []
+
+    with MappedHistoryReader(str(path)) as reader:
+        records = list(reader.iter_records(on_error=errors.append))
+
+    assert records == [{"seq": 1}, {"seq": 3}]
+    assert len(errors) == 1
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "history.jsonl"
+    path.write_bytes(b"")
+
+    with MappedHistoryReader(str(path)) as reader:
+        assert reader.split(4) == []
+        assert list(reader.iter_records()) == []
+        assert list(reader.iter_records_parallel(workers=2)) == []
+
+
+def test_parallel_decode_keeps_file_order(history):
+    with MappedHistoryReader(history) as reader:
+        assert list(reader.iter_records_parallel(workers=2)) == RECORDS
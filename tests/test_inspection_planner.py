@@ -0,0 +1,79 @@
+import pytest
+
+from metrics.inspection_planner import InspectionPlanner
+
+MB = 1024 * 1024
+
+
+class StubCache:
+    def __init__(self):
+        self.records = []
+
+    def sample(self):
+        return self.records
+
+
+def process(pid, cpu_percent=0.0, memory_percent=0.0, io_bytes_per_sec=0.0, rss=100 * MB):
+    return {"pid": pid, "create_time": 1000.0 + pid, "cpu_percent": cpu_percent, "memory_percent": memory_percent,
+            "io_bytes_per_sec": io_bytes_per_sec, "rss": rss}
+
+
+@pytest.fixture
+def cache():
+    return StubCache()
+
+
+@pytest.fixture
+def planner(cache):
+    return InspectionPlanner(tiers={"threads": (1.0, 3)}, min_k=1, max_k=20, cost_smoothing=0.5, cache=cache)
+
+
+def test_k_follows_the_smoothed_cost_per_process(planner):
+    planner.record_cost("threads", 0.5, 10)    # 50 ms per process
+    assert planner.stats()["threads"]["k"] == 20  # 1 s budget / 50 ms
+
+    planner.record_cost("threads", 2.5, 10)    # 250 ms; smoothed to 150 ms
+    stats = planner.stats()["threads"]
+    assert stats["cost_per_process_ms"] == 150.0
+    assert stats["k"] == 6
+    assert (stats["inspected"], stats["elapsed_seconds"]) == (20, 3.0)
+
+    planner.record_cost("threads", 50.0, 10)   # far over budget: K bottoms out at min_k
+    assert planner.stats()["threads"]["k"] == 1
+    planner.record_cost("threads", 0.0, 0)     # an empty pass is ignored
+    assert planner.stats()["threads"]["inspected"] == 30
+
+
+def test_k_is_capped_at_max_k(planner):
+    planner.record_cost("threads", 0.001, 10)
+
+    assert planner.stats()["threads"]["k"] == 20
+
+
+def test_plan_takes_the_top_k_by_score(planner, cache):
+    cache.records = [process(1, cpu_percent=10), process(2, cpu_percent=60), process(3, memory_percent=40),
+                     process(4, io_bytes_per_sec=25 * MB), process(5, cpu_percent=1)]
+
+    assert [(record["pid"], reason) for record, reason in planner.plan("threads")] == [
+        (2, "top"), (4, "top"), (3, "top")]
+    assert [record["pid"] for record, _ in planner.plan("threads", limit=2, exclude_pids=(2,))] == [4, 3]
+
+
+def test_new_anomalies_are_inspected_on_top_of_k(planner, cache):
+    cache.records = [process(1, cpu_percent=50), process(2, cpu_percent=40), process(3, cpu_percent=30),
+                     process(4, rss=100 * MB)]
+    assert len(planner.plan("threads")) == 3
+
+    cache.records = [process(1, cpu_percent=50), process(2, cpu_percent=40), process(3, cpu_percent=30),
+                     process(4, rss=200 * MB)]  # doubled its RSS since the previous sample
+    plan = [(record["pid"], reason) for record, reason in planner.plan("threads")]
+    assert plan == [(1, "top"), (2, "top"), (3, "top"), (4, "anomaly:rss_growth")]
+
+    cache.records = [dict(record) for record in cache.records]  # next sample, nothing changed
+    assert [record["pid"] for record, _ in planner.plan("threads")] == [1, 2, 3]  # reported once
+
+
+def test_unknown_tier_starts_at_min_k(planner, cache):
+    cache.records = [process(1, cpu_percent=50), process(2, cpu_percent=40)]
+
+    assert [record["pid"] for record, _ in planner.plan("fds")] == [1]
@@ -0,0 +1,93 @@
+import pytest
+
+from metrics.leak_detector import MemoryLeakDetector
+
+MB = 1024 * 1024
+GB = 1024 * MB
+
+
+def record(pid, rss, create_time=1000.0, name="worker"):
+    return {"pid": pid, "create_time": create_time, "name": name, "rss": rss}
+
+
+@pytest.fixture
+def detector():
+    detector = MemoryLeakDetector(window=20, max_processes=8, min_samples=10, min_interval=0)
+    detector._read_uss = lambda pid: float("nan")
+    return detector
+
+
+def feed(detector, samples, interval=60.0, start=0.0):
+    """Observe one list of records per sample, `interval` seconds apart."""
+    for index, records in enumerate(samples):
+        detector.observe(records=records, now=start + index * interval)
+
+
+def test_linear_growth_is_flagged_with_time_to_oom(detector):
+    # 100 MB/min growth in the leaking process, a flat neighbour
+    feed(detector, [[record(10, 500 * MB + i * 100 * MB), record(11, 200 * MB, name="steady")] for i in range(12)])
+
+    suspects = detector.suspects(available_bytes=600 * MB)
+
+    assert [suspect["pid"] for suspect in suspects] == [10]
+    leak = suspects[0]
+    assert leak["metric"] == "rss"
+    assert leak["growth_mb_per_hour"] == pytest.approx(6000.0)
+    assert leak["r2"] == 1.0
+    assert leak["samples"] == 12
+    assert leak["memory_usage_mb"] == pytest.approx(1600.0)
+    assert leak["time_to_oom_seconds"] == 360  # 600 MB at 100 MB/min
+
+
+def test_noisy_or_short_histories_are_not_flagged(detector):
+    noise = [0, 300, 10, 250, 40, 310, 5, 290, 30, 280, 0, 300]
+    feed(detector, [[record(10, 500 * MB + n * MB)] for n in noise])
+    assert detector.suspects(available_bytes=GB) == []
+
+    short = MemoryLeakDetector(min_samples=10, min_interval=0)
+    short._read_uss = lambda pid: float("nan")
+    feed(short, [[record(10, 500 * MB + i * 100 * MB)] for i in range(9)])
+    assert short.suspects(available_bytes=GB) == []
+
+
+def test_uss_is_preferred_once_it_has_enough_samples(detector):
+    # RSS stays flat (shared pages) while USS grows: only the USS fit sees the leak
+    uss = iter(300 * MB + i * 50 * MB for i in range(12))
+    detector._read_uss = lambda pid: next(uss)
+    feed(detector, [[record(10, 800 * MB)] for _ in range(12)])
+
+    suspects = detector.suspects(available_bytes=GB)
+
+    assert len(suspects) == 1
+    assert suspects[0]["metric"] == "uss"
+    assert suspects[0]["growth_mb_per_hour"] == pytest.approx(3000.0)
+
+
+def test_rss_is_used_below_the_uss_sample_count(detector):
+    detector.uss_top_n = 1
+    feed(detector, [[record(10, 900 * MB), record(11, 100 * MB + i * 100 * MB)] for i in range(12)])
+
+    # pid 11 stays smaller than pid 10, so it never gets a USS sample and is fitted on RSS
+    leak, = detector.suspects(available_bytes=GB)
+    assert leak["pid"] == 11
+    assert leak["metric"] == "rss"
+
+
+def test_restarted_pid_gets_a_fresh_row(detector):
+    feed(detector, [[record(10, 500 * MB + i * 100 * MB)] for i in range(12)])
+    assert detector.suspects(available_bytes=GB)[0]["create_time"] == 1000.0
+
+    # Same pid, new process: the old history is released and the new one starts empty
+    feed(detector, [[record(10, 50 * MB, create_time=2000.0)]], start=12 * 60.0)
+
+    assert list(detector._rows) == [(10, 2000.0)]
+    assert detector.suspects(available_bytes=GB) == []
+    row = detector._rows[(10, 2000.0)]
+    assert detector._cursor[row] == 1
+
+
+def test_min_interval_skips_close_observations():
+    detector = MemoryLeakDetector(min_interval=5.0)
+    detector._read_uss = lambda pid: float("nan")
+    assert detector.observe(records=[record(10, MB)], now=100.0) is True
+    assert detector.observe(records=[record(10, MB)], now=102.0) is False
@@ -0,0 +1,69 @@
+import http.client
+import json
+import threading
+import time
+
+from metrics import metric_request_handler
+from metrics.metric_request_handler import start_http_server
+
+
+class FakeManager:
+    """Publishes one snapshot a moment after its collection loop starts, like a first auto-save cycle."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.openmetrics_text = None
+        self.stopped = threading.Event()
+
+    def start_auto_save(self):
+        def cycle():
+            time.sleep(0.1)
+            self.metrics = {"timestamp": "2026-01-01T00:00:00Z", "cpu_metrics": {"cpu_usage_percent": 12.5}}
+            self.openmetrics_text = b"# EOF\n"
+
+        threading.Thread(target=cycle, daemon=True).start()
+
+    def stop_auto_save(self):
+        self.stopped.set()
+
+
+def get(port, path):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        connection.request("GET", path)
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+def test_standalone_server_starts_collection(monkeypatch):
+    servers = []
+    create_http_server = metric_request_handler.create_http_server
+
+    def create_and_remember(*args, **kwargs):
+        servers.append(create_http_server(*args, **kwargs))
+        return servers[-1]
+
+    monkeypatch.setattr(metric_request_handler, "create_http_server", create_and_remember)
+    manager = FakeManager()
+    thread = threading.Thread(target=start_http_server, args=(manager,), kwargs={"port": 0}, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not servers and time.monotonic() < deadline:
+        time.sleep(0.01)
+    port = servers[0].server_address[1]
+
+    deadline = time.monotonic() + 5
+    status, body = get(port, "/metrics")
+    while status == 503 and time.monotonic() < deadline:  # before the first cycle
+        time.sleep(0.05)
+        status, body = get(port, "/metrics")
+
+    assert status == 200
+    assert json.loads(body)["cpu_metrics"]["cpu_usage_percent"] == 12.5
+    assert get(port, "/metrics/openmetrics") == (200, b"# EOF\n")
+
+    servers[0].shutdown()
+    thread.join(5)
+    assert manager.stopped.is_set()
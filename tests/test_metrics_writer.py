@@ -0,0 +1,52 @@
+import gzip
+import json
+
+from metrics.metrics_writer import MetricsWriter
+
+
+def read_lines(path, opener=open):
+    with opener(path, "rt") as file:
+        return [json.loads(line) for line in file]
+
+
+def test_batches_are_appended_as_json_lines(tmp_path):
+    writer = MetricsWriter(str(tmp_path / "history.jsonl"), batch_size=2, flush_interval=60)
+    for i in range(5):
+        writer.submit({"seq": i})
+    assert writer.flush(timeout=5)
+    writer.close(timeout=5)
+
+    assert read_lines(writer.file_path) == [{"seq": i} for i in range(5)]
+    assert writer.stats["records"] == 5
+    assert writer.stats["batches"] == 3
+
+
+def test_gzip_members_concatenate_into_one_stream(tmp_path):
+    writer = MetricsWriter(str(tmp_path / "history.jsonl"), batch_size=1, compression="gzip")
+    writer.submit({"seq": 1})
+    writer.submit({"seq": 2})
+    writer.close(timeout=5)
+
+    assert writer.file_path.endswith(".gz")
+    assert read_lines(writer.file_path, gzip.open) == [{"seq": 1}, {"seq": 2}]
+
+
+def test_unserializable_record_is_skipped_not_the_batch(tmp_path):
+    writer = MetricsWriter(str(tmp_path / "history.jsonl"), batch_size=3, flush_interval=60)
+    writer.submit({"seq": 1})
+    writer.submit({"seq": 2, "handle": object()})
+    writer.submit({"seq": 3})
+    writer.close(timeout=5)
+
+    assert read_lines(writer.file_path) == [{"seq": 1}, {"seq": 3}]
+    assert writer.stats["records"] == 2
+    assert writer.stats["unserializable"] == 1
+
+
+def test_batch_of_only_bad_records_writes_nothing(tmp_path):
+    writer = MetricsWriter(str(tmp_path / "history.jsonl"), batch_size=1)
+    writer.submit({"value": float("nan"), "handle": {1, 2}})
+    writer.close(timeout=5)
+
+    assert not (tmp_path / "history.jsonl").exists()
+    assert writer.stats["batches"] == 0
@@ -0,0 +1,112 @@
+import collections
+import types
+
+import psutil
+import pytest
+
+from metrics import network_io_engine as engine_module
+from metrics.network_io_engine import NetworkRateEngine
+
+NicCounters = collections.namedtuple("NicCounters", NetworkRateEngine.COUNTERS)
+NicStats = collections.namedtuple("NicStats", "isup speed")
+Connection = collections.namedtuple("Connection", "pid status")
+BOOT_TIME = 1_000_000.0
+
+
+class StubCache:
+    def sample(self):
+        return [{"pid": 10, "name": "nginx"}, {"pid": 11, "name": "postgres"}]
+
+
+@pytest.fixture
+def host(monkeypatch):
+    """Fake psutil NIC counters and sockets; booted 1000 s before the first sample."""
+    state = types.SimpleNamespace(now=500.0, counters={}, connections=[], connection_walks=0)
+
+    def net_connections(kind="inet"):
+        state.connection_walks += 1
+        return list(state.connections)
+
+    monkeypatch.setattr(engine_module, "time", types.SimpleNamespace(
+        monotonic=lambda: state.now, time=lambda: BOOT_TIME + 1000))
+    monkeypatch.setattr(engine_module.psutil, "boot_time", lambda: BOOT_TIME)
+    monkeypatch.setattr(engine_module.psutil, "net_io_counters", lambda pernic=False: dict(state.counters))
+    monkeypatch.setattr(engine_module.psutil, "net_if_stats",
+                        lambda: {"eth0": NicStats(True, 100), "lo": NicStats(True, 0)})
+    monkeypatch.setattr(engine_module.psutil, "net_connections", net_connections)
+    return state
+
+
+def test_first_sample_averages_since_boot(host):
+    host.counters = {"eth0": NicCounters(1_000_000, 2_000_000, 0, 0, 0, 0, 0, 0)}
+
+    rates = NetworkRateEngine(max_age=0).sample()
+
+    assert rates["since_boot"] is True
+    assert rates["interval_seconds"] == 1000.0
+    assert rates["interfaces"]["eth0"]["bytes_recv_per_sec"] == 2000.0
+
+
+def test_per_interface_rates_and_utilization(host):
+    engine = NetworkRateEngine(max_age=0)
+    host.counters = {"eth0": NicCounters(1000, 1000, 10, 10, 0, 0, 0, 0),
+                     "lo": NicCounters(0, 0, 0, 0, 0, 0, 0, 0)}
+    engine.sample()
+
+    host.now += 10
+    host.counters = {"eth0": NicCounters(6_251_000, 1_251_000, 1010, 510, 3, 2, 10, 0),
+                     "lo": NicCounters(5_000_000, 5_000_000, 0, 0, 0, 0, 0, 0)}
+    rates = engine.sample()
+
+    eth0 = rates["interfaces"]["eth0"]
+    assert rates["since_boot"] is False
+    assert eth0["bytes_sent_per_sec"] == 625_000.0
+    assert eth0["bytes_recv_per_sec"] == 125_000.0
+    assert eth0["packets_sent_per_sec"] == 100.0
+    assert eth0["errors_per_sec"] == 0.5
+    assert eth0["drops_per_sec"] == 1.0
+    assert eth0["utilization_percent"] == 5.0   # 5 Mbit/s sent on a 100 Mbit/s link
+    assert rates["interfaces"]["lo"]["utilization_percent"] is None  # no link speed
+    assert rates["total"]["bytes_sent_per_sec"] == 625_000.0  # loopback is left out of the total
+
+
+def test_counter_reset_does_not_go_negative(host):
+    engine = NetworkRateEngine(max_age=0)
+    host.counters = {"eth0": NicCounters(10_000, 10_000, 10, 10, 0, 0, 0, 0)}
+    engine.sample()
+
+    host.now += 10
+    host.counters = {"eth0": NicCounters(500, 500, 1, 1, 0, 0, 0, 0)}  # driver reloaded
+
+    assert engine.sample()["interfaces"]["eth0"]["bytes_sent_per_sec"] == 0.0
+
+
+def test_connections_are_walked_at_most_once_per_interval(host):
+    host.connections = [Connection(10, "ESTABLISHED"), Connection(10, "ESTABLISHED"),
+                        Connection(10, "TIME_WAIT"), Connection(11, "LISTEN"), Connection(None, "LISTEN")]
+    engine = NetworkRateEngine(connection_interval=30, top_n=1, cache=StubCache())
+
+    first = engine.process_connections()
+    host.now += 29
+    assert engine.process_connections() is first
+    assert host.connection_walks == 1
+
+    host.now += 1
+    engine.process_connections()
+    assert host.connection_walks == 2
+    assert first["processes"] == [{"pid": 10, "name": "nginx", "connections": 3,
+                                   "by_state": {"ESTABLISHED": 2, "TIME_WAIT": 1}}]
+
+
+def test_connections_disabled_or_denied(host, monkeypatch):
+    assert NetworkRateEngine().process_connections() is None
+    assert host.connection_walks == 0
+
+    def denied(kind="inet"):
+        raise psutil.AccessDenied()
+
+    monkeypatch.setattr(engine_module.psutil, "net_connections", denied)
+    engine = NetworkRateEngine(connection_interval=30, cache=StubCache())
+
+    assert engine.process_connections() is None
+    assert engine.connection_interval is None  # not retried every cycle
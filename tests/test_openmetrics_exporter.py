@@ -0,0 +1,66 @@
+import pytest
+
+from metrics.openmetrics_exporter import OpenMetricsExporter
+
+
+@pytest.fixture
+def exporter():
+    return OpenMetricsExporter(top_n=2)
+
+
+def family(text, name):
+    """:return: list[str] - The lines of one metric family, TYPE and HELP included."""
+    return [line for line in text.splitlines() if line.startswith(f"sysprof_{name}") or line.endswith(
+        f" sysprof_{name}") or f" sysprof_{name} " in line]
+
+
+def test_gauges_counters_and_eof(exporter):
+    text = exporter.render({
+        "timestamp": "2024-01-01T00:00:00Z",
+        "cpu_metrics": {"cpu_usage_percent": 12.5},
+        "cpu_deep_metrics": {"cpu_context_switches": 1000, "cpu_load": [0.5, 0.25, 0.125]},
+    })
+
+    assert text.endswith("\n# EOF\n")
+    assert family(text, "cpu_usage_percent") == [
+        "# TYPE sysprof_cpu_usage_percent gauge",
+        "# HELP sysprof_cpu_usage_percent System-wide CPU utilisation.",
+        "sysprof_cpu_usage_percent 12.5"]
+    assert "# TYPE sysprof_cpu_context_switches counter" in text
+    assert "sysprof_cpu_context_switches_total 1000" in text  # counter samples carry the _total suffix
+    assert 'sysprof_cpu_load_average{period="15m"} 0.125' in text
+    assert "sysprof_collection_timestamp_seconds 1704067200.0" in text
+
+
+def test_missing_and_non_numeric_values_are_skipped(exporter):
+    text = exporter.render({"cpu_metrics": {"cpu_usage_percent": "n/a"},
+                            "memory_deep_metrics": {"memory_usage": {"total": 8, "used": None}}})
+
+    assert "cpu_usage_percent" not in text
+    assert family(text, "memory_bytes")[2:] == ['sysprof_memory_bytes{state="total"} 8']
+    assert exporter.render({}) == "# EOF\n"
+
+
+def test_label_values_are_escaped(exporter):
+    text = exporter.render({"cgroup_metrics": {"cgroups": {'/odd"name\\with\nnewline': {"cpu_percent": 1.0}}}})
+
+    assert 'sysprof_cgroup_cpu_percent{cgroup="/odd\\"name\\\\with\\nnewline"} 1.0' in text
+
+
+def test_non_finite_values_use_openmetrics_spelling(exporter):
+    text = exporter.render({"cpu_deep_metrics": {"cpu_load": [float("nan"), float("inf"), float("-inf")]}})
+
+    assert family(text, "cpu_load_average")[2:] == [
+        'sysprof_cpu_load_average{period="1m"} NaN',
+        'sysprof_cpu_load_average{period="5m"} +Inf',
+        'sysprof_cpu_load_average{period="15m"} -Inf']
+
+
+def test_process_series_are_limited_to_top_n(exporter):
+    processes = [{"pid": pid, "name": f"p{pid}", "cpu_percent": 100 - pid} for pid in range(5)]
+
+    text = exporter.render({"cpu_deep_metrics": {"top_cpu_processes": processes}})
+
+    assert family(text, "process_cpu_percent")[2:] == [
+        'sysprof_process_cpu_percent{pid="0",name="p0"} 100',
+        'sysprof_process_cpu_percent{pid="1",name="p1"} 99']
@@ -0,0 +1,103 @@
+import itertools
+import os
+import time
+import types
+
+import pytest
+
+from metrics import pressure_metrics as pressure_module
+from metrics import process_cache as process_cache_module
+from metrics.pressure_metrics import PressureMetrics
+from metrics.process_cache import ProcessCache
+
+
+def write_pressure(proc, cpu_total, memory_total):
+    (proc / "pressure").mkdir(parents=True, exist_ok=True)
+    for resource, total in (("cpu", cpu_total), ("memory", memory_total), ("io", 0)):
+        (proc / "pressure" / resource).write_text(
+            f"some avg10=1.00 avg60=0.50 avg300=0.10 total={total}\n"
+            f"full avg10=0.00 avg60=0.00 avg300=0.00 total={total // 2}\n")
+
+
+def write_vmstat(proc, pgfault, pgmajfault, pswpin=0):
+    (proc / "vmstat").write_text(f"nr_free_pages 1000\npgfault {pgfault}\npgmajfault {pgmajfault}\n"
+                                 f"pswpin {pswpin}\npswpout 0\npgscan_direct 0\nallocstall_normal 0\n"
+                                 f"allocstall_movable 0\noom_kill 0\n")
+
+
+def write_pid_stat(proc, pid, minflt, majflt, utime=500, stime=200):
+    (proc / str(pid)).mkdir(parents=True, exist_ok=True)
+    (proc / str(pid) / "stat").write_text(f"{pid} (worker one) S 1 1 1 0 -1 4194304 {minflt} 0 {majflt} 0 "
+                                          f"{utime} {stime} 0 0 20 0 1 0 100 0 0\n")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Monotonic time that advances 2 s per reading."""
+    ticks = itertools.count(1000.0, 2.0)
+    fake_time = types.SimpleNamespace(monotonic=lambda: next(ticks), time=time.time)
+    monkeypatch.setattr(pressure_module, "time", fake_time)
+    monkeypatch.setattr(process_cache_module, "time", fake_time)
+
+
+class StubCache:
+    def __init__(self, records):
+        self.records = records
+
+    def sample(self):
+        return self.records
+
+
+def test_stall_percent_and_vm_rates(tmp_path, clock):
+    proc = tmp_path / "proc"
+    write_pressure(proc, cpu_total=0, memory_total=0)
+    write_vmstat(proc, pgfault=1000, pgmajfault=100)
+    collector = PressureMetrics(proc_root=str(proc), cache=StubCache([]))
+
+    first = collector.get_metrics()
+    assert first["vm_rates"] == {}  # rates need two samples
+    assert "stall_percent" not in first["psi"]["cpu"]["some"]
+
+    write_pressure(proc, cpu_total=500_000, memory_total=1_000_000)  # microseconds stalled
+    write_vmstat(proc, pgfault=3000, pgmajfault=300, pswpin=40)
+    metrics = collector.get_metrics()
+
+    assert metrics["psi"]["cpu"]["some"]["stall_percent"] == 25.0     # 0.5 s of 2 s
+    assert metrics["psi"]["memory"]["some"]["stall_percent"] == 50.0
+    assert metrics["psi"]["memory"]["full"]["stall_percent"] == 25.0
+    assert metrics["vm_rates"]["minor_faults_per_sec"] == 900.0       # (2000 - 200) / 2
+    assert metrics["vm_rates"]["major_faults_per_sec"] == 100.0
+    assert metrics["vm_rates"]["swap_in_pages_per_sec"] == 20.0
+
+
+def test_top_faulting_processes_come_from_the_cache(tmp_path, clock):
+    proc = tmp_path / "proc"
+    write_pressure(proc, cpu_total=0, memory_total=0)
+    write_vmstat(proc, pgfault=0, pgmajfault=0)
+    records = [
+        {"pid": 1, "name": "quiet", "minor_faults_per_sec": 5.0, "major_faults_per_sec": 0.0},
+        {"pid": 2, "name": "thrasher", "minor_faults_per_sec": 10.0, "major_faults_per_sec": 42.123},
+        {"pid": 3, "name": "elsewhere", "minor_faults_per_sec": None, "major_faults_per_sec": None}
+    ]
+    collector = PressureMetrics(proc_root=str(proc), top_n=5, cache=StubCache(records))
+
+    top = collector.get_metrics()["top_faulting_processes"]
+
+    assert [entry["name"] for entry in top] == ["thrasher", "quiet"]
+    assert top[0]["major_faults_per_sec"] == 42.12
+
+
+def test_process_cache_fault_rates_from_proc_stat(tmp_path, clock):
+    proc = tmp_path / "proc"
+    pid = os.getpid()
+    write_pid_stat(proc, pid, minflt=100, majflt=10)
+    cache = ProcessCache(max_age=0, proc_root=str(proc))
+    cache.sample()
+
+    write_pid_stat(proc, pid, minflt=300, majflt=30, utime=700)
+    record, = [record for record in cache.sample() if record["pid"] == pid]
+
+    ticks = os.sysconf("SC_CLK_TCK")
+    assert record["minor_faults_per_sec"] == 100.0  # 200 faults over 2 s
+    assert record["major_faults_per_sec"] == 10.0
+    assert record["cpu_percent"] == round(200 / ticks / 2 * 100, 1)
@@ -0,0 +1,126 @@
+import collections
+import types
+
+import psutil
+import pytest
+
+from metrics import process_cache as cache_module
+from metrics.process_cache import ProcessCache
+
+CpuTimes = collections.namedtuple("CpuTimes", "user system")
+MemoryInfo = collections.namedtuple("MemoryInfo", "rss vms")
+IoCounters = collections.namedtuple("IoCounters", "read_bytes write_bytes")
+WALL_START = 1_700_000_000.0
+
+
+class FakeProcess:
+    def __init__(self, table, pid, name, create_time, cpu_seconds=0.0, io_bytes=(0, 0)):
+        self.table = table
+        self.pid = pid
+        self.name = name
+        self._create_time = create_time
+        self.cpu_seconds = cpu_seconds
+        self.io_bytes = io_bytes
+        self.static_reads = 0
+
+    def create_time(self):
+        return self._create_time
+
+    def is_running(self):
+        return self.table.get(self.pid) is self
+
+    def as_dict(self, attrs, ad_value=None):
+        if not self.is_running():
+            raise psutil.NoSuchProcess(self.pid)
+        values = {"name": self.name, "cmdline": [self.name], "exe": f"/usr/bin/{self.name}", "username": "svc",
+                  "cpu_times": CpuTimes(self.cpu_seconds, 0.0), "memory_info": MemoryInfo(1024, 4096),
+                  "num_threads": 2, "io_counters": IoCounters(*self.io_bytes)}
+        if "name" in attrs:
+            self.static_reads += 1
+        return {attr: values[attr] for attr in attrs}
+
+
+@pytest.fixture
+def host(tmp_path, monkeypatch):
+    """A fake process table behind psutil, a clock advancing 2 s per sample, and a cache without /proc."""
+    table = {}
+    clock = types.SimpleNamespace(now=100.0)
+
+    def process(pid):
+        if pid not in table:
+            raise psutil.NoSuchProcess(pid)
+        return table[pid]
+
+    monkeypatch.setattr(cache_module, "psutil", types.SimpleNamespace(
+        pids=lambda: sorted(table), Process=process,
+        virtual_memory=lambda: types.SimpleNamespace(total=1024 * 100),
+        NoSuchProcess=psutil.NoSuchProcess, AccessDenied=psutil.AccessDenied))
+    monkeypatch.setattr(cache_module, "time", types.SimpleNamespace(
+        monotonic=lambda: clock.now, time=lambda: WALL_START + clock.now))
+    cache = ProcessCache(max_age=1.0, proc_root=str(tmp_path / "no-procfs"))
+    return table, clock, cache
+
+
+def by_pid(records):
+    return {record["pid"]: record for record in records}
+
+
+def test_rates_come_from_the_previous_sample(host):
+    table, clock, cache = host
+    table[10] = FakeProcess(table, 10, "worker", create_time=WALL_START + 90.0, cpu_seconds=5.0, io_bytes=(1000, 0))
+
+    first = by_pid(cache.sample())[10]
+    assert first["cpu_percent"] == 50.0  # 5 s of CPU over the 10 s since it started
+    assert first["memory_percent"] == 1.0
+
+    table[10].cpu_seconds, table[10].io_bytes = 6.0, (5000, 2000)
+    clock.now += 2
+    second = by_pid(cache.sample())[10]
+
+    assert second["cpu_percent"] == 50.0
+    assert second["io_read_bytes_per_sec"] == 2000.0
+    assert second["io_bytes_per_sec"] == 3000.0
+    assert table[10].static_reads == 1  # static attributes are read once per process
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 1
+
+
+def test_recycled_pid_is_a_new_process(host):
+    table, clock, cache = host
+    table[10] = FakeProcess(table, 10, "old", create_time=WALL_START + 50.0, cpu_seconds=40.0)
+    cache.sample()
+    old_process = cache.process(10)
+
+    table[10] = FakeProcess(table, 10, "new", create_time=WALL_START + 101.0, cpu_seconds=0.5)
+    clock.now += 2
+    record = by_pid(cache.sample())[10]
+
+    assert record["name"] == "new"
+    assert record["create_time"] == WALL_START + 101.0
+    assert record["cpu_percent"] == 50.0  # first-sight average, not a negative delta from the old process
+    assert cache.process(10) is not old_process
+    assert cache.stats["misses"] == 2
+    assert cache.stats["evictions"] == 1
+
+
+def test_exited_processes_are_evicted(host):
+    table, clock, cache = host
+    table[10] = FakeProcess(table, 10, "short", create_time=WALL_START)
+    table[11] = FakeProcess(table, 11, "long", create_time=WALL_START)
+    cache.sample()
+
+    del table[10]
+    clock.now += 2
+    assert list(by_pid(cache.sample())) == [11]
+    assert cache.process(10) is None
+    assert cache.snapshot_stats()["cached_processes"] == 1
+
+
+def test_samples_are_shared_within_max_age(host):
+    table, clock, cache = host
+    table[10] = FakeProcess(table, 10, "worker", create_time=WALL_START)
+
+    first = cache.sample()
+    clock.now += 0.5
+    assert cache.sample() is first
+    assert cache.sample(max_age=0) is not first
+    assert cache.stats["samples"] == 2
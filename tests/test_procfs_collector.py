@@ -0,0 +1,98 @@
+import functools
+import sys
+import threading
+
+import pytest
+
+from metrics.cpu_metrics import CPUMetrics
+from metrics.cpu_metrics_deep import CpuDeepMetrics
+from metrics.disk_metrics_deep import DiskDeepMetrics
+from metrics.memory_metrics_deep import MemoryDeepMetrics
+from metrics.network_metrics import NetworkMetrics
+from metrics.procfs_collector import ProcfsCollector
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="procfs backend is Linux only")
+
+PSUTIL_COLLECTORS = {
+    "cpu_metrics": functools.partial(CPUMetrics.get_metrics, memory_threshold=0.0, cpu_interval=None),
+    "cpu_deep_metrics": CpuDeepMetrics.get_metrics,
+    "memory_deep_metrics": MemoryDeepMetrics.get_metrics,
+    "network_metrics": NetworkMetrics.get_metrics,
+    "disk_deep_metrics": DiskDeepMetrics.get_metrics
+}
+
+
+def key_paths(value, prefix=""):
+    """Every dict key path in a section; list elements are described by their first item."""
+    paths = set()
+    if isinstance(value, dict):
+        for key, item in value.items():
+            paths.add(prefix + key)
+            paths |= key_paths(item, f"{prefix}{key}.")
+    elif isinstance(value, list) and value and isinstance(value[0], dict):
+        paths |= key_paths(value[0], prefix + "[].")
+    return paths
+
+
+@pytest.fixture
+def procfs():
+    collector = ProcfsCollector(critical_memory_threshold=0.0, min_process_interval=0)
+    yield collector
+    collector.close()
+
+
+def test_collectors_cover_the_psutil_sections(procfs):
+    assert set(procfs.collectors()) == set(PSUTIL_COLLECTORS)
+
+
+@pytest.mark.parametrize("section", sorted(PSUTIL_COLLECTORS))
+def test_section_schema_matches_psutil(procfs, section):
+    expected = PSUTIL_COLLECTORS[section]()
+    actual = procfs.collectors()[section]()
+
+    assert "error" not in expected and "error" not in actual
+    assert key_paths(actual) == key_paths(expected)
+
+
+def test_disk_io_totals_match_psutil(procfs):
+    expected = DiskDeepMetrics.get_metrics()["disk_io"]
+    actual = procfs.disk_io_counters()
+
+    assert set(actual) == set(expected)
+    for key, value in actual.items():
+        assert value >= expected[key]  # counters only grow between the two reads
+
+
+def test_concurrent_reads_do_not_mix_files(procfs):
+    errors = []
+
+    def reader(name, header):
+        for _ in range(500):
+            if not procfs._read(name).startswith(header):
+                errors.append(name)
+
+    threads = [threading.Thread(target=reader, args=args)
+               for args in (("meminfo", b"MemTotal:"), ("stat", b"cpu "), ("vmstat", b"nr_free_pages ")) * 2]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def test_diskstats_skip_partitions_listed_under_sys_root(tmp_path):
+    (tmp_path / "proc").mkdir()
+    (tmp_path / "proc" / "diskstats").write_text(
+        "   8       0 sda 100 0 2000 50 40 0 800 30 0 70 80 0 0 0 0\n"
+        "   8       1 sda1 90 0 1800 45 40 0 800 30 0 60 75 0 0 0 0\n"
+        " 259       0 nvme0n1 10 0 160 5 0 0 0 0 0 4 5 0 0 0 0\n")
+    for disk in ("sda", "nvme0n1"):
+        (tmp_path / "sys" / "block" / disk).mkdir(parents=True)
+    collector = ProcfsCollector(proc_root=str(tmp_path / "proc"), sys_root=str(tmp_path / "sys"))
+    try:
+        disks = collector.read_diskstats()
+    finally:
+        collector.close()
+
+    assert disks == {"sda": (100, 2000 * 512, 50, 40, 800 * 512, 30, 70),
+                     "nvme0n1": (10, 160 * 512, 5, 0, 0, 0, 4)}
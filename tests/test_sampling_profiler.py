@@ -0,0 +1,92 @@
+import os
+import stat
+import sys
+import time
+
+import pytest
+
+from metrics.sampling_profiler import SamplingProfiler
+
+# Stands in for `py-spy record`: writes two folded stacks to --output when its
+# --duration elapses or when it is interrupted, like py-spy does.
+STUB_PY_SPY = f"""#!{sys.executable}
+import os, signal, sys, time
+
+output = sys.argv[sys.argv.index("--output") + 1]
+duration = float(sys.argv[sys.argv.index("--duration") + 1])
+
+
+def finish(*_):
+    with open(output, "w") as file:
+        file.write("main (app.py:1);work (app.py:5) 3\\n")
+        file.write("main (app.py:1);idle (app.py:9) 1\\n")
+    sys.exit(0)
+
+
+signal.signal(signal.SIGINT, finish)
+open(os.environ["STUB_READY"], "w").close()
+time.sleep(duration)
+finish()
+"""
+
+
+@pytest.fixture
+def profiler(tmp_path, monkeypatch):
+    stub = tmp_path / "bin" / "py-spy"
+    stub.parent.mkdir()
+    stub.write_text(STUB_PY_SPY)
+    stub.chmod(stub.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv("PATH", f"{stub.parent}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("STUB_READY", str(tmp_path / "ready"))
+    profiler = SamplingProfiler(window_seconds=30)
+    yield profiler
+    profiler.stop()
+
+
+def wait_until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+def test_session_aggregates_into_a_flame_graph(profiler):
+    pid = os.getpid()
+    session = profiler.start([pid], rate_hz=5000, duration=1)
+    assert session["rate_hz"] == profiler.max_rate_hz
+
+    wait_until(lambda: not profiler.is_running())
+
+    status = profiler.status()
+    assert status["errors"] == {}
+    assert status["samples"] == {pid: 4}
+    assert status["session"]["finished_at"] is not None
+    assert profiler.collapsed(pid) == "main (app.py:1);idle (app.py:9) 1\nmain (app.py:1);work (app.py:5) 3\n"
+
+    graph = profiler.flame_graph(pid)
+    main, = graph["children"]
+    assert graph["value"] == main["value"] == 4
+    assert [(child["name"], child["value"]) for child in main["children"]] == [
+        ("work (app.py:5)", 3), ("idle (app.py:9)", 1)]
+    assert profiler.flame_graph()["children"][0]["name"].endswith(f"({pid})")
+
+
+def test_stop_interrupts_the_running_window(profiler, tmp_path):
+    pid = os.getpid()
+    profiler.start([pid], duration=60)
+    wait_until((tmp_path / "ready").exists)
+
+    start = time.monotonic()
+    profiler.stop()
+
+    assert time.monotonic() - start < SamplingProfiler.INTERRUPT_GRACE
+    assert not profiler.is_running()
+    assert profiler.status()["samples"] == {pid: 4}  # the interrupted window is kept
+
+
+def test_rejects_a_second_session_and_missing_processes(profiler):
+    with pytest.raises(ValueError):
+        profiler.start([2 ** 22 + 1])
+    profiler.start([os.getpid()], duration=60)
+    with pytest.raises(RuntimeError):
+        profiler.start([os.getpid()])
@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+
+from metrics.scheduler import FixedRateScheduler
+
+
+class FakeClock:
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_ticks_stay_on_the_grid_regardless_of_run_time(clock):
+    scheduler = FixedRateScheduler(10, clock=clock)
+    starts = []
+    for run_time in (1.0, 4.5, 0.2, 9.9):
+        scheduler.begin_tick()
+        starts.append(clock.now)
+        clock.now += run_time
+        clock.now += scheduler.advance()
+
+    assert starts == [100.0, 110.0, 120.0, 130.0]
+    assert clock.now == 140.0
+    assert scheduler.missed_ticks == 0
+
+
+def test_overrun_skips_ticks_instead_of_shifting_the_schedule(clock):
+    scheduler = FixedRateScheduler(10, clock=clock)
+    scheduler.begin_tick()
+    clock.now += 25.0  # overran the ticks at 110 and 120
+
+    assert scheduler.advance() == 5.0  # next tick is 130, not 125 + 10
+    assert scheduler.missed_ticks == 2
+
+    clock.now = 130.0
+    scheduler.begin_tick()
+    clock.now += 10.0  # finishes exactly on the next tick
+    assert scheduler.advance() == 0.0
+    assert scheduler.missed_ticks == 2
+
+
+def test_jitter_statistics(clock):
+    scheduler = FixedRateScheduler(10, clock=clock)
+    for lateness in (0.0, 0.002, 0.004):
+        clock.now += lateness
+        scheduler.begin_tick()
+        clock.now += scheduler.advance()
+
+    jitter = scheduler.stats()["jitter_ms"]
+    assert jitter["last"] == 4.0
+    assert jitter["mean"] == 2.0
+    assert jitter["stdev"] == 2.0
+    assert jitter["max"] == 4.0
+    assert scheduler.stats()["ticks"] == 3
+
+
+def test_run_survives_task_errors_until_stopped():
+    scheduler = FixedRateScheduler(0.01)
+    stop_event = threading.Event()
+    calls = []
+
+    def task():
+        calls.append(1)
+        if len(calls) == 3:
+            stop_event.set()
+        raise RuntimeError("boom")
+
+    scheduler.run(task, stop_event)
+
+    assert len(calls) == 3
+    assert scheduler.stats()["ticks"] == 3
+
+
+def test_interval_must_be_positive():
+    with pytest.raises(ValueError):
+        FixedRateScheduler(0)
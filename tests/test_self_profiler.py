@@ -0,0 +1,53 @@
+import pytest
+
+from metrics.self_profiler import PerfRecorder
+
+
+@pytest.fixture
+def recorder():
+    return PerfRecorder()
+
+
+def test_percentiles_are_bucket_upper_bounds(recorder):
+    for _ in range(90):
+        recorder.record("section", 0.0008)   # 0.8 ms -> 1 ms bucket
+    for _ in range(5):
+        recorder.record("section", 0.02)     # 20 ms -> 25 ms bucket
+        recorder.record("section", 0.04)     # 40 ms -> 50 ms bucket
+
+    section = recorder.snapshot()["sections"]["section"]
+
+    assert section["count"] == 100
+    assert section["p50_ms"] == 1
+    assert section["p95_ms"] == 25
+    assert section["p99_ms"] == 40.0  # the 50 ms bucket is capped at the observed max
+    assert section["min_ms"] == 0.8
+    assert section["histogram"] == {"1": 90, "25": 5, "50": 5}
+
+
+def test_overflow_bucket_is_capped_at_the_maximum(recorder):
+    recorder.record("slow", 45.0)
+    recorder.record("slow", 60.0)
+
+    section = recorder.snapshot()["sections"]["slow"]
+
+    assert section["histogram"] == {"+Inf": 2}
+    assert section["p50_ms"] == section["p99_ms"] == section["max_ms"] == 60000.0
+
+
+def test_instrument_records_calls_that_raise(recorder):
+    @recorder.instrument()
+    def fails():
+        raise RuntimeError("boom")
+
+    with recorder.timed("block"):
+        pass
+    with pytest.raises(RuntimeError):
+        fails()
+
+    sections = recorder.snapshot()["sections"]
+    assert sections["block"]["count"] == 1
+    assert sections["test_instrument_records_calls_that_raise.<locals>.fails"]["count"] == 1
+
+    recorder.reset()
+    assert recorder.snapshot()["sections"] == {}
@@ -0,0 +1,103 @@
+import threading
+import time
+import types
+
+import pytest
+
+from metrics import snapshot_cache as cache_module
+from metrics.snapshot_cache import SnapshotCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(cache_module, "time", types.SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+class GatedLoader:
+    """Loader that publishes numbered snapshots, each one only after the gate is opened."""
+
+    def __init__(self):
+        self.cache = None
+        self.gate = threading.Event()
+        self.started = threading.Event()
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        assert self.gate.wait(10)
+        snapshot = {"seq": self.calls}
+        self.cache.publish(snapshot)
+        return snapshot
+
+
+@pytest.fixture
+def loader():
+    loader = GatedLoader()
+    loader.cache = SnapshotCache(loader, max_age=30)
+    yield loader
+    loader.gate.set()
+
+
+def wait_until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_concurrent_refreshes_share_one_collection(loader, clock):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(loader.cache.refresh())) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: loader.cache.stats["joined_refreshes"] == 4)
+    loader.gate.set()
+    for thread in threads:
+        thread.join(10)
+
+    assert loader.calls == 1
+    assert results == [{"seq": 1}] * 5
+    assert loader.cache.stats["refreshes"] == 1
+
+
+def test_first_read_waits_for_the_first_collection(loader, clock):
+    loader.gate.set()
+
+    assert loader.cache.get() == {"seq": 1}
+    assert loader.cache.get() == {"seq": 1}
+    assert loader.cache.stats["hits"] == 1
+
+
+def test_stale_snapshot_is_served_while_one_refresh_runs(loader, clock):
+    loader.cache.publish({"seq": 0})
+    clock.now += 31
+
+    assert loader.cache.get() == {"seq": 0}  # returns at once; the refresh runs in the background
+    assert loader.started.wait(10)
+    assert loader.cache.get() == {"seq": 0}  # joins the running refresh instead of starting another
+    assert loader.calls == 1
+    assert loader.cache.stats["stale_hits"] == 2
+
+    loader.gate.set()
+    wait_until(lambda: loader.cache.latest() == {"seq": 1})
+    assert loader.cache.get() == {"seq": 1}
+    assert loader.cache.stats["hits"] == 1
+
+
+def test_failed_refresh_returns_none_and_allows_the_next_one(clock):
+    outcomes = iter([RuntimeError("collector crashed"), {"seq": 2}])
+
+    def load():
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    cache = SnapshotCache(load, max_age=30)
+
+    assert cache.refresh() is None
+    assert cache.refresh() == {"seq": 2}
+    assert cache.stats["refreshes"] == 2
@@ -0,0 +1,35 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+HEAVY_MODULES = ("wmi", "pandas", "sklearn", "numpy")
+
+# Imports main.py the way the server does and reports what startup loaded; os._exit skips
+# the atexit shutdown, which would wait for the first collection cycle.
+STARTUP_PROBE = f"""
+import json, os, runpy, sys
+runpy.run_path({os.path.join(ROOT, "tests", "conftest.py")!r})
+sys.path.insert(0, {ROOT!r})
+import metrics.main as main
+print(json.dumps({{
+    "loaded": [name for name in {HEAVY_MODULES!r} if name in sys.modules],
+    "startup_seconds": main.startup_seconds,
+    "budget_seconds": main.startup_budget_seconds
+}}), flush=True)
+os._exit(0)
+"""
+
+
+def test_main_import_stays_lean_and_within_budget(tmp_path):
+    env = {key: value for key, value in os.environ.items() if not key.startswith("AGGREGATOR_")}
+    env["METRICS_FILE_PATH"] = str(tmp_path / "system_metrics.json")
+    result = subprocess.run([sys.executable, "-c", STARTUP_PROBE], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert report["loaded"] == []
+    assert report["startup_seconds"] <= report["budget_seconds"]
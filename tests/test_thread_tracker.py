@@ -0,0 +1,135 @@
+import os
+import types
+
+import pytest
+
+from metrics import thread_tracker as tracker_module
+from metrics.thread_tracker import ThreadActivityTracker
+
+TICKS = os.sysconf("SC_CLK_TCK")
+PID = 4242
+
+
+class FakeTasks:
+    """A /proc tree with one process whose task directories the test rewrites between samples."""
+
+    def __init__(self, root):
+        self.root = root
+        self.uptime = 1000.0
+
+    def write(self, tid, cpu_seconds, voluntary=0, involuntary=0, run_ns=0, wait_ns=0, start_seconds=900,
+              state="R", wchan=None, syscall=None):
+        task = self.root / str(PID) / "task" / str(tid)
+        task.mkdir(parents=True, exist_ok=True)
+        fields = [state] + ["0"] * 21
+        fields[11] = str(int(cpu_seconds * TICKS))     # utime
+        fields[19] = str(int(start_seconds * TICKS))   # starttime, ticks after boot
+        (task / "stat").write_text(f"{tid} (worker (1)) {' '.join(fields)}\n")
+        (task / "status").write_text(f"Name:\tworker\nvoluntary_ctxt_switches:\t{voluntary}\n"
+                                     f"nonvoluntary_ctxt_switches:\t{involuntary}\n")
+        (task / "schedstat").write_text(f"{run_ns} {wait_ns} 10\n")
+        if wchan is not None:
+            (task / "wchan").write_text(wchan)
+        if syscall is not None:
+            (task / "syscall").write_text(syscall)
+        (self.root / "uptime").write_text(f"{self.uptime} 0.0\n")
+
+    def remove(self, tid):
+        for path in (self.root / str(PID) / "task" / str(tid)).iterdir():
+            path.unlink()
+        (self.root / str(PID) / "task" / str(tid)).rmdir()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=500.0)
+    monkeypatch.setattr(tracker_module, "time", types.SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture
+def tasks(tmp_path):
+    return FakeTasks(tmp_path)
+
+
+@pytest.fixture
+def tracker(tasks):
+    return ThreadActivityTracker(proc_root=str(tasks.root), max_idle=60)
+
+
+def advance(clock, tasks, seconds):
+    clock.now += seconds
+    tasks.uptime += seconds
+
+
+def test_first_sample_averages_over_the_thread_lifetime(tasks, tracker, clock):
+    tasks.write(1, cpu_seconds=25, voluntary=200, start_seconds=900)
+
+    thread, = tracker.sample(PID)
+
+    assert thread["tid"] == 1
+    assert thread["cpu_percent"] == 25.0      # 25 s over 100 s alive
+    assert thread["voluntary_ctxt_switches_per_sec"] == 2.0
+
+
+def test_schedstat_ratios_since_the_previous_sample(tasks, tracker, clock):
+    tasks.write(1, cpu_seconds=10, run_ns=50 * 10 ** 9, wait_ns=5 * 10 ** 9)
+    tracker.sample(PID)
+
+    advance(clock, tasks, 10)
+    tasks.write(1, cpu_seconds=12, voluntary=30, involuntary=5, run_ns=52 * 10 ** 9, wait_ns=6 * 10 ** 9)
+    thread, = tracker.sample(PID)
+
+    assert thread["cpu_percent"] == 20.0
+    assert thread["voluntary_ctxt_switches_per_sec"] == 3.0
+    assert thread["nonvoluntary_ctxt_switches_per_sec"] == 0.5
+    assert thread["run_delay_ratio"] == 0.1   # 1 s runnable but waiting
+    assert thread["blocked_ratio"] == 0.7     # neither running (2 s) nor waiting (1 s)
+
+
+def test_consumers_keep_their_own_baselines(tasks, tracker, clock):
+    tasks.write(1, cpu_seconds=10)
+    tracker.sample(PID)                        # collector baseline at 10 s of CPU
+
+    advance(clock, tasks, 8)
+    tasks.write(1, cpu_seconds=14)
+    tracker.sample(PID, consumer="route")      # route baseline
+
+    advance(clock, tasks, 2)
+    tasks.write(1, cpu_seconds=16)
+    route, = tracker.sample(PID, consumer="route")
+    collector, = tracker.sample(PID)
+
+    assert route["cpu_percent"] == 100.0       # 2 s over its own 2 s window
+    assert collector["cpu_percent"] == 60.0    # 6 s over the collector's 10 s window
+    assert tracker.stats()["consumers"] == {"collector": {"tracked_processes": 1, "tracked_threads": 1},
+                                            "route": {"tracked_processes": 1, "tracked_threads": 1}}
+
+
+def test_reused_tid_exited_threads_and_idle_processes(tasks, tracker, clock):
+    tasks.write(1, cpu_seconds=50, start_seconds=100)
+    tasks.write(2, cpu_seconds=1)
+    tracker.sample(PID)
+
+    advance(clock, tasks, 10)
+    tasks.remove(2)
+    tasks.write(1, cpu_seconds=2, start_seconds=1000)  # tid 1 now belongs to a new thread
+    thread, = tracker.sample(PID)
+
+    assert thread["cpu_percent"] == 20.0      # its own lifetime (10 s), not a delta from the old thread
+    assert tracker.stats()["tracked_threads"] == 1
+
+    advance(clock, tasks, 61)
+    tracker.sample(PID, consumer="route")
+    assert tracker.stats()["consumers"] == {"route": {"tracked_processes": 1, "tracked_threads": 1}}
+
+
+def test_wait_channel_of_sleeping_threads(tasks, tracker, clock):
+    tracker._futex_syscall = 202
+    tasks.write(1, cpu_seconds=1, state="S", wchan="pipe_read")
+    tasks.write(2, cpu_seconds=1, state="S", wchan="0", syscall="202 0x7f 0x80 0x0 0x0 0x0 0x0")
+    tasks.write(3, cpu_seconds=1, state="R", wchan="ignored")
+
+    channels = {thread["tid"]: (thread["state"], thread["wait_channel"]) for thread in tracker.sample(PID)}
+
+    assert channels == {1: ("S", "pipe_read"), 2: ("S", "futex"), 3: ("R", None)}
@@ -0,0 +1,100 @@
+import json
+import logging
+import os
+import pickle
+import random
+from datetime import datetime, timezone
+
+from metrics.alert_manager import AlertManager
+from metrics.analyzer import Analyzer
+from metrics.threshold_rules import ThresholdRuleSet
+
+SPEC = {
+    "rules": [
+        {"name": "memory_usage", "type": "HighMemoryUsage", "path": "memory.percent",
+         "op": ">", "threshold": 90, "clear_threshold": 85, "for_seconds": 30},
+        {"name": "disk_usage", "type": "HighDiskUsage", "path": "disks[*].percent", "key": "mountpoint",
+         "op": ">", "threshold": 85, "clear_threshold": 80, "for_seconds": 20},
+        {"name": "cpu_frequency", "type": "LowCPUFrequency", "path": "cpu.frequency",
+         "op": "<", "threshold": 1500, "clear_threshold": 1600}
+    ],
+    "analyzer": {"cpu_threshold": 80}
+}
+
+
+def make_records(count, seed=7):
+    random.seed(seed)
+    records = []
+    for position in range(count):
+        disks = [{"mountpoint": "/", "percent": random.uniform(75, 95)}]
+        if random.random() > 0.1:  # /var comes and goes
+            disks.append({"mountpoint": "/var", "percent": random.uniform(75, 95)})
+        records.append({
+            "timestamp": datetime.fromtimestamp(1_700_000_000 + position * 10, timezone.utc)
+            .replace(tzinfo=None).isoformat() + "Z",
+            "memory": {"percent": random.uniform(80, 95)},
+            "cpu": {"frequency": random.uniform(1400, 1700)},
+            "disks": disks
+        })
+    return records
+
+
+def live_firing(rule_set, records):
+    manager = AlertManager(rules=rule_set.alert_rules())
+    return [{(alert["rule"], alert["key"]) for alert in manager.evaluate(record, now=1_700_000_000 + position * 10)}
+            for position, record in enumerate(records)]
+
+
+def test_batches_match_live_engine():
+    rule_set = ThresholdRuleSet.from_spec(SPEC)
+    records = make_records(500)
+    expected = live_firing(rule_set, records)
+
+    for batch_size in (1, 7, 64, 500):
+        state, issues = {}, []
+        for start in range(0, len(records), batch_size):
+            issues.extend(rule_set.evaluate_batch(records[start:start + batch_size], state))
+        assert [{(issue["rule"], issue["key"]) for issue in record_issues} for record_issues in issues] == expected
+
+
+def test_for_seconds_and_hysteresis():
+    rule_set = ThresholdRuleSet.from_spec({"rules": [SPEC["rules"][0]]})
+    values = [95, 95, 95, 95, 88, 95, 84, 95, 95]
+    records = [{"timestamp": f"2026-01-01T00:00:{position * 10:02d}Z", "memory": {"percent": value}}
+               for position, value in enumerate(values)]
+
+    firing = [bool(issues) for issues in rule_set.evaluate_batch(records)]
+
+    # Fires 30 s into the run, holds through 88 (above the clear threshold), resets at 84
+    assert firing == [False, False, False, True, True, True, False, False, False]
+
+
+def test_worker_config_is_picklable():
+    analyzer = Analyzer(metrics_file="history.json", rules=ThresholdRuleSet.from_spec(SPEC))
+    config = pickle.loads(pickle.dumps(analyzer.worker_config()))
+
+    worker = Analyzer(**config)
+    assert [rule.name for rule in worker.rules.rules] == ["memory_usage", "disk_usage", "cpu_frequency"]
+    assert worker.rules.analyzer_options == {"cpu_threshold": 80}
+
+
+def test_parallel_chunks_match_serial(tmp_path, monkeypatch, caplog, analysis_workers):
+    rule_set = ThresholdRuleSet.from_spec({"rules": [
+        {"name": "memory_usage", "type": "HighMemoryUsage", "path": "memory.percent",
+         "op": ">", "threshold": 90, "for_seconds": 60}
+    ]})
+    history = tmp_path / "system_metrics.json"
+    # Every record breaches; the rule fires 60 s (six records) into the run and holds to the end
+    history.write_text("".join(json.dumps({"timestamp": f"2026-01-01T00:{position * 10 // 60:02d}:"
+                                                        f"{position * 10 % 60:02d}Z",
+                                           "memory": {"percent": 95}}) + "\n" for position in range(40)))
+    analyzer = Analyzer(metrics_file=str(history), rules=rule_set, rule_batch_size=8)
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+
+    serial = analyzer.analyze_metrics_parallel(workers=1)
+    with caplog.at_level(logging.ERROR):
+        parallel = analyzer.analyze_metrics_parallel(workers=4)
+
+    assert not caplog.records  # no fallback to the serial path
+    assert serial["counts"]["HighMemoryUsage"] == 34
+    assert parallel == serial
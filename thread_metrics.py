@@ -1,52 +1,71 @@
-import psutil
-from datetime import datetime
-
-class ThreadMetrics:
-    @staticmethod
-    def get_metrics(max_external_processes=10):
-        thread_details = []
-        seen_pids = set()
-        external_process_count = 0
-
-        current_pid = psutil.Process().pid
-
-        for proc in psutil.process_iter(['pid', 'name']):
-            try:
-                if proc.pid == current_pid:
-                    continue  # Skip current process
-
-                if proc.pid in seen_pids:
-                    continue  # Skip duplicates, if any
-
-                if external_process_count >= max_external_processes:
-                    break  # Limit reached
-
-                seen_pids.add(proc.pid)
-                external_process_count += 1
-
-                for t in proc.threads():
-                    thread_details.append({
-                        "process_name": proc.info['name'],
-                        "pid": proc.pid,
-                        "thread_name": f"TID-{t.id}",
-                        "ident": t.id,
-                        "is_alive": "Unknown",
-                        "daemon": "Unknown",
-                        "is_blocking": "Unknown",
-                        "stack_summary": ["Unavailable for external process"],
-                        "user_time": round(t.user_time, 2),
-                        "system_time": round(t.system_time, 2),
-                        "total_cpu_time": round(t.user_time + t.system_time, 2),
-                        "source": "external"
-                    })
-
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                # Skip processes we can't access
-                continue
-
-        return {
-            "collected_at": datetime.now().isoformat(),
-            "external_process_count": external_process_count,
-            "thread_count": len(thread_details),
-            "thread_details": thread_details
-        }
+import time
+import psutil
+from datetime import datetime
+
+from metrics.inspection_planner import inspection_planner
+from metrics.process_cache import process_cache
+from metrics.thread_tracker import thread_tracker
+from metrics.contention_detector import contention_detector
+
+class ThreadMetrics:
+    @staticmethod
+    def get_metrics(max_external_processes=None):
+        """
+        Per-thread CPU times for the processes picked by the inspection planner:
+        the top-ranked processes by CPU/RSS/IO plus newly anomalous ones. CPU% and
+        context-switch rates are deltas since the previous cycle; is_blocking and
+        is_starved come from the contention detector.
+
+        :param max_external_processes: int - Hard cap on top-ranked processes (None: adaptive K).
+        :return: dict - Thread details of the inspected processes.
+        """
+        thread_details = []
+        external_process_count = 0
+
+        current_pid = psutil.Process().pid
+        started = time.perf_counter()
+
+        for record, reason in inspection_planner.plan("threads", limit=max_external_processes,
+                                                      exclude_pids=(current_pid,)):
+            try:
+                threads = thread_tracker.sample(record['pid'], process_cache.process(record['pid']))
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                # Skip processes we can't access
+                continue
+
+            external_process_count += 1
+            for t in threads:
+                assessment = contention_detector.assess(t)
+                thread_details.append({
+                    "process_name": record['name'],
+                    "pid": record['pid'],
+                    "thread_name": f"TID-{t['tid']}",
+                    "ident": t['tid'],
+                    "is_alive": "Unknown",
+                    "daemon": "Unknown",
+                    "is_blocking": assessment["is_blocking"],
+                    "is_starved": assessment["is_starved"],
+                    "contention_reasons": assessment["contention_reasons"],
+                    "state": t['state'],
+                    "wait_channel": t['wait_channel'],
+                    "run_delay_ratio": t['run_delay_ratio'],
+                    "blocked_ratio": t['blocked_ratio'],
+                    "stack_summary": [f"wchan: {t['wait_channel']}"] if t['wait_channel'] else ["Unavailable for external process"],
+                    "user_time": round(t['user_time'], 2),
+                    "system_time": round(t['system_time'], 2),
+                    "total_cpu_time": round(t['user_time'] + t['system_time'], 2),
+                    "cpu_percent": t['cpu_percent'],
+                    "voluntary_ctxt_switches_per_sec": t['voluntary_ctxt_switches_per_sec'],
+                    "nonvoluntary_ctxt_switches_per_sec": t['nonvoluntary_ctxt_switches_per_sec'],
+                    "source": "external",
+                    "inspection_reason": reason
+                })
+
+        inspection_planner.record_cost("threads", time.perf_counter() - started, external_process_count)
+
+        return {
+            "collected_at": datetime.now().isoformat(),
+            "external_process_count": external_process_count,
+            "thread_count": len(thread_details),
+            "thread_details": thread_details
+        }
@@ -0,0 +1,217 @@
+import os
+import platform
+import sys
+import threading
+import time
+
+import psutil
+
+
+class ThreadActivityTracker:
+    """
+    Per-thread CPU and context-switch rates tracked across collection cycles.
+
+    Cumulative thread CPU time says nothing about what a thread is doing now, so
+    every sample is compared with the previous one for the same thread: CPU seconds
+    per wall second (as a percentage) and voluntary / involuntary context switches
+    per second. A thread seen for the first time is averaged over its lifetime.
+
+    On Linux the scheduler statistics of /proc/<pid>/task/<tid>/schedstat add the
+    run-queue delay ratio (seconds spent runnable but waiting for a CPU, per wall
+    second) and the blocked ratio (share of wall time neither running nor waiting
+    to run), and every sample records the thread state and what it sleeps on
+    (wchan, or the futex syscall when wchan is hidden).
+
+    State is one tuple per (pid, tid): (start ticks, cpu seconds, voluntary,
+    involuntary, run ns, run-queue wait ns, sampled at). Threads that exit are
+    evicted when their process is next sampled; processes that are no longer sampled
+    are swept after max_idle seconds.
+
+    Every consumer keeps its own baselines, so rates are always measured over that
+    consumer's own sampling interval: a dashboard route polling every few seconds
+    does not shorten the window of the collector's per-cycle rates.
+
+    On Linux the counters come straight from /proc/<pid>/task/<tid>/{stat,status,schedstat};
+    elsewhere psutil's per-thread CPU times are used and the other counters are None.
+    """
+
+    # futex(2) syscall numbers, used when the kernel hides wchan
+    FUTEX_SYSCALLS = {"x86_64": 202, "aarch64": 98, "i686": 240, "armv7l": 240}
+
+    def __init__(self, proc_root="/proc", max_idle=300.0):
+        self.proc_root = proc_root
+        self.max_idle = max_idle
+        self.lock = threading.Lock()
+        self.use_procfs = sys.platform.startswith("linux") and os.path.isdir(proc_root)
+        self._clock_ticks = os.sysconf("SC_CLK_TCK") if self.use_procfs else 100
+        self._futex_syscall = self.FUTEX_SYSCALLS.get(platform.machine())
+        self._state = {}          # (consumer, pid) -> {tid: state tuple (see the class docstring)}
+        self._last_seen = {}      # (consumer, pid) -> monotonic time of the last sample
+
+    def _uptime(self):
+        with open(os.path.join(self.proc_root, "uptime"), "rb") as file:
+            return float(file.read().split()[0])
+
+    def _read_task(self, task_dir):
+        """
+        :return: tuple - (start_ticks, user_time, system_time, voluntary, involuntary,
+                 run_ns, wait_ns, state, wait_channel) for one /proc task directory.
+        """
+        with open(os.path.join(task_dir, "stat"), "rb") as file:
+            data = file.read()
+        # comm may contain spaces and parentheses: fields restart after the last ')'
+        fields = data[data.rindex(b")") + 2:].split()
+        state = fields[0].decode()
+        user_time = int(fields[11]) / self._clock_ticks
+        system_time = int(fields[12]) / self._clock_ticks
+        start_ticks = int(fields[19])
+
+        voluntary = involuntary = None
+        with open(os.path.join(task_dir, "status"), "rb") as file:
+            for line in file:
+                if line.startswith(b"voluntary_ctxt_switches:"):
+                    voluntary = int(line.split()[1])
+                elif line.startswith(b"nonvoluntary_ctxt_switches:"):
+                    involuntary = int(line.split()[1])
+
+        run_ns = wait_ns = None
+        try:
+            with open(os.path.join(task_dir, "schedstat"), "rb") as file:
+                run_ns, wait_ns = (int(value) for value in file.read().split()[:2])
+        except (OSError, ValueError):
+            pass  # kernel built without CONFIG_SCHEDSTATS
+
+        wait_channel = None
+        if state in ("S", "D"):
+            wait_channel = self._read_wait_channel(task_dir)
+        return start_ticks, user_time, system_time, voluntary, involuntary, run_ns, wait_ns, state, wait_channel
+
+    def _read_wait_channel(self, task_dir):
+        """Kernel function a sleeping thread waits in; "futex" from the syscall number when wchan is hidden."""
+        try:
+            with open(os.path.join(task_dir, "wchan"), "rb") as file:
+                wchan = file.read().decode().strip()
+            if wchan and wchan != "0":
+                return wchan
+        except OSError:
+            pass
+        try:
+            with open(os.path.join(task_dir, "syscall"), "rb") as file:
+                syscall = file.read().split(b" ", 1)[0]
+            if syscall.isdigit() and int(syscall) == self._futex_syscall:
+                return "futex"
+        except OSError:
+            pass  # needs ptrace access to the process
+        return None
+
+    def _read_threads(self, pid, process):
+        """:return: dict - tid -> the tuple returned by _read_task()."""
+        threads = {}
+        if self.use_procfs:
+            task_root = os.path.join(self.proc_root, str(pid), "task")
+            try:
+                tids = os.listdir(task_root)
+            except FileNotFoundError:
+                raise psutil.NoSuchProcess(pid)
+            except PermissionError:
+                raise psutil.AccessDenied(pid)
+            for tid in tids:
+                try:
+                    threads[int(tid)] = self._read_task(os.path.join(task_root, tid))
+                except (OSError, ValueError, IndexError):
+                    continue  # thread exited or is unreadable
+            return threads
+
+        process = process or psutil.Process(pid)
+        for thread in process.threads():
+            threads[thread.id] = (None, thread.user_time, thread.system_time, None, None, None, None, None, None)
+        return threads
+
+    def sample(self, pid, process=None, consumer="collector"):
+        """
+        Sample every thread of one process and return its current activity.
+
+        :param pid: int - Process to sample.
+        :param process: psutil.Process - Optional cached Process object (non-Linux path).
+        :param consumer: str - Whose baseline to compare with and replace (e.g. "collector", a route name).
+        :return: list[dict] - tid, user_time, system_time, cpu_percent, voluntary_ctxt_switches_per_sec,
+                 nonvoluntary_ctxt_switches_per_sec, run_delay_ratio, blocked_ratio, state,
+                 wait_channel (rates are None without a baseline).
+        """
+        threads = self._read_threads(pid, process)
+        now = time.monotonic()
+        uptime = self._uptime() if self.use_procfs else None
+
+        key = (consumer, pid)
+        with self.lock:
+            previous_threads = self._state.get(key, {})
+            current_threads = {}
+            results = []
+            for tid, (start_ticks, user_time, system_time, voluntary, involuntary,
+                      run_ns, wait_ns, state, wait_channel) in threads.items():
+                cpu_seconds = user_time + system_time
+                previous = previous_threads.get(tid)
+                if previous is not None and previous[0] == start_ticks:
+                    elapsed = now - previous[6]
+                    baseline = previous[1:6]
+                elif start_ticks is not None:
+                    # First sight: average over the thread's lifetime
+                    elapsed = uptime - start_ticks / self._clock_ticks
+                    baseline = (0.0, 0, 0, 0, 0)
+                else:
+                    elapsed, baseline = None, None
+
+                cpu_percent = voluntary_rate = involuntary_rate = run_delay_ratio = blocked_ratio = None
+                if elapsed is not None and elapsed > 0:
+                    cpu_percent = round(max(cpu_seconds - baseline[0], 0.0) / elapsed * 100, 2)
+                    if voluntary is not None:
+                        voluntary_rate = round(max(voluntary - baseline[1], 0) / elapsed, 2)
+                    if involuntary is not None:
+                        involuntary_rate = round(max(involuntary - baseline[2], 0) / elapsed, 2)
+                    if run_ns is not None and baseline[3] is not None:
+                        run_seconds = max(run_ns - baseline[3], 0) / 1e9
+                        wait_seconds = max(wait_ns - baseline[4], 0) / 1e9
+                        run_delay_ratio = round(wait_seconds / elapsed, 3)
+                        blocked_ratio = round(min(max(1 - (run_seconds + wait_seconds) / elapsed, 0.0), 1.0), 3)
+
+                current_threads[tid] = (start_ticks, cpu_seconds, voluntary, involuntary, run_ns, wait_ns, now)
+                results.append({
+                    "tid": tid,
+                    "user_time": user_time,
+                    "system_time": system_time,
+                    "cpu_percent": cpu_percent,
+                    "voluntary_ctxt_switches_per_sec": voluntary_rate,
+                    "nonvoluntary_ctxt_switches_per_sec": involuntary_rate,
+                    "run_delay_ratio": run_delay_ratio,
+                    "blocked_ratio": blocked_ratio,
+                    "state": state,
+                    "wait_channel": wait_channel
+                })
+
+            # Replacing the table for this pid evicts threads that have exited
+            self._state[key] = current_threads
+            self._last_seen[key] = now
+            self._sweep(now)
+        return results
+
+    def _sweep(self, now):
+        for key in [key for key, seen in self._last_seen.items() if now - seen > self.max_idle]:
+            self._state.pop(key, None)
+            del self._last_seen[key]
+
+    def stats(self):
+        with self.lock:
+            consumers = {}
+            for (consumer, _), threads in self._state.items():
+                counts = consumers.setdefault(consumer, {"tracked_processes": 0, "tracked_threads": 0})
+                counts["tracked_processes"] += 1
+                counts["tracked_threads"] += len(threads)
+            return {
+                "tracked_processes": len({pid for _, pid in self._state}),
+                "tracked_threads": sum(len(threads) for threads in self._state.values()),
+                "consumers": consumers
+            }
+
+
+# Process-wide tracker shared by ThreadMetrics and the Analyzer
+thread_tracker = ThreadActivityTracker()
@@ -0,0 +1,385 @@
+import json
+import logging
+import re
+from datetime import datetime, timezone
+
+from metrics.alert_manager import AlertRule
+
+
+def _epoch_seconds(timestamp):
+    """:return: float - A record timestamp (ISO 8601, naive means UTC) as epoch seconds, or None."""
+    try:
+        moment = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+class ThresholdRule:
+    """
+    One declarative threshold rule, compiled once from its spec:
+
+        {"name": "disk_usage", "type": "HighDiskUsage",
+         "path": "disk_deep_metrics.disk_partitions[*].percent", "key": "mountpoint",
+         "op": ">", "threshold": 85, "clear_threshold": 80, "for_seconds": 60,
+         "severity": "warning", "message": "Disk usage high: {value}% on {key}"}
+
+    path is a dotted field path into a snapshot. "*" (or "[*]") fans out over every
+    value of a dict or element of a list; each match is tracked under its own key:
+    the dict key, the list element's `key` field, or the list index. "[N]" picks one
+    list element. Paths with at most one fan-out also compile to plain key chains
+    (before and after the fan-out) for the history evaluator.
+    """
+
+    SEGMENT = re.compile(r"([^.\[\]]+)|\[(\*|\d+)\]")
+
+    def __init__(self, spec):
+        self.spec = dict(spec)
+        try:
+            self.name = spec["name"]
+            self.path = spec["path"]
+            self.threshold = float(spec["threshold"])
+        except KeyError as e:
+            raise ValueError(f"Threshold rule {spec.get('name', spec)} is missing {e}")
+        self.type = spec.get("type", self.name)
+        self.op = spec.get("op", ">")
+        if self.op not in AlertRule.COMPARISONS:
+            raise ValueError(f"Unsupported comparison in rule {self.name}: {self.op}")
+        self.clear_threshold = spec.get("clear_threshold")
+        self.for_seconds = float(spec.get("for_seconds", 0))
+        self.severity = spec.get("severity", "warning")
+        self.message = spec.get("message", "{name} is {value} (threshold {threshold})")
+        self.key_field = spec.get("key")
+        self._direct = None     # key chain of a path without fan-out
+        self._fan_out_chains = None     # (chain before, chain after) the single fan-out
+        self._extract = self._compile(self.path)
+
+    def _compile(self, path):
+        """Compile the path into a chain of accessors: each maps (key parts, node) pairs to their children."""
+        segments = self.SEGMENT.findall(path)
+        chain = tuple("*" if "*" in (name, index) else int(index) if index else name for name, index in segments)
+        if chain and "*" not in chain:
+            self._direct = chain
+        elif chain.count("*") == 1:
+            split = chain.index("*")
+            self._fan_out_chains = (chain[:split], chain[split + 1:])
+        steps = []
+        for name, index in segments:
+            if name == "*" or index == "*":
+                steps.append(self._fan_out)
+            elif index:
+                position = int(index)
+                steps.append(lambda parts, node, position=position:
+                             [(parts, node[position])] if isinstance(node, list) and position < len(node) else [])
+            else:
+                steps.append(lambda parts, node, name=name:
+                             [(parts, node[name])] if isinstance(node, dict) and name in node else [])
+        if not steps:
+            raise ValueError(f"Empty path in rule {self.name}")
+
+        def extract(snapshot):
+            matches = [((), snapshot)]
+            for step in steps:
+                matches = [child for parts, node in matches for child in step(parts, node)]
+                if not matches:
+                    break
+            return matches
+        return extract
+
+    def _fan_out(self, parts, node):
+        if isinstance(node, dict):
+            return [(parts + (str(key),), value) for key, value in node.items()]
+        if isinstance(node, list):
+            children = []
+            for position, item in enumerate(node):
+                key = item.get(self.key_field, position) if self.key_field and isinstance(item, dict) else position
+                children.append((parts + (str(key),), item))
+            return children
+        return []
+
+    @staticmethod
+    def _walk(node, chain):
+        """:return: The node at the end of a key chain, or None where the snapshot has no such field."""
+        for step in chain:
+            if isinstance(step, int):
+                if not isinstance(node, list) or step >= len(node):
+                    return None
+            elif not isinstance(node, dict) or step not in node:
+                return None
+            node = node[step]
+        return node
+
+    def values(self, snapshot):
+        """:return: dict - {key: float} for every numeric match (key None for a single value)."""
+        if self._direct is not None:
+            value = self._walk(snapshot, self._direct)
+            return {None: float(value)} if type(value) in (int, float) else {}
+        values = {}
+        for parts, value in self._extract(snapshot):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                values[":".join(parts) if parts else None] = float(value)
+        return values
+
+    def format(self, key, value):
+        return self.message.format(name=self.name, key=key, value=value, threshold=self.threshold)
+
+    def alert_rule(self):
+        """:return: AlertRule - The live evaluator for the alert manager."""
+        return AlertRule(self.name, self.values, self.threshold, comparison=self.op,
+                         clear_threshold=self.clear_threshold, for_seconds=self.for_seconds,
+                         severity=self.severity, message=self.message)
+
+
+class ThresholdRuleSet:
+    """
+    A rule file: threshold rules plus the Analyzer and disk profiler thresholds.
+
+        {"rules": [...], "analyzer": {"cpu_threshold": 80, ...},
+         "disk_profiler": {"disk_usage_threshold": 85, ...}}
+
+    JSON is always supported; .yaml/.yml files need PyYAML. Rules run live through the
+    alert manager and over history with evaluate_batch(); for_seconds and hysteresis
+    apply to both, so a record is reported exactly when the live rule would be firing.
+    """
+
+    def __init__(self, rules=None, analyzer_options=None, disk_profiler_options=None):
+        self.rules = [rule if isinstance(rule, ThresholdRule) else ThresholdRule(rule) for rule in rules or []]
+        self.analyzer_options = dict(analyzer_options or {})
+        self.disk_profiler_options = dict(disk_profiler_options or {})
+
+    @classmethod
+    def from_spec(cls, spec):
+        """:param spec: dict - A parsed rule file ({"rules": [...], "analyzer": {...}, ...})."""
+        return cls(spec.get("rules"), spec.get("analyzer"), spec.get("disk_profiler"))
+
+    @classmethod
+    def load(cls, path):
+        """
+        :param path: str - A .json, .yaml or .yml rule file.
+        :return: ThresholdRuleSet - The compiled rule set.
+        """
+        with open(path, "r") as file:
+            if path.endswith((".yaml", ".yml")):
+                try:
+                    import yaml
+                except ImportError:
+                    raise RuntimeError("YAML rule files require the 'PyYAML' package")
+                spec = yaml.safe_load(file) or {}
+            else:
+                spec = json.load(file)
+        rule_set = cls.from_spec(spec)
+        logging.info(f"Loaded {len(rule_set.rules)} threshold rule(s) from {path}")
+        return rule_set
+
+    def spec(self):
+        """:return: dict - The plain, picklable rule file this set compiles from (see from_spec)."""
+        return {"rules": [rule.spec for rule in self.rules], "analyzer": dict(self.analyzer_options),
+                "disk_profiler": dict(self.disk_profiler_options)}
+
+    def alert_rules(self):
+        return [rule.alert_rule() for rule in self.rules]
+
+    @staticmethod
+    def _columns(rule, records, np):
+        """:return: (keys, matrix) - The rule's values as a (keys x records) matrix, NaN where a key is missing."""
+        if rule._direct is not None:
+            column = []
+            for record in records:
+                value = rule._walk(record, rule._direct)
+                column.append(value if type(value) in (int, float) else np.nan)
+            matrix = np.array([column], dtype=float)
+            return ([None], matrix) if not np.isnan(matrix).all() else ([], matrix[:0])
+        positions, values = {}, {}
+
+        def add(key, position, value):
+            if key not in positions:
+                positions[key], values[key] = [], []
+            positions[key].append(position)
+            values[key].append(value)
+
+        if rule._fan_out_chains is not None:
+            before, after = rule._fan_out_chains
+            for position, record in enumerate(records):
+                node = rule._walk(record, before)
+                if isinstance(node, dict):
+                    children = ((str(key), child) for key, child in node.items())
+                elif isinstance(node, list):
+                    children = ((str(child.get(rule.key_field, index) if rule.key_field and isinstance(child, dict)
+                                     else index), child) for index, child in enumerate(node))
+                else:
+                    continue
+                for key, child in children:
+                    value = rule._walk(child, after)
+                    if type(value) in (int, float):
+                        add(key, position, float(value))
+        else:
+            for position, record in enumerate(records):
+                for key, value in rule.values(record).items():
+                    add(key, position, value)
+        keys = list(positions)
+        matrix = np.full((len(keys), len(records)), np.nan)
+        for row, key in enumerate(keys):
+            matrix[row, positions[key]] = values[key]
+        return keys, matrix
+
+    @staticmethod
+    def _firing_spans(raised, held, times, for_seconds, carried, np):
+        """
+        Replay one key of one rule the way AlertManager.evaluate does, one run at a time.
+
+        A run of records breaching the threshold (raised) fires at its first record at
+        least for_seconds after the run started; firing lasts until the first record
+        that no longer breaches the clear threshold (held), which resets the key.
+
+        :param carried: dict - {"pending_since", "firing"} left by the previous batch, or None.
+        :return: (list[(start, end)], dict) - Firing record ranges and the state to carry on.
+        """
+        count = len(raised)
+        breaks = np.flatnonzero(~held)
+        spans = []
+        resume = 0
+        if carried is not None and carried["firing"]:
+            end = int(breaks[0]) if len(breaks) else count
+            spans.append((0, end))
+            if end == count:
+                return spans, carried
+            resume, carried = end + 1, None
+
+        edges = np.diff(np.concatenate(([0], raised.astype(np.int8), [0])))
+        pending = None
+        for start, end in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+            if end <= resume:
+                continue
+            start = max(int(start), resume)
+            since = carried["pending_since"] if carried is not None and start == 0 else float(times[start])
+            fire = start + int(np.searchsorted(times[start:end], since + for_seconds))
+            if fire >= end:
+                if end == count:
+                    pending = {"pending_since": since, "firing": False}
+                continue
+            following = int(np.searchsorted(breaks, fire, side="right"))
+            stop = int(breaks[following]) if following < len(breaks) else count
+            spans.append((fire, stop))
+            if stop == count:
+                return spans, {"pending_since": since, "firing": True}
+            resume = stop + 1
+        return spans, pending
+
+    @staticmethod
+    def _trace(trace, state_key, raised, held, times):
+        """Record a key's comparisons while it has not reset since the first record of the traced range."""
+        runs = trace["runs"]
+        if trace["records"] and runs.get(state_key) is None:
+            return  # missing from an earlier record, or already reset
+        if not (raised | held).all():
+            runs[state_key] = None  # neither raised nor held resets the key whatever state it started in
+        else:
+            runs.setdefault(state_key, []).append((raised.copy(), held.copy(), times))
+
+    def carry(self, state, trace, traced_state):
+        """
+        The state after a traced range of records that evaluate_batch started from an
+        empty state, given the state the range really started from. Keys that reset
+        inside the range end as traced; the others are replayed from their trace.
+
+        :param state: dict - Per-(rule, key) state before the range.
+        :param trace: dict - The range's trace (see evaluate_batch).
+        :param traced_state: dict - The state evaluate_batch left after the range.
+        :return: dict - The state after the range.
+        """
+        if not trace["records"]:
+            return dict(state)
+        carried = dict(traced_state)
+        if not state:
+            return carried
+        import numpy as np
+        for_seconds = {rule.name: rule.for_seconds for rule in self.rules}
+        for state_key, start in state.items():
+            run = trace["runs"].get(state_key)
+            if not run:
+                continue
+            raised, held, times = (np.concatenate(parts) for parts in zip(*run))
+            _, end = self._firing_spans(raised, held, times, for_seconds[state_key[0]], start, np)
+            if end is None:
+                carried.pop(state_key, None)
+            else:
+                carried[state_key] = end
+        return carried
+
+    def evaluate_batch(self, records, state=None, trace=None):
+        """
+        Evaluate every rule over a batch of history records with the live engine's
+        for_seconds and hysteresis semantics.
+
+        Each distinct path is extracted once per record into a (keys x records)
+        matrix; the threshold and clear-threshold comparisons are array operations,
+        and the firing state is then replayed per run of breaching records rather
+        than per record. A key missing from a record resets, as a vanished key does
+        live.
+
+        :param records: list[dict] - Consecutive metrics records.
+        :param state: dict - Per-(rule, key) state carried between consecutive batches; updated in place.
+        :param trace: dict - {"records": 0, "runs": {}} to trace consecutive batches for carry(), so a
+            range evaluated from an empty state can be chained after the range before it; updated in place.
+        :return: list[list[dict]] - The rule issues of each record, in record order.
+        """
+        issues = [[] for _ in records]
+        state = {} if state is None else state
+        if not records or not self.rules:
+            return issues
+        import numpy as np  # history analysis only; kept off the startup path
+        timestamps = [record.get("timestamp") or record.get("system_info", {}).get("current_time", "Unknown Time")
+                      for record in records]
+        # Unparseable timestamps take the previous record's time
+        times, moment = np.empty(len(records)), 0.0
+        for position, timestamp in enumerate(timestamps):
+            parsed = _epoch_seconds(timestamp)
+            moment = moment if parsed is None else parsed
+            times[position] = moment
+
+        extracted = {}
+        for rule in self.rules:
+            signature = (rule.path, rule.key_field)
+            if signature not in extracted:
+                extracted[signature] = self._columns(rule, records, np)
+            keys, matrix = extracted[signature]
+            for state_key in [state_key for state_key in state if state_key[0] == rule.name and state_key[1] not in keys]:
+                del state[state_key]
+            if trace is not None and trace["records"]:
+                for state_key in trace["runs"]:
+                    if state_key[0] == rule.name and state_key[1] not in keys:
+                        trace["runs"][state_key] = None
+            if not keys:
+                continue
+            compare = AlertRule.COMPARISONS[rule.op]
+            clear_threshold = rule.threshold if rule.clear_threshold is None else rule.clear_threshold
+            with np.errstate(invalid="ignore"):
+                raised = compare(matrix, rule.threshold)
+                held = compare(matrix, clear_threshold)
+            for row, key in enumerate(keys):
+                spans, carried = self._firing_spans(raised[row], held[row], times, rule.for_seconds,
+                                                    state.get((rule.name, key)), np)
+                if carried is None:
+                    state.pop((rule.name, key), None)
+                else:
+                    state[(rule.name, key)] = carried
+                if trace is not None:
+                    self._trace(trace, (rule.name, key), raised[row], held[row], times)
+                for start, end in spans:
+                    for position in range(start, end):
+                        value = float(matrix[row, position])
+                        issues[position].append({
+                            "type": rule.type,
+                            "timestamp": timestamps[position],
+                            "rule": rule.name,
+                            "key": key,
+                            "value": value,
+                            "threshold": rule.threshold,
+                            "severity": rule.severity,
+                            "message": rule.format(key, value)
+                        })
+        if trace is not None:
+            trace["records"] += len(records)
+        return issues
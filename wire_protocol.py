@@ -0,0 +1,67 @@
+import asyncio
+import json
+import struct
+import zlib
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Frame: payload length (uint32), flags (uint8), payload. Payloads are JSON, zlib-compressed when flagged.
+HEADER = struct.Struct("!IB")
+FLAG_ZLIB = 0x01
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+# Small control messages (hello, ack) are not worth compressing
+COMPRESSION_MIN_BYTES = 512
+
+
+class ProtocolError(Exception):
+    """Raised for frames that cannot be decoded; the connection should be dropped."""
+
+
+def encode_frame(message, compression_level=6):
+    """
+    :param message: dict - A JSON-serializable message.
+    :return: bytes - The framed (and, above COMPRESSION_MIN_BYTES, compressed) message.
+    """
+    payload = orjson.dumps(message) if orjson is not None else json.dumps(message, separators=(",", ":")).encode()
+    flags = 0
+    if len(payload) >= COMPRESSION_MIN_BYTES:
+        payload = zlib.compress(payload, compression_level)
+        flags |= FLAG_ZLIB
+    if len(payload) > MAX_FRAME_BYTES:
+        raise ProtocolError(f"Frame of {len(payload)} bytes exceeds {MAX_FRAME_BYTES}")
+    return HEADER.pack(len(payload), flags) + payload
+
+
+def decode_payload(flags, payload):
+    try:
+        if flags & FLAG_ZLIB:
+            payload = zlib.decompress(payload)
+        return orjson.loads(payload) if orjson is not None else json.loads(payload)
+    except (zlib.error, ValueError) as e:
+        raise ProtocolError(f"Undecodable frame: {e}")
+
+
+async def read_frame(reader):
+    """
+    Read one message from an asyncio StreamReader.
+
+    :return: dict - The decoded message, or None when the peer closed the connection.
+    """
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise ProtocolError("Connection closed inside a frame header")
+        return None
+    length, flags = HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ProtocolError(f"Frame of {length} bytes exceeds {MAX_FRAME_BYTES}")
+    try:
+        payload = await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        raise ProtocolError("Connection closed inside a frame")
+    return decode_payload(flags, payload)